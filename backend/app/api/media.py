@@ -0,0 +1,17 @@
+from fastapi import APIRouter, HTTPException, status
+
+from ..core.media import MediaResponse, resolve
+
+router = APIRouter()
+
+
+@router.api_route("/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def get_media(path: str):
+    """内容のハッシュをパスにしたメディアファイルを配信（app.core.media）"""
+    file_path = resolve(path)
+    if file_path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="ファイルが見つかりません"
+        )
+    return MediaResponse(file_path, path)
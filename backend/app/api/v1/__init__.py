@@ -1,12 +1,29 @@
 # API v1 endpoints
-from fastapi import APIRouter
+from fastapi import FastAPI
 from .products import router as products_router
 from .trial_requests import router as trial_requests_router
 from .users import router as users_router
+from .events import router as events_router
+from .metrics import router as metrics_router
+from .health import router as health_router
 
-api_router = APIRouter()
+# 各APIルーター（ルーター, プレフィックス, タグ）
+ROUTERS = [
+    (products_router, "/products", ["products"]),
+    (trial_requests_router, "/trial-requests", ["trial-requests"]),
+    (users_router, "/users", ["users"]),
+    (events_router, "/events", ["events"]),
+    (metrics_router, "/metrics", ["metrics"]),
+    (health_router, "/health", ["health"]),
+]
 
-# 各APIルーターを登録
-api_router.include_router(products_router, prefix="/products", tags=["products"])
-api_router.include_router(trial_requests_router, prefix="/trial-requests", tags=["trial-requests"])
-api_router.include_router(users_router, prefix="/users", tags=["users"])
\ No newline at end of file
+
+def include_api_routers(app: FastAPI, prefix: str) -> None:
+    """
+    各APIルーターをアプリに直接登録
+    
+    include_router は登録先でルートを作り直すため、中間のルーターを経由せずに
+    登録して作り直しを1回にする（ワーカーの起動時間を短縮）
+    """
+    for router, router_prefix, tags in ROUTERS:
+        app.include_router(router, prefix=prefix + router_prefix, tags=tags)
@@ -0,0 +1,78 @@
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...core.database import get_tenant_db
+from ...core.events import SSE_HEADERS, broker, event_stream, parse_last_event_id, replay_events
+from ...core.tenancy import session_salon_id
+from ...crud import outbox as crud_outbox
+from ...models.outbox import AggregateType
+from ...schemas.event import EventFeedResponse, OutboxEventResponse
+
+router = APIRouter()
+
+
+@router.get("/", response_model=EventFeedResponse)
+async def get_events(
+    after: int = Query(0, ge=0, description="この連番より後を取得（前回の next_cursor）"),
+    limit: int = Query(100, ge=1, le=1000, description="取得件数"),
+    aggregate_type: Optional[AggregateType] = Query(None, description="集約種別フィルタ"),
+    db: AsyncSession = Depends(get_tenant_db)
+):
+    """
+    リクエストのサロンの配信済みの変更イベントを配信順（連番 seq）に取得
+    
+    ディスパッチャが配信する前のイベントは含めない。連番は全サロンで共通のため、
+    続きの連番は飛び飛びになる
+    """
+    events = await crud_outbox.get_after(
+        db, after=after, limit=limit + 1, aggregate_type=aggregate_type
+    )
+    has_more = len(events) > limit
+    events = events[:limit]
+    
+    return EventFeedResponse(
+        items=[OutboxEventResponse.model_validate(event) for event in events],
+        next_cursor=events[-1].dispatched_seq if events else after,
+        has_more=has_more
+    )
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    after: Optional[int] = Query(None, ge=0, description="この連番より後から配信（省略時は接続以降のイベントのみ）"),
+    aggregate_type: Optional[AggregateType] = Query(None, description="集約種別フィルタ"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: AsyncSession = Depends(get_tenant_db)
+):
+    """
+    リクエストのサロンの変更イベントをServer-Sent Eventsで配信
+    
+    再接続時は Last-Event-ID（または after）以降をフィードから再送してから
+    リアルタイム配信に切り替える。同じイベントが重複して届くことがあるため、
+    クライアントはイベントIDで重複を除外すること
+    """
+    cursor = parse_last_event_id(last_event_id, after)
+    # ブローカーは全サロンのイベントを配信するため、接続時のサロンで絞り込む
+    salon_id = session_salon_id(db)
+    # 再送の取りこぼしを防ぐため、フィードを読む前に購読を開始する
+    subscription = broker.subscribe()
+    
+    if cursor is None:
+        await db.close()
+        replay = None
+    else:
+        replay = replay_events(db, after=cursor, aggregate_type=aggregate_type)
+    
+    def accept(message: Dict[str, Any]) -> bool:
+        if message.get("salon_id") != salon_id:
+            return False
+        return aggregate_type is None or message["aggregate_type"] == aggregate_type.value
+    
+    return StreamingResponse(
+        event_stream(request, subscription, replay=replay, accept=accept),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
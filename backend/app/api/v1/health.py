@@ -0,0 +1,28 @@
+from typing import Any, Dict
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from ...core.health import readiness
+
+router = APIRouter()
+
+
+@router.get("/live")
+async def liveness() -> Dict[str, Any]:
+    """
+    プロセスが応答できるか（依存先は確認しない）
+
+    失敗時はコンテナを再起動する判定に使うため、DB等の障害で失敗させない
+    """
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness_check() -> JSONResponse:
+    """
+    リクエストを受け付けられるか（受け付けられない場合は 503）
+
+    ロードバランサーは 503 のワーカーを振り分け先から外す
+    """
+    report = await readiness.report()
+    return JSONResponse(status_code=200 if report["status"] == "ready" else 503, content=report)
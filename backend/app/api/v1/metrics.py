@@ -0,0 +1,22 @@
+from typing import Any, Dict
+from fastapi import APIRouter
+
+from ...core import singleflight
+from ...core.compression import compression_stats
+from ...core.database import replicas
+from ...core.response_cache import response_cache
+from ...core.startup import startup_profile
+
+router = APIRouter()
+
+
+@router.get("/")
+async def get_metrics() -> Dict[str, Any]:
+    """プロセス内の実行時メトリクスを取得（ワーカー毎の値）"""
+    return {
+        "singleflight": singleflight.metrics(),
+        "response_cache": response_cache.stats(),
+        "compression": compression_stats.snapshot(),
+        "startup": startup_profile.snapshot(),
+        "replicas": replicas.stats()
+    }
@@ -1,21 +1,53 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import csv
+from typing import Any, Hashable, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Header, Request
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...core.database import get_db
+from ...core.config import settings
+from ...core.database import get_read_db, get_tenant_db
+from ...core.replicas import READ_REPLICA_KEY
+from ...core.tenancy import SALON_SCOPE_KEY
+from ...core.export import ExportFormat, export_response
+from ...core.idempotency import run_idempotent
+from ...core.images import FileTooLargeError, InvalidImageError, image_processor
+from ...core.response_cache import TRIAL_STATS_TAG, tag_response
+from ...core.singleflight import group as singleflight_group, make_key
+from ...core.bulk_import import (
+    detect_format, iter_records, iter_chunks, validation_messages
+)
 from ...crud import product as crud_product
-from ...models.product import ProductStatus
+from ...crud.demand_forecast import demand_forecast
+from ...crud.stock import stock_ledger
+from ...crud.trial_stats import product_trial_stats
+from ...models.product import Product, ProductStatus
 from ...schemas.product import (
     ProductCreate, ProductUpdate, ProductResponse, ProductListItem,
-    ProductStockUpdate, ProductStatusUpdate, ProductSearchQuery, ProductFilter
+    ProductStockUpdate, ProductStatusUpdate, ProductSearchQuery, ProductFilter,
+    ProductImportRow, ProductImportError, ProductImportResult, ProductSort,
+    ProductTrialStatsResponse, ReorderSuggestion, ProductAvailabilityResponse,
+    StockMovementResponse, ProductImageUploadResponse
 )
 from ...schemas.common import PaginatedResponse
 
 router = APIRouter()
 
+# 同時に届いた同一条件の参照リクエストはDB問い合わせを1回にまとめる
+# （サロン毎、レプリカから読む場合とプライマリから読む場合は別のキー）
+product_reads = singleflight_group("products")
+
+
+def _read_key(db: AsyncSession, name: str, **params: Any) -> Tuple[Hashable, ...]:
+    """参照のキー（サロン・読み取り先を含める）"""
+    return make_key(
+        name, salon_id=db.info.get(SALON_SCOPE_KEY), replica=db.info.get(READ_REPLICA_KEY), **params
+    )
+
 
 @router.get("/", response_model=PaginatedResponse[ProductListItem])
 async def get_products(
+    request: Request,
     page: int = Query(1, ge=1, description="ページ番号"),
     size: int = Query(20, ge=1, le=100, description="ページサイズ"),
     category: Optional[str] = Query(None, description="カテゴリフィルタ"),
@@ -23,7 +55,8 @@ async def get_products(
     brand: Optional[str] = Query(None, description="ブランドフィルタ"),
     is_featured: Optional[bool] = Query(None, description="おすすめ商品のみ"),
     in_stock: Optional[bool] = Query(None, description="在庫ありのみ"),
-    db: AsyncSession = Depends(get_db)
+    sort: Optional[ProductSort] = Query(None, description="並び順（トライアル集計の値が大きい順）"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """商品一覧を取得"""
     skip = (page - 1) * size
@@ -37,63 +70,89 @@ async def get_products(
         in_stock=in_stock
     )
     
-    products = await crud_product.get_filtered_products(
-        db, filters=filters, skip=skip, limit=size
-    )
-    total = await crud_product.get_count(db)
+    async def load() -> PaginatedResponse[ProductListItem]:
+        products = await crud_product.get_filtered_products(
+            db, filters=filters, sort=sort, skip=skip, limit=size
+        )
+        total = await crud_product.get_count(db)
+        
+        return PaginatedResponse[ProductListItem](
+            items=[ProductListItem.model_validate(product) for product in products],
+            total=total,
+            page=page,
+            size=size,
+            pages=(total + size - 1) // size,
+            has_next=page * size < total,
+            has_prev=page > 1
+        )
     
-    return PaginatedResponse[ProductListItem](
-        items=[ProductListItem.model_validate(product) for product in products],
-        total=total,
-        page=page,
-        size=size,
-        pages=(total + size - 1) // size,
-        has_next=page * size < total,
-        has_prev=page > 1
+    key = _read_key(
+        db, "list", page=page, size=size, category=category, status=status,
+        brand=brand, is_featured=is_featured, in_stock=in_stock, sort=sort
     )
+    result = await product_reads.do(key, load)
+    tag_response(
+        request, result.items, category=category,
+        extra_tags=(TRIAL_STATS_TAG,) if sort else ()
+    )
+    return result
 
 
 @router.get("/search", response_model=PaginatedResponse[ProductListItem])
 async def search_products(
+    request: Request,
     q: str = Query(..., min_length=1, description="検索キーワード"),
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """商品を検索"""
     skip = (page - 1) * size
     
-    products = await crud_product.search_products(
-        db, query=q, skip=skip, limit=size
-    )
-    total = len(products)  # 検索結果の簡易カウント
+    async def load() -> PaginatedResponse[ProductListItem]:
+        products = await crud_product.search_products(
+            db, query=q, skip=skip, limit=size
+        )
+        total = len(products)  # 検索結果の簡易カウント
+        
+        return PaginatedResponse[ProductListItem](
+            items=[ProductListItem.model_validate(product) for product in products],
+            total=total,
+            page=page,
+            size=size,
+            pages=(total + size - 1) // size,
+            has_next=page * size < total,
+            has_prev=page > 1
+        )
     
-    return PaginatedResponse[ProductListItem](
-        items=[ProductListItem.model_validate(product) for product in products],
-        total=total,
-        page=page,
-        size=size,
-        pages=(total + size - 1) // size,
-        has_next=page * size < total,
-        has_prev=page > 1
-    )
+    key = _read_key(db, "search", q=q, page=page, size=size)
+    result = await product_reads.do(key, load)
+    tag_response(request, result.items)
+    return result
 
 
 @router.get("/featured", response_model=List[ProductListItem])
 async def get_featured_products(
+    request: Request,
     limit: int = Query(10, ge=1, le=50, description="取得件数"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """おすすめ商品一覧を取得"""
-    products = await crud_product.get_featured_products(db, limit=limit)
-    return [ProductListItem.model_validate(product) for product in products]
+    async def load() -> List[ProductListItem]:
+        products = await crud_product.get_featured_products(db, limit=limit)
+        return [ProductListItem.model_validate(product) for product in products]
+    
+    key = _read_key(db, "featured", limit=limit)
+    products = await product_reads.do(key, load)
+    tag_response(request, products)
+    return products
 
 
 @router.get("/low-stock", response_model=PaginatedResponse[ProductListItem])
 async def get_low_stock_products(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """在庫不足商品一覧を取得"""
     skip = (page - 1) * size
@@ -111,25 +170,145 @@ async def get_low_stock_products(
     )
 
 
+@router.get("/reorder-suggestions", response_model=PaginatedResponse[ReorderSuggestion])
+async def get_reorder_suggestions(
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=100),
+    needs_reorder: Optional[bool] = Query(None, description="在庫数が推奨最低在庫数以下のもののみ"),
+    within_days: Optional[int] = Query(None, ge=1, description="この日数以内に在庫切れ予測のもののみ"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    発注提案（在庫切れ予測日・推奨最低在庫数）を在庫切れが近い順に取得
+    
+    トライアル需要の予測ジョブの結果を返す（未実行の商品は含まない）
+    """
+    skip = (page - 1) * size
+    suggestions, total = await demand_forecast.get_suggestions(
+        db, skip=skip, limit=size, needs_reorder=needs_reorder, within_days=within_days
+    )
+    
+    return PaginatedResponse[ReorderSuggestion](
+        items=[ReorderSuggestion(**suggestion) for suggestion in suggestions],
+        total=total,
+        page=page,
+        size=size,
+        pages=(total + size - 1) // size,
+        has_next=page * size < total,
+        has_prev=page > 1
+    )
+
+
+@router.get("/export")
+async def export_products(
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="出力形式"),
+    category: Optional[str] = Query(None, description="カテゴリフィルタ"),
+    status: Optional[ProductStatus] = Query(None, description="ステータスフィルタ"),
+    brand: Optional[str] = Query(None, description="ブランドフィルタ"),
+    is_featured: Optional[bool] = Query(None, description="おすすめ商品のみ"),
+    in_stock: Optional[bool] = Query(None, description="在庫ありのみ"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """商品をNDJSON/CSVでストリーミングエクスポート"""
+    filters = ProductFilter(
+        category=category,
+        status=status,
+        brand=brand,
+        is_featured=is_featured,
+        in_stock=in_stock
+    )
+    query = crud_product.build_filtered_query(filters).order_by(Product.id)
+    
+    partitions = crud_product.stream_partitions(
+        db, query, chunk_size=settings.EXPORT_CHUNK_SIZE
+    )
+    return export_response(
+        partitions, ProductResponse, export_format=format, filename="products"
+    )
+
+
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(
     product_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """商品詳細を取得"""
+    async def load() -> ProductResponse:
+        product = await crud_product.get(db, id=product_id)
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="商品が見つかりません"
+            )
+        return ProductResponse.model_validate(product)
+    
+    key = _read_key(db, "detail", product_id=product_id)
+    return await product_reads.do(key, load)
+
+
+@router.get("/{product_id}/trial-stats", response_model=ProductTrialStatsResponse)
+async def get_product_trial_stats(
+    product_id: int,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """商品のトライアル集計（件数・完了率・平均評価・購入意向率）を取得"""
+    stats = await product_trial_stats.get(db, product_id=product_id)
+    if stats is not None:
+        return ProductTrialStatsResponse.model_validate(stats)
+    if not await crud_product.exists(db, id=product_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="商品が見つかりません"
+        )
+    return ProductTrialStatsResponse(product_id=product_id)
+
+
+@router.get("/{product_id}/availability", response_model=ProductAvailabilityResponse)
+async def get_product_availability(
+    product_id: int,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """商品の在庫数・トライアルの引当数・引当可能数を取得"""
     product = await crud_product.get(db, id=product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="商品が見つかりません"
         )
-    return ProductResponse.model_validate(product)
+    return ProductAvailabilityResponse(**await stock_ledger.get_availability(db, product=product))
+
+
+@router.get("/{product_id}/stock-movements", response_model=PaginatedResponse[StockMovementResponse])
+async def get_product_stock_movements(
+    product_id: int,
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """商品の在庫移動（引当・解除）を新しい順に取得"""
+    if not await crud_product.exists(db, id=product_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="商品が見つかりません"
+        )
+    skip = (page - 1) * size
+    movements, total = await stock_ledger.get_movements(db, product_id=product_id, skip=skip, limit=size)
+    
+    return PaginatedResponse[StockMovementResponse](
+        items=[StockMovementResponse.model_validate(movement) for movement in movements],
+        total=total,
+        page=page,
+        size=size,
+        pages=(total + size - 1) // size,
+        has_next=page * size < total,
+        has_prev=page > 1
+    )
 
 
 @router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 async def create_product(
     product_in: ProductCreate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_active_user)  # 認証実装後に追加
 ):
     """新しい商品を作成"""
@@ -137,11 +316,135 @@ async def create_product(
     return ProductResponse.model_validate(product)
 
 
+@router.post("/import", response_model=ProductImportResult)
+async def import_products(
+    file: UploadFile = File(..., description="CSVまたはNDJSONファイル"),
+    format: Optional[ExportFormat] = Query(None, description="入力形式（省略時はファイル名から判定）"),
+    db: AsyncSession = Depends(get_tenant_db)
+    # TODO: current_user: User = Depends(get_current_active_user)
+):
+    """商品を一括インポート（slug・型番が一致する商品は更新）"""
+    if file.size is not None and file.size > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="ファイルサイズが上限を超えています"
+        )
+    
+    import_format = format or detect_format(file.filename, file.content_type)
+    records = iter_records(
+        file.file, import_format, json_fields=("tags", "attributes", "image_urls")
+    )
+    
+    total_rows = created = updated = 0
+    errors: List[ProductImportError] = []
+    
+    try:
+        for chunk in iter_chunks(records, settings.IMPORT_CHUNK_SIZE):
+            total_rows += len(chunk)
+            rows: List[ProductImportRow] = []
+            row_numbers: List[int] = []
+            
+            # チャンク単位でバリデーション
+            for row_number, record, error in chunk:
+                if error:
+                    errors.append(ProductImportError(row=row_number, errors=[error]))
+                    continue
+                try:
+                    rows.append(ProductImportRow.model_validate(record))
+                    row_numbers.append(row_number)
+                except ValidationError as e:
+                    errors.append(ProductImportError(row=row_number, errors=validation_messages(e)))
+            
+            if not rows:
+                continue
+            
+            try:
+                chunk_created, chunk_updated, skipped = await crud_product.bulk_upsert(db, rows=rows)
+            except SQLAlchemyError as e:
+                await db.rollback()
+                message = f"データベースエラー: {e.__class__.__name__}"
+                errors.extend(ProductImportError(row=n, errors=[message]) for n in row_numbers)
+                continue
+            
+            created += chunk_created
+            updated += chunk_updated
+            errors.extend(
+                ProductImportError(row=row_numbers[i], errors=["同じキーの行が後に存在するためスキップしました"])
+                for i in skipped
+            )
+    except (UnicodeDecodeError, csv.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ファイルを読み込めません（UTF-8のCSVまたはNDJSONを指定してください）"
+        )
+    
+    errors.sort(key=lambda error: error.row)
+    return ProductImportResult(
+        total_rows=total_rows,
+        created=created,
+        updated=updated,
+        failed=len(errors),
+        errors=errors
+    )
+
+
+@router.post("/{product_id}/images", response_model=ProductImageUploadResponse)
+async def upload_product_image(
+    product_id: int,
+    file: UploadFile = File(..., description="JPEG・PNG・WebPの画像"),
+    primary: bool = Query(False, description="サムネイルをこの画像にする（未設定なら常に設定）"),
+    db: AsyncSession = Depends(get_tenant_db)
+    # TODO: current_user: User = Depends(get_current_active_user)
+):
+    """
+    商品画像をアップロード
+    
+    サイズ毎（thumb / card / full）のWebP・JPEGに変換して保存し、full のWebPを
+    画像URLに、thumb のWebPをサムネイルURLに設定する
+    """
+    if file.content_type not in settings.ALLOWED_FILE_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="対応していないファイル形式です"
+        )
+    if file.size is not None and file.size > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="ファイルサイズが上限を超えています"
+        )
+    product = await crud_product.get(db, id=product_id)
+    if not product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="商品が見つかりません"
+        )
+    
+    try:
+        result = await image_processor.process(file)
+    except FileTooLargeError as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+    except InvalidImageError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="画像を読み込めません"
+        )
+    
+    variants = result["variants"]
+    product = await crud_product.add_image(
+        db,
+        db_obj=product,
+        image_url=variants["full"]["webp"],
+        thumbnail_url=variants["thumb"]["webp"],
+        primary=primary
+    )
+    return ProductImageUploadResponse(**result, product=ProductResponse.model_validate(product))
+
+
 @router.put("/{product_id}", response_model=ProductResponse)
 async def update_product(
     product_id: int,
     product_in: ProductUpdate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_active_user)
 ):
     """商品を更新"""
@@ -158,40 +461,43 @@ async def update_product(
 
 @router.patch("/{product_id}/stock", response_model=ProductResponse)
 async def update_product_stock(
+    request: Request,
     product_id: int,
     stock_update: ProductStockUpdate,
-    db: AsyncSession = Depends(get_db)
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_active_user)
 ):
-    """商品在庫を更新"""
-    product = await crud_product.get(db, id=product_id)
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="商品が見つかりません"
+    """
+    商品在庫を更新
+    
+    Idempotency-Key を指定した再送では更新せず、初回のレスポンスを返す
+    """
+    async def handler() -> ProductResponse:
+        product = await crud_product.get(db, id=product_id)
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="商品が見つかりません"
+            )
+        
+        # 在庫数・最低在庫レベル（指定されている場合）を1回の更新で反映
+        updated_product = await crud_product.update(
+            db, db_obj=product, obj_in=stock_update.model_dump(exclude_none=True)
         )
+        
+        return ProductResponse.model_validate(updated_product)
     
-    # 在庫数の更新
-    quantity_change = stock_update.stock_quantity - product.stock_quantity
-    updated_product = await crud_product.update_stock(
-        db, product_id=product_id, quantity_change=quantity_change
+    return await run_idempotent(
+        db, request, key=idempotency_key, payload=stock_update, handler=handler
     )
-    
-    # 最低在庫レベルも更新（指定されている場合）
-    if stock_update.min_stock_level is not None:
-        updated_product.min_stock_level = stock_update.min_stock_level
-        db.add(updated_product)
-        await db.commit()
-        await db.refresh(updated_product)
-    
-    return ProductResponse.model_validate(updated_product)
 
 
 @router.patch("/{product_id}/status", response_model=ProductResponse)
 async def update_product_status(
     product_id: int,
     status_update: ProductStatusUpdate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_active_user)
 ):
     """商品ステータスを更新"""
@@ -210,7 +516,7 @@ async def update_product_status(
 async def toggle_product_featured(
     product_id: int,
     featured: bool = Query(..., description="おすすめ設定"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_active_user)
 ):
     """商品のおすすめ設定を切り替え"""
@@ -228,12 +534,12 @@ async def toggle_product_featured(
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
     product_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_active_user)
 ):
     """商品を削除"""
-    product = await crud_product.remove(db, id=product_id)
-    if not product:
+    deleted_id = await crud_product.remove(db, id=product_id)
+    if deleted_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="商品が見つかりません"
@@ -1,19 +1,61 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...core.database import get_db
-from ...crud import trial_request as crud_trial_request, product as crud_product
+from ...core.config import settings
+from ...core.database import get_read_db, get_tenant_db
+from ...core.events import SSE_HEADERS, broker, event_stream, parse_last_event_id, replay_events
+from ...core.export import ExportFormat, export_response
+from ...core.idempotency import run_idempotent
+from ...core.tenancy import session_salon_id
+from ...crud import trial_request as crud_trial_request, product as crud_product, outbox as crud_outbox
+from ...crud.trial_rollup import bucket_range, floor_bucket, leaderboard_range, to_utc, trial_rollup
+from ...models.product import ProductCategory
+from ...models.outbox import AggregateType, EventType
 from ...models.trial_request import TrialStatus
 from ...schemas.trial_request import (
     TrialRequestCreate, TrialRequestUpdate, TrialRequestStaffUpdate,
     TrialRequestResponse, TrialRequestListItem, TrialRequestStatusUpdate,
-    TrialRequestFeedback, TrialRequestFilter, TrialRequestWithDetails
+    TrialRequestFeedback, TrialRequestFilter, TrialRequestWithDetails,
+    TrialRequestBulkAction, TrialRequestBulkItemResult, TrialRequestBulkResult,
+    BulkActionOutcome, TimeseriesDimension, TimeseriesInterval, TrialTimeseriesResponse,
+    TrialTimeseriesSeries, LeaderboardSort, StylistLeaderboardEntry, StylistLeaderboardResponse
 )
 from ...schemas.common import PaginatedResponse
 
 router = APIRouter()
 
+# 承認待ちキューのスナップショットのイベント名
+PENDING_SNAPSHOT_EVENT = "pending_snapshot"
+
+# 承認待ちキューの表示に影響するイベント
+PENDING_QUEUE_EVENT_TYPES = frozenset({
+    EventType.TRIAL_REQUEST_CREATED.value,
+    EventType.TRIAL_REQUEST_APPROVED.value,
+    EventType.TRIAL_REQUEST_REJECTED.value,
+    EventType.TRIAL_REQUEST_STARTED.value,
+    EventType.TRIAL_REQUEST_COMPLETED.value,
+    EventType.TRIAL_REQUEST_CANCELLED.value,
+    PENDING_SNAPSHOT_EVENT,
+})
+
+
+def _bulk_result(outcomes: Dict[int, BulkActionOutcome]) -> TrialRequestBulkResult:
+    """ID毎の結果から一括更新レスポンスを作成"""
+    counts = Counter(outcomes.values())
+    return TrialRequestBulkResult(
+        applied=counts[BulkActionOutcome.APPLIED],
+        conflict=counts[BulkActionOutcome.CONFLICT],
+        not_found=counts[BulkActionOutcome.NOT_FOUND],
+        results=[
+            TrialRequestBulkItemResult(id=request_id, outcome=outcome)
+            for request_id, outcome in outcomes.items()
+        ]
+    )
+
 
 @router.get("/", response_model=PaginatedResponse[TrialRequestListItem])
 async def get_trial_requests(
@@ -23,7 +65,7 @@ async def get_trial_requests(
     product_id: Optional[int] = Query(None, description="商品IDフィルタ"),
     customer_id: Optional[int] = Query(None, description="顧客IDフィルタ"),
     has_feedback: Optional[bool] = Query(None, description="フィードバック有無"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """トライアルリクエスト一覧を取得"""
     skip = (page - 1) * size
@@ -38,7 +80,7 @@ async def get_trial_requests(
     trial_requests = await crud_trial_request.get_filtered_requests(
         db, filters=filters, skip=skip, limit=size
     )
-    total = await crud_trial_request.get_count(db)
+    total = await crud_trial_request.get_count(db, include_archive=True)
     
     return PaginatedResponse[TrialRequestListItem](
         items=[TrialRequestListItem.model_validate(request) for request in trial_requests],
@@ -51,11 +93,37 @@ async def get_trial_requests(
     )
 
 
+@router.get("/export")
+async def export_trial_requests(
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="出力形式"),
+    status: Optional[TrialStatus] = Query(None, description="ステータスフィルタ"),
+    product_id: Optional[int] = Query(None, description="商品IDフィルタ"),
+    customer_id: Optional[int] = Query(None, description="顧客IDフィルタ"),
+    has_feedback: Optional[bool] = Query(None, description="フィードバック有無"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """トライアルリクエストをNDJSON/CSVでストリーミングエクスポート"""
+    filters = TrialRequestFilter(
+        status=status,
+        product_id=product_id,
+        customer_id=customer_id,
+        has_feedback=has_feedback
+    )
+    query = crud_trial_request.build_filtered_query(filters, order_by="id", descending=False)
+    
+    partitions = crud_trial_request.stream_partitions(
+        db, query, chunk_size=settings.EXPORT_CHUNK_SIZE
+    )
+    return export_response(
+        partitions, TrialRequestResponse, export_format=format, filename="trial_requests"
+    )
+
+
 @router.get("/pending", response_model=PaginatedResponse[TrialRequestListItem])
 async def get_pending_requests(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """承認待ちのトライアルリクエスト一覧を取得"""
     skip = (page - 1) * size
@@ -73,54 +141,192 @@ async def get_pending_requests(
     )
 
 
+async def _pending_snapshot(db: AsyncSession, *, limit: int) -> AsyncIterator[Dict[str, Any]]:
+    """
+    承認待ち一覧のスナップショットを1件のメッセージとして送信
+    
+    メッセージのIDは一覧取得前の最新の配信順の連番とし、再接続時はそれ以降を再送する
+    """
+    try:
+        cursor = await crud_outbox.get_latest_seq(db)
+        requests = await crud_trial_request.get_pending_requests(db, limit=limit)
+        yield {
+            "seq": cursor,
+            "salon_id": session_salon_id(db),
+            "event_type": PENDING_SNAPSHOT_EVENT,
+            "items": [
+                TrialRequestListItem.model_validate(request).model_dump(mode="json")
+                for request in requests
+            ]
+        }
+    finally:
+        await db.close()
+
+
+@router.get("/pending/stream")
+async def stream_pending_queue(
+    request: Request,
+    snapshot_size: int = Query(100, ge=0, le=500, description="接続時に送る承認待ち件数"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: AsyncSession = Depends(get_tenant_db)
+):
+    """
+    承認待ちキューの変更をServer-Sent Eventsで配信（スタッフ画面用）
+    
+    初回接続時は承認待ち一覧（pending_snapshot）を1回だけ送り、以降は申込・承認・却下・
+    開始・完了・キャンセルのイベントを送る。配信中はDBにアクセスしないため、
+    接続端末が多くてもイベントが無い間のDB負荷は発生しない。
+    再接続時は Last-Event-ID 以降のイベントを再送する
+    """
+    # ブローカーは全サロンのイベントを配信するため、接続時のサロンで絞り込む
+    salon_id = session_salon_id(db)
+    # スナップショット・再送の取りこぼしを防ぐため、DBを読む前に購読を開始する
+    subscription = broker.subscribe()
+    cursor = parse_last_event_id(last_event_id)
+    if cursor is None:
+        replay = _pending_snapshot(db, limit=snapshot_size)
+    else:
+        replay = replay_events(db, after=cursor, aggregate_type=AggregateType.TRIAL_REQUEST)
+    
+    def accept(message: Dict[str, Any]) -> bool:
+        return message.get("salon_id") == salon_id and message["event_type"] in PENDING_QUEUE_EVENT_TYPES
+    
+    return StreamingResponse(
+        event_stream(request, subscription, replay=replay, accept=accept),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
 @router.get("/stats")
 async def get_trial_stats(
     start_date: Optional[str] = Query(None, description="開始日 (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="終了日 (YYYY-MM-DD)"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """トライアルリクエスト統計を取得"""
-    from sqlalchemy import select, func
-    from ...models.trial_request import TrialStatus
-    
-    # 基本統計
-    total_result = await db.execute(select(func.count(crud_trial_request.model.id)))
-    total_requests = total_result.scalar() or 0
-    
+    """トライアルリクエスト統計を取得（アーカイブ済みのリクエストを含む）"""
     # ステータス別統計
-    status_stats = {}
-    for status in TrialStatus:
-        result = await db.execute(
-            select(func.count(crud_trial_request.model.id))
-            .where(crud_trial_request.model.status == status)
-        )
-        status_stats[status.value] = result.scalar() or 0
+    status_counts = await crud_trial_request.count_by_status(db)
+    status_stats = {trial_status.value: count for trial_status, count in status_counts.items()}
+    total_requests = sum(status_counts.values())
     
     # 最近の統計（過去30日）
-    from datetime import datetime, timedelta
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    recent_result = await db.execute(
-        select(func.count(crud_trial_request.model.id))
-        .where(crud_trial_request.model.created_at >= thirty_days_ago)
-    )
-    recent_requests = recent_result.scalar() or 0
+    recent_counts = await crud_trial_request.count_by_status(db, created_since=thirty_days_ago)
+    recent_requests = sum(recent_counts.values())
+    
+    # 期間指定時は日単位の集計から期間内の件数を返す（終了日を含む）
+    period: Dict[str, Any] = {"start_date": start_date, "end_date": end_date}
+    if start_date or end_date:
+        try:
+            start = datetime.combine(date.fromisoformat(start_date), time()) if start_date else None
+            end = datetime.combine(date.fromisoformat(end_date), time()) + timedelta(days=1) if end_date else None
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="日付は YYYY-MM-DD 形式で指定してください"
+            )
+        period.update(await trial_rollup.totals(db, start=start, end=end))
     
     return {
         "total_requests": total_requests,
         "status_breakdown": status_stats,
         "recent_requests": recent_requests,
-        "period": {
-            "start_date": start_date,
-            "end_date": end_date
-        }
+        "period": period
     }
 
 
+def _validate_range(start: datetime, end: Optional[datetime], *, hourly: bool) -> Tuple[datetime, datetime]:
+    """集計を読む期間をUTCに揃えて検証（時間単位の集計は保存期間内のみ）"""
+    start, end = to_utc(start), to_utc(end or datetime.utcnow())
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="終了日時は開始日時より後に設定してください"
+        )
+    retention = timedelta(days=settings.TRIAL_ROLLUP_HOURLY_RETENTION_DAYS)
+    if hourly and start < floor_bucket(datetime.utcnow() - retention, TimeseriesInterval.HOUR):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"時間単位の集計は直近{settings.TRIAL_ROLLUP_HOURLY_RETENTION_DAYS}日分のみです"
+        )
+    return start, end
+
+
+@router.get("/timeseries", response_model=TrialTimeseriesResponse)
+async def get_trial_timeseries(
+    start: datetime = Query(..., description="開始日時（含む、タイムゾーン無しはUTC）"),
+    end: Optional[datetime] = Query(None, description="終了日時（含まない、省略時は現在）"),
+    interval: TimeseriesInterval = Query(TimeseriesInterval.DAY, description="バケットの間隔"),
+    group_by: List[TimeseriesDimension] = Query([], description="系列を分ける軸（複数指定可）"),
+    category: Optional[ProductCategory] = Query(None, description="カテゴリフィルタ"),
+    stylist_id: Optional[int] = Query(None, description="スタイリストIDフィルタ（0は未割当）"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    トライアル活動（リクエスト・承認・完了・購入意向）の時系列を取得
+    
+    時間・日単位の集計テーブルから返し、トライアルリクエストは読まない。
+    時間単位は保存期間内のみ指定できる
+    """
+    start, end = _validate_range(start, end, hourly=interval == TimeseriesInterval.HOUR)
+    if len(bucket_range(interval, start, end)) > settings.TRIAL_TIMESERIES_MAX_POINTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"バケット数が上限（{settings.TRIAL_TIMESERIES_MAX_POINTS}）を超えています"
+        )
+    
+    group_by = list(dict.fromkeys(group_by))
+    series = await trial_rollup.timeseries(
+        db, interval=interval, start=start, end=end, group_by=group_by,
+        category=category, stylist_id=stylist_id
+    )
+    return TrialTimeseriesResponse(
+        interval=interval,
+        start=start,
+        end=end,
+        group_by=group_by,
+        series=[TrialTimeseriesSeries(**item["key"], points=item["points"]) for item in series]
+    )
+
+
+@router.get("/leaderboard", response_model=StylistLeaderboardResponse)
+async def get_stylist_leaderboard(
+    start: datetime = Query(..., description="開始日時（含む、タイムゾーン無しはUTC）"),
+    end: Optional[datetime] = Query(None, description="終了日時（含まない、省略時は現在）"),
+    sort: LeaderboardSort = Query(LeaderboardSort.HANDLED, description="並べ替え"),
+    limit: int = Query(20, ge=1, le=100, description="件数"),
+    min_handled: int = Query(0, ge=0, description="最低担当件数（率の並べ替えで少数の担当を除く）"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    スタイリスト別の成績（担当・承認までの時間・完了率・購入意向率）のランキングを取得
+    
+    時系列集計から求め、トライアルリクエストは読まない。日の境界で指定した期間は
+    日単位、それ以外は時間単位の集計を使う。時間単位の保存期間より前から始まる期間は
+    日の境界に広げる（レスポンスの start / end は広げた期間）
+    """
+    start, end = _validate_range(start, end, hourly=False)
+    start, end = leaderboard_range(
+        start, end, hourly_retention_days=settings.TRIAL_ROLLUP_HOURLY_RETENTION_DAYS
+    )
+    entries = await trial_rollup.leaderboard(
+        db, start=start, end=end, sort=sort, limit=limit, min_handled=min_handled,
+        hourly_retention_days=settings.TRIAL_ROLLUP_HOURLY_RETENTION_DAYS
+    )
+    return StylistLeaderboardResponse(
+        start=start,
+        end=end,
+        sort=sort,
+        entries=[StylistLeaderboardEntry(**entry) for entry in entries]
+    )
+
+
 @router.get("/active", response_model=PaginatedResponse[TrialRequestListItem])
 async def get_active_requests(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """アクティブなトライアルリクエスト一覧を取得"""
     skip = (page - 1) * size
@@ -142,7 +348,7 @@ async def get_active_requests(
 async def get_trial_stats(
     start_date: Optional[str] = Query(None, description="開始日 (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="終了日 (YYYY-MM-DD)"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """トライアルリクエスト統計を取得"""
     from sqlalchemy import select, func
@@ -185,7 +391,7 @@ async def get_trial_stats(
 async def get_requests_needing_feedback(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """フィードバック待ちのトライアルリクエスト一覧を取得"""
     skip = (page - 1) * size
@@ -209,7 +415,7 @@ async def get_requests_needing_feedback(
 async def get_trial_stats(
     start_date: Optional[str] = Query(None, description="開始日 (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="終了日 (YYYY-MM-DD)"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """トライアルリクエスト統計を取得"""
     from sqlalchemy import select, func
@@ -251,10 +457,10 @@ async def get_trial_stats(
 @router.get("/{request_id}", response_model=TrialRequestResponse)
 async def get_trial_request(
     request_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """トライアルリクエスト詳細を取得"""
-    trial_request = await crud_trial_request.get(db, id=request_id)
+    """トライアルリクエスト詳細を取得（アーカイブ済みを含む）"""
+    trial_request = await crud_trial_request.get_with_archive(db, id=request_id)
     if not trial_request:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -265,40 +471,52 @@ async def get_trial_request(
 
 @router.post("/", response_model=TrialRequestResponse, status_code=status.HTTP_201_CREATED)
 async def create_trial_request(
+    request: Request,
     request_in: TrialRequestCreate,
     customer_id: int = Query(1, description="顧客ID"),  # TODO: 認証から取得
-    db: AsyncSession = Depends(get_db)
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_tenant_db)
 ):
-    """新しいトライアルリクエストを作成"""
-    # 商品存在確認と価格取得
-    product = await crud_product.get(db, id=request_in.product_id)
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="指定された商品が見つかりません"
+    """
+    新しいトライアルリクエストを作成
+    
+    Idempotency-Key を指定した再送では新たに作成せず、初回のレスポンスを返す
+    """
+    async def handler() -> TrialRequestResponse:
+        # 商品存在確認と価格取得
+        product = await crud_product.get(db, id=request_in.product_id)
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="指定された商品が見つかりません"
+            )
+        
+        if not product.is_trial_available:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="この商品はトライアル対象外です"
+            )
+        
+        # トライアル価格を取得（設定されていなければ通常価格）
+        unit_price = product.trial_price if product.trial_price else product.price
+        
+        trial_request = await crud_trial_request.create_request(
+            db, obj_in=request_in, customer_id=customer_id, unit_price=float(unit_price)
         )
+        
+        return TrialRequestResponse.model_validate(trial_request)
     
-    if not product.is_trial_available:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="この商品はトライアル対象外です"
-        )
-    
-    # トライアル価格を取得（設定されていなければ通常価格）
-    unit_price = product.trial_price if product.trial_price else product.price
-    
-    trial_request = await crud_trial_request.create_request(
-        db, obj_in=request_in, customer_id=customer_id, unit_price=float(unit_price)
+    return await run_idempotent(
+        db, request, key=idempotency_key, payload=request_in, handler=handler,
+        status_code=status.HTTP_201_CREATED
     )
-    
-    return TrialRequestResponse.model_validate(trial_request)
 
 
 @router.put("/{request_id}", response_model=TrialRequestResponse)
 async def update_trial_request(
     request_id: int,
     request_in: TrialRequestUpdate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_user)
 ):
     """トライアルリクエストを更新（顧客用）"""
@@ -327,7 +545,7 @@ async def update_request_status(
     request_id: int,
     status_update: TrialRequestStatusUpdate,
     staff_id: int = Query(..., description="スタッフID"),  # TODO: 認証から取得
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
 ):
     """トライアルリクエストステータスを更新（スタッフ用）"""
     trial_request = await crud_trial_request.get(db, id=request_id)
@@ -369,7 +587,7 @@ async def update_request_status(
 async def add_trial_feedback(
     request_id: int,
     feedback: TrialRequestFeedback,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_user)
 ):
     """トライアルにフィードバックを追加"""
@@ -395,7 +613,7 @@ async def add_trial_feedback(
 async def staff_update_request(
     request_id: int,
     staff_update: TrialRequestStaffUpdate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_staff_user)
 ):
     """スタッフによるトライアルリクエスト更新"""
@@ -418,7 +636,7 @@ async def get_customer_requests(
     customer_id: int,
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """特定顧客のトライアルリクエスト一覧"""
     skip = (page - 1) * size
@@ -442,7 +660,7 @@ async def get_customer_requests(
 async def get_trial_stats(
     start_date: Optional[str] = Query(None, description="開始日 (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="終了日 (YYYY-MM-DD)"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """トライアルリクエスト統計を取得"""
     from sqlalchemy import select, func
@@ -486,7 +704,7 @@ async def get_product_requests(
     product_id: int,
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """特定商品のトライアルリクエスト一覧"""
     skip = (page - 1) * size
@@ -512,13 +730,13 @@ async def approve_trial_request(
     request_id: int,
     request_body: dict = {},
     staff_id: int = Query(1, description="スタッフID"),  # TODO: 認証から取得
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
 ):
     """トライアルリクエストを承認"""
     staff_notes = request_body.get("staff_notes")
     
     updated_request = await crud_trial_request.approve_request(
-        db, request_id=request_id, approved_by=staff_id
+        db, request_id=request_id, approved_by=staff_id, staff_notes=staff_notes
     )
     
     if not updated_request:
@@ -527,11 +745,6 @@ async def approve_trial_request(
             detail="トライアルリクエストが見つかりません"
         )
     
-    if staff_notes:
-        updated_request = await crud_trial_request.update(
-            db, db_obj=updated_request, obj_in={"staff_notes": staff_notes}
-        )
-    
     return TrialRequestResponse.model_validate(updated_request)
 
 
@@ -540,7 +753,7 @@ async def reject_trial_request(
     request_id: int,
     request_body: dict = {},
     staff_id: int = Query(1, description="スタッフID"),  # TODO: 認証から取得
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
 ):
     """トライアルリクエストを拒否"""
     from ...models.trial_request import TrialStatus
@@ -564,7 +777,7 @@ async def complete_trial_request(
     request_id: int,
     request_body: dict = {},
     staff_id: int = Query(1, description="スタッフID"),  # TODO: 認証から取得
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
 ):
     """トライアルリクエストを完了"""
     from ...models.trial_request import TrialStatus
@@ -587,16 +800,67 @@ async def complete_trial_request(
             detail="このステータスではトライアルを完了できません"
         )
     
-    # ステータスを完了に変更
-    trial_request.status = TrialStatus.COMPLETED
-    trial_request.completion_date = datetime.utcnow()
-    
-    # スタッフノートが提供された場合は更新
+    # ステータスを完了に変更（スタッフノートが提供された場合は併せて更新）
+    values = {
+        "status": TrialStatus.COMPLETED,
+        "completion_date": datetime.utcnow()
+    }
     if staff_notes:
-        trial_request.staff_notes = staff_notes
+        values["staff_notes"] = staff_notes
     
-    db.add(trial_request)
-    await db.commit()
-    await db.refresh(trial_request)
+    trial_request = await crud_trial_request.update(db, db_obj=trial_request, obj_in=values)
     
-    return TrialRequestResponse.model_validate(trial_request)
\ No newline at end of file
+    return TrialRequestResponse.model_validate(trial_request)
+
+
+# 一括アクション用エンドポイント
+@router.post("/bulk/approve", response_model=TrialRequestBulkResult)
+async def bulk_approve_trial_requests(
+    bulk_action: TrialRequestBulkAction,
+    staff_id: int = Query(1, description="スタッフID"),  # TODO: 認証から取得
+    db: AsyncSession = Depends(get_tenant_db)
+):
+    """承認待ちのトライアルリクエストを一括承認"""
+    outcomes = await crud_trial_request.bulk_approve(
+        db, ids=bulk_action.ids, approved_by=staff_id, staff_notes=bulk_action.staff_notes
+    )
+    return _bulk_result(outcomes)
+
+
+@router.post("/bulk/reject", response_model=TrialRequestBulkResult)
+async def bulk_reject_trial_requests(
+    bulk_action: TrialRequestBulkAction,
+    staff_id: int = Query(1, description="スタッフID"),  # TODO: 認証から取得
+    db: AsyncSession = Depends(get_tenant_db)
+):
+    """承認待ちのトライアルリクエストを一括却下"""
+    outcomes = await crud_trial_request.bulk_reject(
+        db, ids=bulk_action.ids, processed_by=staff_id, staff_notes=bulk_action.staff_notes
+    )
+    return _bulk_result(outcomes)
+
+
+@router.post("/bulk/start", response_model=TrialRequestBulkResult)
+async def bulk_start_trials(
+    bulk_action: TrialRequestBulkAction,
+    staff_id: int = Query(1, description="スタッフID"),  # TODO: 認証から取得
+    db: AsyncSession = Depends(get_tenant_db)
+):
+    """承認済みのトライアルを一括開始"""
+    outcomes = await crud_trial_request.bulk_start(
+        db, ids=bulk_action.ids, processed_by=staff_id, staff_notes=bulk_action.staff_notes
+    )
+    return _bulk_result(outcomes)
+
+
+@router.post("/bulk/complete", response_model=TrialRequestBulkResult)
+async def bulk_complete_trials(
+    bulk_action: TrialRequestBulkAction,
+    staff_id: int = Query(1, description="スタッフID"),  # TODO: 認証から取得
+    db: AsyncSession = Depends(get_tenant_db)
+):
+    """承認済み・実施中のトライアルを一括完了"""
+    outcomes = await crud_trial_request.bulk_complete(
+        db, ids=bulk_action.ids, processed_by=staff_id, staff_notes=bulk_action.staff_notes
+    )
+    return _bulk_result(outcomes)
@@ -2,9 +2,11 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ...core.database import get_db
+from ...core.config import settings
+from ...core.database import get_tenant_db
+from ...core.export import ExportFormat, export_response
 from ...crud import user as crud_user
-from ...models.user import UserRole
+from ...models.user import User, UserRole
 from ...schemas.user import (
     UserCreate, UserUpdate, UserResponse, UserProfile, UserListResponse,
     UserLogin, PasswordChange
@@ -21,7 +23,7 @@ async def get_users(
     role: Optional[UserRole] = Query(None, description="ロールフィルタ"),
     is_active: Optional[bool] = Query(None, description="アクティブ状態フィルタ"),
     is_verified: Optional[bool] = Query(None, description="認証状態フィルタ"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_admin_user)
 ):
     """ユーザー一覧を取得（管理者のみ）"""
@@ -42,11 +44,33 @@ async def get_users(
     )
 
 
+@router.get("/export")
+async def export_users(
+    format: ExportFormat = Query(ExportFormat.NDJSON, description="出力形式"),
+    role: Optional[UserRole] = Query(None, description="ロールフィルタ"),
+    is_active: Optional[bool] = Query(None, description="アクティブ状態フィルタ"),
+    is_verified: Optional[bool] = Query(None, description="認証状態フィルタ"),
+    db: AsyncSession = Depends(get_tenant_db)
+    # TODO: current_user: User = Depends(get_current_admin_user)
+):
+    """ユーザーをNDJSON/CSVでストリーミングエクスポート（管理者のみ）"""
+    query = crud_user.build_filtered_query(
+        role=role, is_active=is_active, is_verified=is_verified
+    ).order_by(User.id)
+    
+    partitions = crud_user.stream_partitions(
+        db, query, chunk_size=settings.EXPORT_CHUNK_SIZE
+    )
+    return export_response(
+        partitions, UserListResponse, export_format=format, filename="users"
+    )
+
+
 @router.get("/me", response_model=UserProfile)
 async def get_current_user_profile(
     # current_user: User = Depends(get_current_active_user)  # TODO: 認証実装後
     user_id: int = Query(..., description="ユーザーID"),  # 仮の実装
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
 ):
     """現在のユーザーのプロファイルを取得"""
     user = await crud_user.get(db, id=user_id)
@@ -62,7 +86,7 @@ async def get_current_user_profile(
 async def update_current_user_profile(
     user_update: UserUpdate,
     user_id: int = Query(..., description="ユーザーID"),  # 仮の実装
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_active_user)
 ):
     """現在のユーザーのプロファイルを更新"""
@@ -81,7 +105,7 @@ async def update_current_user_profile(
 async def change_password(
     password_change: PasswordChange,
     user_id: int = Query(..., description="ユーザーID"),  # 仮の実装
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_active_user)
 ):
     """現在のユーザーのパスワードを変更"""
@@ -107,7 +131,7 @@ async def change_password(
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_staff_user)
 ):
     """特定ユーザーの情報を取得"""
@@ -123,7 +147,7 @@ async def get_user(
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_user(
     user_in: UserCreate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_admin_user)
 ):
     """新しいユーザーを作成（管理者のみ）"""
@@ -152,7 +176,7 @@ async def create_user(
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_admin_user)
 ):
     """ユーザー情報を更新（管理者のみ）"""
@@ -170,7 +194,7 @@ async def update_user(
 @router.patch("/{user_id}/verify", response_model=UserResponse)
 async def verify_user(
     user_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_admin_user)
 ):
     """ユーザーを認証済みに設定（管理者のみ）"""
@@ -188,7 +212,7 @@ async def verify_user(
 @router.patch("/{user_id}/deactivate", response_model=UserResponse)
 async def deactivate_user(
     user_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_admin_user)
 ):
     """ユーザーを非アクティブに設定（管理者のみ）"""
@@ -206,7 +230,7 @@ async def deactivate_user(
 @router.patch("/{user_id}/activate", response_model=UserResponse)
 async def activate_user(
     user_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_admin_user)
 ):
     """ユーザーをアクティブに設定（管理者のみ）"""
@@ -217,12 +241,8 @@ async def activate_user(
             detail="ユーザーが見つかりません"
         )
     
-    user.is_active = True
-    db.add(user)
-    await db.commit()
-    await db.refresh(user)
-    
-    return UserResponse.model_validate(user)
+    activated_user = await crud_user.activate_user(db, user=user)
+    return UserResponse.model_validate(activated_user)
 
 
 # ロール別ユーザー取得
@@ -230,7 +250,7 @@ async def activate_user(
 async def get_customers(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_staff_user)
 ):
     """顧客ユーザー一覧を取得"""
@@ -256,7 +276,7 @@ async def get_customers(
 async def get_staff_users(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
     # TODO: current_user: User = Depends(get_current_admin_user)
 ):
     """スタッフユーザー一覧を取得（管理者のみ）"""
@@ -284,7 +304,7 @@ async def get_staff_users(
 @router.post("/authenticate", response_model=dict)
 async def authenticate_user(
     login_data: UserLogin,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_tenant_db)
 ):
     """ユーザー認証（基本実装）"""
     user = await crud_user.authenticate(
@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+from itertools import islice
+from typing import IO, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from pydantic import ValidationError
+
+from .export import ExportFormat
+
+T = TypeVar("T")
+
+# (行番号, 解析済みレコード, 解析エラー)
+ImportRecord = Tuple[int, Optional[dict], Optional[str]]
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> ExportFormat:
+    """ファイル名・Content-Typeから入力形式を判定（判定できなければNDJSON）"""
+    if (filename or "").lower().endswith(".csv") or (content_type or "").startswith("text/csv"):
+        return ExportFormat.CSV
+    return ExportFormat.NDJSON
+
+
+def iter_csv_records(file: IO[bytes], *, json_fields: Iterable[str] = ()) -> Iterator[ImportRecord]:
+    """CSVを1行ずつ辞書に変換（空セルは未入力として扱う）"""
+    json_fields = set(json_fields)
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    for record in reader:
+        row_number = reader.line_num
+        parsed = {}
+        error = None
+        for key, value in record.items():
+            if key is None or value is None or value == "":
+                continue
+            if key in json_fields:
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    error = f"{key}: JSONとして解析できません"
+                    break
+            parsed[key] = value
+        yield (row_number, None, error) if error else (row_number, parsed, None)
+
+
+def iter_ndjson_records(file: IO[bytes]) -> Iterator[ImportRecord]:
+    """NDJSONを1行ずつ辞書に変換（空行は読み飛ばす）"""
+    for row_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield row_number, None, "JSONとして解析できません"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "JSONオブジェクトではありません"
+            continue
+        yield row_number, record, None
+
+
+def iter_records(
+    file: IO[bytes],
+    import_format: ExportFormat,
+    *,
+    json_fields: Iterable[str] = ()
+) -> Iterator[ImportRecord]:
+    """入力形式に応じたレコードイテレータを返す"""
+    if import_format == ExportFormat.CSV:
+        return iter_csv_records(file, json_fields=json_fields)
+    return iter_ndjson_records(file)
+
+
+def iter_chunks(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """イテラブルを size 件ずつのリストに分割"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def validation_messages(error: ValidationError) -> List[str]:
+    """ValidationErrorを「フィールド: メッセージ」形式の一覧に変換"""
+    return [
+        f"{'.'.join(str(loc) for loc in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors()
+    ]
@@ -0,0 +1,278 @@
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+# brotli / zstd は任意の依存（インストールされていなければ gzip のみ）
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# 圧縮対象のContent-Type（SSEはイベント毎に届ける必要があるため対象外）
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/csv",
+    "text/html",
+    "text/plain",
+)
+
+# ハンドラがレスポンスキャッシュのタグを設定する request.state の属性名
+# （タグがあればキャッシュ対象）
+CACHE_TAGS_STATE = "cache_tags"
+
+
+class GzipCompressor:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """ここまでの入力を送信できるよう出力を区切る"""
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level, mode=brotli.MODE_TEXT)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+# 利用可能な圧縮方式（優先順）
+COMPRESSORS: Dict[str, Callable[[int], Any]] = {}
+if brotli is not None:
+    COMPRESSORS["br"] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS["zstd"] = ZstdCompressor
+COMPRESSORS["gzip"] = GzipCompressor
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """
+    Accept-Encoding から使用する圧縮方式を選択（圧縮しない場合は None）
+
+    q値が最も高いものを選び、同じ場合はサーバー側の優先順（br > zstd > gzip）
+    """
+    weights: Dict[str, float] = {}
+    for token in accept_encoding.lower().split(","):
+        name, _, params = token.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in COMPRESSORS:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return content_type in COMPRESSIBLE_TYPES or (
+        content_type.startswith("text/") and content_type != "text/event-stream"
+    )
+
+
+class CompressionStats:
+    """圧縮方式毎の件数・バイト数・CPU時間"""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, encoding: str) -> Dict[str, float]:
+        return self._stats.setdefault(
+            encoding, {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0}
+        )
+
+    def count_response(self, encoding: str) -> None:
+        self._entry(encoding)["responses"] += 1
+
+    def record(self, encoding: str, *, bytes_in: int, bytes_out: int, cpu_seconds: float) -> None:
+        stats = self._entry(encoding)
+        stats["bytes_in"] += bytes_in
+        stats["bytes_out"] += bytes_out
+        stats["cpu_seconds"] += cpu_seconds
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            encoding: {
+                **stats,
+                "ratio": stats["bytes_out"] / stats["bytes_in"] if stats["bytes_in"] else 0.0
+            }
+            for encoding, stats in self._stats.items()
+        }
+
+    def reset(self) -> None:
+        self._stats.clear()
+
+
+compression_stats = CompressionStats()
+
+
+class CompressionMiddleware:
+    """
+    レスポンスを br / zstd / gzip で圧縮するASGIミドルウェア
+
+    - 1回で送られるボディ: minimum_size 以上なら一括で圧縮
+    - ストリーミング（エクスポート等）: チャンク毎に圧縮して送信
+    - レスポンスキャッシュの対象（ハンドラがタグを設定したもの）は、圧縮結果が
+      キャッシュに保存されて繰り返し返されるため、高い圧縮レベルを使う
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = settings.COMPRESSION_MINIMUM_SIZE,
+        levels: Optional[Dict[str, int]] = None,
+        cached_levels: Optional[Dict[str, int]] = None
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = levels or settings.COMPRESSION_LEVELS
+        self.cached_levels = cached_levels or settings.COMPRESSION_CACHED_LEVELS
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, scope, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, send: Send, encoding: str):
+        self.middleware = middleware
+        self.scope = scope
+        self._send = send
+        self.encoding = encoding
+        self.start: Optional[Message] = None
+        self.compressor: Any = None
+        self.passthrough = False
+
+    def _new_compressor(self) -> Any:
+        cached = self.scope.get("state", {}).get(CACHE_TAGS_STATE)
+        levels = self.middleware.cached_levels if cached else self.middleware.levels
+        return COMPRESSORS[self.encoding](levels[self.encoding])
+
+    def _compress(self, data: bytes, *, finish: bool) -> bytes:
+        """圧縮し、最後のボディでなければ途中までの出力を区切って返す"""
+        started = time.thread_time()
+        output = self.compressor.compress(data) if data else b""
+        output += self.compressor.finish() if finish else self.compressor.flush()
+        compression_stats.record(
+            self.encoding,
+            bytes_in=len(data),
+            bytes_out=len(output),
+            cpu_seconds=time.thread_time() - started
+        )
+        return output
+
+    def _encoded_headers(self, *, content_length: Optional[int]) -> List[Tuple[bytes, bytes]]:
+        headers = MutableHeaders(raw=list(self.start.get("headers", [])))
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        return headers.raw
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if self.passthrough:
+            await self._send(message)
+            return
+        if message["type"] != "http.response.body":
+            if self.compressor is None:
+                # http.response.zerocopy など圧縮できない本体は、保留した開始を送ってからそのまま渡す
+                self.passthrough = True
+                await self._send(self.start)
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = Headers(raw=self.start.get("headers", []))
+            too_small = not more_body and len(body) < self.middleware.minimum_size
+            if self.start["status"] in (204, 304) or not _is_compressible(headers) or too_small:
+                self.passthrough = True
+                if _is_compressible(headers):
+                    vary = MutableHeaders(raw=list(self.start.get("headers", [])))
+                    vary.add_vary_header("Accept-Encoding")
+                    self.start = {**self.start, "headers": vary.raw}
+                await self._send(self.start)
+                await self._send(message)
+                return
+
+            self.compressor = self._new_compressor()
+            compression_stats.count_response(self.encoding)
+            if not more_body:
+                # 一括で圧縮して Content-Length を付ける
+                output = self._compress(body, finish=True)
+                await self._send({**self.start, "headers": self._encoded_headers(content_length=len(output))})
+                await self._send({"type": "http.response.body", "body": output})
+                return
+            await self._send({**self.start, "headers": self._encoded_headers(content_length=None)})
+
+        output = self._compress(body, finish=not more_body)
+        await self._send({"type": "http.response.body", "body": output, "more_body": more_body})
@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 
@@ -43,6 +43,17 @@ class Settings(BaseSettings):
     def ASYNC_DATABASE_URL(self) -> str:
         return "sqlite+aiosqlite:///./auraselect.db"
     
+    # 読み取りレプリカ設定（非同期ドライバのURL。空ならプライマリのみ）
+    DATABASE_REPLICA_URLS: List[str] = []
+    REPLICA_MAX_LAG: float = 2.0  # 遅延がこれ以上のレプリカには振り分けない（秒）
+    REPLICA_CHECK_INTERVAL: float = 2.0  # レプリカの疎通・遅延の確認間隔（秒）
+    REPLICA_CHECK_TIMEOUT: float = 1.0  # 確認の応答を待つ時間（秒、超えたら停止とみなす）
+    REPLICA_STICKY_SECONDS: float = 5.0  # 書き込み後にプライマリから読む時間（REPLICA_MAX_LAG + 確認間隔 以上）
+    REPLICA_STICKY_COOKIE: str = "db_primary"
+    
+    # マルチテナント設定（サロン）
+    TENANT_HEADER: str = "X-Salon-ID"  # リクエストのサロンID（未指定は既定のサロン）
+    
     # Redis設定 (キャッシュ・セッション用)
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
@@ -68,12 +79,94 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
     
+    # サーバー設定（production: gunicorn + uvicornワーカー / それ以外: uvicorn --reload）
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WEB_CONCURRENCY: int = 0  # ワーカー数（0: CPUコア数）
+    SERVER_TIMEOUT: int = 60  # 応答しないワーカーを再起動するまでの時間（秒）
+    SERVER_GRACEFUL_TIMEOUT: int = 30  # 停止・再起動時に処理中のリクエストを待つ時間（秒）
+    SERVER_KEEPALIVE: int = 5  # Keep-Alive 接続を保持する時間（秒）
+    SERVER_MAX_REQUESTS: int = 10000  # ワーカーを再起動するまでのリクエスト数（0: 再起動しない）
+    SERVER_MAX_REQUESTS_JITTER: int = 1000  # 全ワーカーが同時に再起動しないよう加える揺らぎ
+    
+    @property
+    def is_production(self) -> bool:
+        return self.ENVIRONMENT == "production"
+    
     # ログ設定
     LOG_LEVEL: str = "INFO"
     
     # ファイルアップロード設定
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_FILE_TYPES: List[str] = ["image/jpeg", "image/png", "image/webp"]
+    MEDIA_ROOT: str = "media"  # アップロードした画像の保存先
+    MEDIA_URL: str = "/media"  # 保存した画像のURLの接頭辞
+    MEDIA_CACHE_MAX_AGE: int = 365 * 24 * 3600  # メディアのキャッシュ期間（秒、パスの内容は変わらない）
+    MEDIA_ACCEL_REDIRECT_PREFIX: str = ""  # nginx の内部ロケーション（設定時は本体を nginx が配信）
+    IMAGE_PROCESS_WORKERS: int = 2  # 画像変換のプロセス数
+    IMAGE_MAX_PENDING: int = 8  # 変換待ちを含めて同時に処理する画像の数
+    IMAGE_MAX_PIXELS: int = 40_000_000  # これより画素数の多い画像は受け付けない（展開爆弾対策）
+    
+    # エクスポート設定
+    EXPORT_CHUNK_SIZE: int = 1000  # サーバーサイドカーソルの1回の取得件数
+    
+    # インポート設定
+    IMPORT_CHUNK_SIZE: int = 500  # 1回のマルチローINSERTで処理する行数
+    
+    # 変更イベント（アウトボックス）設定
+    OUTBOX_BATCH_SIZE: int = 100  # ディスパッチャが1回に配信する件数
+    OUTBOX_POLL_INTERVAL: float = 5.0  # コミット通知が無い場合の確認間隔（秒）
+    OUTBOX_RETENTION_DAYS: int = 7  # 配信済みイベントの保持期間（フィードで再取得可能な期間）
+    EVENT_STREAM_HEARTBEAT: float = 15.0  # SSEのキープアライブ間隔（秒）
+    EVENT_SUBSCRIBER_QUEUE_SIZE: int = 1000  # SSE接続毎の未送信イベント上限
+    EVENT_BROKER_BACKEND: str = "memory"  # memory: プロセス内 / redis: Redis pub/sub（複数ワーカー時）
+    EVENT_BROKER_CHANNEL: str = "auraselect:events"
+    
+    # ヘルスチェック設定（/health/ready）
+    HEALTH_CHECK_TIMEOUT: float = 1.0  # 依存先の確認全体の時間上限（秒）
+    HEALTH_CHECK_CACHE_TTL: float = 2.0  # 依存先の確認結果を再利用する時間（秒）
+    HEALTH_MAX_POOL_SATURATION: float = 0.9  # DB接続プールの使用率がこれ以上なら not ready
+    HEALTH_MAX_LOOP_LAG: float = 0.25  # イベントループの遅延がこれ以上なら not ready（秒）
+    HEALTH_LOOP_LAG_INTERVAL: float = 0.5  # イベントループ遅延の計測間隔（秒）
+    
+    # スケジューラ設定
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_LEASE_TTL: float = 60.0  # リーダーリースの有効期間（秒、期間の1/3毎に延長）
+    TRIAL_EXPIRY_INTERVAL: float = 300.0  # 期限切れトライアルの確認間隔（秒）
+    TRIAL_EXPIRY_BATCH_SIZE: int = 500  # 1回のUPDATEで遷移する件数
+    TRIAL_ARCHIVE_INTERVAL: float = 3600.0  # 終了済みトライアルのアーカイブ間隔（秒）
+    TRIAL_ARCHIVE_AFTER_DAYS: int = 180  # 終了後、更新の無いままこの日数が過ぎたらアーカイブ
+    TRIAL_ARCHIVE_BATCH_SIZE: int = 1000  # 1トランザクションで移動する件数
+    TRIAL_STATS_RECONCILE_INTERVAL: float = 3600.0  # 商品毎のトライアル集計を照合する間隔（秒）
+    TRIAL_ROLLUP_COMPACT_INTERVAL: float = 3600.0  # 時系列集計の作り直し・圧縮の間隔（秒）
+    TRIAL_ROLLUP_REBUILD_DAYS: int = 2  # 圧縮時に作り直す直近の日数
+    TRIAL_ROLLUP_HOURLY_RETENTION_DAYS: int = 90  # 時間単位の集計の保存期間（日単位は無期限）
+    TRIAL_TIMESERIES_MAX_POINTS: int = 2000  # 時系列の1系列あたりの最大バケット数
+    DEMAND_FORECAST_INTERVAL: float = 21600.0  # 商品毎の需要予測の更新間隔（秒）
+    DEMAND_HISTORY_DAYS: int = 112  # 予測に使うトライアル需要の日数（曜日の季節性のため7の倍数）
+    DEMAND_FORECAST_HORIZON_DAYS: int = 90  # 在庫切れ予測日を求める期間（日）
+    REORDER_LEAD_TIME_DAYS: int = 7  # 発注から入荷までの日数
+    REORDER_SERVICE_LEVEL_Z: float = 1.65  # 安全在庫の係数（約95%の確率で欠品させない）
+    STOCK_LEDGER_COMPACT_INTERVAL: float = 3600.0  # 在庫移動台帳の圧縮・カウンタの照合の間隔（秒）
+    STOCK_LEDGER_RETENTION_DAYS: int = 30  # 在庫移動を1行ずつ残す日数（それより古い移動は商品毎にまとめる）
+    
+    # Idempotency-Key設定
+    IDEMPOTENCY_TTL_HOURS: int = 24  # 結果の保存期間
+    IDEMPOTENCY_LOCK_TIMEOUT: float = 30.0  # 実行中とみなす最大時間（秒、超えたら再実行を許可）
+    IDEMPOTENCY_WAIT_TIMEOUT: float = 10.0  # 同じキーの実行完了を待つ最大時間（秒）
+    
+    # レスポンスキャッシュ設定（未認証の商品カタログGET）
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL: float = 60.0  # 保存期間（秒、他ワーカーへの無効化が届かない場合の上限）
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000  # 超えたら最も古く参照されたものから破棄
+    RESPONSE_CACHE_MAX_BODY_SIZE: int = 1024 * 1024  # これより大きいレスポンスは保存しない
+    RESPONSE_CACHE_CHANNEL: str = "auraselect:cache"  # 無効化を他ワーカーへ伝えるチャンネル（redis時）
+    
+    # レスポンス圧縮設定（br / zstd は brotli / zstandard がインストールされている場合のみ）
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # これより小さいレスポンスは圧縮しない
+    COMPRESSION_LEVELS: Dict[str, int] = {"br": 4, "zstd": 3, "gzip": 6}
+    COMPRESSION_CACHED_LEVELS: Dict[str, int] = {"br": 9, "zstd": 12, "gzip": 9}  # キャッシュされるレスポンス（1回だけ圧縮）
     
     class Config:
         env_file = ".env"
@@ -1,21 +1,36 @@
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Dict
+from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 from .config import settings
+from .replicas import READ_REPLICA_KEY, READ_REPLICA_STATE, ReplicaSet, RoutingSession, wrote_recently
+from .tenancy import current_salon_id, scope_session
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    return {
+        "echo": settings.DEBUG,  # SQLログ出力（開発時のみ）
+        "poolclass": StaticPool if "sqlite" in url else None,
+        "connect_args": {"check_same_thread": False} if "sqlite" in url else {}
+    }
+
 
 # 非同期データベースエンジン作成
-engine = create_async_engine(
-    settings.ASYNC_DATABASE_URL,
-    echo=settings.DEBUG,  # SQLログ出力（開発時のみ）
-    poolclass=StaticPool if "sqlite" in settings.ASYNC_DATABASE_URL else None,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.ASYNC_DATABASE_URL else {}
-)
+engine = create_async_engine(settings.ASYNC_DATABASE_URL, **engine_options(settings.ASYNC_DATABASE_URL))
+
+# 読み取りレプリカ（未設定なら全てプライマリ）
+replicas = ReplicaSet([
+    create_async_engine(url, **engine_options(url)) for url in settings.DATABASE_REPLICA_URLS
+])
 
 # セッションメーカー
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
-    expire_on_commit=False
+    expire_on_commit=False,
+    sync_session_class=RoutingSession,
+    replicas=replicas
 )
 
 
@@ -34,6 +49,69 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def get_tenant_db(request: Request, db: AsyncSession = Depends(get_db)) -> AsyncSession:
+    """
+    リクエストのサロンにスコープしたセッションを取得
+
+    ORMのSELECT・UPDATE・DELETEはそのサロンの行に限定され、追加した行はそのサロンに所属する
+    """
+    scope_session(db, current_salon_id(request))
+    return db
+
+
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_tenant_db)) -> AsyncSession:
+    """
+    読み取り専用のハンドラ用のセッションを取得（SELECTをレプリカに振り分ける）
+
+    直近に書き込みを行ったクライアントは、自分の書き込みを読めるようプライマリから読む
+    """
+    if replicas and not wrote_recently(request):
+        db.info[READ_REPLICA_KEY] = True
+        setattr(request.state, READ_REPLICA_STATE, True)
+    return db
+
+
+# セッションが unit of work 内にあることを示す Session.info のキー
+UNIT_OF_WORK_KEY = "unit_of_work"
+
+# 未コミットのアウトボックスイベントがあることを示す Session.info のキー
+OUTBOX_PENDING_KEY = "outbox_pending"
+
+# コミット時に破棄するレスポンスキャッシュのタグを保持する Session.info のキー
+CACHE_PURGE_KEY = "cache_purge_tags"
+
+
+@asynccontextmanager
+async def unit_of_work(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """
+    複数の書き込みを1トランザクションにまとめる
+    
+    ブロック内のCRUD書き込みはflushのみ行い、ブロックを抜けた時に1回だけcommitする
+    （例外時はrollback）。入れ子の場合は最も外側のブロックでcommitする
+    """
+    if db.info.get(UNIT_OF_WORK_KEY):
+        yield db
+        return
+    
+    db.info[UNIT_OF_WORK_KEY] = True
+    try:
+        yield db
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        db.info.pop(UNIT_OF_WORK_KEY, None)
+
+
+async def commit_or_flush(db: AsyncSession) -> None:
+    """unit of work 内ならflushのみ、それ以外はcommit"""
+    if db.info.get(UNIT_OF_WORK_KEY):
+        await db.flush()
+    else:
+        await db.commit()
+
+
 async def create_tables():
     """
     テーブルを作成する関数（開発・テスト用）
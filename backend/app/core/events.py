@@ -0,0 +1,371 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import timedelta
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Optional, Set
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import AsyncSessionLocal, OUTBOX_PENDING_KEY
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """イベント購読（接続毎のキュー）"""
+    
+    def __init__(self, broker: "EventBroker", max_size: int):
+        self.broker = broker
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.closed = False
+    
+    def put(self, message: Dict[str, Any]) -> bool:
+        """メッセージを追加（キューが溢れたら購読を閉じて False）"""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.close()
+            return False
+    
+    def close(self) -> None:
+        """購読を閉じる（未送信のメッセージは破棄し、受信側に終了を通知）"""
+        self.closed = True
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+    
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        次のメッセージを取得（購読が閉じられた場合は None）
+        
+        Raises:
+            asyncio.TimeoutError: timeout 秒以内にメッセージが無い場合
+        """
+        if not self._queue.empty():
+            return self._queue.get_nowait()
+        return await asyncio.wait_for(self._queue.get(), timeout=timeout)
+
+
+class EventBroker:
+    """
+    プロセス内のイベント配信（pub/sub）
+    
+    配信はメモリ上のキューへの追加のみでDBにはアクセスしない。
+    受信が追いつかない購読は閉じるため、クライアントは Last-Event-ID で再接続して
+    フィードから取りこぼしを再取得する。
+    単一プロセス用（複数ワーカーでは RedisEventBroker を使う）
+    """
+    
+    def __init__(self, queue_size: int = settings.EVENT_SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscriptions: Set[Subscription] = set()
+    
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+    
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self, self.queue_size)
+        self._subscriptions.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+    
+    def fan_out(self, message: Dict[str, Any]) -> None:
+        """このプロセスの全ての購読にメッセージを配信"""
+        for subscription in list(self._subscriptions):
+            if not subscription.put(message):
+                self._subscriptions.discard(subscription)
+    
+    async def publish(self, message: Dict[str, Any]) -> None:
+        """メッセージを配信"""
+        self.fan_out(message)
+    
+    async def start(self) -> None:
+        """配信の受信を開始"""
+    
+    async def stop(self) -> None:
+        """配信の受信を停止"""
+
+
+class RedisEventBroker(EventBroker):
+    """
+    Redis pub/sub を経由するイベント配信
+    
+    publish はRedisのチャンネルに送信し、各ワーカーはチャンネルを購読して
+    自プロセスの購読へ配信する。ディスパッチャがどのワーカーで動いても
+    全ワーカーのSSE接続にイベントが届く
+    """
+    
+    def __init__(
+        self,
+        url: str = settings.REDIS_URL,
+        *,
+        channel: str = settings.EVENT_BROKER_CHANNEL,
+        client: Any = None,
+        queue_size: int = settings.EVENT_SUBSCRIBER_QUEUE_SIZE,
+        retry_interval: float = 1.0
+    ):
+        super().__init__(queue_size)
+        self.url = url
+        self.channel = channel
+        self.retry_interval = retry_interval
+        self._client = client
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            import redis.asyncio as redis
+            self._client = redis.from_url(self.url)
+        return self._client
+    
+    async def publish(self, message: Dict[str, Any]) -> None:
+        await self.client.publish(self.channel, json.dumps(message, ensure_ascii=False))
+    
+    async def _listen(self) -> None:
+        """チャンネルを購読し、受信したメッセージを自プロセスの購読へ配信（切断時は再接続）"""
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for raw in pubsub.listen():
+                    if raw.get("type") != "message":
+                        continue
+                    self.fan_out(json.loads(raw["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Redisのイベント購読が切断されました")
+                await asyncio.sleep(self.retry_interval)
+            finally:
+                await pubsub.close()
+    
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def create_broker() -> EventBroker:
+    """設定に応じたブローカーを生成（memory: プロセス内 / redis: Redis pub/sub）"""
+    if settings.EVENT_BROKER_BACKEND == "redis":
+        return RedisEventBroker()
+    return EventBroker()
+
+
+def serialize_event(outbox_event: Any) -> Dict[str, Any]:
+    """アウトボックスのイベントを配信用のdictに変換"""
+    from ..schemas.event import OutboxEventResponse
+    return OutboxEventResponse.model_validate(outbox_event).model_dump(mode="json")
+
+
+class OutboxDispatcher:
+    """
+    アウトボックスの未配信イベントをバッチで取り出してブローカーへ配信する
+    
+    イベントを追加したトランザクションのコミット時に起床し、通知が無い間は
+    poll_interval 毎にアウトボックスのみを確認する（本体テーブルは参照しない）。
+    配信順の連番の採番・配信済みへの更新は配信後にコミットするため、途中で停止した場合は
+    再配信される（at-least-once）
+    """
+    
+    def __init__(
+        self,
+        broker: EventBroker,
+        *,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        poll_interval: float = settings.OUTBOX_POLL_INTERVAL,
+        retention: timedelta = timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+    ):
+        self.broker = broker
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+    
+    def notify(self) -> None:
+        """未配信のイベントがコミットされたことを通知"""
+        self._wakeup.set()
+    
+    async def dispatch_once(self) -> int:
+        """未配信のイベントを1バッチ配信し、配信件数を返す"""
+        from ..crud.outbox import outbox
+        
+        async with self.session_factory() as db:
+            events = await outbox.claim_undispatched(db, limit=self.batch_size)
+            # 配信順の連番を採番してから配信する（メッセージの seq がSSEのIDになる）
+            await outbox.mark_dispatched(db, events=events)
+            for outbox_event in events:
+                await self.broker.publish(serialize_event(outbox_event))
+            await db.commit()
+        return len(events)
+    
+    async def purge(self) -> int:
+        """保持期間を過ぎた配信済みイベントを削除"""
+        from ..crud.outbox import outbox
+        
+        async with self.session_factory() as db:
+            deleted = await outbox.purge_dispatched(db, older_than=self.retention)
+            await db.commit()
+        return deleted
+    
+    async def run(self) -> None:
+        """配信ループ"""
+        while True:
+            self._wakeup.clear()
+            try:
+                dispatched = await self.dispatch_once()
+                if time.monotonic() - self._last_purge > 3600:
+                    await self.purge()
+                    self._last_purge = time.monotonic()
+            except Exception:
+                logger.exception("アウトボックスの配信に失敗しました")
+                dispatched = 0
+            
+            # バッチが埋まっていれば続けて配信
+            if dispatched >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def format_sse(message: Dict[str, Any], *, event: Optional[str] = None) -> str:
+    """SSEのメッセージ形式に変換（配信順の連番 seq をSSEのIDにする）"""
+    data = json.dumps(message, ensure_ascii=False, default=str)
+    lines = []
+    if message.get("seq") is not None:
+        lines.append(f"id: {message['seq']}")
+    lines.append(f"event: {event or message['event_type']}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+# SSEレスポンスの共通ヘッダー（nginx等でのバッファリングを無効化）
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def parse_last_event_id(last_event_id: Optional[str], default: Optional[int] = None) -> Optional[int]:
+    """Last-Event-ID ヘッダーをカーソルに変換"""
+    if last_event_id and last_event_id.isdigit():
+        return int(last_event_id)
+    return default
+
+
+async def replay_events(
+    db: AsyncSession,
+    *,
+    after: int,
+    aggregate_type: Optional[Any] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    カーソル（配信順の連番）以降の配信済みイベントをバッチ単位で再送
+    
+    再送後はDBを使わないため、セッションを閉じて接続を返却する
+    """
+    from ..crud.outbox import outbox
+    
+    try:
+        while True:
+            events = await outbox.get_after(
+                db, after=after, limit=settings.OUTBOX_BATCH_SIZE, aggregate_type=aggregate_type
+            )
+            for outbox_event in events:
+                yield serialize_event(outbox_event)
+            if len(events) < settings.OUTBOX_BATCH_SIZE:
+                break
+            after = events[-1].dispatched_seq
+    finally:
+        await db.close()
+
+
+async def event_stream(
+    request: Request,
+    subscription: Subscription,
+    *,
+    replay: Optional[AsyncIterable[Dict[str, Any]]] = None,
+    accept: Callable[[Dict[str, Any]], bool] = lambda message: True,
+    heartbeat: float = settings.EVENT_STREAM_HEARTBEAT
+) -> AsyncIterator[str]:
+    """
+    再送分を送信した後、購読したイベントをSSEで送信する
+    
+    購読は再送分を読む前に開始しておくこと（再送とリアルタイム配信の間で取りこぼさない）。
+    accept が False のメッセージは送らず、再送済みのイベント（配信順の連番）は重複して送らない。
+    リアルタイム配信中はDBにアクセスしない
+    """
+    sent: Set[int] = set()
+    try:
+        if replay is not None:
+            async for message in replay:
+                if message.get("seq") is not None:
+                    sent.add(message["seq"])
+                if accept(message):
+                    yield format_sse(message)
+        
+        while not await request.is_disconnected():
+            try:
+                message = await subscription.get(timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if message is None:
+                # 受信が追いつかず購読が閉じられた（クライアントは再接続する）
+                break
+            if message.get("seq") in sent or not accept(message):
+                continue
+            yield format_sse(message)
+    finally:
+        subscription.broker.unsubscribe(subscription)
+
+
+# グローバルインスタンス
+broker = create_broker()
+dispatcher = OutboxDispatcher(broker)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_dispatcher(session: Session) -> None:
+    """イベントを追加したトランザクションのコミット後にディスパッチャを起床"""
+    if session.info.pop(OUTBOX_PENDING_KEY, False):
+        dispatcher.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(OUTBOX_PENDING_KEY, None)
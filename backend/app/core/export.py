@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+
+class ExportFormat(str, Enum):
+    """エクスポート形式"""
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES: Dict[ExportFormat, str] = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+}
+
+
+def _csv_value(value: Any) -> Any:
+    """CSVセルに書き込める値に変換（リスト・辞書はJSON文字列）"""
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+async def encode_ndjson(
+    partitions: AsyncIterator[List[Any]],
+    schema: Type[BaseModel]
+) -> AsyncIterator[bytes]:
+    """チャンク毎にNDJSONへエンコード"""
+    async for partition in partitions:
+        lines = [schema.model_validate(obj).model_dump_json() for obj in partition]
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def encode_csv(
+    partitions: AsyncIterator[List[Any]],
+    schema: Type[BaseModel]
+) -> AsyncIterator[bytes]:
+    """チャンク毎にCSVへエンコード（先頭行はヘッダー）"""
+    fieldnames = list(schema.model_fields.keys())
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    
+    async for partition in partitions:
+        for obj in partition:
+            row = schema.model_validate(obj).model_dump(mode="json")
+            writer.writerow({key: _csv_value(value) for key, value in row.items()})
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    
+    # 0件の場合もヘッダーは返す
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def export_response(
+    partitions: AsyncIterator[List[Any]],
+    schema: Type[BaseModel],
+    *,
+    export_format: ExportFormat,
+    filename: str
+) -> StreamingResponse:
+    """チャンク列をストリーミングレスポンスとして返す"""
+    if export_format == ExportFormat.CSV:
+        body = encode_csv(partitions, schema)
+    else:
+        body = encode_ndjson(partitions, schema)
+    
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'
+        }
+    )
@@ -0,0 +1,134 @@
+"""
+トライアル需要の予測（全商品を1回の行列演算で計算）
+
+商品 × 日 の需要行列を作り、曜日の季節性（加法）を除いた系列に単純指数平滑を
+当てはめる。平滑化係数は候補の中から商品毎に1期先予測の二乗誤差が最小のものを選ぶ。
+ループは日数 × 候補数のみで、商品数方向は全てNumPyのベクトル演算
+"""
+from datetime import date, timedelta
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+# 平滑化係数の候補
+DEFAULT_ALPHAS = (0.1, 0.2, 0.3, 0.5)
+
+# 曜日の季節性を使う最低の週数（履歴の週数・需要の発生日数とも。少なければ曜日毎の平均が
+# 不安定なため使わない）
+MIN_SEASONAL_WEEKS = 4
+
+# 予測モデルの名前
+MODEL_SES = "ses"
+MODEL_SEASONAL_SES = "seasonal_ses"
+
+
+def demand_matrix(
+    demand: pd.DataFrame,
+    product_ids: np.ndarray,
+    *,
+    start: date,
+    days: int
+) -> np.ndarray:
+    """
+    (product_id, day, quantity) の行から 商品 × 日 の需要行列を作成
+
+    行は (product_id, day) で一意であること（SQLで集計済み）
+    """
+    matrix = np.zeros((len(product_ids), days), dtype=np.float64)
+    if demand.empty:
+        return matrix
+    offsets = (pd.to_datetime(demand["day"]) - pd.Timestamp(start)).dt.days.to_numpy()
+    rows = pd.Index(product_ids).get_indexer(demand["product_id"].to_numpy())
+    mask = (rows >= 0) & (offsets >= 0) & (offsets < days)
+    matrix[rows[mask], offsets[mask]] = demand["quantity"].to_numpy(dtype=np.float64)[mask]
+    return matrix
+
+
+def forecast_demand(
+    demand: pd.DataFrame,
+    products: pd.DataFrame,
+    *,
+    today: date,
+    history_days: int,
+    horizon_days: int,
+    lead_time_days: int,
+    service_level_z: float,
+    alphas: Sequence[float] = DEFAULT_ALPHAS
+) -> pd.DataFrame:
+    """
+    商品毎の需要を予測し、在庫切れ予測日と推奨最低在庫数を求める
+
+    Args:
+        demand: 過去 history_days 日（today の前日まで）の日毎の需要（product_id, day, quantity）
+        products: 予測対象の商品（product_id, stock_quantity）
+        today: 予測の起点（この日から horizon_days 日分を予測）
+        lead_time_days: 発注から入荷までの日数（推奨最低在庫数はこの期間の需要 + 安全在庫）
+        service_level_z: 安全在庫の係数（欠品させない確率の標準正規分位点）
+
+    Returns:
+        product_id を索引にした daily_demand（予測期間の平均日需要）, demand_stddev（1期先予測誤差の標準偏差）,
+        suggested_min_stock_level, projected_stockout_date（予測期間内に切れなければ None）, model, alpha
+    """
+    product_ids = products["product_id"].to_numpy()
+    start = today - timedelta(days=history_days)
+    y = demand_matrix(demand, product_ids, start=start, days=history_days)
+    n = len(product_ids)
+
+    # 曜日毎の平均と全体の平均の差（加法の季節性）
+    weekdays = (start.weekday() + np.arange(history_days)) % 7
+    overall = y.mean(axis=1)
+    offsets = np.zeros((n, 7))
+    for weekday in range(7):
+        columns = weekdays == weekday
+        if columns.any():
+            offsets[:, weekday] = y[:, columns].mean(axis=1) - overall
+    seasonal = ((y > 0).sum(axis=1) >= MIN_SEASONAL_WEEKS) & (history_days >= 7 * MIN_SEASONAL_WEEKS)
+    offsets[~seasonal] = 0.0
+    x = y - offsets[:, weekdays]
+
+    # 係数の候補毎に単純指数平滑を当てはめ、1期先予測の二乗誤差が最小の係数を選ぶ
+    initial = x[:, :7].mean(axis=1) if history_days else np.zeros(n)
+    levels = np.empty((len(alphas), n))
+    sse = np.empty((len(alphas), n))
+    for i, alpha in enumerate(alphas):
+        level = initial.copy()
+        errors = np.zeros(n)
+        for t in range(history_days):
+            error = x[:, t] - level
+            errors += error * error
+            level += alpha * error
+        levels[i], sse[i] = level, errors
+    best = sse.argmin(axis=0)
+    rows = np.arange(n)
+    level = levels[best, rows]
+    stddev = np.sqrt(sse[best, rows] / max(history_days - 1, 1))
+
+    # 予測期間の日毎の需要（負にはしない）
+    horizon_weekdays = (today.weekday() + np.arange(horizon_days)) % 7
+    forecast = np.clip(level[:, None] + offsets[:, horizon_weekdays], 0.0, None)
+
+    # 累積需要が在庫以上になる最初の日を在庫切れ予測日とする
+    stock = products["stock_quantity"].fillna(0).to_numpy(dtype=np.float64)
+    reached = forecast.cumsum(axis=1) >= stock[:, None]
+    stocks_out = reached.any(axis=1) & ((stock <= 0) | (forecast.sum(axis=1) > 0))
+    first_day = reached.argmax(axis=1)
+    stockout_dates = np.where(
+        stocks_out,
+        np.datetime64(today, "D") + first_day.astype("timedelta64[D]"),
+        np.datetime64("NaT", "D")
+    )
+
+    lead_time = min(lead_time_days, horizon_days)
+    suggested = np.ceil(
+        forecast[:, :lead_time].sum(axis=1) + service_level_z * stddev * np.sqrt(lead_time)
+    ).astype(np.int64)
+
+    return pd.DataFrame({
+        "daily_demand": forecast.mean(axis=1) if horizon_days else np.zeros(n),
+        "demand_stddev": stddev,
+        "suggested_min_stock_level": suggested,
+        "projected_stockout_date": stockout_dates,
+        "model": np.where(seasonal, MODEL_SEASONAL_SES, MODEL_SES),
+        "alpha": np.asarray(alphas)[best],
+    }, index=pd.Index(product_ids, name="product_id"))
@@ -0,0 +1,6 @@
+from uvicorn.workers import UvicornWorker
+
+
+class UvloopWorker(UvicornWorker):
+    """uvloop・httptools を使う uvicorn ワーカー（gunicorn 用）"""
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
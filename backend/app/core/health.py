@@ -0,0 +1,230 @@
+import asyncio
+import os
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import QueuePool
+
+from .config import settings
+from .database import engine as default_engine
+from .singleflight import group as singleflight_group
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 確認結果
+OK, FAIL, SKIPPED = "ok", "fail", "skipped"
+
+
+class CheckFailed(Exception):
+    """依存先の確認に失敗"""
+
+
+class _Skipped(Exception):
+    """確認の対象外"""
+
+
+class LoopLagMonitor:
+    """
+    イベントループの遅延を計測する
+
+    interval 秒毎に sleep し、予定より起床が遅れた時間を遅延とする。
+    直近の計測の最大値で判定するため、一時的なブロックも検出できる
+    """
+
+    def __init__(self, interval: float = settings.HEALTH_LOOP_LAG_INTERVAL, window: int = 10):
+        self.interval = interval
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def lag(self) -> float:
+        """直近の最大遅延（秒）"""
+        return max(self._samples, default=0.0)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._samples.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def pool_stats(engine: AsyncEngine) -> Dict[str, Any]:
+    """DB接続プールの使用状況（QueuePool以外はクラス名のみ）"""
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"class": type(pool).__name__, "saturation": None}
+    checked_out = pool.checkedout()
+    max_overflow = pool._max_overflow
+    capacity = pool.size() + max_overflow if max_overflow >= 0 else None
+    return {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "capacity": capacity,
+        "saturation": checked_out / capacity if capacity else None
+    }
+
+
+@lru_cache(maxsize=1)
+def head_revision() -> Optional[str]:
+    """マイグレーションスクリプトの最新リビジョン（プロセス内で1回だけ読み込む）"""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+async def check_database(engine: AsyncEngine) -> Optional[str]:
+    """プールから接続を取得して往復できるか"""
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return None
+
+
+async def check_migrations(engine: AsyncEngine) -> Optional[str]:
+    """DBのリビジョンが最新か（本番以外はAlembicを使わないため確認しない）"""
+    if not settings.is_production:
+        raise _Skipped("本番環境以外ではテーブルを起動時に作成")
+    head = await asyncio.to_thread(head_revision)
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+            current = result.scalar_one_or_none()
+    except SQLAlchemyError:
+        raise CheckFailed("alembic_version がありません")
+    if current != head:
+        raise CheckFailed(f"リビジョンが最新ではありません（現在: {current}, 最新: {head}）")
+    return current
+
+
+_redis_client: Any = None
+
+
+async def check_redis() -> Optional[str]:
+    """Redisに接続できるか（Redisを使わない構成では確認しない）"""
+    global _redis_client
+    if settings.EVENT_BROKER_BACKEND != "redis":
+        raise _Skipped("Redisを使用していません")
+    if _redis_client is None:
+        import redis.asyncio as redis
+        _redis_client = redis.from_url(settings.REDIS_URL)
+    await _redis_client.ping()
+    return None
+
+
+Check = Callable[[], Awaitable[Optional[str]]]
+
+
+async def _run_check(check: Check, timeout: float) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        detail = await asyncio.wait_for(check(), timeout=timeout)
+        status = OK
+    except _Skipped as e:
+        status, detail = SKIPPED, str(e)
+    except asyncio.TimeoutError:
+        status, detail = FAIL, "タイムアウト"
+    except Exception as e:
+        status, detail = FAIL, str(e) or e.__class__.__name__
+    result = {"status": status, "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+    if detail:
+        result["detail"] = detail
+    return result
+
+
+class ReadinessProbe:
+    """
+    リクエストを受け付けられるかの判定
+
+    DB・Redis・マイグレーションの確認は並行して timeout 秒以内に行い、結果を
+    cache_ttl 秒再利用する（同時に届いた確認は1回の実行を共有）。
+    接続プールの使用率とイベントループの遅延は毎回現在の値で判定し、
+    過負荷のワーカーをロードバランサーから外せるようにする
+    """
+
+    def __init__(
+        self,
+        *,
+        engine: AsyncEngine = default_engine,
+        monitor: Optional[LoopLagMonitor] = None,
+        checks: Optional[Dict[str, Check]] = None,
+        timeout: float = settings.HEALTH_CHECK_TIMEOUT,
+        cache_ttl: float = settings.HEALTH_CHECK_CACHE_TTL,
+        max_pool_saturation: float = settings.HEALTH_MAX_POOL_SATURATION,
+        max_loop_lag: float = settings.HEALTH_MAX_LOOP_LAG
+    ):
+        self.engine = engine
+        self.monitor = monitor or LoopLagMonitor()
+        self.checks = checks if checks is not None else {
+            "database": lambda: check_database(engine),
+            "redis": check_redis,
+            "migrations": lambda: check_migrations(engine),
+        }
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.max_pool_saturation = max_pool_saturation
+        self.max_loop_lag = max_loop_lag
+        self._cached: Optional[Tuple[float, Dict[str, Dict[str, Any]]]] = None
+        self._flight = singleflight_group("health")
+
+    async def _run_checks(self) -> Dict[str, Dict[str, Any]]:
+        names = list(self.checks)
+        results = await asyncio.gather(
+            *[_run_check(self.checks[name], self.timeout) for name in names]
+        )
+        return dict(zip(names, results))
+
+    async def dependency_checks(self) -> Dict[str, Dict[str, Any]]:
+        if self._cached is not None and time.monotonic() - self._cached[0] < self.cache_ttl:
+            return self._cached[1]
+        results = await self._flight.do("ready", self._run_checks)
+        self._cached = (time.monotonic(), results)
+        return results
+
+    async def report(self) -> Dict[str, Any]:
+        checks = await self.dependency_checks()
+        pool = pool_stats(self.engine)
+        loop_lag = self.monitor.lag
+
+        reasons = [
+            f"{name}: {result.get('detail', FAIL)}"
+            for name, result in checks.items() if result["status"] == FAIL
+        ]
+        if pool["saturation"] is not None and pool["saturation"] >= self.max_pool_saturation:
+            reasons.append("DB接続プールが飽和しています")
+        if loop_lag >= self.max_loop_lag:
+            reasons.append("イベントループが遅延しています")
+
+        return {
+            "status": "ready" if not reasons else "not_ready",
+            "reasons": reasons,
+            "checks": checks,
+            "pool": pool,
+            "loop_lag_ms": round(loop_lag * 1000, 1)
+        }
+
+
+# グローバルインスタンス
+loop_lag_monitor = LoopLagMonitor()
+readiness = ReadinessProbe(monitor=loop_lag_monitor)
@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import unit_of_work
+from .tenancy import session_salon_id
+
+# 再送に対して保存済みのレスポンスを返したことを示すヘッダー
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# (リクエスト内容のハッシュ, ステータスコード, レスポンスボディ)
+StoredResponse = Tuple[str, int, Any]
+
+# このプロセスで実行中のキー（同時に届いた再送はDBを見ずに実行完了を待つ）
+_inflight: Dict[Tuple[str, str], "asyncio.Future[StoredResponse]"] = {}
+
+
+def request_fingerprint(request: Request, payload: Any) -> str:
+    """クエリパラメータとリクエストボディからリクエスト内容のハッシュを求める"""
+    content = json.dumps(
+        {"query": sorted(request.query_params.multi_items()), "body": jsonable_encoder(payload)},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _replay(stored: StoredResponse, request_hash: str) -> JSONResponse:
+    """保存済みのレスポンスを返す（同じキーで内容が異なるリクエストは 422）"""
+    stored_hash, status_code, body = stored
+    if stored_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="同じIdempotency-Keyが異なるリクエスト内容で使用されています"
+        )
+    return JSONResponse(status_code=status_code, content=body, headers={REPLAYED_HEADER: "true"})
+
+
+async def _wait_for_completion(db: AsyncSession, *, scope: str, key: str) -> Optional[StoredResponse]:
+    """
+    他のワーカーで実行中のキーの完了を待つ
+
+    完了したら保存済みのレスポンス、予約が解除・失効した場合は None を返す
+    """
+    from ..crud.idempotency import idempotency_key
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    delay = 0.05
+    while True:
+        record = await idempotency_key.get(db, scope=scope, key=key)
+        if record is None:
+            return None
+        stored = (record.request_hash, record.response_status, record.response_body)
+        completed, locked_until = record.completed_at is not None, record.locked_until
+        # 次の確認で他のトランザクションのコミットが見えるよう読み取りを終える
+        await db.rollback()
+        if completed:
+            return stored
+        if locked_until.replace(tzinfo=None) < datetime.utcnow():
+            # 実行していたワーカーが応答しなくなった（予約から引き継ぐ）
+            return None
+        if loop.time() + delay > deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="同じIdempotency-Keyのリクエストを処理中です",
+                headers={"Retry-After": "1"}
+            )
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.5)
+
+
+async def run_idempotent(
+    db: AsyncSession,
+    request: Request,
+    *,
+    key: Optional[str],
+    payload: Any,
+    handler: Callable[[], Awaitable[Any]],
+    status_code: int = status.HTTP_200_OK
+) -> Any:
+    """
+    Idempotency-Key 付きでハンドラを実行
+
+    - キー無し: そのまま実行
+    - 初回: キーを予約してから実行し、書き込みとレスポンスの保存を1トランザクションでコミット
+    - 完了済みのキー: ハンドラを実行せず保存済みのレスポンスを返す
+    - 実行中のキー: 同じプロセスなら実行完了を待ち、他のワーカーならDBで完了を待つ
+
+    ハンドラが例外で終了した場合は予約を解除するため、再送すると改めて実行される
+    """
+    if not key:
+        return await handler()
+
+    from ..crud.idempotency import idempotency_key
+
+    scope = f"{session_salon_id(db)}:{request.method} {request.url.path}"
+    request_hash = request_fingerprint(request, payload)
+    local_key = (scope, key)
+
+    inflight = _inflight.get(local_key)
+    if inflight is not None:
+        try:
+            return _replay(await asyncio.shield(inflight), request_hash)
+        except HTTPException:
+            raise
+        except Exception:
+            # 先行の実行が失敗した場合は改めて予約から行う
+            pass
+
+    future: "asyncio.Future[StoredResponse]" = asyncio.get_running_loop().create_future()
+    _inflight[local_key] = future
+    try:
+        while True:
+            now = datetime.utcnow()
+            reserved_id = await idempotency_key.reserve(
+                db,
+                scope=scope,
+                key=key,
+                request_hash=request_hash,
+                now=now,
+                lock_timeout=timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT),
+                ttl=timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+            )
+            if reserved_id is not None:
+                break
+            stored = await _wait_for_completion(db, scope=scope, key=key)
+            if stored is not None:
+                future.set_result(stored)
+                return _replay(stored, request_hash)
+
+        try:
+            async with unit_of_work(db):
+                result = await handler()
+                body = jsonable_encoder(result)
+                await idempotency_key.complete(
+                    db, id=reserved_id, response_status=status_code,
+                    response_body=body, now=datetime.utcnow()
+                )
+        except BaseException:
+            await idempotency_key.release(db, id=reserved_id)
+            raise
+
+        future.set_result((request_hash, status_code, body))
+        return result
+    except BaseException as exc:
+        if not future.done():
+            future.set_exception(exc if isinstance(exc, Exception) else RuntimeError("cancelled"))
+            # 待機者がいない場合の "exception was never retrieved" 警告を抑止
+            future.exception()
+        raise
+    finally:
+        if _inflight.get(local_key) is future:
+            del _inflight[local_key]
@@ -0,0 +1,186 @@
+"""
+商品画像のアップロード処理
+
+アップロードされたファイルはチャンク毎に一時ファイルへ書き込みながら SHA-256 を計算し、
+内容のハッシュを保存先のディレクトリ名にする（app.core.media。同じ画像は1度だけ処理する）。
+デコードと各サイズ（thumb / card / full）の WebP・JPEG への変換はCPUを使うため、
+ワーカー数を制限したプロセスプールで実行し、イベントループを塞がない
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .config import settings
+from .media import content_path, media_url
+
+# 画像のサイズ（名前, 長辺の最大ピクセル数）
+IMAGE_VARIANTS = {"thumb": 200, "card": 600, "full": 1600}
+
+# 保存形式（名前, 拡張子, Pillowの保存オプション）
+IMAGE_FORMATS = {
+    "webp": ("webp", {"format": "WEBP", "quality": 80, "method": 4}),
+    "jpeg": ("jpg", {"format": "JPEG", "quality": 85, "optimize": True, "progressive": True}),
+}
+
+# 受け付ける画像の形式（Pillowの判定結果。Content-Type は信用しない）
+ACCEPTED_FORMATS = frozenset({"JPEG", "PNG", "WEBP"})
+
+# 保存先の種類（MEDIA_ROOT・MEDIA_URL 直下のディレクトリ）
+IMAGES_KIND = "images"
+
+
+class InvalidImageError(ValueError):
+    """画像として読み込めない・受け付けない形式のファイル"""
+
+
+class FileTooLargeError(ValueError):
+    """アップロードの上限サイズを超えたファイル"""
+
+
+def variant_filename(variant: str, image_format: str) -> str:
+    return f"{variant}.{IMAGE_FORMATS[image_format][0]}"
+
+
+def variant_urls(digest: str) -> Dict[str, Dict[str, str]]:
+    """サイズ毎・形式毎のURL"""
+    base = content_path(IMAGES_KIND, digest)
+    return {
+        variant: {
+            image_format: media_url(f"{base}/{variant_filename(variant, image_format)}")
+            for image_format in IMAGE_FORMATS
+        }
+        for variant in IMAGE_VARIANTS
+    }
+
+
+def render_variants(source: str, target_dir: str, max_pixels: int) -> None:
+    """
+    画像を各サイズ・形式に変換して target_dir に保存
+
+    プロセスプールのワーカーで実行する。各ファイルは一時ファイルに書いてから
+    名前を変えるため、同じ画像が同時に処理されても壊れたファイルは見えない
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        with Image.open(source) as image:
+            if image.format not in ACCEPTED_FORMATS:
+                raise InvalidImageError(f"対応していない画像形式です: {image.format}")
+            if image.width * image.height > max_pixels:
+                raise InvalidImageError("画像の画素数が上限を超えています")
+            image.load()
+            image = ImageOps.exif_transpose(image)
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise InvalidImageError(str(exc)) from None
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+    os.makedirs(target_dir, exist_ok=True)
+    for variant, edge in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        for image_format, (_, options) in IMAGE_FORMATS.items():
+            output = resized
+            if image_format == "jpeg" and output.mode != "RGB":
+                # JPEGは透過を持てないため白で塗る
+                output = Image.new("RGB", resized.size, (255, 255, 255))
+                output.paste(resized, mask=resized.getchannel("A"))
+            path = os.path.join(target_dir, variant_filename(variant, image_format))
+            fd, temporary = tempfile.mkstemp(dir=target_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    output.save(file, **options)
+                os.replace(temporary, path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+
+
+class ImageProcessor:
+    """
+    画像変換のプロセスプール
+
+    最初の変換時に作成する。ワーカーはイベントループのスレッドやDB接続を
+    引き継がないよう spawn で起動する
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.IMAGE_PROCESS_WORKERS,
+        max_pending: int = settings.IMAGE_MAX_PENDING
+    ):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # プールのキューは上限が無いため、変換待ちを含めた件数をここで制限する
+        self._slots = asyncio.Semaphore(max_pending)
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def receive(self, upload: Any, *, chunk_size: int = 1024 * 1024) -> Tuple[str, str]:
+        """
+        アップロードをチャンク毎に一時ファイルへ書き込み、(一時ファイルのパス, SHA-256) を返す
+
+        MAX_FILE_SIZE を超えた時点で中止する（一時ファイルは削除する）
+        """
+        temporary_dir = Path(settings.MEDIA_ROOT) / "tmp"
+        temporary_dir.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=temporary_dir, suffix=".upload")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as file:
+                while chunk := await upload.read(chunk_size):
+                    size += len(chunk)
+                    if size > settings.MAX_FILE_SIZE:
+                        raise FileTooLargeError("ファイルサイズが上限を超えています")
+                    digest.update(chunk)
+                    await asyncio.to_thread(file.write, chunk)
+        except BaseException:
+            os.unlink(path)
+            raise
+        return path, digest.hexdigest()
+
+    async def process(self, upload: Any) -> Dict[str, Any]:
+        """
+        アップロードされた画像を保存し、ハッシュ・各サイズのURL・変換したかを返す
+
+        同じ内容の画像が保存済みなら変換しない
+        """
+        source, digest = await self.receive(upload)
+        try:
+            target_dir = Path(settings.MEDIA_ROOT) / content_path(IMAGES_KIND, digest)
+            expected = [
+                target_dir / variant_filename(variant, image_format)
+                for variant in IMAGE_VARIANTS for image_format in IMAGE_FORMATS
+            ]
+            created = not all(path.exists() for path in expected)
+            if created:
+                loop = asyncio.get_running_loop()
+                async with self._slots:
+                    await loop.run_in_executor(
+                        self.executor, render_variants, source, str(target_dir), settings.IMAGE_MAX_PIXELS
+                    )
+        finally:
+            os.unlink(source)
+        return {"digest": digest, "variants": variant_urls(digest), "created": created}
+
+    async def stop(self) -> None:
+        if self._executor is not None:
+            await asyncio.to_thread(self._executor.shutdown, wait=True, cancel_futures=True)
+            self._executor = None
+
+
+# グローバルインスタンス
+image_processor = ImageProcessor()
@@ -0,0 +1,244 @@
+"""
+内容のハッシュをパスにしたメディアファイルの保存・配信
+
+ファイルは <種類>/<ハッシュ先頭2文字>/<次の2文字>/<ハッシュ>/<ファイル名> に保存し、
+一度書いたパスの内容は変えない。そのため ETag は強いETag、Cache-Control は immutable にできる。
+
+配信は次のいずれか
+- MEDIA_ACCEL_REDIRECT_PREFIX 設定時: 存在確認のみ行い X-Accel-Redirect を返す
+  （nginx が内部ロケーションから sendfile で配信し、Range も nginx が処理する）
+- 未設定時: Range（単一範囲）・If-None-Match・If-Range を処理して Python から配信する。
+  サーバーが ASGI の zerocopy 拡張に対応していれば sendfile、無ければスレッドでチャンク毎に読む
+"""
+import os
+import re
+import stat
+import mimetypes
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from .config import settings
+
+# 配信できるパス（<種類>/<aa>/<bb>/<SHA-256>/<ファイル名>）
+MEDIA_PATH = re.compile(
+    r"^(?P<kind>[a-z]+)/(?P<a>[0-9a-f]{2})/(?P<b>[0-9a-f]{2})/(?P<digest>[0-9a-f]{64})/"
+    r"(?P<name>[a-z0-9_-]+\.[a-z0-9]+)$"
+)
+
+# 1回に読むバイト数（zerocopy 非対応のサーバー）
+CHUNK_SIZE = 64 * 1024
+
+# nginx.conf の生成部分の目印
+NGINX_BEGIN = "# BEGIN media (generated by scripts/generate_nginx_media.py)"
+NGINX_END = "# END media"
+
+mimetypes.add_type("image/webp", ".webp")
+
+
+def content_path(kind: str, digest: str) -> str:
+    """ハッシュから保存先の相対パス（1ディレクトリのエントリ数を抑えるため先頭4文字で2段に分ける）"""
+    return f"{kind}/{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+def media_url(path: str) -> str:
+    """保存先の相対パスのURL"""
+    return f"{settings.MEDIA_URL.rstrip('/')}/{path}"
+
+
+def resolve(path: str) -> Optional[str]:
+    """URLのパスを MEDIA_ROOT 内のファイルパスにする（形式が違えば None）"""
+    match = MEDIA_PATH.match(path)
+    if match is None or match["a"] + match["b"] != match["digest"][:4]:
+        return None
+    return os.path.join(settings.MEDIA_ROOT, path)
+
+
+def parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Range ヘッダーを [開始, 終了] のバイト位置にする
+
+    単一範囲のみ扱う（複数範囲・形式違いは None で、全体を返す）。
+    満たせない範囲は ValueError
+    """
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = (part.strip() for part in spec.strip().partition("-"))
+    if not dash or not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+    if not first:
+        # 末尾から last バイト
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("unsatisfiable range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+class MediaResponse(Response):
+    """
+    メディアファイルのレスポンス
+
+    パスの内容は変わらないため、ETag はパスから作り、ファイルの内容は読まない
+    """
+
+    def __init__(self, path: str, relative_path: str):
+        self.background = None
+        self.path = path
+        self.relative_path = relative_path
+        digest = MEDIA_PATH.match(relative_path)
+        self.etag = f'"{digest["digest"]}-{digest["name"]}"'
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    def _headers(self, **extra: str) -> List[Tuple[bytes, bytes]]:
+        headers: Dict[str, str] = {
+            "etag": self.etag,
+            "cache-control": f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable",
+            "accept-ranges": "bytes",
+            **extra,
+        }
+        return [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+    async def _respond(self, send: Send, status: int, headers: List[Tuple[bytes, bytes]]) -> None:
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+
+    def _not_modified(self, request_headers: Headers) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is None:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        try:
+            file_stat = await anyio.to_thread.run_sync(os.stat, self.path)
+        except FileNotFoundError:
+            file_stat = None
+        if file_stat is None or not stat.S_ISREG(file_stat.st_mode):
+            await self._respond(send, 404, [(b"content-length", b"0")])
+            return
+
+        if self._not_modified(request_headers):
+            await self._respond(send, 304, self._headers())
+            return
+
+        if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+            # 本体は nginx が内部ロケーションから配信する
+            location = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + self.relative_path
+            await self._respond(send, 200, self._headers(**{
+                "content-type": self.media_type,
+                "x-accel-redirect": location,
+            }))
+            return
+
+        size = file_stat.st_size
+        start, end, status = 0, size - 1, 200
+        extra = {"content-type": self.media_type}
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range.strip() == self.etag):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                await self._respond(send, 416, [
+                    (b"content-range", f"bytes */{size}".encode("latin-1")), (b"content-length", b"0")
+                ])
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                status = 206
+                extra["content-range"] = f"bytes {start}-{end}/{size}"
+        length = end - start + 1 if size else 0
+        extra["content-length"] = str(length)
+
+        await send({"type": "http.response.start", "status": status, "headers": self._headers(**extra)})
+        if scope["method"] == "HEAD" or length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": file.wrapped,
+                    "offset": start,
+                    "count": length,
+                })
+                return
+            await file.seek(start)
+            remaining = length
+            while remaining:
+                chunk = await file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": bool(remaining)})
+            if remaining:
+                # 配信中にファイルが短くなった場合も応答を閉じる
+                await send({"type": "http.response.body", "body": b""})
+
+
+def render_nginx_locations(
+    *,
+    media_url: str,
+    accel_prefix: str,
+    media_root: str,
+    upstream: str = "backend",
+    indent: str = "        "
+) -> str:
+    """
+    メディア配信用の nginx の location（公開パスと X-Accel-Redirect の内部ロケーション）
+
+    公開パスは ^~ で静的ファイルの正規表現ロケーションより優先し、バックエンドに存在確認させる。
+    Content-Type・Cache-Control はバックエンドの応答のものを nginx が引き継ぐ。ETag は引き継がれないため
+    バックエンドの強いETagを設定する（If-None-Match はバックエンドが処理する）。
+    内部ロケーションの add_header は http ブロックのヘッダーを引き継がないため、必要なものを再設定する
+    """
+    media_url = media_url.rstrip("/") + "/"
+    accel_prefix = accel_prefix.rstrip("/") + "/"
+    media_root = media_root.rstrip("/") + "/"
+    lines = [
+        NGINX_BEGIN,
+        f"location ^~ {media_url} {{",
+        "    gzip off;",
+        f"    proxy_pass http://{upstream};",
+        "    proxy_http_version 1.1;",
+        "    proxy_set_header Host $host;",
+        "    proxy_set_header X-Real-IP $remote_addr;",
+        "    proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;",
+        "    proxy_set_header X-Forwarded-Proto $scheme;",
+        "}",
+        "",
+        f"location {accel_prefix} {{",
+        "    internal;",
+        f"    alias {media_root};",
+        "    sendfile on;",
+        "    tcp_nopush on;",
+        "    gzip off;",
+        "    etag off;",
+        "    add_header ETag $upstream_http_etag always;",
+        "    add_header X-Content-Type-Options nosniff always;",
+        "}",
+        NGINX_END,
+    ]
+    return "\n".join(f"{indent}{line}" if line else "" for line in lines) + "\n"
+
+
+def replace_nginx_locations(conf: str, block: str) -> str:
+    """nginx.conf の生成部分（目印の行の間）を置き換える"""
+    begin, end = conf.find(NGINX_BEGIN), conf.find(NGINX_END)
+    if begin == -1 or end == -1:
+        raise ValueError(f"生成部分の目印がありません: {NGINX_BEGIN}")
+    line_start = conf.rfind("\n", 0, begin) + 1
+    line_end = conf.find("\n", end)
+    line_end = len(conf) if line_end == -1 else line_end + 1
+    return conf[:line_start] + block + conf[line_end:]
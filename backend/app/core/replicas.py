@@ -0,0 +1,227 @@
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence
+from sqlalchemy import Select, event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# セッションの読み取りをレプリカに振り分けることを示す Session.info のキー
+READ_REPLICA_KEY = "read_replica"
+
+# レプリカから読んだリクエストであることを示す request.state の属性名
+READ_REPLICA_STATE = "read_replica"
+
+# PostgreSQLのレプリカの遅延（秒）。WALを全て適用済みなら 0
+_POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+@dataclass
+class Replica:
+    """レプリカと直近の確認結果"""
+    name: str
+    engine: AsyncEngine
+    healthy: bool = True
+    lag: Optional[float] = None
+    error: Optional[str] = None
+    checked_at: Optional[float] = None
+    reads: int = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "error": self.error,
+            "reads": self.reads
+        }
+
+
+class ReplicaSet:
+    """
+    読み取り用レプリカの集合
+
+    正常なレプリカをラウンドロビンで選ぶ。定期的な確認で停止・遅延（max_lag 秒以上）を
+    検出したレプリカは外し、正常なレプリカが無ければ呼び出し側はプライマリを使う。
+    クエリで接続エラーが起きたレプリカも次の確認まで外す
+    """
+
+    def __init__(
+        self,
+        engines: Sequence[AsyncEngine] = (),
+        *,
+        max_lag: float = settings.REPLICA_MAX_LAG,
+        check_interval: float = settings.REPLICA_CHECK_INTERVAL,
+        check_timeout: float = settings.REPLICA_CHECK_TIMEOUT
+    ):
+        self.replicas = [
+            Replica(name=engine.url.render_as_string(hide_password=True), engine=engine)
+            for engine in engines
+        ]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.fallbacks = 0
+        self._cycle = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        for replica in self.replicas:
+            event.listen(replica.engine.sync_engine, "handle_error", self._on_error(replica))
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    def _on_error(self, replica: Replica):
+        def handle_error(context: Any) -> None:
+            # 接続の切断・接続できない場合のみ（SQLのエラーはレプリカの障害ではない）
+            if context.is_disconnect or context.connection is None:
+                self._mark_down(replica, str(context.original_exception))
+        return handle_error
+
+    def _mark_down(self, replica: Replica, error: str) -> None:
+        if replica.healthy:
+            logger.warning("レプリカ %s を振り分け先から外しました: %s", replica.name, error)
+        replica.healthy = False
+        replica.error = error
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """読み取りに使うレプリカ（正常なものが無ければ None）"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            if self.replicas:
+                self.fallbacks += 1
+            return None
+        replica = healthy[next(self._cycle) % len(healthy)]
+        replica.reads += 1
+        return replica.engine
+
+    async def _measure_lag(self, engine: AsyncEngine) -> float:
+        async with engine.connect() as conn:
+            if engine.dialect.name == "postgresql":
+                lag = (await conn.execute(_POSTGRES_LAG_QUERY)).scalar()
+                return float(lag or 0)
+            # 遅延を取得できないDB（開発・テスト用のSQLite等）は疎通のみ確認
+            await conn.execute(text("SELECT 1"))
+            return 0.0
+
+    async def check(self, replica: Replica) -> None:
+        try:
+            lag = await asyncio.wait_for(self._measure_lag(replica.engine), timeout=self.check_timeout)
+        except Exception as e:
+            self._mark_down(replica, str(e) or e.__class__.__name__)
+        else:
+            replica.lag = lag
+            if lag >= self.max_lag:
+                self._mark_down(replica, f"遅延 {lag:.1f} 秒")
+            else:
+                if not replica.healthy:
+                    logger.info("レプリカ %s を振り分け先に戻しました", replica.name)
+                replica.healthy = True
+                replica.error = None
+        replica.checked_at = time.monotonic()
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*[self.check(replica) for replica in self.replicas])
+
+    async def run(self) -> None:
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.check_interval)
+
+    def start(self) -> None:
+        if self.replicas and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "replicas": [replica.snapshot() for replica in self.replicas],
+            "fallbacks": self.fallbacks
+        }
+
+
+def _is_plain_select(clause: Any) -> bool:
+    """レプリカで実行できる読み取りか（SELECT ... FOR UPDATE はプライマリ）"""
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+class RoutingSession(Session):
+    """
+    読み取りをレプリカに振り分けるセッション
+
+    READ_REPLICA_KEY が設定されたセッションのSELECTのみレプリカで実行する。
+    書き込み（flush・UPDATE等）を行った後は、同じセッションの読み取りもプライマリで行う
+    """
+
+    def __init__(self, *args: Any, replicas: Optional[ReplicaSet] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kw: Any) -> Any:
+        if self.info.get(READ_REPLICA_KEY):
+            if self._flushing or not _is_plain_select(clause):
+                self.info.pop(READ_REPLICA_KEY)
+            elif self.replicas:
+                engine = self.replicas.choose()
+                if engine is not None:
+                    return engine.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+def wrote_recently(request: HTTPConnection) -> bool:
+    """直近に書き込みを行ったクライアントか（自分の書き込みをプライマリから読む）"""
+    return settings.REPLICA_STICKY_COOKIE in request.cookies
+
+
+class ReadYourWritesMiddleware:
+    """
+    書き込みに成功したクライアントに REPLICA_STICKY_SECONDS 秒で失効するCookieを付ける
+
+    Cookieが有効な間の読み取りはプライマリで行うため、レプリカの遅延中でも
+    自分の書き込みが反映された内容を読める（ワーカーをまたいでも有効）
+    """
+
+    SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+    def __init__(self, app: ASGIApp, *, sticky_seconds: float = settings.REPLICA_STICKY_SECONDS):
+        self.app = app
+        self.cookie = (
+            f"{settings.REPLICA_STICKY_COOKIE}=1; Max-Age={max(int(sticky_seconds), 1)}; "
+            f"Path=/; HttpOnly; SameSite=Lax"
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in self.SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = MutableHeaders(raw=list(message.get("headers", [])))
+                headers.append("Set-Cookie", self.cookie)
+                message = {**message, "headers": headers.raw}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
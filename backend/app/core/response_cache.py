@@ -0,0 +1,394 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .compression import CACHE_TAGS_STATE, negotiate
+from .config import settings
+from .database import CACHE_PURGE_KEY
+from .events import EventBroker, RedisEventBroker
+from .replicas import READ_REPLICA_STATE
+from .tenancy import parse_salon_id
+
+logger = logging.getLogger(__name__)
+
+# キャッシュの利用結果を示すレスポンスヘッダー（HIT / MISS）
+CACHE_HEADER = b"x-cache"
+
+# 全てのエントリを破棄するタグ
+ALL_TAG = "*"
+
+# トライアル集計で並べ替えたレスポンスのタグ（集計の更新で順序が変わりうる）
+TRIAL_STATS_TAG = "trial-stats"
+
+# カテゴリで絞り込んでいないレスポンスのタグ（どの商品の追加・変更でも内容が変わりうる）
+UNFILTERED_TAG = "category:*"
+
+# キャッシュ対象のパス（未認証のGETのみ）
+CACHEABLE_PATHS = frozenset(
+    f"{settings.API_V1_STR}/products{suffix}" for suffix in ("/", "/featured", "/search")
+)
+
+CacheKey = Tuple[int, str, str, str]
+
+
+def product_tag(product_id: Any) -> str:
+    return f"product:{product_id}"
+
+
+def category_tag(category: Any) -> str:
+    return f"category:{getattr(category, 'value', category)}"
+
+
+def product_write_tags(product_id: Optional[int], category: Any) -> Set[str]:
+    """
+    商品の書き込みで破棄するタグ
+
+    その商品を含むレスポンスに加え、同じカテゴリで絞り込んだレスポンスと
+    カテゴリで絞り込んでいないレスポンス（一覧に入る・外れる可能性がある）
+    """
+    tags = {category_tag(category), UNFILTERED_TAG}
+    if product_id is not None:
+        tags.add(product_tag(product_id))
+    return tags
+
+
+def tag_response(
+    request: Request,
+    items: Iterable[Any],
+    *,
+    category: Any = None,
+    extra_tags: Iterable[str] = ()
+) -> None:
+    """
+    レスポンスに含まれる商品・カテゴリのタグを設定
+
+    タグを設定したレスポンスのみキャッシュされる
+    """
+    tags = {category_tag(category) if category else UNFILTERED_TAG, *extra_tags}
+    for item in items:
+        tags.add(product_tag(item.id))
+        tags.add(category_tag(item.category))
+    setattr(request.state, CACHE_TAGS_STATE, frozenset(tags))
+
+
+def cache_key(salon_id: int, path: str, query_string: bytes, accept_encoding: str) -> CacheKey:
+    """
+    サロン・パス・正規化したクエリ・Accept-Encoding からキーを生成
+
+    Accept-Encoding は選択される圧縮方式に正規化する（同じ方式のエントリを共有）
+    """
+    query = urlencode(sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)))
+    return salon_id, path, query, negotiate(accept_encoding) or "identity"
+
+
+@dataclass
+class CachedResponse:
+    """保存済みのレスポンス（ボディは送信時のバイト列のまま保持）"""
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    tags: FrozenSet[str]
+    expires_at: float
+
+
+class ResponseCache:
+    """
+    タグで無効化できるプロセス内のレスポンスキャッシュ（LRU）
+
+    破棄の度に generation を進めるため、破棄より前に読み始めたレスポンスは
+    保存しないよう呼び出し側で判定できる。purged_at は最後に破棄した時刻
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = settings.RESPONSE_CACHE_MAX_ENTRIES,
+        ttl: float = settings.RESPONSE_CACHE_TTL
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        self.purged_at = float("-inf")
+        self.hits = self.misses = self.stores = self.purged = 0
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(
+        self,
+        key: Hashable,
+        *,
+        status: int,
+        headers: List[Tuple[bytes, bytes]],
+        body: bytes,
+        tags: Iterable[str]
+    ) -> None:
+        self._remove(key)
+        entry = CachedResponse(
+            status=status,
+            headers=headers,
+            body=body,
+            tags=frozenset(tags),
+            expires_at=time.monotonic() + self.ttl
+        )
+        self._entries[key] = entry
+        for tag in entry.tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        self.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def purge(self, tags: Iterable[str]) -> int:
+        """いずれかのタグを持つエントリを破棄し、破棄した件数を返す"""
+        tags = set(tags)
+        self.generation += 1
+        self.purged_at = time.monotonic()
+        if ALL_TAG in tags:
+            keys = set(self._entries)
+        else:
+            keys = set().union(*(self._keys_by_tag.get(tag, ()) for tag in tags))
+        for key in keys:
+            self._remove(key)
+        self.purged += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        self.purge({ALL_TAG})
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "purged": self.purged
+        }
+
+
+class ResponseCacheMiddleware:
+    """
+    未認証のカタログGETのレスポンスをそのまま保存・返却するASGIミドルウェア
+
+    ヒット時はルーティング・バリデーション・DB・シリアライズを行わずに保存済みの
+    バイト列を返す。ミス時はハンドラがタグを設定した 200 のレスポンスのみ保存する。
+    CompressionMiddleware より外側に置いて圧縮済みのボディを保存し、
+    CORS等のリクエスト毎に変わるヘッダーを保存しないよう、それらのミドルウェアより内側に置く
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        cache: Optional[ResponseCache] = None,
+        paths: Iterable[str] = CACHEABLE_PATHS,
+        max_body_size: int = settings.RESPONSE_CACHE_MAX_BODY_SIZE,
+        replica_max_lag: float = settings.REPLICA_MAX_LAG
+    ):
+        self.app = app
+        self.cache = cache if cache is not None else response_cache
+        self.paths = frozenset(paths)
+        self.max_body_size = max_body_size
+        self.replica_max_lag = replica_max_lag
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        salon_id = parse_salon_id(headers.get(settings.TENANT_HEADER))
+        if "authorization" in headers or salon_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = cache_key(salon_id, scope["path"], scope["query_string"], headers.get("accept-encoding", ""))
+        entry = self.cache.get(key)
+        if entry is not None:
+            await send({
+                "type": "http.response.start",
+                "status": entry.status,
+                "headers": [*entry.headers, (CACHE_HEADER, b"HIT")]
+            })
+            await send({"type": "http.response.body", "body": entry.body})
+            return
+
+        generation = self.cache.generation
+        state = scope.setdefault("state", {})
+        start: Optional[Message] = None
+        chunks: List[bytes] = []
+        size = 0
+        storable = True
+
+        async def send_and_capture(message: Message) -> None:
+            nonlocal start, size, storable
+            if message["type"] == "http.response.start":
+                start = message
+                message = {**message, "headers": [*message.get("headers", []), (CACHE_HEADER, b"MISS")]}
+            elif message["type"] == "http.response.body" and storable:
+                body = message.get("body", b"")
+                size += len(body)
+                if size > self.max_body_size:
+                    storable = False
+                    chunks.clear()
+                else:
+                    chunks.append(body)
+            await send(message)
+
+        await self.app(scope, receive, send_and_capture)
+
+        tags = state.get(CACHE_TAGS_STATE)
+        # 処理中に破棄が行われた場合は、破棄前の内容の可能性があるため保存しない
+        # （レプリカから読んだ場合は、破棄からレプリカの許容遅延が過ぎるまで保存しない）
+        replica_may_be_stale = (
+            state.get(READ_REPLICA_STATE)
+            and time.monotonic() - self.cache.purged_at < self.replica_max_lag
+        )
+        if (
+            storable and tags and start is not None and start["status"] == 200
+            and self.cache.generation == generation and not replica_may_be_stale
+        ):
+            self.cache.set(
+                key,
+                status=start["status"],
+                headers=[
+                    (name, value) for name, value in start.get("headers", [])
+                    if name.lower() != b"set-cookie"
+                ],
+                body=b"".join(chunks),
+                tags=tags
+            )
+
+
+class CacheInvalidator:
+    """
+    コミットされた書き込みのタグで自プロセスのキャッシュを破棄し、他のワーカーにも伝える
+
+    broker が None（単一プロセス）の場合は自プロセスのみ破棄する。
+    他のワーカーへの通知が届かなかった場合も、エントリは保存期間で失効する
+    """
+
+    def __init__(self, cache: ResponseCache, broker: Optional[EventBroker] = None):
+        self.cache = cache
+        self.broker = broker
+        self.origin = uuid.uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+        self._publishing: Set[asyncio.Task] = set()
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        tags = sorted(tags)
+        self.cache.purge(tags)
+        if self.broker is None:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self._publish(tags))
+        except RuntimeError:
+            # イベントループ外（同期セッションのスクリプト等）
+            return
+        self._publishing.add(task)
+        task.add_done_callback(self._publishing.discard)
+
+    async def _publish(self, tags: List[str]) -> None:
+        try:
+            await self.broker.publish({"origin": self.origin, "tags": tags})
+        except Exception:
+            logger.exception("キャッシュ無効化の通知に失敗しました")
+
+    async def run(self) -> None:
+        """他のワーカーからの無効化を受信して破棄"""
+        subscription = self.broker.subscribe()
+        try:
+            while True:
+                message = await subscription.get()
+                if message is None:
+                    # 受信が追いつかず購読が閉じられた（取りこぼしがあるため全て破棄）
+                    self.cache.clear()
+                    subscription = self.broker.subscribe()
+                    continue
+                if message.get("origin") != self.origin:
+                    self.cache.purge(message.get("tags", ()))
+        finally:
+            self.broker.unsubscribe(subscription)
+
+    async def start(self) -> None:
+        if self.broker is None:
+            return
+        await self.broker.start()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.broker is not None:
+            await self.broker.stop()
+
+
+def mark_stale(db: AsyncSession, tags: Iterable[str]) -> None:
+    """コミット時に破棄するタグを追加（ロールバックされた場合は破棄しない）"""
+    db.info.setdefault(CACHE_PURGE_KEY, set()).update(tags)
+
+
+def _create_invalidation_broker() -> Optional[EventBroker]:
+    """複数ワーカー（redis）の場合のみ、無効化用のチャンネルを購読するブローカーを生成"""
+    if settings.EVENT_BROKER_BACKEND == "redis":
+        return RedisEventBroker(channel=settings.RESPONSE_CACHE_CHANNEL)
+    return None
+
+
+# グローバルインスタンス
+response_cache = ResponseCache()
+cache_invalidator = CacheInvalidator(response_cache, _create_invalidation_broker())
+
+
+@event.listens_for(Session, "after_commit")
+def _purge_on_commit(session: Session) -> None:
+    tags = session.info.pop(CACHE_PURGE_KEY, None)
+    if tags:
+        cache_invalidator.invalidate(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_purge_tags(session: Session) -> None:
+    session.info.pop(CACHE_PURGE_KEY, None)
@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from .config import settings
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[[async_sessionmaker], Awaitable[None]]
+
+
+@dataclass
+class Job:
+    """定期実行ジョブ"""
+    name: str
+    func: JobFunc
+    interval: float
+    next_run: float = field(default=0.0)
+
+
+class Scheduler:
+    """
+    プロセス内の非同期スケジューラ
+
+    複数ワーカーで起動しても、DBのリース（scheduler_leases）を保持している
+    1ワーカーのみがジョブを実行する。リースは有効期間の1/3毎に延長し（ジョブの実行中も延長する）、
+    リーダーが停止した場合は期限切れ後に他のワーカーが引き継ぐ
+    """
+
+    def __init__(
+        self,
+        *,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        lease_name: str = "scheduler",
+        lease_ttl: float = settings.SCHEDULER_LEASE_TTL,
+        holder: Optional[str] = None
+    ):
+        self.session_factory = session_factory
+        self.lease_name = lease_name
+        self.lease_ttl = lease_ttl
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.jobs: Dict[str, Job] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add_job(self, name: str, func: JobFunc, *, interval: float) -> None:
+        """ジョブを登録（リーダーになった直後に1回実行し、以降 interval 秒毎に実行）"""
+        self.jobs[name] = Job(name=name, func=func, interval=interval)
+
+    async def acquire_leadership(self) -> bool:
+        """リースを取得・延長"""
+        from ..crud.scheduler_lease import scheduler_lease
+
+        try:
+            async with self.session_factory() as db:
+                self.is_leader = await scheduler_lease.acquire(
+                    db,
+                    name=self.lease_name,
+                    holder=self.holder,
+                    ttl=timedelta(seconds=self.lease_ttl),
+                    now=datetime.utcnow()
+                )
+        except Exception:
+            logger.exception("スケジューラのリース取得に失敗しました")
+            self.is_leader = False
+        return self.is_leader
+
+    async def _run_job(self, job: Job) -> bool:
+        """
+        ジョブを実行し、実行中も有効期間の1/3毎にリースを延長
+
+        リースを延長できなかった（他のワーカーが引き継いだ可能性がある）場合は
+        ジョブを中止して False を返す
+        """
+        task = asyncio.create_task(job.func(self.session_factory))
+        try:
+            while not (await asyncio.wait({task}, timeout=self.lease_ttl / 3))[0]:
+                if not await self.acquire_leadership():
+                    logger.warning("リースを失ったためジョブ %s を中止しました", job.name)
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    return False
+        except asyncio.CancelledError:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            raise
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("ジョブ %s の実行に失敗しました", job.name, exc_info=task.exception())
+        return True
+
+    async def run_pending(self) -> None:
+        """実行時刻になったジョブを実行（リーダーでなくなった時点で以降のジョブは実行しない）"""
+        for job in self.jobs.values():
+            if time.monotonic() < job.next_run:
+                continue
+            if not self.is_leader or not await self._run_job(job):
+                return
+            job.next_run = time.monotonic() + job.interval
+
+    async def tick(self) -> bool:
+        """リースを更新し、リーダーであれば実行時刻になったジョブを実行"""
+        was_leader = self.is_leader
+        if not await self.acquire_leadership():
+            return False
+        if not was_leader:
+            # 新たにリーダーになった場合は全ジョブをすぐに実行
+            for job in self.jobs.values():
+                job.next_run = 0.0
+        await self.run_pending()
+        return True
+
+    def _seconds_until_next_tick(self) -> float:
+        renew_in = self.lease_ttl / 3
+        if not self.is_leader or not self.jobs:
+            return renew_in
+        next_run = min(job.next_run for job in self.jobs.values())
+        return max(0.0, min(renew_in, next_run - time.monotonic()))
+
+    async def run(self) -> None:
+        while True:
+            await self.tick()
+            await asyncio.sleep(self._seconds_until_next_tick())
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """停止し、保持しているリースを解放"""
+        from ..crud.scheduler_lease import scheduler_lease
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.is_leader:
+            try:
+                async with self.session_factory() as db:
+                    await scheduler_lease.release(db, name=self.lease_name, holder=self.holder)
+            except Exception:
+                logger.exception("スケジューラのリース解放に失敗しました")
+            self.is_leader = False
+
+
+async def expire_trials(session_factory: async_sessionmaker) -> None:
+    """期限切れのトライアルを完了・キャンセルに遷移"""
+    from ..crud.trial_request import trial_request
+
+    async with session_factory() as db:
+        counts = await trial_request.expire_due(db, batch_size=settings.TRIAL_EXPIRY_BATCH_SIZE)
+    if any(counts.values()):
+        logger.info(
+            "期限切れトライアルを遷移しました: %s",
+            {status.value: count for status, count in counts.items()}
+        )
+
+
+async def archive_trials(session_factory: async_sessionmaker) -> None:
+    """終了済みで一定期間更新の無いトライアルをアーカイブに移動"""
+    from ..crud.trial_request import trial_request
+
+    async with session_factory() as db:
+        archived = await trial_request.archive_terminal(
+            db,
+            older_than=timedelta(days=settings.TRIAL_ARCHIVE_AFTER_DAYS),
+            batch_size=settings.TRIAL_ARCHIVE_BATCH_SIZE
+        )
+    if archived:
+        logger.info("終了済みトライアルを %d 件アーカイブしました", archived)
+
+
+async def reconcile_trial_stats(session_factory: async_sessionmaker) -> None:
+    """商品毎のトライアル集計を稼働中のテーブルとアーカイブから集計し直す"""
+    from ..crud.trial_stats import product_trial_stats
+
+    async with session_factory() as db:
+        await product_trial_stats.reconcile(db)
+
+
+async def compact_trial_rollups(session_factory: async_sessionmaker) -> None:
+    """トライアル活動の時系列集計の直近分を作り直し、古い時間単位の行を削除"""
+    from ..crud.trial_rollup import trial_rollup
+
+    async with session_factory() as db:
+        await trial_rollup.compact(
+            db,
+            rebuild_days=settings.TRIAL_ROLLUP_REBUILD_DAYS,
+            hourly_retention_days=settings.TRIAL_ROLLUP_HOURLY_RETENTION_DAYS
+        )
+
+
+async def forecast_demand(session_factory: async_sessionmaker) -> None:
+    """全商品のトライアル需要を予測し、在庫切れ予測日と推奨最低在庫数を更新"""
+    from ..crud.demand_forecast import demand_forecast
+
+    async with session_factory() as db:
+        count = await demand_forecast.refresh(
+            db,
+            history_days=settings.DEMAND_HISTORY_DAYS,
+            horizon_days=settings.DEMAND_FORECAST_HORIZON_DAYS,
+            lead_time_days=settings.REORDER_LEAD_TIME_DAYS,
+            service_level_z=settings.REORDER_SERVICE_LEVEL_Z
+        )
+    logger.info("%d 商品の需要を予測しました", count)
+
+
+async def compact_stock_ledger(session_factory: async_sessionmaker) -> None:
+    """古い在庫移動を商品毎にまとめ、引当数カウンタを台帳に合わせる"""
+    from ..crud.stock import stock_ledger
+
+    async with session_factory() as db:
+        folded = await stock_ledger.compact(
+            db, older_than=timedelta(days=settings.STOCK_LEDGER_RETENTION_DAYS)
+        )
+    if folded:
+        logger.info("在庫移動を %d 件圧縮しました", folded)
+
+
+async def purge_idempotency_keys(session_factory: async_sessionmaker) -> None:
+    """保存期間を過ぎたIdempotency-Keyを削除"""
+    from ..crud.idempotency import idempotency_key
+
+    async with session_factory() as db:
+        await idempotency_key.purge_expired(db, now=datetime.utcnow())
+
+
+# グローバルインスタンス
+scheduler = Scheduler()
+scheduler.add_job("expire_trials", expire_trials, interval=settings.TRIAL_EXPIRY_INTERVAL)
+scheduler.add_job("archive_trials", archive_trials, interval=settings.TRIAL_ARCHIVE_INTERVAL)
+scheduler.add_job(
+    "reconcile_trial_stats", reconcile_trial_stats, interval=settings.TRIAL_STATS_RECONCILE_INTERVAL
+)
+scheduler.add_job(
+    "compact_trial_rollups", compact_trial_rollups, interval=settings.TRIAL_ROLLUP_COMPACT_INTERVAL
+)
+scheduler.add_job("forecast_demand", forecast_demand, interval=settings.DEMAND_FORECAST_INTERVAL)
+scheduler.add_job(
+    "compact_stock_ledger", compact_stock_ledger, interval=settings.STOCK_LEDGER_COMPACT_INTERVAL
+)
+scheduler.add_job("purge_idempotency_keys", purge_idempotency_keys, interval=3600)
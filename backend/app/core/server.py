@@ -0,0 +1,92 @@
+"""
+サーバー起動
+
+- production: gunicorn がCPUコア数分の uvicorn ワーカー（uvloop + httptools）を管理する
+- それ以外: uvicorn を1プロセス・自動リロードで起動する
+
+    python -m app.core.server
+"""
+import multiprocessing
+from typing import Any, Dict
+
+from .config import settings
+
+APP_URI = "main:app"
+
+
+def worker_count() -> int:
+    return settings.WEB_CONCURRENCY or multiprocessing.cpu_count()
+
+
+def gunicorn_options() -> Dict[str, Any]:
+    """設定から gunicorn のオプションを生成"""
+    return {
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": worker_count(),
+        "worker_class": "app.core.gunicorn_worker.UvloopWorker",
+        "timeout": settings.SERVER_TIMEOUT,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        "keepalive": settings.SERVER_KEEPALIVE,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS_JITTER,
+        # マスターでアプリをインポートしてからforkする（ワーカー起動の短縮・メモリ共有）
+        "preload_app": True,
+        "post_fork": post_fork,
+        # アクセスログはnginxで記録する
+        "errorlog": "-",
+        "loglevel": settings.LOG_LEVEL.lower(),
+    }
+
+
+def post_fork(server: Any, worker: Any) -> None:
+    """
+    fork直後のワーカーでDB接続プールを作り直す
+
+    preload時にマスターで接続が作られていた場合、複数のワーカーで同じ接続を共有しないよう
+    親プロセスの接続は閉じずに破棄する
+    """
+    from .database import engine, replicas
+    from ..db.database import engine as auth_engine
+
+    replica_engines = [replica.engine for replica in replicas.replicas]
+    for async_engine in (engine, auth_engine, *replica_engines):
+        async_engine.sync_engine.dispose(close=False)
+
+
+def run_production() -> None:
+    from gunicorn.app.base import BaseApplication
+    from uvicorn.importer import import_from_string
+
+    class Application(BaseApplication):
+        def load_config(self) -> None:
+            for key, value in gunicorn_options().items():
+                self.cfg.set(key, value)
+
+        def load(self) -> Any:
+            return import_from_string(APP_URI)
+
+    Application().run()
+
+
+def run_development() -> None:
+    import uvicorn
+
+    uvicorn.run(
+        APP_URI,
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        reload=True,
+        reload_dirs=["app"]
+    )
+
+
+def run() -> None:
+    """設定（ENVIRONMENT）に応じたモードで起動"""
+    if settings.is_production:
+        run_production()
+    else:
+        run_development()
+
+
+if __name__ == "__main__":
+    run()
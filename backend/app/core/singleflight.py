@@ -0,0 +1,128 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def make_key(name: str, **params: Any) -> Tuple[Hashable, ...]:
+    """ルート名と正規化したパラメータからキーを生成（None のパラメータは無視）"""
+    items = tuple(sorted(
+        (key, value.value if hasattr(value, "value") else value)
+        for key, value in params.items()
+        if value is not None
+    ))
+    return (name,) + items
+
+
+@dataclass
+class SingleFlightStats:
+    """合流の統計"""
+    calls: int = 0
+    executions: int = 0
+    coalesced: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+    def as_dict(self, in_flight: int) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalescing_rate": self.coalesced / self.calls if self.calls else 0.0,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_avg": self.wait_seconds_total / self.coalesced if self.coalesced else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+            "in_flight": in_flight
+        }
+
+
+class SingleFlight:
+    """
+    同じキーの同時実行を1回にまとめる
+
+    実行中のキーに届いた呼び出しは、先行する呼び出し（リーダー）の結果を待って
+    同じ結果（または例外）を受け取る。完了後の呼び出しは改めて実行されるため、
+    結果をキャッシュするわけではない。
+
+    結果は複数のリクエストで共有されるため、セッションに紐づくORMオブジェクトではなく
+    レスポンススキーマ等に変換した値を返す関数を渡すこと
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stats = SingleFlightStats()
+        self._calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self.stats.calls += 1
+        future = self._calls.get(key)
+        if future is not None:
+            return await self._wait(key, future, fn)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.stats.executions += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # リーダーのリクエストが中断された場合、待機者は各自で実行し直す
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # 待機者がいない場合の "exception was never retrieved" 警告を抑止
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    async def _wait(self, key: Hashable, future: "asyncio.Future[Any]", fn: Callable[[], Awaitable[T]]) -> T:
+        self.stats.coalesced += 1
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if future.cancelled() and not _current_task_cancelling():
+                self.stats.calls -= 1
+                self.stats.coalesced -= 1
+                return await self.do(key, fn)
+            raise
+        finally:
+            waited = loop.time() - started
+            self.stats.wait_seconds_total += waited
+            self.stats.wait_seconds_max = max(self.stats.wait_seconds_max, waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self.stats.as_dict(len(self._calls))
+
+    def reset(self) -> None:
+        self.stats = SingleFlightStats()
+
+
+def _current_task_cancelling() -> bool:
+    """現在のタスク自体がキャンセルされているか（Python 3.11 未満では判定できないため False）"""
+    task = asyncio.current_task()
+    cancelling = getattr(task, "cancelling", None)
+    return bool(cancelling and cancelling())
+
+
+# 名前毎のインスタンス（メトリクスの公開用）
+_groups: Dict[str, SingleFlight] = {}
+
+
+def group(name: str) -> SingleFlight:
+    """名前に対応するインスタンスを取得（無ければ作成）"""
+    if name not in _groups:
+        _groups[name] = SingleFlight(name)
+    return _groups[name]
+
+
+def metrics() -> Dict[str, Dict[str, Any]]:
+    """全インスタンスの統計"""
+    return {name: flight.snapshot() for name, flight in _groups.items()}
@@ -0,0 +1,69 @@
+"""
+起動時間の計測
+
+main.py の最初でインポートし、インポート完了・lifespan 完了・最初のリクエスト完了
+までの時間を記録する（/metrics とログで確認できる）
+"""
+import logging
+import time
+from typing import Dict, Optional
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+def _process_age() -> Optional[float]:
+    """プロセス起動からの経過秒数（/proc が無い環境では None）"""
+    try:
+        import os
+        with open("/proc/self/stat") as stat, open("/proc/uptime") as uptime:
+            # comm に空白が含まれる場合があるため ")" の後から数える
+            fields = stat.read().rsplit(")", 1)[1].split()
+            started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+            return float(uptime.read().split()[0]) - started
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupProfile:
+    """起動フェーズ毎の経過時間（このモジュールのインポート時点から）"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.interpreter_seconds = _process_age()
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, phase: str) -> None:
+        """フェーズの完了を記録（2回目以降は無視）"""
+        self.phases.setdefault(phase, time.perf_counter() - self.started)
+
+    def snapshot(self) -> Dict[str, float]:
+        result = {f"{phase}_seconds": seconds for phase, seconds in self.phases.items()}
+        if self.interpreter_seconds is not None:
+            # プロセス起動からこのモジュールのインポートまで（インタプリタ・サーバーの起動）
+            result["interpreter_seconds"] = self.interpreter_seconds
+        return result
+
+
+startup_profile = StartupProfile()
+
+
+class FirstRequestMiddleware:
+    """最初のリクエストの完了時刻を記録してログに出力する"""
+
+    def __init__(self, app: ASGIApp, *, profile: StartupProfile = startup_profile):
+        self.app = app
+        self.profile = profile
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or "first_request" in self.profile.phases:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profile.mark("first_request")
+            logger.info(
+                "起動プロファイル: %s",
+                ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.profile.snapshot().items())
+            )
@@ -0,0 +1,78 @@
+from typing import Any, Optional
+from fastapi import HTTPException, Request, status
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session, with_loader_criteria
+
+from .config import settings
+from ..models.base import DEFAULT_SALON_ID, TenantMixin
+
+# セッションのテナント（サロン）のスコープを保持する Session.info のキー
+SALON_SCOPE_KEY = "salon_id"
+
+
+def parse_salon_id(value: Optional[str]) -> Optional[int]:
+    """テナントヘッダーの値をサロンIDに変換（未指定は既定のサロン、不正な値は None）"""
+    if value is None or not value.strip():
+        return DEFAULT_SALON_ID
+    try:
+        salon_id = int(value)
+    except ValueError:
+        return None
+    return salon_id if salon_id > 0 else None
+
+
+def current_salon_id(request: Request) -> int:
+    """
+    リクエストのサロンIDを取得（TENANT_HEADER、未指定なら既定のサロン）
+
+    TODO: 認証の導入後はログインユーザーの salon_id と照合する
+    """
+    salon_id = parse_salon_id(request.headers.get(settings.TENANT_HEADER))
+    if salon_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{settings.TENANT_HEADER} が不正です"
+        )
+    return salon_id
+
+
+def scope_session(db: Any, salon_id: int) -> None:
+    """セッションの読み書きを指定したサロンに限定"""
+    db.info[SALON_SCOPE_KEY] = salon_id
+
+
+def session_salon_id(db: Any) -> int:
+    """セッションのサロンID（スコープが無ければ既定のサロン）"""
+    return db.info.get(SALON_SCOPE_KEY, DEFAULT_SALON_ID)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _apply_salon_scope(state: ORMExecuteState) -> None:
+    """
+    スコープのあるセッションのORM文（SELECT・UPDATE・DELETE）に salon_id の条件を追加
+
+    条件が先頭列に一致するため、salon_id から始まる複合インデックス（PostgreSQLでは
+    パーティションの絞り込み）が使われる。テーブルを直接指定したCore文は対象外
+    """
+    salon_id = state.session.info.get(SALON_SCOPE_KEY)
+    if salon_id is None or state.is_column_load or state.is_relationship_load:
+        return
+    if state.is_select or state.is_update or state.is_delete:
+        state.statement = state.statement.options(
+            with_loader_criteria(
+                TenantMixin,
+                lambda cls: cls.salon_id == salon_id,
+                include_aliases=True
+            )
+        )
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_salon(session: Session, flush_context: Any, instances: Any) -> None:
+    """スコープのあるセッションで追加した行をそのサロンに所属させる"""
+    salon_id = session.info.get(SALON_SCOPE_KEY)
+    if salon_id is None:
+        return
+    for obj in session.new:
+        if isinstance(obj, TenantMixin) and obj.salon_id is None:
+            obj.salon_id = salon_id
@@ -2,5 +2,8 @@
 from .user import user
 from .product import product  
 from .trial_request import trial_request
+from .outbox import outbox
+from .scheduler_lease import scheduler_lease
+from .idempotency import idempotency_key
 
-__all__ = ["user", "product", "trial_request"]
\ No newline at end of file
+__all__ = ["user", "product", "trial_request", "outbox", "scheduler_lease", "idempotency_key"]
\ No newline at end of file
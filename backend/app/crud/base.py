@@ -1,8 +1,9 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
-from fastapi.encoders import jsonable_encoder
+from typing import Any, AsyncIterator, Dict, Generic, Iterable, List, Optional, Type, TypeVar, Union
 from pydantic import BaseModel
-from sqlalchemy import select, func
+from sqlalchemy import Select, select, update, delete, func, inspect
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.database import commit_or_flush
 from ..models.base import BaseModel as DBBaseModel
 
 ModelType = TypeVar("ModelType", bound=DBBaseModel)
@@ -10,6 +11,17 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+def dialect_insert(db: AsyncSession, model: Any):
+    """
+    接続先DBの方言に応じたINSERT文を生成
+    
+    PostgreSQL/SQLiteともに on_conflict_do_update / on_conflict_do_nothing が使える
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """CRUD操作のベースクラス"""
     
@@ -21,6 +33,12 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             model: SQLAlchemyモデルクラス
         """
         self.model = model
+        mapper = inspect(model)
+        primary_keys = {column.key for column in mapper.primary_key}
+        # 更新対象にできるカラム属性（主キーを除く）
+        self.column_keys = frozenset(
+            attr.key for attr in mapper.column_attrs if attr.key not in primary_keys
+        )
 
     async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
         """IDでエンティティを取得"""
@@ -40,6 +58,30 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         )
         return list(result.scalars().all())
 
+    async def stream_partitions(
+        self,
+        db: AsyncSession,
+        query: Select,
+        *,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[List[ModelType]]:
+        """
+        サーバーサイドカーソルでクエリ結果をチャンク単位に取得
+
+        取得済みのチャンクは次のチャンクを読む前にセッションから切り離すため、
+        件数に関わらずメモリ使用量は chunk_size 件分に収まる
+        """
+        result = await db.stream(
+            query.execution_options(stream_results=True, yield_per=chunk_size)
+        )
+        try:
+            async for partition in result.scalars().partitions():
+                yield partition
+                for obj in partition:
+                    db.expunge(obj)
+        finally:
+            await result.close()
+
     async def get_count(self, db: AsyncSession) -> int:
         """総件数を取得"""
         result = await db.execute(select(func.count(self.model.id)))
@@ -47,13 +89,46 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
     async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
         """新しいエンティティを作成"""
-        obj_in_data = jsonable_encoder(obj_in)
-        db_obj = self.model(**obj_in_data)
+        db_obj = self.model(**obj_in.model_dump())
         db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+        await commit_or_flush(db)
+        return db_obj
+
+    async def update_where(
+        self,
+        db: AsyncSession,
+        *,
+        id: Any,
+        values: Dict[str, Any],
+        conditions: Iterable[Any] = ()
+    ) -> Optional[ModelType]:
+        """
+        条件付きで1件を更新し、更新後のエンティティを返す
+        
+        UPDATE ... RETURNING の1文で更新と再取得を行う。
+        該当行が無い・条件に一致しない場合は None
+        """
+        result = await db.execute(
+            update(self.model)
+            .where(self.model.id == id, *conditions)
+            .values(**values)
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        )
+        db_obj = result.scalar_one_or_none()
+        if db_obj is not None:
+            await self._after_update(db, db_obj, values)
+        await commit_or_flush(db)
         return db_obj
 
+    async def _after_update(
+        self,
+        db: AsyncSession,
+        db_obj: ModelType,
+        values: Dict[str, Any]
+    ) -> None:
+        """更新後・コミット前のフック（同じトランザクションで追加の書き込みを行う）"""
+
     async def update(
         self,
         db: AsyncSession,
@@ -61,30 +136,38 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
-        """既存のエンティティを更新"""
-        obj_data = jsonable_encoder(db_obj)
+        """
+        既存のエンティティを更新
         
+        モデルのカラム定義に含まれ、かつ現在値から変わった項目だけを
+        UPDATE ... RETURNING で1回だけ更新し、返却値で db_obj を上書きする
+        （変更が無ければクエリを発行しない）
+        """
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
-            update_data = obj_in.dict(exclude_unset=True)
-            
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-                
-        db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
-        return db_obj
+            update_data = obj_in.model_dump(exclude_unset=True)
+        
+        loaded = inspect(db_obj).dict
+        changes = {
+            field: value
+            for field, value in update_data.items()
+            if field in self.column_keys
+            and (field not in loaded or loaded[field] != value)
+        }
+        if not changes:
+            return db_obj
+        
+        return await self.update_where(db, id=db_obj.id, values=changes)
 
-    async def remove(self, db: AsyncSession, *, id: int) -> Optional[ModelType]:
-        """エンティティを削除"""
-        obj = await self.get(db, id=id)
-        if obj:
-            await db.delete(obj)
-            await db.commit()
-        return obj
+    async def remove(self, db: AsyncSession, *, id: int) -> Optional[int]:
+        """エンティティを削除（DELETE ... RETURNING id の1文）し、削除したIDを返す"""
+        result = await db.execute(
+            delete(self.model).where(self.model.id == id).returning(self.model.id)
+        )
+        deleted_id = result.scalar_one_or_none()
+        await commit_or_flush(db)
+        return deleted_id
 
     async def exists(self, db: AsyncSession, *, id: int) -> bool:
         """エンティティが存在するかチェック"""
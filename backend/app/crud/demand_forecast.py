@@ -0,0 +1,179 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import dialect_insert
+from ..models.demand_forecast import ProductDemandForecast
+from ..models.product import Product
+from ..models.trial_request import TrialRequest, TrialRequestArchive, TrialStatus
+
+# 予測ジョブが上書きする列
+FORECAST_COLUMNS = (
+    "daily_demand", "demand_stddev", "suggested_min_stock_level", "projected_stockout_date",
+    "stock_quantity", "model", "alpha", "generated_at"
+)
+
+
+class CRUDDemandForecast:
+    """商品毎の需要予測・発注提案の操作"""
+
+    async def _demand_rows(self, db: AsyncSession, *, start: date, end: date) -> List[Tuple[Any, ...]]:
+        """期間 [start, end) の商品 × 日 の需要（却下を除くリクエストの数量の合計）"""
+        since, until = datetime.combine(start, time()), datetime.combine(end, time())
+        rows = union_all(*(
+            select(
+                model.product_id,
+                func.date(model.created_at).label("day"),
+                model.quantity
+            )
+            .where(model.created_at >= since, model.created_at < until)
+            .where(model.status != TrialStatus.REJECTED)
+            for model in (TrialRequest, TrialRequestArchive)
+        )).subquery()
+        result = await db.execute(
+            select(rows.c.product_id, rows.c.day, func.sum(rows.c.quantity))
+            .group_by(rows.c.product_id, rows.c.day)
+        )
+        return list(result.tuples().all())
+
+    async def refresh(
+        self,
+        db: AsyncSession,
+        *,
+        today: Optional[date] = None,
+        history_days: int = 112,
+        horizon_days: int = 90,
+        lead_time_days: int = 7,
+        service_level_z: float = 1.65,
+        batch_size: int = 5000
+    ) -> int:
+        """
+        全サロンの商品の需要を予測して上書きし、予測した商品数を返す
+
+        スコープの無いセッションで実行する。需要はSQLで 商品 × 日 に集計してから読み、
+        予測（NumPy/pandas）はイベントループを塞がないようスレッドで計算する
+        """
+        import pandas as pd
+        from ..core.forecasting import forecast_demand
+
+        today = today or datetime.utcnow().date()
+        result = await db.execute(select(Product.id, Product.salon_id, Product.stock_quantity))
+        products = pd.DataFrame(result.tuples().all(), columns=["product_id", "salon_id", "stock_quantity"])
+        if products.empty:
+            return 0
+        demand = pd.DataFrame(
+            await self._demand_rows(db, start=today - timedelta(days=history_days), end=today),
+            columns=["product_id", "day", "quantity"]
+        )
+
+        forecasts = await asyncio.to_thread(
+            forecast_demand, demand, products,
+            today=today,
+            history_days=history_days,
+            horizon_days=horizon_days,
+            lead_time_days=lead_time_days,
+            service_level_z=service_level_z
+        )
+
+        generated_at = datetime.utcnow()
+        stockout_dates = forecasts["projected_stockout_date"]
+        values = [
+            {
+                "salon_id": int(salon_id),
+                "product_id": int(product_id),
+                "daily_demand": float(daily_demand),
+                "demand_stddev": float(demand_stddev),
+                "suggested_min_stock_level": int(suggested),
+                "projected_stockout_date": None if pd.isna(stockout) else stockout.date(),
+                "stock_quantity": int(stock_quantity or 0),
+                "model": model,
+                "alpha": float(alpha),
+                "generated_at": generated_at,
+            }
+            for salon_id, product_id, stock_quantity, daily_demand, demand_stddev, suggested, stockout, model, alpha
+            in zip(
+                products["salon_id"], products["product_id"], products["stock_quantity"],
+                forecasts["daily_demand"], forecasts["demand_stddev"],
+                forecasts["suggested_min_stock_level"], stockout_dates,
+                forecasts["model"], forecasts["alpha"]
+            )
+        ]
+
+        table = ProductDemandForecast.__table__
+        stmt = dialect_insert(db, table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.product_id],
+            set_={
+                **{column: stmt.excluded[column] for column in FORECAST_COLUMNS},
+                "updated_at": func.now()
+            }
+        )
+        for offset in range(0, len(values), batch_size):
+            await db.execute(stmt, values[offset:offset + batch_size])
+        await db.commit()
+        return len(values)
+
+    async def get_suggestions(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 20,
+        needs_reorder: Optional[bool] = None,
+        within_days: Optional[int] = None,
+        today: Optional[date] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        発注提案を在庫切れ予測日の近い順に取得し、(提案, 総件数) を返す
+
+        要発注は現在の在庫数が推奨最低在庫数以下のもの
+        """
+        needs_reorder_expr = Product.stock_quantity <= ProductDemandForecast.suggested_min_stock_level
+        stmt = (
+            select(
+                ProductDemandForecast,
+                Product.name,
+                Product.stock_quantity.label("current_stock"),
+                Product.min_stock_level,
+                needs_reorder_expr.label("needs_reorder")
+            )
+            .join(Product, Product.id == ProductDemandForecast.product_id)
+        )
+        if needs_reorder is not None:
+            stmt = stmt.where(needs_reorder_expr if needs_reorder else ~needs_reorder_expr)
+        if within_days is not None:
+            today = today or datetime.utcnow().date()
+            stmt = stmt.where(ProductDemandForecast.projected_stockout_date < today + timedelta(days=within_days))
+
+        total = await db.scalar(select(func.count()).select_from(stmt.subquery()))
+        result = await db.execute(
+            stmt.order_by(
+                ProductDemandForecast.projected_stockout_date.asc().nulls_last(),
+                (ProductDemandForecast.suggested_min_stock_level - Product.stock_quantity).desc(),
+                ProductDemandForecast.product_id
+            )
+            .offset(skip)
+            .limit(limit)
+        )
+        suggestions = []
+        for forecast, name, current_stock, min_stock_level, reorder in result.tuples():
+            suggestions.append({
+                "product_id": forecast.product_id,
+                "name": name,
+                "stock_quantity": current_stock,
+                "min_stock_level": min_stock_level,
+                "suggested_min_stock_level": forecast.suggested_min_stock_level,
+                "needs_reorder": bool(reorder),
+                "daily_demand": forecast.daily_demand,
+                "demand_stddev": forecast.demand_stddev,
+                "projected_stockout_date": forecast.projected_stockout_date,
+                "model": forecast.model,
+                "generated_at": forecast.generated_at,
+            })
+        return suggestions, total or 0
+
+
+# CRUDインスタンス
+demand_forecast = CRUDDemandForecast()
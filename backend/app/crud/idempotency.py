@@ -0,0 +1,106 @@
+from typing import Any, Optional
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import dialect_insert
+from ..models.idempotency import IdempotencyKey
+
+
+class CRUDIdempotencyKey:
+    """Idempotency-Key の予約・結果保存操作"""
+    
+    async def reserve(
+        self,
+        db: AsyncSession,
+        *,
+        scope: str,
+        key: str,
+        request_hash: str,
+        now: datetime,
+        lock_timeout: timedelta,
+        ttl: timedelta
+    ) -> Optional[int]:
+        """
+        キーを予約し、予約できた場合はIDを返す（既に実行中・完了済みなら None）
+        
+        INSERT ... ON CONFLICT DO UPDATE ... WHERE の1文で、キーが無い・ロック期限切れ・
+        保存期間切れの場合だけ予約する。同じキーで同時に呼ばれても1件のみ成功する
+        """
+        table = IdempotencyKey.__table__
+        stmt = dialect_insert(db, table).values(
+            scope=scope,
+            key=key,
+            request_hash=request_hash,
+            locked_until=now + lock_timeout,
+            expires_at=now + ttl
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.scope, table.c.key],
+            set_={
+                "request_hash": stmt.excluded.request_hash,
+                "locked_until": stmt.excluded.locked_until,
+                "expires_at": stmt.excluded.expires_at,
+                "response_status": None,
+                "response_body": None,
+                "completed_at": None
+            },
+            where=or_(
+                and_(table.c.completed_at.is_(None), table.c.locked_until < now),
+                table.c.expires_at < now
+            )
+        ).returning(table.c.id)
+        result = await db.execute(stmt)
+        reserved_id = result.scalar_one_or_none()
+        await db.commit()
+        return reserved_id
+    
+    async def get(self, db: AsyncSession, *, scope: str, key: str) -> Optional[IdempotencyKey]:
+        """キーの現在の状態を取得"""
+        result = await db.execute(
+            select(IdempotencyKey)
+            .where(IdempotencyKey.scope == scope)
+            .where(IdempotencyKey.key == key)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one_or_none()
+    
+    async def complete(
+        self,
+        db: AsyncSession,
+        *,
+        id: int,
+        response_status: int,
+        response_body: Any,
+        now: datetime
+    ) -> None:
+        """レスポンスを保存（コミットはハンドラの書き込みと同じトランザクションで行う）"""
+        await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == id)
+            .values(response_status=response_status, response_body=response_body, completed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    
+    async def release(self, db: AsyncSession, *, id: int) -> None:
+        """予約を解除（ハンドラが失敗した場合。再送時は改めて実行される）"""
+        await db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.id == id)
+            .where(IdempotencyKey.completed_at.is_(None))
+        )
+        await db.commit()
+    
+    async def purge_expired(self, db: AsyncSession, *, now: datetime) -> int:
+        """保存期間を過ぎたキーを削除し、削除件数を返す"""
+        result = await db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.expires_at < now)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        return result.rowcount
+
+
+# CRUDインスタンス
+idempotency_key = CRUDIdempotencyKey()
@@ -0,0 +1,154 @@
+from typing import Any, Dict, List, Mapping, Optional
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, delete, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import CRUDBase
+from ..core.database import OUTBOX_PENDING_KEY
+from ..core.tenancy import session_salon_id
+from ..models.outbox import OutboxEvent, EventType, AggregateType
+from ..schemas.event import OutboxEventCreate
+
+# 配信順の連番の採番を直列化するアドバイザリロックのキー（PostgreSQL）
+DISPATCH_SEQUENCE_LOCK_KEY = 0x6F7574626F78  # "outbox"
+
+
+class CRUDOutbox(CRUDBase[OutboxEvent, OutboxEventCreate, OutboxEventCreate]):
+    """アウトボックス（変更イベント）CRUD操作"""
+    
+    def append(
+        self,
+        db: AsyncSession,
+        *,
+        event_type: EventType,
+        aggregate_type: AggregateType,
+        aggregate_id: Optional[int],
+        payload: Optional[Dict[str, Any]] = None,
+        salon_id: Optional[int] = None
+    ) -> OutboxEvent:
+        """
+        イベントをセッションに追加（コミットは呼び出し元の書き込みと同時）
+        
+        呼び出し元のトランザクションがロールバックされればイベントも破棄される。
+        salon_id は発生元の集約のサロン（省略時はセッションのサロン）
+        """
+        event = OutboxEvent(
+            salon_id=salon_id or session_salon_id(db),
+            event_type=event_type.value,
+            aggregate_type=aggregate_type.value,
+            aggregate_id=aggregate_id,
+            payload=payload
+        )
+        db.add(event)
+        db.info[OUTBOX_PENDING_KEY] = True
+        return event
+    
+    async def append_many(
+        self,
+        db: AsyncSession,
+        *,
+        event_type: EventType,
+        aggregate_type: AggregateType,
+        payloads: Dict[int, Dict[str, Any]],
+        salon_ids: Optional[Mapping[int, int]] = None
+    ) -> None:
+        """
+        集約ID毎のイベントを1回のexecutemanyで追加
+        
+        salon_ids は集約ID毎のサロン（含まれない集約はセッションのサロン）
+        """
+        if not payloads:
+            return
+        salon_ids = salon_ids or {}
+        default_salon_id = session_salon_id(db)
+        await db.execute(
+            insert(OutboxEvent),
+            [
+                {
+                    "salon_id": salon_ids.get(aggregate_id, default_salon_id),
+                    "event_type": event_type.value,
+                    "aggregate_type": aggregate_type.value,
+                    "aggregate_id": aggregate_id,
+                    "payload": payload
+                }
+                for aggregate_id, payload in payloads.items()
+            ]
+        )
+        db.info[OUTBOX_PENDING_KEY] = True
+    
+    async def get_after(
+        self,
+        db: AsyncSession,
+        *,
+        after: int = 0,
+        limit: int = 100,
+        aggregate_type: Optional[AggregateType] = None
+    ) -> List[OutboxEvent]:
+        """
+        カーソル（配信順の連番）より後の配信済みイベントを連番順に取得
+        
+        テナントのスコープのあるセッションではそのサロンのイベントのみを返す。
+        id はコミット順ではない（先に採番したトランザクションが後にコミットされうる）ため、
+        id をカーソルにすると後からコミットされたイベントを読み飛ばす。配信済みのイベントのみを
+        ディスパッチャが採番した連番順に返すことで、カーソルより前に後から行が現れないようにする
+        """
+        query = select(OutboxEvent).where(OutboxEvent.dispatched_seq > after)
+        if aggregate_type:
+            query = query.where(OutboxEvent.aggregate_type == aggregate_type.value)
+        result = await db.execute(query.order_by(OutboxEvent.dispatched_seq).limit(limit))
+        return list(result.scalars().all())
+    
+    async def get_latest_seq(self, db: AsyncSession) -> int:
+        """最新の配信順の連番（配信済みのイベントが無ければ0、スコープのあるセッションではそのサロン内）"""
+        result = await db.execute(select(func.max(OutboxEvent.dispatched_seq)))
+        return result.scalar() or 0
+    
+    async def claim_undispatched(self, db: AsyncSession, *, limit: int = 100) -> List[OutboxEvent]:
+        """
+        未配信のイベントをID順に取得
+        
+        PostgreSQLでは FOR UPDATE SKIP LOCKED で行ロックを取り、
+        複数ワーカーのディスパッチャが同じイベントを同時に処理しないようにする
+        """
+        result = await db.execute(
+            select(OutboxEvent)
+            .where(OutboxEvent.dispatched_at.is_(None))
+            .order_by(OutboxEvent.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(result.scalars().all())
+    
+    async def mark_dispatched(self, db: AsyncSession, *, events: List[OutboxEvent]) -> None:
+        """
+        イベントに配信順の連番を採番して配信済みにする（コミットは呼び出し元）
+        
+        PostgreSQLではトランザクション終了まで保持するアドバイザリロックで採番を直列化する。
+        先に採番したディスパッチャが先にコミットするため、連番の順にイベントが見えるようになる
+        """
+        if not events:
+            return
+        if db.get_bind().dialect.name == "postgresql":
+            await db.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"), {"key": DISPATCH_SEQUENCE_LOCK_KEY}
+            )
+        latest = await self.get_latest_seq(db)
+        dispatched_at = datetime.utcnow()
+        for seq, outbox_event in enumerate(events, start=latest + 1):
+            outbox_event.dispatched_seq = seq
+            outbox_event.dispatched_at = dispatched_at
+        await db.flush()
+    
+    async def purge_dispatched(self, db: AsyncSession, *, older_than: timedelta) -> int:
+        """保持期間を過ぎた配信済みイベントを削除し、削除件数を返す"""
+        result = await db.execute(
+            delete(OutboxEvent)
+            .where(OutboxEvent.dispatched_at.is_not(None))
+            .where(OutboxEvent.dispatched_at < datetime.utcnow() - older_than)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+
+# CRUDインスタンス
+outbox = CRUDOutbox(OutboxEvent)
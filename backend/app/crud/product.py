@@ -1,10 +1,37 @@
-from typing import List, Optional
-from sqlalchemy import select, or_, and_
+import secrets
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Set, Tuple
+from slugify import slugify
+from sqlalchemy import Select, bindparam, case, delete, select, update, func, or_, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .base import CRUDBase
+from .base import CRUDBase, dialect_insert
+from .outbox import outbox
+from ..core.database import commit_or_flush
+from ..core.response_cache import ALL_TAG, mark_stale, product_write_tags
+from ..core.tenancy import session_salon_id
+from ..models.outbox import EventType, AggregateType
 from ..models.product import Product, ProductCategory, ProductStatus
-from ..schemas.product import ProductCreate, ProductUpdate, ProductFilter
+from ..models.trial_stats import ProductTrialStats
+from ..schemas.product import ProductCreate, ProductUpdate, ProductFilter, ProductImportRow, ProductSort
+
+# 並び順毎のトライアル集計の列
+TRIAL_STATS_SORT_COLUMNS = {
+    ProductSort.BEST_RATED: ProductTrialStats.avg_rating,
+    ProductSort.HIGHEST_CONVERSION: ProductTrialStats.conversion_rate,
+    ProductSort.HIGHEST_COMPLETION: ProductTrialStats.completion_rate,
+    ProductSort.MOST_TRIALED: ProductTrialStats.trial_count,
+}
+
+
+def _slug_base(row: ProductImportRow) -> str:
+    """ブランド・商品名・型番からスラッグの元を生成"""
+    parts = [part for part in (row.brand, row.name, row.model_number) if part]
+    return slugify(" ".join(parts), max_length=180) or "product"
+
+
+def _input_fields(row: ProductImportRow) -> FrozenSet[str]:
+    """更新対象とする列（入力で明示された列のみ）"""
+    return frozenset(row.model_fields_set - {"slug"})
 
 
 class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
@@ -73,15 +100,8 @@ class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
         )
         return list(result.scalars().all())
     
-    async def get_filtered_products(
-        self,
-        db: AsyncSession,
-        *,
-        filters: ProductFilter,
-        skip: int = 0,
-        limit: int = 100
-    ) -> List[Product]:
-        """フィルタリングされた商品一覧を取得"""
+    def build_filtered_query(self, filters: ProductFilter) -> Select:
+        """フィルタ条件を適用した商品クエリを構築"""
         query = select(Product)
         conditions = []
         
@@ -115,6 +135,25 @@ class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
         if conditions:
             query = query.where(and_(*conditions))
         
+        return query
+    
+    async def get_filtered_products(
+        self,
+        db: AsyncSession,
+        *,
+        filters: ProductFilter,
+        sort: Optional[ProductSort] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Product]:
+        """フィルタリングされた商品一覧を取得（sort 指定時はトライアル集計の値が大きい順）"""
+        query = self.build_filtered_query(filters)
+        if sort is not None:
+            column = TRIAL_STATS_SORT_COLUMNS[sort]
+            query = (
+                query.outerjoin(ProductTrialStats, ProductTrialStats.product_id == Product.id)
+                .order_by(column.desc().nulls_last(), Product.id)
+            )
         result = await db.execute(query.offset(skip).limit(limit))
         return list(result.scalars().all())
     
@@ -156,20 +195,54 @@ class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
         product_id: int,
         quantity_change: int
     ) -> Optional[Product]:
-        """在庫数を更新"""
-        product = await self.get(db, id=product_id)
-        if not product:
-            return None
-        
-        new_quantity = product.stock_quantity + quantity_change
-        if new_quantity < 0:
-            new_quantity = 0
+        """在庫数を増減（0未満にはしない）"""
+        new_quantity = Product.stock_quantity + quantity_change
+        return await self.update_where(
+            db,
+            id=product_id,
+            values={"stock_quantity": case((new_quantity < 0, 0), else_=new_quantity)}
+        )
+    
+    async def consume_stock(self, db: AsyncSession, *, quantities: Mapping[int, int]) -> None:
+        """
+        トライアルで渡した数を商品毎に在庫数から減らす（0未満にはしない、コミットは呼び出し元）
         
-        product.stock_quantity = new_quantity
-        db.add(product)
-        await db.commit()
-        await db.refresh(product)
-        return product
+        在庫変更イベントの追加・キャッシュの破棄は在庫数の更新と同じ。
+        ロックの順序を揃えるため商品ID順に更新する
+        """
+        for product_id, quantity in sorted(quantities.items()):
+            new_quantity = Product.stock_quantity - quantity
+            values = {"stock_quantity": case((new_quantity < 0, 0), else_=new_quantity)}
+            result = await db.execute(
+                update(Product)
+                .where(Product.id == product_id)
+                .values(**values)
+                .returning(Product)
+                .execution_options(populate_existing=True)
+            )
+            db_obj = result.scalar_one_or_none()
+            if db_obj is not None:
+                await self._after_update(db, db_obj, values)
+    
+    async def add_image(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: Product,
+        image_url: str,
+        thumbnail_url: str,
+        primary: bool = False
+    ) -> Product:
+        """画像URLを追加し、サムネイルが未設定（primary なら常に）ならサムネイルに設定"""
+        values: Dict[str, Any] = {}
+        image_urls = list(db_obj.image_urls or [])
+        if image_url not in image_urls:
+            values["image_urls"] = [*image_urls, image_url]
+        if primary or not db_obj.thumbnail_url:
+            values["thumbnail_url"] = thumbnail_url
+        if not values:
+            return db_obj
+        return await self.update_where(db, id=db_obj.id, values=values) or db_obj
     
     async def set_featured(
         self,
@@ -179,15 +252,7 @@ class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
         featured: bool
     ) -> Optional[Product]:
         """おすすめ設定を更新"""
-        product = await self.get(db, id=product_id)
-        if not product:
-            return None
-        
-        product.is_featured = featured
-        db.add(product)
-        await db.commit()
-        await db.refresh(product)
-        return product
+        return await self.update_where(db, id=product_id, values={"is_featured": featured})
     
     async def change_status(
         self,
@@ -197,15 +262,212 @@ class CRUDProduct(CRUDBase[Product, ProductCreate, ProductUpdate]):
         status: ProductStatus
     ) -> Optional[Product]:
         """商品ステータスを変更"""
-        product = await self.get(db, id=product_id)
-        if not product:
-            return None
-        
-        product.status = status
-        db.add(product)
-        await db.commit()
-        await db.refresh(product)
-        return product
+        return await self.update_where(db, id=product_id, values={"status": status})
+    
+    async def create(self, db: AsyncSession, *, obj_in: ProductCreate) -> Product:
+        """新しい商品を作成"""
+        mark_stale(db, product_write_tags(None, obj_in.category))
+        return await super().create(db, obj_in=obj_in)
+    
+    async def remove(self, db: AsyncSession, *, id: int) -> Optional[int]:
+        """商品を削除し、削除したIDを返す"""
+        result = await db.execute(
+            delete(Product).where(Product.id == id).returning(Product.id, Product.category)
+        )
+        row = result.one_or_none()
+        if row is not None:
+            mark_stale(db, product_write_tags(row.id, row.category))
+        await commit_or_flush(db)
+        return row.id if row is not None else None
+    
+    async def _after_update(
+        self,
+        db: AsyncSession,
+        db_obj: Product,
+        values: Dict[str, Any]
+    ) -> None:
+        """キャッシュ済みレスポンスの破棄を予約し、在庫数が更新された場合は在庫変更イベントを追加"""
+        mark_stale(db, product_write_tags(db_obj.id, db_obj.category))
+        if "stock_quantity" not in values:
+            return
+        outbox.append(
+            db,
+            event_type=EventType.PRODUCT_STOCK_CHANGED,
+            aggregate_type=AggregateType.PRODUCT,
+            aggregate_id=db_obj.id,
+            payload={
+                "stock_quantity": db_obj.stock_quantity,
+                "min_stock_level": db_obj.min_stock_level,
+                "is_low_stock": db_obj.is_low_stock
+            },
+            salon_id=db_obj.salon_id
+        )
+    
+    async def _unique_slugs(
+        self,
+        db: AsyncSession,
+        *,
+        bases: List[str],
+        reserved: Set[str]
+    ) -> List[str]:
+        """バッチ内・既存データのどちらとも重複しないスラッグを生成"""
+        seen = set(reserved)
+        slugs = []
+        for base in bases:
+            candidate, suffix = base, 2
+            while candidate in seen:
+                candidate = f"{base}-{suffix}"
+                suffix += 1
+            seen.add(candidate)
+            slugs.append(candidate)
+        
+        while slugs:
+            result = await db.execute(select(Product.slug).where(Product.slug.in_(slugs)))
+            taken = set(result.scalars().all())
+            if not taken:
+                break
+            for index, candidate in enumerate(slugs):
+                if candidate in taken:
+                    new_slug = f"{candidate}-{secrets.token_hex(3)}"
+                    while new_slug in seen:
+                        new_slug = f"{candidate}-{secrets.token_hex(3)}"
+                    seen.add(new_slug)
+                    slugs[index] = new_slug
+        return slugs
+    
+    async def bulk_upsert(
+        self,
+        db: AsyncSession,
+        *,
+        rows: List[ProductImportRow]
+    ) -> Tuple[int, int, List[int]]:
+        """
+        商品を一括アップサート
+        
+        - slug指定行・型番が既存商品と一致する行: INSERT ... ON CONFLICT (salon_id, slug) DO UPDATE
+          （一致した既存商品にスラッグが無い場合は主キー指定のUPDATE）
+        - それ以外: 一意なスラッグを生成して新規作成
+        
+        いずれも1つの文をexecutemanyでまとめて実行するため、コンパイル済みの文が
+        再利用され、行数が増えても文の構築コストは増えない。
+        更新時は入力された列のみを上書きする。同じキーの行が複数ある場合は後の行を採用する。
+        テーブルを直接指定した文はテナントの条件が自動で付かないため、salon_id を明示する。
+        
+        Returns:
+            (作成件数, 更新件数, 重複のためスキップした行のインデックス)
+        """
+        # 型番で既存商品を照合
+        model_numbers = {row.model_number for row in rows if not row.slug and row.model_number}
+        existing: Dict[str, Tuple[int, Optional[str]]] = {}
+        if model_numbers:
+            result = await db.execute(
+                select(Product.model_number, Product.id, Product.slug)
+                .where(Product.model_number.in_(model_numbers))
+                .order_by(Product.id.desc())
+            )
+            existing = {
+                model_number: (product_id, slug)
+                for model_number, product_id, slug in result.all()
+            }
+        
+        # 各行の更新先を決定（同じ更新先の行は後の行を採用）
+        by_slug: Dict[str, int] = {}
+        by_id: Dict[int, int] = {}
+        new_by_model_number: Dict[str, int] = {}
+        others: List[int] = []
+        skipped: List[int] = []
+        
+        for index, row in enumerate(rows):
+            if row.slug:
+                targets, key = by_slug, slugify(row.slug, max_length=200)
+            elif row.model_number in existing:
+                product_id, slug = existing[row.model_number]
+                targets, key = (by_slug, slug) if slug else (by_id, product_id)
+            elif row.model_number:
+                targets, key = new_by_model_number, row.model_number
+            else:
+                others.append(index)
+                continue
+            if key in targets:
+                skipped.append(targets[key])
+            targets[key] = index
+        others.extend(new_by_model_number.values())
+        
+        table = Product.__table__
+        salon_id = session_salon_id(db)
+        created = updated = 0
+        
+        # スラッグ未設定の既存商品は主キー指定で一括UPDATE
+        matched: Dict[FrozenSet[str], List[dict]] = {}
+        for product_id, index in by_id.items():
+            row = rows[index]
+            fields = _input_fields(row)
+            matched.setdefault(fields, []).append(
+                {"_id": product_id, **row.model_dump(include=set(fields))}
+            )
+        
+        for fields, params in matched.items():
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam("_id"), table.c.salon_id == salon_id)
+                .values({name: bindparam(name) for name in fields})
+            )
+            await db.execute(stmt, params)
+            updated += len(params)
+        
+        # スラッグ指定行のアップサート
+        if by_slug:
+            result = await db.execute(select(Product.slug).where(Product.slug.in_(list(by_slug))))
+            existing_slugs = set(result.scalars().all())
+            updated += len(existing_slugs)
+            created += len(by_slug) - len(existing_slugs)
+            
+            groups: Dict[FrozenSet[str], List[dict]] = {}
+            for key, index in by_slug.items():
+                row = rows[index]
+                groups.setdefault(_input_fields(row), []).append(
+                    row.model_dump() | {"slug": key, "salon_id": salon_id}
+                )
+            
+            for fields, values in groups.items():
+                stmt = dialect_insert(db, table)
+                set_ = {name: stmt.excluded[name] for name in fields}
+                set_["updated_at"] = func.now()
+                await db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[table.c.salon_id, table.c.slug], set_=set_
+                    ),
+                    values
+                )
+        
+        # 新規作成（スラッグ自動生成）
+        if others:
+            slugs = await self._unique_slugs(
+                db,
+                bases=[_slug_base(rows[index]) for index in others],
+                reserved=set(by_slug)
+            )
+            values = [
+                rows[index].model_dump() | {"slug": slug, "salon_id": salon_id}
+                for index, slug in zip(others, slugs)
+            ]
+            await db.execute(dialect_insert(db, table), values)
+            created += len(others)
+        
+        # 一括取込は行毎ではなく1件のイベントで通知
+        if created or updated:
+            mark_stale(db, {ALL_TAG})
+            outbox.append(
+                db,
+                event_type=EventType.PRODUCT_BULK_IMPORTED,
+                aggregate_type=AggregateType.PRODUCT,
+                aggregate_id=None,
+                payload={"created": created, "updated": updated},
+                salon_id=salon_id
+            )
+        
+        await commit_or_flush(db)
+        return created, updated, sorted(skipped)
 
 
 # CRUDインスタンス
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import dialect_insert
+from ..models.scheduler import SchedulerLease
+
+
+class CRUDSchedulerLease:
+    """スケジューラのリーダーリース操作"""
+    
+    async def acquire(
+        self,
+        db: AsyncSession,
+        *,
+        name: str,
+        holder: str,
+        ttl: timedelta,
+        now: datetime
+    ) -> bool:
+        """
+        リースを取得・延長し、リーダーになれたかを返す
+        
+        INSERT ... ON CONFLICT DO UPDATE ... WHERE の1文で、リースが無い・自分が保持している・
+        期限切れのいずれかの場合だけ保持者を書き換えるため、同時に実行しても1ワーカーのみ成功する
+        """
+        table = SchedulerLease.__table__
+        stmt = dialect_insert(db, table).values(name=name, holder=holder, expires_at=now + ttl)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={
+                "holder": stmt.excluded.holder,
+                "expires_at": stmt.excluded.expires_at,
+                "updated_at": func.now()
+            },
+            where=or_(table.c.holder == holder, table.c.expires_at < now)
+        ).returning(table.c.holder)
+        result = await db.execute(stmt)
+        acquired = result.scalar_one_or_none() == holder
+        await db.commit()
+        return acquired
+    
+    async def release(self, db: AsyncSession, *, name: str, holder: str) -> None:
+        """保持しているリースを解放（他のワーカーがすぐに引き継げるようにする）"""
+        await db.execute(
+            delete(SchedulerLease)
+            .where(SchedulerLease.name == name)
+            .where(SchedulerLease.holder == holder)
+        )
+        await db.commit()
+
+
+# CRUDインスタンス
+scheduler_lease = CRUDSchedulerLease()
@@ -0,0 +1,233 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import dialect_insert
+from .product import product as crud_product
+from ..models.product import Product
+from ..models.stock import ProductStockCounter, StockMovement, StockMovementKind
+from ..models.trial_request import TrialStatus
+
+# 引当を持つステータス（承認から終了まで）
+RESERVING_STATUSES = frozenset({TrialStatus.APPROVED, TrialStatus.IN_PROGRESS})
+
+# 1商品あたりのカウンタの行数
+COUNTER_SHARDS = 8
+
+# カウンタのキー（salon_id, product_id, シャード）
+CounterKey = Tuple[int, int, int]
+
+
+def shard_for(trial_request_id: int) -> int:
+    """引当・解除を加算するシャード（同じリクエストの引当と解除は同じ行）"""
+    return trial_request_id % COUNTER_SHARDS
+
+
+def snapshot(obj: Any) -> Dict[str, Any]:
+    """引当に使う列をモデルから取り出す"""
+    return {
+        field: getattr(obj, field)
+        for field in ("id", "salon_id", "product_id", "quantity", "status")
+    }
+
+
+def _movement(row: Mapping[str, Any], kind: StockMovementKind) -> Dict[str, Any]:
+    """リクエスト1件の引当・解除・消費の移動"""
+    quantity = row["quantity"]
+    return {
+        "salon_id": row["salon_id"],
+        "product_id": row["product_id"],
+        "trial_request_id": row["id"],
+        "kind": kind,
+        "quantity": quantity if kind == StockMovementKind.RESERVE else -quantity,
+    }
+
+
+def _transition_kind(status: TrialStatus, holds: bool) -> StockMovementKind:
+    """引当の有無が変わる遷移の移動の種別（完了は渡した分の消費、それ以外の終了は解除）"""
+    if holds:
+        return StockMovementKind.RESERVE
+    if status == TrialStatus.COMPLETED:
+        return StockMovementKind.CONSUME
+    return StockMovementKind.RELEASE
+
+
+class CRUDStockLedger:
+    """在庫移動台帳・引当数カウンタの操作"""
+
+    async def _add_to_counters(self, db: AsyncSession, deltas: Mapping[CounterKey, int]) -> None:
+        """
+        シャード毎の引当数に加算（呼び出し元のトランザクション内）
+
+        INSERT ... ON CONFLICT DO UPDATE の加算で、商品の行は読まずロックもしない。
+        ロックの順序を揃えるためキー順に実行する
+        """
+        values = [
+            {"salon_id": salon_id, "product_id": product_id, "shard": shard, "reserved": delta}
+            for (salon_id, product_id, shard), delta in sorted(deltas.items()) if delta
+        ]
+        if not values:
+            return
+        table = ProductStockCounter.__table__
+        stmt = dialect_insert(db, table)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.product_id, table.c.shard],
+                set_={"reserved": table.c.reserved + stmt.excluded.reserved, "updated_at": func.now()}
+            ),
+            values
+        )
+
+    async def record(self, db: AsyncSession, movements: Sequence[Mapping[str, Any]]) -> None:
+        """
+        移動を台帳に追加し、引当数カウンタに加算（コミットは呼び出し元）
+
+        消費の移動は引当を減らすとともに、渡した数を商品の在庫数から減らす
+        （引当可能数は変わらず、完了したトライアルの分が再び引当可能にならない）
+        """
+        if not movements:
+            return
+        await db.execute(insert(StockMovement.__table__), list(movements))
+        deltas: Dict[CounterKey, int] = {}
+        consumed: Dict[int, int] = {}
+        for movement in movements:
+            key = (movement["salon_id"], movement["product_id"], shard_for(movement["trial_request_id"]))
+            deltas[key] = deltas.get(key, 0) + movement["quantity"]
+            if movement["kind"] == StockMovementKind.CONSUME:
+                consumed[movement["product_id"]] = consumed.get(movement["product_id"], 0) - movement["quantity"]
+        await self._add_to_counters(db, deltas)
+        if consumed:
+            await crud_product.consume_stock(db, quantities=consumed)
+
+    async def apply_change(
+        self,
+        db: AsyncSession,
+        *,
+        before: Optional[Mapping[str, Any]],
+        after: Mapping[str, Any]
+    ) -> None:
+        """1件の作成（before なし）・更新で引当の有無が変わった場合に引当・解除・消費"""
+        held = before is not None and before["status"] in RESERVING_STATUSES
+        holds = after["status"] in RESERVING_STATUSES
+        if held != holds:
+            await self.record(db, [_movement(after, _transition_kind(after["status"], holds))])
+
+    async def apply_transitions(
+        self,
+        db: AsyncSession,
+        rows: Sequence[Mapping[str, Any]],
+        from_statuses: Iterable[TrialStatus],
+        to_status: TrialStatus
+    ) -> None:
+        """一括遷移した行を引当・解除・消費（遷移元は全て引当ありか、全て引当なしであること）"""
+        held = {status in RESERVING_STATUSES for status in from_statuses}
+        if len(held) != 1:
+            raise ValueError("引当のあるステータスと無いステータスからの一括遷移はできません")
+        holds = to_status in RESERVING_STATUSES
+        if held.pop() != holds:
+            kind = _transition_kind(to_status, holds)
+            await self.record(db, [_movement(row, kind) for row in rows])
+
+    async def get_availability(self, db: AsyncSession, *, product: Product) -> Dict[str, Any]:
+        """商品の在庫数・引当数・引当可能数"""
+        reserved = await db.scalar(
+            select(func.coalesce(func.sum(ProductStockCounter.reserved), 0))
+            .where(ProductStockCounter.product_id == product.id)
+        )
+        stock_quantity = product.stock_quantity or 0
+        return {
+            "product_id": product.id,
+            "stock_quantity": stock_quantity,
+            "reserved_quantity": int(reserved),
+            "available_quantity": stock_quantity - int(reserved),
+        }
+
+    async def get_movements(
+        self,
+        db: AsyncSession,
+        *,
+        product_id: int,
+        skip: int = 0,
+        limit: int = 20
+    ) -> Tuple[List[StockMovement], int]:
+        """商品の在庫移動を新しい順に取得し、(移動, 総件数) を返す"""
+        total = await db.scalar(
+            select(func.count()).select_from(StockMovement).where(StockMovement.product_id == product_id)
+        )
+        result = await db.execute(
+            select(StockMovement)
+            .where(StockMovement.product_id == product_id)
+            .order_by(StockMovement.created_at.desc(), StockMovement.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().all()), total or 0
+
+    async def compact(
+        self,
+        db: AsyncSession,
+        *,
+        older_than: timedelta,
+        now: Optional[datetime] = None
+    ) -> int:
+        """
+        古い移動を商品毎に1行にまとめ、カウンタを台帳に合わせ、まとめた移動の行数を返す
+
+        スコープの無いセッションで実行する。削除した行（RETURNING）の合計を圧縮行として
+        追加するため、実行中に追加された移動は失われない。カウンタとの差は台帳とカウンタを
+        1文で集計して求め、シャード0に加算する（引当数が0のシャードは削除する）
+        """
+        cutoff = (now or datetime.utcnow()) - older_than
+        movements = StockMovement.__table__
+        # 圧縮行だけの商品は対象にしない（毎回作り直さない）
+        products = (
+            select(movements.c.product_id)
+            .where(movements.c.created_at < cutoff)
+            .where(movements.c.kind != StockMovementKind.COMPACTED)
+        )
+        result = await db.execute(
+            delete(movements)
+            .where(movements.c.created_at < cutoff)
+            .where(movements.c.product_id.in_(products))
+            .returning(movements.c.salon_id, movements.c.product_id, movements.c.quantity)
+        )
+        folded: Dict[Tuple[int, int], int] = {}
+        count = 0
+        for salon_id, product_id, quantity in result.tuples():
+            folded[(salon_id, product_id)] = folded.get((salon_id, product_id), 0) + quantity
+            count += 1
+        compacted = [
+            {
+                "salon_id": salon_id,
+                "product_id": product_id,
+                "trial_request_id": None,
+                "kind": StockMovementKind.COMPACTED,
+                "quantity": quantity,
+                "created_at": cutoff,
+            }
+            for (salon_id, product_id), quantity in sorted(folded.items()) if quantity
+        ]
+        if compacted:
+            await db.execute(insert(movements), compacted)
+
+        counters = ProductStockCounter.__table__
+        rows = union_all(
+            select(movements.c.salon_id, movements.c.product_id, movements.c.quantity.label("delta")),
+            select(counters.c.salon_id, counters.c.product_id, (-counters.c.reserved).label("delta")),
+        ).subquery()
+        result = await db.execute(
+            select(rows.c.salon_id, rows.c.product_id, func.sum(rows.c.delta))
+            .group_by(rows.c.salon_id, rows.c.product_id)
+            .having(func.sum(rows.c.delta) != literal(0))
+        )
+        await self._add_to_counters(db, {
+            (salon_id, product_id, 0): int(delta) for salon_id, product_id, delta in result.tuples()
+        })
+        await db.execute(delete(counters).where(counters.c.reserved == 0))
+        await db.commit()
+        return count
+
+
+# CRUDインスタンス
+stock_ledger = CRUDStockLedger()
@@ -1,11 +1,87 @@
-from typing import List, Optional
-from datetime import datetime
-from sqlalchemy import select, and_
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import (
+    DateTime, Select, String, cast, delete, func, insert, literal, select, text, union_all, update
+)
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from .base import CRUDBase
-from ..models.trial_request import TrialRequest, TrialStatus
-from ..schemas.trial_request import TrialRequestCreate, TrialRequestUpdate, TrialRequestFilter
+from .outbox import outbox
+from .stock import stock_ledger, snapshot as stock_snapshot
+from .trial_rollup import ROLLUP_FIELDS, trial_rollup, snapshot as rollup_snapshot
+from .trial_stats import STATS_FIELDS, product_trial_stats, snapshot
+from ..core.database import commit_or_flush
+from ..models.outbox import EventType, AggregateType
+from ..models.salon import Salon
+from ..models.trial_request import TrialRequest, TrialRequestArchive, TrialStatus, TERMINAL_STATUSES
+from ..schemas.trial_request import (
+    TrialRequestCreate, TrialRequestUpdate, TrialRequestFilter, BulkActionOutcome
+)
+
+# ステータス遷移毎のイベント種別
+STATUS_EVENT_TYPES = {
+    TrialStatus.APPROVED: EventType.TRIAL_REQUEST_APPROVED,
+    TrialStatus.REJECTED: EventType.TRIAL_REQUEST_REJECTED,
+    TrialStatus.IN_PROGRESS: EventType.TRIAL_REQUEST_STARTED,
+    TrialStatus.COMPLETED: EventType.TRIAL_REQUEST_COMPLETED,
+    TrialStatus.CANCELLED: EventType.TRIAL_REQUEST_CANCELLED,
+}
+
+# イベントに含める列
+EVENT_PAYLOAD_FIELDS = ("salon_id", "product_id", "customer_id", "approved_by", "processed_by")
+
+
+# 期限切れ時の遷移（遷移元 → 遷移先）
+EXPIRY_TRANSITIONS = (
+    (TrialStatus.IN_PROGRESS, TrialStatus.COMPLETED),
+    (TrialStatus.APPROVED, TrialStatus.CANCELLED),
+)
+
+
+# 更新前の集計対象の値を update_where から _after_update に渡す Session.info のキー
+PREVIOUS_STATS_KEY = "trial_stats_previous"
+
+# 商品毎の集計・時系列集計に影響する列
+AGGREGATE_FIELDS = STATS_FIELDS | ROLLUP_FIELDS
+
+# 一括遷移の RETURNING で取得する列（イベント内容・時系列集計・在庫の引当用）
+TRANSITION_RETURNING_FIELDS = (
+    *EVENT_PAYLOAD_FIELDS, "created_at", "approved_at", "actual_start_date", "completion_date",
+    "purchase_intent", "quantity"
+)
+
+# 履歴の取得で稼働中のテーブルとアーカイブから選択する列
+HISTORY_COLUMNS = tuple(column.key for column in TrialRequest.__table__.columns)
+
+
+def _event_payload(status: TrialStatus, row: Mapping[str, Any]) -> Dict[str, Any]:
+    """トライアルリクエストのイベント内容を作成"""
+    return {"status": status.value, **{field: row[field] for field in EVENT_PAYLOAD_FIELDS}}
+
+
+def _month_start(value: datetime) -> datetime:
+    """日時が属する月の初日（UTC）"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def due_date_expr(db: AsyncSession, start: Any) -> Any:
+    """
+    開始日時 + トライアル期間（日）を求めるSQL式
+    
+    行毎の期間で計算するため、一括更新でも1文で期限を設定できる
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return start + func.make_interval(0, 0, 0, TrialRequest.trial_duration_days)
+    # SQLiteはSQLAlchemyの保存形式（マイクロ秒6桁）に合わせて文字列化する
+    return func.strftime(
+        "%Y-%m-%d %H:%M:%f000",
+        start,
+        literal("+") + cast(TrialRequest.trial_duration_days, String) + literal(" days"),
+        type_=DateTime(timezone=True)
+    )
 
 
 class CRUDTrialRequest(CRUDBase[TrialRequest, TrialRequestCreate, TrialRequestUpdate]):
@@ -19,13 +95,11 @@ class CRUDTrialRequest(CRUDBase[TrialRequest, TrialRequestCreate, TrialRequestUp
         skip: int = 0,
         limit: int = 100
     ) -> List[TrialRequest]:
-        """顧客のトライアルリクエスト一覧を取得"""
+        """顧客のトライアルリクエスト一覧を取得（アーカイブ済みを含む）"""
         result = await db.execute(
-            select(TrialRequest)
-            .where(TrialRequest.customer_id == customer_id)
-            .order_by(TrialRequest.created_at.desc())
-            .offset(skip)
-            .limit(limit)
+            self.history_query(
+                lambda model: [model.customer_id == customer_id], skip=skip, limit=limit
+            )
         )
         return list(result.scalars().all())
     
@@ -37,13 +111,11 @@ class CRUDTrialRequest(CRUDBase[TrialRequest, TrialRequestCreate, TrialRequestUp
         skip: int = 0,
         limit: int = 100
     ) -> List[TrialRequest]:
-        """商品のトライアルリクエスト一覧を取得"""
+        """商品のトライアルリクエスト一覧を取得（アーカイブ済みを含む）"""
         result = await db.execute(
-            select(TrialRequest)
-            .where(TrialRequest.product_id == product_id)
-            .order_by(TrialRequest.created_at.desc())
-            .offset(skip)
-            .limit(limit)
+            self.history_query(
+                lambda model: [model.product_id == product_id], skip=skip, limit=limit
+            )
         )
         return list(result.scalars().all())
     
@@ -114,46 +186,150 @@ class CRUDTrialRequest(CRUDBase[TrialRequest, TrialRequestCreate, TrialRequestUp
         )
         return list(result.scalars().all())
     
-    async def get_filtered_requests(
+    def history_query(
         self,
-        db: AsyncSession,
+        where: Callable[[Any], List[Any]],
         *,
-        filters: TrialRequestFilter,
+        include_archive: bool = True,
+        order_by: str = "created_at",
+        descending: bool = True,
         skip: int = 0,
-        limit: int = 100
-    ) -> List[TrialRequest]:
-        """フィルタリングされたリクエスト一覧を取得"""
-        query = select(TrialRequest)
+        limit: Optional[int] = None
+    ) -> Select:
+        """
+        稼働中のテーブルとアーカイブを合わせたリクエストのクエリ（結果は TrialRequest）
+        
+        where はモデル（TrialRequest・TrialRequestArchive）を受け取り条件のリストを返す。
+        件数を指定した場合は各テーブルでも先頭の skip + limit 件に絞ってから結合するため、
+        どちらも (salon_id, ..., created_at) インデックスの上位の行のみを読む
+        """
+        def ordering(entity: Any) -> List[Any]:
+            keys = (getattr(entity, order_by), entity.id)
+            return [key.desc() if descending else key.asc() for key in keys]
+        
+        if include_archive:
+            branches = []
+            for model in (TrialRequest, TrialRequestArchive):
+                branch = select(*(getattr(model, key) for key in HISTORY_COLUMNS)).where(*where(model))
+                if limit is not None:
+                    branch = select(*branch.order_by(*ordering(model)).limit(skip + limit).subquery().c)
+                branches.append(branch)
+            entity = aliased(TrialRequest, union_all(*branches).subquery("trial_request_history"))
+        else:
+            entity = TrialRequest
+        
+        query = select(entity)
+        if not include_archive:
+            query = query.where(*where(TrialRequest))
+        query = query.order_by(*ordering(entity))
+        if skip:
+            query = query.offset(skip)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+    
+    def _filter_conditions(self, model: Any, filters: TrialRequestFilter) -> List[Any]:
         conditions = []
         
         if filters.status:
-            conditions.append(TrialRequest.status == filters.status)
+            conditions.append(model.status == filters.status)
         
         if filters.product_id:
-            conditions.append(TrialRequest.product_id == filters.product_id)
+            conditions.append(model.product_id == filters.product_id)
         
         if filters.customer_id:
-            conditions.append(TrialRequest.customer_id == filters.customer_id)
+            conditions.append(model.customer_id == filters.customer_id)
         
         if filters.date_from:
-            conditions.append(TrialRequest.created_at >= filters.date_from)
+            conditions.append(model.created_at >= filters.date_from)
         
         if filters.date_to:
-            conditions.append(TrialRequest.created_at <= filters.date_to)
+            conditions.append(model.created_at <= filters.date_to)
         
         if filters.has_feedback is not None:
             if filters.has_feedback:
-                conditions.append(TrialRequest.customer_rating.is_not(None))
+                conditions.append(model.customer_rating.is_not(None))
             else:
-                conditions.append(TrialRequest.customer_rating.is_(None))
+                conditions.append(model.customer_rating.is_(None))
         
-        if conditions:
-            query = query.where(and_(*conditions))
+        return conditions
+    
+    def build_filtered_query(
+        self,
+        filters: TrialRequestFilter,
+        *,
+        order_by: str = "created_at",
+        descending: bool = True,
+        skip: int = 0,
+        limit: Optional[int] = None
+    ) -> Select:
+        """
+        フィルタ条件を適用したリクエストクエリを構築
         
-        query = query.order_by(TrialRequest.created_at.desc())
-        result = await db.execute(query.offset(skip).limit(limit))
+        終了済みのステータスが対象になる場合のみアーカイブも参照する
+        """
+        return self.history_query(
+            lambda model: self._filter_conditions(model, filters),
+            include_archive=filters.status is None or filters.status in TERMINAL_STATUSES,
+            order_by=order_by,
+            descending=descending,
+            skip=skip,
+            limit=limit
+        )
+    
+    async def get_filtered_requests(
+        self,
+        db: AsyncSession,
+        *,
+        filters: TrialRequestFilter,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[TrialRequest]:
+        """フィルタリングされたリクエスト一覧を取得"""
+        result = await db.execute(self.build_filtered_query(filters, skip=skip, limit=limit))
         return list(result.scalars().all())
     
+    async def get_count(self, db: AsyncSession, *, include_archive: bool = False) -> int:
+        """総件数を取得（include_archive ならアーカイブ済みを含む）"""
+        count = await super().get_count(db)
+        if include_archive:
+            result = await db.execute(select(func.count(TrialRequestArchive.id)))
+            count += result.scalar()
+        return count
+    
+    async def count_by_status(
+        self,
+        db: AsyncSession,
+        *,
+        created_since: Optional[datetime] = None
+    ) -> Dict[TrialStatus, int]:
+        """
+        ステータス別の件数を稼働中のテーブルとアーカイブを合わせて取得
+        
+        テーブル毎に1回の GROUP BY で数える（アーカイブには終了済みのステータスのみがある）
+        """
+        counts = dict.fromkeys(TrialStatus, 0)
+        for model in (TrialRequest, TrialRequestArchive):
+            query = select(model.status, func.count(model.id)).group_by(model.status)
+            if created_since is not None:
+                query = query.where(model.created_at >= created_since)
+            for trial_status, count in (await db.execute(query)).all():
+                counts[TrialStatus(trial_status)] += count
+        return counts
+    
+    async def get_with_archive(
+        self,
+        db: AsyncSession,
+        *,
+        id: int
+    ) -> Optional[Union[TrialRequest, TrialRequestArchive]]:
+        """IDでリクエストを取得（稼働中のテーブルに無ければアーカイブから）"""
+        trial_request = await self.get(db, id=id)
+        if trial_request is not None:
+            return trial_request
+        result = await db.execute(select(TrialRequestArchive).where(TrialRequestArchive.id == id))
+        return result.scalar_one_or_none()
+    
     async def create_request(
         self,
         db: AsyncSession,
@@ -179,30 +355,119 @@ class CRUDTrialRequest(CRUDBase[TrialRequest, TrialRequestCreate, TrialRequestUp
         )
         
         db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+        # イベントの集約IDを得るためINSERTを先に実行（同じトランザクション内）
+        await db.flush()
+        self._append_event(db, db_obj, EventType.TRIAL_REQUEST_CREATED)
+        await product_trial_stats.apply_change(db, before=None, after=snapshot(db_obj))
+        await trial_rollup.apply_change(db, before=None, after=rollup_snapshot(db_obj))
+        await commit_or_flush(db)
         return db_obj
     
+    def _append_event(self, db: AsyncSession, db_obj: TrialRequest, event_type: EventType) -> None:
+        """リクエストの変更イベントを追加"""
+        outbox.append(
+            db,
+            event_type=event_type,
+            aggregate_type=AggregateType.TRIAL_REQUEST,
+            aggregate_id=db_obj.id,
+            payload=_event_payload(
+                db_obj.status,
+                {field: getattr(db_obj, field) for field in EVENT_PAYLOAD_FIELDS}
+            ),
+            salon_id=db_obj.salon_id
+        )
+    
+    async def update_where(
+        self,
+        db: AsyncSession,
+        *,
+        id: Any,
+        values: Dict[str, Any],
+        conditions: Iterable[Any] = ()
+    ) -> Optional[TrialRequest]:
+        """
+        条件付きで1件を更新
+        
+        集計に影響する列を更新する場合は、更新前の値を行ロック付きで読み、
+        商品毎の集計・時系列集計の差分と在庫の引当・解除を同じトランザクションで加算する
+        """
+        if AGGREGATE_FIELDS.isdisjoint(values):
+            return await super().update_where(db, id=id, values=values, conditions=conditions)
+        result = await db.execute(
+            select(
+                TrialRequest.salon_id,
+                TrialRequest.product_id,
+                TrialRequest.created_at,
+                *(getattr(TrialRequest, field) for field in AGGREGATE_FIELDS)
+            )
+            .where(TrialRequest.id == id, *conditions)
+            .with_for_update()
+        )
+        db.info[PREVIOUS_STATS_KEY] = result.mappings().one_or_none()
+        try:
+            return await super().update_where(db, id=id, values=values, conditions=conditions)
+        finally:
+            db.info.pop(PREVIOUS_STATS_KEY, None)
+    
+    async def _after_update(
+        self,
+        db: AsyncSession,
+        db_obj: TrialRequest,
+        values: Dict[str, Any]
+    ) -> None:
+        """ステータス変更・フィードバック追加時にイベントを追加し、集計・在庫の引当を更新"""
+        before = db.info.get(PREVIOUS_STATS_KEY)
+        if before is not None:
+            await product_trial_stats.apply_change(db, before=before, after=snapshot(db_obj))
+            await trial_rollup.apply_change(db, before=before, after=rollup_snapshot(db_obj))
+            await stock_ledger.apply_change(db, before=before, after=stock_snapshot(db_obj))
+        if "status" in values:
+            event_type = STATUS_EVENT_TYPES.get(db_obj.status)
+        elif "customer_rating" in values:
+            event_type = EventType.TRIAL_REQUEST_FEEDBACK_ADDED
+        else:
+            event_type = None
+        if event_type:
+            self._append_event(db, db_obj, event_type)
+    
+    def _approval_values(self, db: AsyncSession, *, approved_by: int) -> Dict[str, Any]:
+        """承認時の更新値（期限は希望開始日（未指定なら承認日時）+ トライアル期間）"""
+        now = datetime.utcnow()
+        return {
+            "status": TrialStatus.APPROVED,
+            "approved_by": approved_by,
+            "approved_at": now,
+            "due_date": due_date_expr(db, func.coalesce(TrialRequest.preferred_start_date, now))
+        }
+    
+    def _start_values(self, db: AsyncSession, *, processed_by: int) -> Dict[str, Any]:
+        """開始時の更新値（期限は開始日時 + トライアル期間）"""
+        now = datetime.utcnow()
+        return {
+            "status": TrialStatus.IN_PROGRESS,
+            "actual_start_date": now,
+            "processed_by": processed_by,
+            "due_date": due_date_expr(db, literal(now, DateTime(timezone=True)))
+        }
+    
     async def approve_request(
         self,
         db: AsyncSession,
         *,
         request_id: int,
-        approved_by: int
+        approved_by: int,
+        staff_notes: Optional[str] = None
     ) -> Optional[TrialRequest]:
-        """リクエストを承認"""
-        trial_request = await self.get(db, id=request_id)
-        if not trial_request or trial_request.status != TrialStatus.PENDING:
-            return None
-        
-        trial_request.status = TrialStatus.APPROVED
-        trial_request.approved_by = approved_by
-        trial_request.approved_at = datetime.utcnow()
-        
-        db.add(trial_request)
-        await db.commit()
-        await db.refresh(trial_request)
-        return trial_request
+        """リクエストを承認（承認待ちでなければ None）"""
+        values = self._approval_values(db, approved_by=approved_by)
+        if staff_notes:
+            values["staff_notes"] = staff_notes
+        return await self.update_where(
+            db,
+            id=request_id,
+            values=values,
+            conditions=[TrialRequest.status == TrialStatus.PENDING]
+        )
     
     async def start_trial(
         self,
@@ -211,19 +476,13 @@ class CRUDTrialRequest(CRUDBase[TrialRequest, TrialRequestCreate, TrialRequestUp
         request_id: int,
         processed_by: int
     ) -> Optional[TrialRequest]:
-        """トライアルを開始"""
-        trial_request = await self.get(db, id=request_id)
-        if not trial_request or trial_request.status != TrialStatus.APPROVED:
-            return None
-        
-        trial_request.status = TrialStatus.IN_PROGRESS
-        trial_request.actual_start_date = datetime.utcnow()
-        trial_request.processed_by = processed_by
-        
-        db.add(trial_request)
-        await db.commit()
-        await db.refresh(trial_request)
-        return trial_request
+        """トライアルを開始（承認済みでなければ None）"""
+        return await self.update_where(
+            db,
+            id=request_id,
+            values=self._start_values(db, processed_by=processed_by),
+            conditions=[TrialRequest.status == TrialStatus.APPROVED]
+        )
     
     async def complete_trial(
         self,
@@ -231,18 +490,16 @@ class CRUDTrialRequest(CRUDBase[TrialRequest, TrialRequestCreate, TrialRequestUp
         *,
         request_id: int
     ) -> Optional[TrialRequest]:
-        """トライアルを完了"""
-        trial_request = await self.get(db, id=request_id)
-        if not trial_request or trial_request.status != TrialStatus.IN_PROGRESS:
-            return None
-        
-        trial_request.status = TrialStatus.COMPLETED
-        trial_request.completion_date = datetime.utcnow()
-        
-        db.add(trial_request)
-        await db.commit()
-        await db.refresh(trial_request)
-        return trial_request
+        """トライアルを完了（実施中でなければ None）"""
+        return await self.update_where(
+            db,
+            id=request_id,
+            values={
+                "status": TrialStatus.COMPLETED,
+                "completion_date": datetime.utcnow()
+            },
+            conditions=[TrialRequest.status == TrialStatus.IN_PROGRESS]
+        )
     
     async def add_feedback(
         self,
@@ -254,20 +511,18 @@ class CRUDTrialRequest(CRUDBase[TrialRequest, TrialRequestCreate, TrialRequestUp
         review: Optional[str] = None,
         purchase_intent: bool = False
     ) -> Optional[TrialRequest]:
-        """フィードバックを追加"""
-        trial_request = await self.get(db, id=request_id)
-        if not trial_request or trial_request.status != TrialStatus.COMPLETED:
-            return None
-        
-        trial_request.customer_rating = rating
-        trial_request.effectiveness_rating = effectiveness_rating
-        trial_request.customer_review = review
-        trial_request.purchase_intent = purchase_intent
-        
-        db.add(trial_request)
-        await db.commit()
-        await db.refresh(trial_request)
-        return trial_request
+        """フィードバックを追加（完了済みでなければ None）"""
+        return await self.update_where(
+            db,
+            id=request_id,
+            values={
+                "customer_rating": rating,
+                "effectiveness_rating": effectiveness_rating,
+                "customer_review": review,
+                "purchase_intent": purchase_intent
+            },
+            conditions=[TrialRequest.status == TrialStatus.COMPLETED]
+        )
     
     async def change_status(
         self,
@@ -278,19 +533,325 @@ class CRUDTrialRequest(CRUDBase[TrialRequest, TrialRequestCreate, TrialRequestUp
         staff_notes: Optional[str] = None
     ) -> Optional[TrialRequest]:
         """ステータスを変更"""
-        trial_request = await self.get(db, id=request_id)
-        if not trial_request:
-            return None
+        values: Dict[str, Any] = {"status": status}
+        if staff_notes:
+            values["staff_notes"] = staff_notes
+        return await self.update_where(db, id=request_id, values=values)
+    
+    async def _append_transition_events(
+        self,
+        db: AsyncSession,
+        rows: Sequence[Mapping[str, Any]],
+        new_status: TrialStatus,
+        event_type: Optional[EventType] = None
+    ) -> None:
+        """一括更新された行のイベントを同じトランザクションで追加"""
+        await outbox.append_many(
+            db,
+            event_type=event_type or STATUS_EVENT_TYPES[new_status],
+            aggregate_type=AggregateType.TRIAL_REQUEST,
+            payloads={row["id"]: _event_payload(new_status, row) for row in rows},
+            salon_ids={row["id"]: row["salon_id"] for row in rows}
+        )
+    
+    async def bulk_transition(
+        self,
+        db: AsyncSession,
+        *,
+        ids: List[int],
+        from_statuses: List[TrialStatus],
+        values: Dict[str, Any]
+    ) -> Dict[int, BulkActionOutcome]:
+        """
+        複数リクエストのステータスを一括で遷移
+        
+        遷移元ステータスを条件にした1回のUPDATEで更新し、更新されなかったIDのみ
+        存在確認するため、件数に関わらずクエリ数は一定
+        
+        Returns:
+            ID毎の結果（applied / conflict / not_found）
+        """
+        ids = list(dict.fromkeys(ids))
+        result = await db.execute(
+            update(TrialRequest)
+            .where(TrialRequest.id.in_(ids))
+            .where(TrialRequest.status.in_(from_statuses))
+            .values(**values)
+            .returning(TrialRequest.id, *(getattr(TrialRequest, f) for f in TRANSITION_RETURNING_FIELDS))
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.mappings().all()
+        applied = {row["id"] for row in rows}
+        await self._append_transition_events(db, rows, values["status"])
+        if values["status"] == TrialStatus.COMPLETED:
+            await product_trial_stats.apply_completions(db, rows)
+        await trial_rollup.apply_transitions(db, rows, values["status"])
+        await stock_ledger.apply_transitions(db, rows, from_statuses, values["status"])
+        
+        remaining = [request_id for request_id in ids if request_id not in applied]
+        existing = set()
+        if remaining:
+            result = await db.execute(
+                select(TrialRequest.id).where(TrialRequest.id.in_(remaining))
+            )
+            existing = set(result.scalars().all())
         
-        trial_request.status = status
+        await commit_or_flush(db)
+        
+        outcomes = {}
+        for request_id in ids:
+            if request_id in applied:
+                outcomes[request_id] = BulkActionOutcome.APPLIED
+            elif request_id in existing:
+                outcomes[request_id] = BulkActionOutcome.CONFLICT
+            else:
+                outcomes[request_id] = BulkActionOutcome.NOT_FOUND
+        return outcomes
+    
+    async def bulk_approve(
+        self,
+        db: AsyncSession,
+        *,
+        ids: List[int],
+        approved_by: int,
+        staff_notes: Optional[str] = None
+    ) -> Dict[int, BulkActionOutcome]:
+        """承認待ちのリクエストを一括承認"""
+        values = self._approval_values(db, approved_by=approved_by)
+        if staff_notes:
+            values["staff_notes"] = staff_notes
+        return await self.bulk_transition(
+            db, ids=ids, from_statuses=[TrialStatus.PENDING], values=values
+        )
+    
+    async def bulk_reject(
+        self,
+        db: AsyncSession,
+        *,
+        ids: List[int],
+        processed_by: int,
+        staff_notes: Optional[str] = None
+    ) -> Dict[int, BulkActionOutcome]:
+        """承認待ちのリクエストを一括却下（却下したスタッフを処理者に記録）"""
+        values: Dict[str, Any] = {"status": TrialStatus.REJECTED, "processed_by": processed_by}
         if staff_notes:
-            trial_request.staff_notes = staff_notes
+            values["staff_notes"] = staff_notes
+        return await self.bulk_transition(
+            db, ids=ids, from_statuses=[TrialStatus.PENDING], values=values
+        )
+    
+    async def bulk_start(
+        self,
+        db: AsyncSession,
+        *,
+        ids: List[int],
+        processed_by: int,
+        staff_notes: Optional[str] = None
+    ) -> Dict[int, BulkActionOutcome]:
+        """承認済みのトライアルを一括開始"""
+        values = self._start_values(db, processed_by=processed_by)
+        if staff_notes:
+            values["staff_notes"] = staff_notes
+        return await self.bulk_transition(
+            db, ids=ids, from_statuses=[TrialStatus.APPROVED], values=values
+        )
+    
+    async def bulk_complete(
+        self,
+        db: AsyncSession,
+        *,
+        ids: List[int],
+        processed_by: int,
+        staff_notes: Optional[str] = None
+    ) -> Dict[int, BulkActionOutcome]:
+        """
+        承認済み・実施中のトライアルを一括完了
+        
+        開始せずに完了したトライアルは完了したスタッフを処理者に記録する
+        （開始済みなら開始したスタッフのまま）
+        """
+        values: Dict[str, Any] = {
+            "status": TrialStatus.COMPLETED,
+            "completion_date": datetime.utcnow(),
+            "processed_by": func.coalesce(TrialRequest.processed_by, processed_by)
+        }
+        if staff_notes:
+            values["staff_notes"] = staff_notes
+        return await self.bulk_transition(
+            db,
+            ids=ids,
+            from_statuses=[TrialStatus.APPROVED, TrialStatus.IN_PROGRESS],
+            values=values
+        )
+    
+    async def expire_due_batch(
+        self,
+        db: AsyncSession,
+        *,
+        salon_id: int,
+        from_status: TrialStatus,
+        to_status: TrialStatus,
+        now: datetime,
+        batch_size: int
+    ) -> int:
+        """
+        サロンの期限を過ぎたリクエストを期限順に最大 batch_size 件だけ遷移し、件数を返す
+        
+        (salon_id, status, due_date) インデックスで対象を絞り込み、1回のUPDATE ... RETURNING で
+        遷移とイベント追加を行う。遷移元ステータスを条件にしているため、
+        同じバッチが重複して実行されても二重に遷移しない
+        """
+        due_ids = (
+            select(TrialRequest.id)
+            .where(TrialRequest.salon_id == salon_id)
+            .where(TrialRequest.status == from_status)
+            .where(TrialRequest.due_date <= now)
+            .order_by(TrialRequest.due_date)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        values: Dict[str, Any] = {"status": to_status}
+        if to_status == TrialStatus.COMPLETED:
+            values["completion_date"] = now
+        
+        result = await db.execute(
+            update(TrialRequest)
+            .where(TrialRequest.id.in_(due_ids))
+            .where(TrialRequest.status == from_status)
+            .values(**values)
+            .returning(TrialRequest.id, *(getattr(TrialRequest, f) for f in TRANSITION_RETURNING_FIELDS))
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.mappings().all()
+        await self._append_transition_events(db, rows, to_status)
+        await trial_rollup.apply_transitions(db, rows, to_status)
+        await stock_ledger.apply_transitions(db, rows, [from_status], to_status)
+        if to_status == TrialStatus.COMPLETED:
+            await product_trial_stats.apply_completions(db, rows)
+            # 自動完了したトライアルはフィードバック依頼のイベントも追加
+            await self._append_transition_events(
+                db, rows, to_status, EventType.TRIAL_REQUEST_FEEDBACK_REQUESTED
+            )
+        await commit_or_flush(db)
+        return len(rows)
+    
+    async def expire_due(
+        self,
+        db: AsyncSession,
+        *,
+        now: Optional[datetime] = None,
+        batch_size: int = 500
+    ) -> Dict[TrialStatus, int]:
+        """
+        期限切れのトライアルをサロン毎にバッチ単位で遷移
+        
+        - 実施中 → 完了（フィードバック依頼イベントを追加）
+        - 承認済みのまま開始されなかったもの → キャンセル
+        
+        Returns:
+            遷移先ステータス毎の件数（全サロンの合計）
+        """
+        now = now or datetime.utcnow()
+        salon_ids = list((await db.execute(select(Salon.id).order_by(Salon.id))).scalars().all())
+        counts = {to_status: 0 for _, to_status in EXPIRY_TRANSITIONS}
+        for salon_id in salon_ids:
+            for from_status, to_status in EXPIRY_TRANSITIONS:
+                while True:
+                    count = await self.expire_due_batch(
+                        db, salon_id=salon_id, from_status=from_status, to_status=to_status,
+                        now=now, batch_size=batch_size
+                    )
+                    counts[to_status] += count
+                    if count < batch_size:
+                        break
+        return counts
+    
+    async def _ensure_archive_partitions(self, db: AsyncSession, created_at: Iterable[datetime]) -> None:
+        """アーカイブ先の月のパーティションを作成（PostgreSQLのみ）"""
+        if db.get_bind().dialect.name != "postgresql":
+            return
+        table = TrialRequestArchive.__tablename__
+        for start in sorted({_month_start(value) for value in created_at}):
+            end = _month_start(start + timedelta(days=32))
+            await db.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {table}_{start:%Y%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{start:%Y-%m-%d} 00:00:00+00') TO ('{end:%Y-%m-%d} 00:00:00+00')"
+            ))
+    
+    async def archive_batch(
+        self,
+        db: AsyncSession,
+        *,
+        salon_id: int,
+        status: TrialStatus,
+        cutoff: datetime,
+        now: datetime,
+        batch_size: int
+    ) -> int:
+        """
+        cutoff より前から更新の無いサロンの終了済みリクエストを最大 batch_size 件アーカイブに移動
+        
+        対象を (salon_id, status, created_at) インデックスで古い順に選び、行ロック
+        （ロック中の行は飛ばす）を取ってから同じトランザクションでコピー・削除する。
+        バッチ毎にコミットするため、稼働中のテーブルを長時間ロックしない
+        """
+        result = await db.execute(
+            select(TrialRequest.id, TrialRequest.created_at)
+            .where(TrialRequest.salon_id == salon_id)
+            .where(TrialRequest.status == status)
+            .where(TrialRequest.updated_at < cutoff)
+            .order_by(TrialRequest.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.all()
+        if not rows:
+            return 0
         
-        db.add(trial_request)
-        await db.commit()
-        await db.refresh(trial_request)
-        return trial_request
+        ids = [row.id for row in rows]
+        await self._ensure_archive_partitions(db, [row.created_at for row in rows])
+        hot = TrialRequest.__table__
+        await db.execute(
+            insert(TrialRequestArchive.__table__).from_select(
+                [*HISTORY_COLUMNS, "archived_at"],
+                select(
+                    *(hot.c[key] for key in HISTORY_COLUMNS),
+                    literal(now, DateTime(timezone=True))
+                ).where(hot.c.id.in_(ids))
+            )
+        )
+        await db.execute(delete(hot).where(hot.c.id.in_(ids)))
+        await commit_or_flush(db)
+        return len(ids)
+    
+    async def archive_terminal(
+        self,
+        db: AsyncSession,
+        *,
+        older_than: timedelta,
+        now: Optional[datetime] = None,
+        batch_size: int = 1000
+    ) -> int:
+        """
+        終了済み（完了・却下・キャンセル）で older_than 以上更新の無いリクエストを
+        サロン・ステータス毎にバッチ単位でアーカイブし、件数を返す
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - older_than
+        salon_ids = list((await db.execute(select(Salon.id).order_by(Salon.id))).scalars().all())
+        archived = 0
+        for salon_id in salon_ids:
+            for status in TERMINAL_STATUSES:
+                while True:
+                    count = await self.archive_batch(
+                        db, salon_id=salon_id, status=status, cutoff=cutoff, now=now,
+                        batch_size=batch_size
+                    )
+                    archived += count
+                    if count < batch_size:
+                        break
+        return archived
 
 
 # CRUDインスタンス
-trial_request = CRUDTrialRequest(TrialRequest)
\ No newline at end of file
+trial_request = CRUDTrialRequest(TrialRequest)
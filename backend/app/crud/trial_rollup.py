@@ -0,0 +1,474 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Type
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Float, cast, delete, func, insert, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import dialect_insert
+from ..models.product import Product, ProductCategory
+from ..models.trial_request import TrialRequest, TrialRequestArchive, TrialStatus
+from ..models.user import User
+from ..models.trial_rollup import (
+    TrialActivityDaily, TrialActivityFields, TrialActivityHourly, UNASSIGNED_STYLIST_ID
+)
+from ..schemas.trial_request import LeaderboardSort, TimeseriesDimension, TimeseriesInterval
+
+# 時系列集計に影響するトライアルリクエストの列（created_at は更新されない）
+ROLLUP_FIELDS = frozenset({
+    "status", "purchase_intent", "approved_at", "approved_by", "processed_by",
+    "actual_start_date", "completion_date"
+})
+
+# 時系列で返す件数の列
+METRIC_COLUMNS = ("requests", "approvals", "handled", "completions", "conversions")
+
+# 差分で加算する列（件数と承認までの秒数の合計）
+COUNTER_COLUMNS = (*METRIC_COLUMNS, "approval_seconds")
+
+# 一括遷移で発生する値（遷移先ステータス毎）
+TRANSITION_METRICS = {
+    TrialStatus.APPROVED: ("approvals", "approval_seconds"),
+    TrialStatus.IN_PROGRESS: ("handled",),
+    TrialStatus.COMPLETED: ("completions", "conversions"),
+}
+
+# 系列の軸とその列
+DIMENSION_COLUMNS = {
+    TimeseriesDimension.CATEGORY: "category",
+    TimeseriesDimension.STYLIST: "stylist_id",
+}
+
+# バケットの間隔
+INTERVAL_STEPS = {
+    TimeseriesInterval.HOUR: timedelta(hours=1),
+    TimeseriesInterval.DAY: timedelta(days=1),
+    TimeseriesInterval.WEEK: timedelta(weeks=1),
+}
+
+# スタイリスト別成績の並べ替え（列, 降順か）。同順位は担当件数・スタイリストIDの順
+LEADERBOARD_ORDER = {
+    LeaderboardSort.HANDLED: ("handled", True),
+    LeaderboardSort.APPROVAL_TIME: ("avg_approval_seconds", False),
+    LeaderboardSort.COMPLETION_RATE: ("completion_rate", True),
+    LeaderboardSort.CONVERSION_RATE: ("conversion_rate", True),
+}
+
+# 集計のキー（salon_id, 時間バケット, カテゴリ, スタイリストID）
+RollupKey = Tuple[int, datetime, ProductCategory, int]
+
+# 競合キーの列
+KEY_COLUMNS = ("salon_id", "bucket_start", "category", "stylist_id")
+
+
+def to_utc(value: datetime) -> datetime:
+    """タイムゾーン無しのUTCに揃える"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def floor_bucket(value: datetime, interval: TimeseriesInterval) -> datetime:
+    """日時が属するバケットの開始日時（UTC、週は月曜始まり）"""
+    value = to_utc(value).replace(minute=0, second=0, microsecond=0)
+    if interval == TimeseriesInterval.HOUR:
+        return value
+    value = value.replace(hour=0)
+    if interval == TimeseriesInterval.WEEK:
+        value -= timedelta(days=value.weekday())
+    return value
+
+
+def is_day_aligned(*values: datetime) -> bool:
+    """全ての日時が日の境界（UTC）か"""
+    return all(floor_bucket(value, TimeseriesInterval.DAY) == to_utc(value) for value in values)
+
+
+def leaderboard_range(
+    start: datetime,
+    end: datetime,
+    *,
+    now: Optional[datetime] = None,
+    hourly_retention_days: int = 90
+) -> Tuple[datetime, datetime]:
+    """
+    ランキングを読む期間（UTC）
+
+    日の境界でない期間は時間単位の集計から読むが、保存期間より前から始まる場合は
+    時間単位の行が削除済みのため、日の境界に広げて日単位の集計から読む
+    """
+    start, end = to_utc(start), to_utc(end)
+    retention_start = to_utc(now or datetime.utcnow()) - timedelta(days=hourly_retention_days)
+    if is_day_aligned(start, end) or floor_bucket(start, TimeseriesInterval.HOUR) >= retention_start:
+        return start, end
+    day_end = floor_bucket(end, TimeseriesInterval.DAY)
+    return floor_bucket(start, TimeseriesInterval.DAY), day_end if day_end == end else day_end + timedelta(days=1)
+
+
+def bucket_range(interval: TimeseriesInterval, start: datetime, end: datetime) -> List[datetime]:
+    """期間 [start, end) に掛かるバケットの開始日時"""
+    step = INTERVAL_STEPS[interval]
+    bucket, end = floor_bucket(start, interval), to_utc(end)
+    buckets = []
+    while bucket < end:
+        buckets.append(bucket)
+        bucket += step
+    return buckets
+
+
+def events(
+    row: Mapping[str, Any],
+    metrics: Sequence[str] = COUNTER_COLUMNS
+) -> List[Tuple[datetime, int, str, int]]:
+    """
+    1件のトライアルリクエストが集計に占める値（発生日時, スタイリストID, 列, 値）
+
+    承認（作成から承認までの秒数を含む）は承認者、担当・完了・購入意向は担当者
+    （未開始なら承認者）の活動とする。担当は開始日時（開始せずに完了したら完了日時）、
+    購入意向は完了日時のバケットに数える
+    """
+    items = []
+    if "requests" in metrics:
+        items.append((row["created_at"], UNASSIGNED_STYLIST_ID, "requests", 1))
+    approved_at = row["approved_at"]
+    if approved_at is not None:
+        approver_id = row["approved_by"] or UNASSIGNED_STYLIST_ID
+        if "approvals" in metrics:
+            items.append((approved_at, approver_id, "approvals", 1))
+        if "approval_seconds" in metrics:
+            seconds = int((to_utc(approved_at) - to_utc(row["created_at"])).total_seconds())
+            items.append((approved_at, approver_id, "approval_seconds", max(seconds, 0)))
+
+    stylist_id = row["processed_by"] or row["approved_by"] or UNASSIGNED_STYLIST_ID
+    completed = row["status"] == TrialStatus.COMPLETED and row["completion_date"] is not None
+    handled_at = row["actual_start_date"] or (row["completion_date"] if completed else None)
+    if "handled" in metrics and handled_at is not None:
+        items.append((handled_at, stylist_id, "handled", 1))
+    if completed:
+        if "completions" in metrics:
+            items.append((row["completion_date"], stylist_id, "completions", 1))
+        if "conversions" in metrics and row["purchase_intent"]:
+            items.append((row["completion_date"], stylist_id, "conversions", 1))
+    return items
+
+
+def snapshot(obj: Any) -> Dict[str, Any]:
+    """時系列集計に使う列をモデルから取り出す"""
+    return {
+        field: getattr(obj, field)
+        for field in ("salon_id", "product_id", "created_at", *ROLLUP_FIELDS)
+    }
+
+
+def _accumulate(
+    deltas: Dict[RollupKey, Dict[str, int]],
+    row: Mapping[str, Any],
+    category: ProductCategory,
+    sign: int,
+    metrics: Sequence[str] = COUNTER_COLUMNS
+) -> None:
+    for at, stylist_id, column, value in events(row, metrics):
+        key = (row["salon_id"], floor_bucket(at, TimeseriesInterval.HOUR), category, stylist_id)
+        deltas.setdefault(key, dict.fromkeys(COUNTER_COLUMNS, 0))[column] += sign * value
+
+
+def _by_day(deltas: Mapping[RollupKey, Mapping[str, int]]) -> Dict[RollupKey, Dict[str, int]]:
+    """時間単位の差分を日単位にまとめる"""
+    daily: Dict[RollupKey, Dict[str, int]] = {}
+    for (salon_id, bucket_start, category, stylist_id), delta in deltas.items():
+        key = (salon_id, floor_bucket(bucket_start, TimeseriesInterval.DAY), category, stylist_id)
+        total = daily.setdefault(key, dict.fromkeys(COUNTER_COLUMNS, 0))
+        for column, value in delta.items():
+            total[column] += value
+    return daily
+
+
+def _values(deltas: Mapping[RollupKey, Mapping[str, int]]) -> List[Dict[str, Any]]:
+    return [
+        {**dict(zip(KEY_COLUMNS, key)), **delta}
+        for key, delta in sorted(deltas.items())
+    ]
+
+
+class CRUDTrialRollup:
+    """トライアル活動の時系列集計の操作"""
+
+    async def _categories(self, db: AsyncSession, product_ids: Iterable[int]) -> Dict[int, ProductCategory]:
+        result = await db.execute(
+            select(Product.id, Product.category).where(Product.id.in_(set(product_ids)))
+        )
+        return dict(result.tuples().all())
+
+    async def _upsert(
+        self,
+        db: AsyncSession,
+        model: Type[TrialActivityFields],
+        deltas: Mapping[RollupKey, Mapping[str, int]]
+    ) -> None:
+        table = model.__table__
+        stmt = dialect_insert(db, table)
+        set_: Dict[str, Any] = {
+            column: table.c[column] + stmt.excluded[column] for column in COUNTER_COLUMNS
+        }
+        set_["updated_at"] = func.now()
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c[column] for column in KEY_COLUMNS], set_=set_
+            ),
+            _values(deltas)
+        )
+
+    async def apply(self, db: AsyncSession, deltas: Mapping[RollupKey, Mapping[str, int]]) -> None:
+        """
+        時間単位の差分を時間・日単位の集計に加算（呼び出し元のトランザクション内、コミットは呼び出し元）
+
+        INSERT ... ON CONFLICT DO UPDATE をexecutemanyで実行する
+        """
+        deltas = {key: delta for key, delta in deltas.items() if any(delta.values())}
+        if not deltas:
+            return
+        await self._upsert(db, TrialActivityHourly, deltas)
+        await self._upsert(db, TrialActivityDaily, _by_day(deltas))
+
+    async def apply_change(
+        self,
+        db: AsyncSession,
+        *,
+        before: Optional[Mapping[str, Any]],
+        after: Optional[Mapping[str, Any]]
+    ) -> None:
+        """1件の作成（before なし）・更新による差分を加算"""
+        if before is not None and after is not None and events(before) == events(after):
+            return
+        rows = [(row, sign) for row, sign in ((before, -1), (after, 1)) if row is not None]
+        categories = await self._categories(db, (row["product_id"] for row, _ in rows))
+        deltas: Dict[RollupKey, Dict[str, int]] = {}
+        for row, sign in rows:
+            _accumulate(deltas, row, categories[row["product_id"]], sign)
+        await self.apply(db, deltas)
+
+    async def apply_transitions(
+        self,
+        db: AsyncSession,
+        rows: Sequence[Mapping[str, Any]],
+        status: TrialStatus
+    ) -> None:
+        """一括遷移した行の遷移先ステータスの活動を加算"""
+        metrics = TRANSITION_METRICS.get(status)
+        if not metrics or not rows:
+            return
+        categories = await self._categories(db, (row["product_id"] for row in rows))
+        deltas: Dict[RollupKey, Dict[str, int]] = {}
+        for row in rows:
+            row_metrics = metrics
+            if status == TrialStatus.COMPLETED and row["actual_start_date"] is None:
+                # 開始せずに完了した場合は完了時に担当とする
+                row_metrics = (*metrics, "handled")
+            _accumulate(deltas, {**row, "status": status}, categories[row["product_id"]], 1, row_metrics)
+        await self.apply(db, deltas)
+
+    async def rebuild(self, db: AsyncSession, *, since: Optional[datetime] = None) -> int:
+        """
+        since 以降（None なら全期間）の集計を稼働中のテーブルとアーカイブから作り直し、行数を返す
+
+        スコープの無いセッションで実行する（コミットは呼び出し元）。since は日の始まりにする
+        """
+        columns = ("salon_id", "product_id", "created_at", *sorted(ROLLUP_FIELDS))
+        branches = []
+        for model in (TrialRequest, TrialRequestArchive):
+            branch = (
+                select(*(getattr(model, column) for column in columns), Product.category)
+                .join(Product, Product.id == model.product_id)
+            )
+            if since is not None:
+                branch = branch.where(or_(
+                    model.created_at >= since,
+                    model.approved_at >= since,
+                    model.actual_start_date >= since,
+                    model.completion_date >= since
+                ))
+            branches.append(branch)
+        result = await db.execute(union_all(*branches))
+
+        deltas: Dict[RollupKey, Dict[str, int]] = {}
+        for row in result.mappings():
+            _accumulate(deltas, row, row["category"], 1)
+        if since is not None:
+            deltas = {key: delta for key, delta in deltas.items() if key[1] >= since}
+
+        for model, model_deltas in (
+            (TrialActivityHourly, deltas), (TrialActivityDaily, _by_day(deltas))
+        ):
+            table = model.__table__
+            stmt = delete(table)
+            if since is not None:
+                stmt = stmt.where(table.c.bucket_start >= since)
+            await db.execute(stmt)
+            values = _values({key: delta for key, delta in model_deltas.items() if any(delta.values())})
+            if values:
+                await db.execute(insert(table), values)
+        return len(deltas)
+
+    async def compact(
+        self,
+        db: AsyncSession,
+        *,
+        now: Optional[datetime] = None,
+        rebuild_days: int = 2,
+        hourly_retention_days: int = 90
+    ) -> int:
+        """
+        直近 rebuild_days 日の集計を作り直し、保存期間を過ぎた時間単位の行を削除
+
+        日単位の集計が空（導入直後）なら全期間を作り直す。作り直し中に加算された
+        差分は失われうるが、次回の実行で修正される
+
+        Returns:
+            作り直した時間単位の行数
+        """
+        now = to_utc(now or datetime.utcnow())
+        empty = (await db.execute(select(TrialActivityDaily.id).limit(1))).first() is None
+        since = None if empty else floor_bucket(now - timedelta(days=rebuild_days), TimeseriesInterval.DAY)
+        rebuilt = await self.rebuild(db, since=since)
+        table = TrialActivityHourly.__table__
+        await db.execute(
+            delete(table).where(table.c.bucket_start < now - timedelta(days=hourly_retention_days))
+        )
+        await db.commit()
+        return rebuilt
+
+    async def totals(
+        self,
+        db: AsyncSession,
+        *,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """期間 [start, end) の件数の合計を日単位の集計から取得（日の境界で数える）"""
+        stmt = select(*(
+            func.coalesce(func.sum(getattr(TrialActivityDaily, column)), 0).label(column)
+            for column in METRIC_COLUMNS
+        ))
+        if start is not None:
+            stmt = stmt.where(TrialActivityDaily.bucket_start >= floor_bucket(start, TimeseriesInterval.DAY))
+        if end is not None:
+            stmt = stmt.where(TrialActivityDaily.bucket_start < to_utc(end))
+        row = (await db.execute(stmt)).mappings().one()
+        return {column: int(row[column]) for column in METRIC_COLUMNS}
+
+    async def timeseries(
+        self,
+        db: AsyncSession,
+        *,
+        interval: TimeseriesInterval,
+        start: datetime,
+        end: datetime,
+        group_by: Sequence[TimeseriesDimension] = (),
+        category: Optional[ProductCategory] = None,
+        stylist_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        期間 [start, end) の系列を集計から取得（トライアルリクエストは読まない）
+
+        時間単位は時間の表、日・週単位は日の表から読み、件数の無いバケットは0で埋める
+
+        Returns:
+            系列毎の {"key": 軸の値, "points": [{"bucket_start", 件数...}]}
+        """
+        model = TrialActivityHourly if interval == TimeseriesInterval.HOUR else TrialActivityDaily
+        dimensions = [getattr(model, DIMENSION_COLUMNS[dimension]) for dimension in group_by]
+        buckets = bucket_range(interval, start, end)
+        if not buckets:
+            return []
+
+        stmt = (
+            select(
+                model.bucket_start, *dimensions,
+                *(func.sum(getattr(model, column)).label(column) for column in METRIC_COLUMNS)
+            )
+            .where(model.bucket_start >= buckets[0], model.bucket_start < to_utc(end))
+            .group_by(model.bucket_start, *dimensions)
+        )
+        if category is not None:
+            stmt = stmt.where(model.category == category)
+        if stylist_id is not None:
+            stmt = stmt.where(model.stylist_id == stylist_id)
+        result = await db.execute(stmt)
+
+        series: Dict[Tuple[Any, ...], Dict[datetime, Dict[str, int]]] = {}
+        if not group_by:
+            series[()] = {}
+        for row in result.mappings():
+            key = tuple(row[column.key] for column in dimensions)
+            bucket = floor_bucket(row["bucket_start"], interval)
+            totals = series.setdefault(key, {}).setdefault(bucket, dict.fromkeys(METRIC_COLUMNS, 0))
+            for column in METRIC_COLUMNS:
+                totals[column] += int(row[column])
+
+        zero = dict.fromkeys(METRIC_COLUMNS, 0)
+        return [
+            {
+                "key": {column.key: value for column, value in zip(dimensions, key)},
+                "points": [
+                    {"bucket_start": bucket, **points.get(bucket, zero)} for bucket in buckets
+                ]
+            }
+            for key, points in sorted(series.items(), key=lambda item: tuple(map(str, item[0])))
+        ]
+
+    async def leaderboard(
+        self,
+        db: AsyncSession,
+        *,
+        start: datetime,
+        end: datetime,
+        sort: LeaderboardSort = LeaderboardSort.HANDLED,
+        limit: int = 20,
+        min_handled: int = 0,
+        hourly_retention_days: int = 90
+    ) -> List[Dict[str, Any]]:
+        """
+        期間 [start, end) のスタイリスト別成績を順位順に取得（トライアルリクエストは読まない）
+
+        期間が日の境界なら日単位、そうでなければ時間単位の集計から読む
+        （時間単位の保存期間より前からの期間は leaderboard_range で日の境界に広げる）。
+        スタイリストの決まっていない活動は含めない
+        """
+        start, end = leaderboard_range(start, end, hourly_retention_days=hourly_retention_days)
+        model = TrialActivityDaily if is_day_aligned(start, end) else TrialActivityHourly
+        sums = {
+            column: func.sum(getattr(model, column))
+            for column in ("handled", "approvals", "approval_seconds", "completions", "conversions")
+        }
+        ratios = {
+            "avg_approval_seconds": cast(sums["approval_seconds"], Float) / func.nullif(sums["approvals"], 0),
+            "completion_rate": cast(sums["completions"], Float) / func.nullif(sums["handled"], 0),
+            "conversion_rate": cast(sums["conversions"], Float) / func.nullif(sums["completions"], 0),
+        }
+        stmt = (
+            select(
+                model.stylist_id,
+                *(expr.label(column) for column, expr in {**sums, **ratios}.items())
+            )
+            .where(model.bucket_start >= floor_bucket(start, TimeseriesInterval.HOUR))
+            .where(model.bucket_start < end, model.stylist_id != UNASSIGNED_STYLIST_ID)
+            .group_by(model.stylist_id)
+        )
+        if min_handled > 0:
+            stmt = stmt.having(sums["handled"] >= min_handled)
+        stats = stmt.subquery("stylist_stats")
+
+        column, descending = LEADERBOARD_ORDER[sort]
+        order = stats.c[column].desc() if descending else stats.c[column].asc()
+        result = await db.execute(
+            select(stats, func.coalesce(User.full_name, User.username).label("name"))
+            .outerjoin(User, User.id == stats.c.stylist_id)
+            .order_by(order.nulls_last(), stats.c.handled.desc(), stats.c.stylist_id)
+            .limit(limit)
+        )
+        return [
+            {"rank": rank, **row}
+            for rank, row in enumerate(result.mappings(), start=1)
+        ]
+
+
+# CRUDインスタンス
+trial_rollup = CRUDTrialRollup()
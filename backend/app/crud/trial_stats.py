@@ -0,0 +1,181 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+from sqlalchemy import Float, case, cast, delete, func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .base import dialect_insert
+from ..core.response_cache import TRIAL_STATS_TAG, mark_stale
+from ..models.trial_request import TrialRequest, TrialRequestArchive, TrialStatus
+from ..models.trial_stats import ProductTrialStats
+
+# 集計に影響するトライアルリクエストの列
+STATS_FIELDS = frozenset({"status", "customer_rating", "effectiveness_rating", "purchase_intent"})
+
+# 差分で加算する列
+COUNTER_COLUMNS = (
+    "trial_count", "completed_count", "rating_count", "rating_sum",
+    "effectiveness_count", "effectiveness_sum", "purchase_intent_count"
+)
+
+# 保存する率・平均（分子・分母の列）
+RATIO_COLUMNS = {
+    "completion_rate": ("completed_count", "trial_count"),
+    "avg_rating": ("rating_sum", "rating_count"),
+    "avg_effectiveness": ("effectiveness_sum", "effectiveness_count"),
+    "conversion_rate": ("purchase_intent_count", "rating_count"),
+}
+
+# 商品毎の集計のキー（salon_id, product_id）
+StatsKey = Tuple[int, int]
+
+
+def contribution(row: Any) -> Dict[str, int]:
+    """1件のトライアルリクエストが集計に占める値"""
+    rating = row["customer_rating"]
+    effectiveness = row["effectiveness_rating"]
+    return {
+        "trial_count": 1,
+        "completed_count": int(row["status"] == TrialStatus.COMPLETED),
+        "rating_count": int(rating is not None),
+        "rating_sum": rating or 0,
+        "effectiveness_count": int(effectiveness is not None),
+        "effectiveness_sum": effectiveness or 0,
+        "purchase_intent_count": int(bool(row["purchase_intent"])),
+    }
+
+
+def snapshot(obj: Any) -> Dict[str, Any]:
+    """集計に使う列をモデルから取り出す"""
+    return {
+        field: getattr(obj, field)
+        for field in ("salon_id", "product_id", *STATS_FIELDS)
+    }
+
+
+def _ratios(counters: Mapping[str, int]) -> Dict[str, Optional[float]]:
+    return {
+        column: counters[numerator] / counters[denominator] if counters[denominator] else None
+        for column, (numerator, denominator) in RATIO_COLUMNS.items()
+    }
+
+
+class CRUDProductTrialStats:
+    """商品毎のトライアル集計の操作"""
+
+    async def get(self, db: AsyncSession, *, product_id: int) -> Optional[ProductTrialStats]:
+        result = await db.execute(
+            select(ProductTrialStats).where(ProductTrialStats.product_id == product_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def apply(self, db: AsyncSession, deltas: Mapping[StatsKey, Mapping[str, int]]) -> None:
+        """
+        商品毎の差分を加算（呼び出し元のトランザクション内、コミットは呼び出し元）
+
+        INSERT ... ON CONFLICT DO UPDATE をexecutemanyで実行し、加算と率の再計算を
+        1文で行う。行が無い商品は差分をそのまま初期値にする
+        """
+        deltas = {key: delta for key, delta in deltas.items() if any(delta.values())}
+        if not deltas:
+            return
+
+        table = ProductTrialStats.__table__
+        stmt = dialect_insert(db, table)
+        totals = {column: table.c[column] + stmt.excluded[column] for column in COUNTER_COLUMNS}
+        set_: Dict[str, Any] = dict(totals)
+        for column, (numerator, denominator) in RATIO_COLUMNS.items():
+            set_[column] = cast(totals[numerator], Float) / func.nullif(totals[denominator], 0)
+        set_["updated_at"] = func.now()
+
+        values = [
+            {"salon_id": salon_id, "product_id": product_id, **delta, **_ratios(delta)}
+            for (salon_id, product_id), delta in sorted(deltas.items())
+        ]
+        await db.execute(
+            stmt.on_conflict_do_update(index_elements=[table.c.product_id], set_=set_), values
+        )
+        mark_stale(db, {TRIAL_STATS_TAG})
+
+    async def apply_change(
+        self,
+        db: AsyncSession,
+        *,
+        before: Optional[Mapping[str, Any]],
+        after: Optional[Mapping[str, Any]]
+    ) -> None:
+        """1件の作成（before なし）・更新による差分を加算"""
+        deltas: Dict[StatsKey, Dict[str, int]] = {}
+        for row, sign in ((before, -1), (after, 1)):
+            if row is None:
+                continue
+            delta = deltas.setdefault(
+                (row["salon_id"], row["product_id"]), dict.fromkeys(COUNTER_COLUMNS, 0)
+            )
+            for column, value in contribution(row).items():
+                delta[column] += sign * value
+        await self.apply(db, deltas)
+
+    async def apply_completions(self, db: AsyncSession, rows: Iterable[Mapping[str, Any]]) -> None:
+        """
+        完了以外から完了に一括遷移した行の差分を加算
+
+        完了件数のみが変わる（フィードバックは完了後に追加される）
+        """
+        deltas: Dict[StatsKey, Dict[str, int]] = {}
+        for row in rows:
+            delta = deltas.setdefault(
+                (row["salon_id"], row["product_id"]), dict.fromkeys(COUNTER_COLUMNS, 0)
+            )
+            delta["completed_count"] += 1
+        await self.apply(db, deltas)
+
+    async def reconcile(self, db: AsyncSession) -> int:
+        """
+        稼働中のテーブルとアーカイブから全サロンの集計をし直して上書きし、集計した商品数を返す
+
+        スコープの無いセッションで実行する。差分の加算で生じた誤差（障害・手作業での修正等）を修正する。
+        集計中に加算された差分は上書きされうるが、次回の照合で修正される
+        """
+        columns = ("salon_id", "product_id", *sorted(STATS_FIELDS))
+        rows = union_all(*(
+            select(*(getattr(model, column) for column in columns))
+            for model in (TrialRequest, TrialRequestArchive)
+        )).subquery()
+        result = await db.execute(
+            select(
+                rows.c.salon_id,
+                rows.c.product_id,
+                func.count().label("trial_count"),
+                func.sum(case((rows.c.status == TrialStatus.COMPLETED, 1), else_=0)).label("completed_count"),
+                func.count(rows.c.customer_rating).label("rating_count"),
+                func.coalesce(func.sum(rows.c.customer_rating), 0).label("rating_sum"),
+                func.count(rows.c.effectiveness_rating).label("effectiveness_count"),
+                func.coalesce(func.sum(rows.c.effectiveness_rating), 0).label("effectiveness_sum"),
+                func.sum(case((rows.c.purchase_intent.is_(True), 1), else_=0)).label("purchase_intent_count"),
+            ).group_by(rows.c.salon_id, rows.c.product_id)
+        )
+        values: List[Dict[str, Any]] = []
+        for row in result.mappings():
+            counters = {column: int(row[column]) for column in COUNTER_COLUMNS}
+            values.append({
+                "salon_id": row["salon_id"], "product_id": row["product_id"],
+                **counters, **_ratios(counters)
+            })
+
+        table = ProductTrialStats.__table__
+        await db.execute(delete(table).where(table.c.product_id.not_in(select(rows.c.product_id))))
+        if values:
+            stmt = dialect_insert(db, table)
+            set_: Dict[str, Any] = {
+                column: stmt.excluded[column] for column in (*COUNTER_COLUMNS, *RATIO_COLUMNS)
+            }
+            set_["updated_at"] = func.now()
+            await db.execute(
+                stmt.on_conflict_do_update(index_elements=[table.c.product_id], set_=set_), values
+            )
+        mark_stale(db, {TRIAL_STATS_TAG})
+        await db.commit()
+        return len(values)
+
+
+# CRUDインスタンス
+product_trial_stats = CRUDProductTrialStats()
@@ -1,9 +1,10 @@
 from typing import Optional
-from sqlalchemy import select
+from sqlalchemy import Select, select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 
 from .base import CRUDBase
+from ..core.database import commit_or_flush
 from ..models.user import User, UserRole
 from ..schemas.user import UserCreate, UserUpdate
 
@@ -32,6 +33,31 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         result = await db.execute(select(User).where(User.username == username))
         return result.scalar_one_or_none()
     
+    def build_filtered_query(
+        self,
+        *,
+        role: Optional[UserRole] = None,
+        is_active: Optional[bool] = None,
+        is_verified: Optional[bool] = None
+    ) -> Select:
+        """フィルタ条件を適用したユーザークエリを構築"""
+        query = select(User)
+        conditions = []
+        
+        if role:
+            conditions.append(User.role == role)
+        
+        if is_active is not None:
+            conditions.append(User.is_active == is_active)
+        
+        if is_verified is not None:
+            conditions.append(User.is_verified == is_verified)
+        
+        if conditions:
+            query = query.where(and_(*conditions))
+        
+        return query
+    
     async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
         """新しいユーザーを作成"""
         # パスワードをハッシュ化
@@ -56,8 +82,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         )
         
         db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+        await commit_or_flush(db)
         return db_obj
     
     async def authenticate(
@@ -100,28 +125,19 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     ) -> User:
         """パスワードを更新"""
         hashed_password = self.get_password_hash(new_password)
-        user.hashed_password = hashed_password
-        db.add(user)
-        await db.commit()
-        await db.refresh(user)
-        return user
+        return await self.update(db, db_obj=user, obj_in={"hashed_password": hashed_password})
     
     async def verify_user(self, db: AsyncSession, *, user: User) -> User:
         """ユーザーを認証済みに設定"""
-        user.is_verified = True
-        db.add(user)
-        await db.commit()
-        await db.refresh(user)
-        return user
+        return await self.update(db, db_obj=user, obj_in={"is_verified": True})
     
     async def deactivate_user(self, db: AsyncSession, *, user: User) -> User:
         """ユーザーを非アクティブに設定"""
-        user.is_active = False
-        db.add(user)
-        await db.commit()
-        await db.refresh(user)
-        return user
-
+        return await self.update(db, db_obj=user, obj_in={"is_active": False})
+    
+    async def activate_user(self, db: AsyncSession, *, user: User) -> User:
+        """ユーザーをアクティブに設定"""
+        return await self.update(db, db_obj=user, obj_in={"is_active": True})
 
 # CRUDインスタンス
 user = CRUDUser(User)
\ No newline at end of file
@@ -20,10 +20,14 @@ async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 async def create_db_and_tables():
     """データベースとテーブルを作成"""
     from app.models.base import Base
+    from app.models.salon import Salon
     # すべてのモデルをインポートしてMetadataに登録
     from app.models.user import User
     from app.models.product import Product
     from app.models.trial_request import TrialRequest
+    from app.models.outbox import OutboxEvent
+    from app.models.scheduler import SchedulerLease
+    from app.models.idempotency import IdempotencyKey
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
@@ -1,18 +1,44 @@
 # Models module
-from .base import Base, BaseModel, TimestampMixin
+from .base import Base, BaseModel, TimestampMixin, TenantMixin, DEFAULT_SALON_ID
+from .salon import Salon
 from .user import User, UserRole
 from .product import Product, ProductCategory, ProductStatus
-from .trial_request import TrialRequest, TrialStatus
+from .trial_request import TrialRequest, TrialRequestArchive, TrialStatus, TERMINAL_STATUSES
+from .trial_stats import ProductTrialStats
+from .trial_rollup import TrialActivityHourly, TrialActivityDaily, UNASSIGNED_STYLIST_ID
+from .demand_forecast import ProductDemandForecast
+from .stock import StockMovement, StockMovementKind, ProductStockCounter
+from .outbox import OutboxEvent, EventType, AggregateType
+from .scheduler import SchedulerLease
+from .idempotency import IdempotencyKey
 
 __all__ = [
     "Base",
     "BaseModel", 
     "TimestampMixin",
+    "TenantMixin",
+    "DEFAULT_SALON_ID",
+    "Salon",
     "User",
     "UserRole",
     "Product", 
     "ProductCategory",
     "ProductStatus",
     "TrialRequest",
-    "TrialStatus"
+    "TrialRequestArchive",
+    "TrialStatus",
+    "TERMINAL_STATUSES",
+    "ProductTrialStats",
+    "TrialActivityHourly",
+    "TrialActivityDaily",
+    "UNASSIGNED_STYLIST_ID",
+    "ProductDemandForecast",
+    "StockMovement",
+    "StockMovementKind",
+    "ProductStockCounter",
+    "OutboxEvent",
+    "EventType",
+    "AggregateType",
+    "SchedulerLease",
+    "IdempotencyKey"
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import DateTime, Integer, func
+from sqlalchemy import DateTime, ForeignKey, Integer, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import mapped_column, Mapped
 
@@ -22,8 +22,30 @@ class TimestampMixin:
     )
 
 
+# 単一サロン運用・テナント導入前のデータが所属するサロン
+DEFAULT_SALON_ID = 1
+
+
+class TenantMixin:
+    """
+    サロン（テナント）に属するモデル
+
+    セッションにテナントのスコープがある場合、SELECT・UPDATE・DELETEは自動で
+    そのサロンに絞り込まれ、追加した行はそのサロンに所属する（app.core.tenancy）。
+    複合インデックスは salon_id を先頭にする
+    """
+    salon_id: Mapped[int] = mapped_column(
+        ForeignKey("salons.id"),
+        nullable=False,
+        default=DEFAULT_SALON_ID
+    )
+
+
 class BaseModel(Base, TimestampMixin):
     """ベースモデルクラス"""
     __abstract__ = True
+    # サーバー側で生成される値（id・created_at・updated_at）をINSERT/UPDATEの
+    # RETURNINGで取得し、書き込み後のrefresh（SELECT）を不要にする
+    __mapper_args__ = {"eager_defaults": True}
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
\ No newline at end of file
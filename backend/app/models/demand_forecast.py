@@ -0,0 +1,34 @@
+from datetime import date, datetime
+from typing import Optional
+from sqlalchemy import Date, DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import mapped_column, Mapped
+from .base import BaseModel, TenantMixin
+
+
+class ProductDemandForecast(TenantMixin, BaseModel):
+    """
+    商品毎のトライアル需要予測モデル
+
+    予測ジョブが日毎のトライアル需要から全商品をまとめて予測し、上書きする（app.core.forecasting）
+    """
+    __tablename__ = "product_demand_forecasts"
+    __table_args__ = (
+        # 発注提案の「在庫切れが近い順」用
+        Index("ix_product_demand_forecasts_salon_id_stockout", "salon_id", "projected_stockout_date"),
+    )
+
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey("products.id", ondelete="CASCADE"), unique=True, nullable=False
+    )
+
+    daily_demand: Mapped[float] = mapped_column(Float, nullable=False)  # 予測期間の平均日需要
+    demand_stddev: Mapped[float] = mapped_column(Float, nullable=False)  # 1期先予測誤差の標準偏差
+    suggested_min_stock_level: Mapped[int] = mapped_column(Integer, nullable=False)
+    projected_stockout_date: Mapped[Optional[date]] = mapped_column(Date)  # 予測期間内に切れなければ NULL
+    stock_quantity: Mapped[int] = mapped_column(Integer, nullable=False)  # 予測時の在庫数
+    model: Mapped[str] = mapped_column(String(20), nullable=False)
+    alpha: Mapped[float] = mapped_column(Float, nullable=False)  # 平滑化係数
+    generated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<ProductDemandForecast(product_id={self.product_id}, stockout={self.projected_stockout_date})>"
@@ -0,0 +1,32 @@
+from typing import Optional
+from datetime import datetime
+from sqlalchemy import String, Integer, DateTime, JSON, Index, UniqueConstraint
+from sqlalchemy.orm import mapped_column, Mapped
+from .base import BaseModel
+
+
+class IdempotencyKey(BaseModel):
+    """Idempotency-Key 毎の実行結果モデル（再送時はハンドラを実行せずに結果を返す）"""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+    
+    # キー（scope は "サロンID:メソッド パス"）
+    scope: Mapped[str] = mapped_column(String(200), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)  # リクエスト内容のSHA-256
+    
+    # 実行中のロック期限（期限を過ぎても未完了なら他のリクエストが引き継ぐ）
+    locked_until: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    
+    # 保存したレスポンス（完了時に設定）
+    response_status: Mapped[Optional[int]] = mapped_column(Integer)
+    response_body: Mapped[Optional[dict]] = mapped_column(JSON)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    
+    def __repr__(self):
+        return f"<IdempotencyKey(scope={self.scope}, key={self.key}, completed_at={self.completed_at})>"
@@ -0,0 +1,65 @@
+from enum import Enum
+from typing import Optional
+from datetime import datetime
+from sqlalchemy import BigInteger, String, Integer, DateTime, JSON, Index, text
+from sqlalchemy.orm import mapped_column, Mapped
+from .base import BaseModel, TenantMixin
+
+
+class EventType(str, Enum):
+    """変更イベント種別"""
+    TRIAL_REQUEST_CREATED = "trial_request.created"
+    TRIAL_REQUEST_APPROVED = "trial_request.approved"
+    TRIAL_REQUEST_REJECTED = "trial_request.rejected"
+    TRIAL_REQUEST_STARTED = "trial_request.started"
+    TRIAL_REQUEST_COMPLETED = "trial_request.completed"
+    TRIAL_REQUEST_CANCELLED = "trial_request.cancelled"
+    TRIAL_REQUEST_FEEDBACK_ADDED = "trial_request.feedback_added"
+    TRIAL_REQUEST_FEEDBACK_REQUESTED = "trial_request.feedback_requested"
+    PRODUCT_STOCK_CHANGED = "product.stock_changed"
+    PRODUCT_BULK_IMPORTED = "product.bulk_imported"
+
+
+class AggregateType(str, Enum):
+    """イベント発生元の集約種別"""
+    TRIAL_REQUEST = "trial_request"
+    PRODUCT = "product"
+
+
+class OutboxEvent(TenantMixin, BaseModel):
+    """
+    トランザクショナルアウトボックス（変更イベント）モデル
+
+    イベントは発生元の集約と同じサロンに所属し、フィード・SSEはそのサロンのイベントのみを返す。
+    ディスパッチャはスコープの無いセッションで全サロンのイベントを配信する
+    """
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # 未配信イベントの取り出し用（配信済みの行は索引に含めない）
+        Index(
+            "ix_outbox_events_undispatched",
+            "id",
+            postgresql_where=text("dispatched_at IS NULL"),
+            sqlite_where=text("dispatched_at IS NULL"),
+        ),
+        # 最新の連番の取得用（連番は全サロンで共通）
+        Index("ix_outbox_events_dispatched_seq", "dispatched_seq", unique=True),
+        # サロン毎のフィードのカーソル順の読み取り用
+        Index("ix_outbox_events_salon_id_dispatched_seq", "salon_id", "dispatched_seq"),
+    )
+    
+    # イベント情報
+    event_type: Mapped[str] = mapped_column(String(100), nullable=False)
+    aggregate_type: Mapped[str] = mapped_column(String(50), nullable=False)
+    aggregate_id: Mapped[Optional[int]] = mapped_column(Integer)  # 一括処理のイベントはNULL
+    payload: Mapped[Optional[dict]] = mapped_column(JSON)
+    
+    # 配信日時（未配信はNULL）
+    dispatched_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    
+    # 配信順の連番（フィード・SSEのカーソル、未配信はNULL）。
+    # id は採番順でコミット順ではないため、ディスパッチャが配信時に採番した連番で読む
+    dispatched_seq: Mapped[Optional[int]] = mapped_column(BigInteger)
+    
+    def __repr__(self):
+        return f"<OutboxEvent(id={self.id}, event_type={self.event_type}, aggregate_id={self.aggregate_id})>"
@@ -1,9 +1,9 @@
 from enum import Enum
 from typing import Optional, List
 from decimal import Decimal
-from sqlalchemy import String, Text, Integer, Numeric, Boolean, ForeignKey, JSON, Enum as SQLEnum
+from sqlalchemy import String, Text, Integer, Numeric, Boolean, ForeignKey, JSON, Index, Enum as SQLEnum
 from sqlalchemy.orm import mapped_column, Mapped, relationship
-from .base import BaseModel
+from .base import BaseModel, TenantMixin
 
 
 class ProductCategory(str, Enum):
@@ -27,12 +27,20 @@ class ProductStatus(str, Enum):
     ARCHIVED = "archived"  # アーカイブ済み
 
 
-class Product(BaseModel):
+class Product(TenantMixin, BaseModel):
     """商品モデル"""
     __tablename__ = "products"
+    __table_args__ = (
+        # サロン毎の一覧・絞り込み用
+        Index("ix_products_salon_id_name", "salon_id", "name"),
+        Index("ix_products_salon_id_status_category", "salon_id", "status", "category"),
+        Index("ix_products_salon_id_status_is_featured", "salon_id", "status", "is_featured"),
+        # スラッグはサロン内で一意
+        Index("uq_products_salon_id_slug", "salon_id", "slug", unique=True),
+    )
     
     # 基本情報
-    name: Mapped[str] = mapped_column(String(200), nullable=False, index=True)
+    name: Mapped[str] = mapped_column(String(200), nullable=False)
     description: Mapped[Optional[str]] = mapped_column(Text)
     short_description: Mapped[Optional[str]] = mapped_column(String(500))
     
@@ -60,7 +68,7 @@ class Product(BaseModel):
     thumbnail_url: Mapped[Optional[str]] = mapped_column(String(500))
     
     # SEO・メタデータ
-    slug: Mapped[Optional[str]] = mapped_column(String(200), unique=True, index=True)
+    slug: Mapped[Optional[str]] = mapped_column(String(200))
     tags: Mapped[Optional[List[str]]] = mapped_column(JSON)  # タグ
     
     # 外部キー
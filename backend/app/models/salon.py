@@ -0,0 +1,23 @@
+from sqlalchemy import DDL, Boolean, String, event, true
+from sqlalchemy.orm import mapped_column, Mapped
+from .base import BaseModel, DEFAULT_SALON_ID
+
+
+class Salon(BaseModel):
+    """サロン（テナント）モデル"""
+    __tablename__ = "salons"
+    
+    name: Mapped[str] = mapped_column(String(200), nullable=False)
+    code: Mapped[str] = mapped_column(String(50), nullable=False, unique=True)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, server_default=true())
+    
+    def __repr__(self):
+        return f"<Salon(id={self.id}, code={self.code}, name={self.name})>"
+
+
+# テーブル作成時（開発・テスト）に既定のサロンを登録（本番はマイグレーションで登録）
+event.listen(
+    Salon.__table__,
+    "after_create",
+    DDL(f"INSERT INTO salons (id, name, code) VALUES ({DEFAULT_SALON_ID}, 'default', 'default')")
+)
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime
+from sqlalchemy.orm import mapped_column, Mapped
+from .base import BaseModel
+
+
+class SchedulerLease(BaseModel):
+    """スケジューラのリーダーリースモデル（複数ワーカー中の1つだけがジョブを実行する）"""
+    __tablename__ = "scheduler_leases"
+    
+    name: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
+    holder: Mapped[str] = mapped_column(String(200), nullable=False)  # リーダーのワーカー識別子
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    
+    def __repr__(self):
+        return f"<SchedulerLease(name={self.name}, holder={self.holder}, expires_at={self.expires_at})>"
@@ -0,0 +1,64 @@
+from enum import Enum
+from typing import Optional
+from sqlalchemy import Enum as SQLEnum, ForeignKey, Index, Integer, UniqueConstraint
+from sqlalchemy.orm import mapped_column, Mapped
+from .base import BaseModel, TenantMixin
+
+
+class StockMovementKind(str, Enum):
+    """在庫移動の種別"""
+    RESERVE = "reserve"  # トライアルの承認による引当
+    RELEASE = "release"  # 却下・キャンセル・期限切れのキャンセルによる引当の解除
+    CONSUME = "consume"  # 完了による引当の消費（渡した数を在庫数から減らす）
+    COMPACTED = "compacted"  # 圧縮ジョブが古い移動をまとめた行
+
+
+class StockMovement(TenantMixin, BaseModel):
+    """
+    在庫移動台帳モデル（追記のみ）
+
+    トライアルリクエストのステータス遷移と同じトランザクションで追加する。
+    quantity は引当数の増減（引当は正、解除・消費は負）で、商品毎の合計が現在の引当数になる。
+    消費（完了）の場合は同じトランザクションで商品の在庫数も減らす。
+    古い行は圧縮ジョブが商品毎に1行にまとめる
+    """
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        # 商品毎の履歴・圧縮対象の絞り込み用
+        Index("ix_stock_movements_product_id_created_at", "product_id", "created_at"),
+    )
+
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey("products.id", ondelete="CASCADE"), nullable=False
+    )
+    # アーカイブに移動するため外部キーにしない（圧縮された行は NULL）
+    trial_request_id: Mapped[Optional[int]] = mapped_column(Integer)
+    kind: Mapped[StockMovementKind] = mapped_column(SQLEnum(StockMovementKind), nullable=False)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<StockMovement(product_id={self.product_id}, kind={self.kind}, quantity={self.quantity})>"
+
+
+class ProductStockCounter(TenantMixin, BaseModel):
+    """
+    商品毎の引当数カウンタモデル
+
+    1商品を複数の行（シャード）に分け、トライアルリクエストIDで選んだ行に加算する。
+    同じ商品の承認が同時に行われても行ロックの待ちが1行に集中しない。
+    引当数は全シャードの合計、引当可能数は在庫数 - 引当数
+    """
+    __tablename__ = "product_stock_counters"
+    __table_args__ = (
+        # 加算の競合キー
+        UniqueConstraint("product_id", "shard", name="uq_product_stock_counters_shard"),
+    )
+
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey("products.id", ondelete="CASCADE"), nullable=False
+    )
+    shard: Mapped[int] = mapped_column(Integer, nullable=False)
+    reserved: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<ProductStockCounter(product_id={self.product_id}, shard={self.shard}, reserved={self.reserved})>"
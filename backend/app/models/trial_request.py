@@ -2,9 +2,9 @@ from enum import Enum
 from typing import Optional
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy import String, Text, Integer, Numeric, ForeignKey, DateTime, JSON, Enum as SQLEnum
+from sqlalchemy import String, Text, Integer, Numeric, ForeignKey, DateTime, JSON, Index, Enum as SQLEnum
 from sqlalchemy.orm import mapped_column, Mapped, relationship
-from .base import BaseModel
+from .base import BaseModel, TenantMixin
 
 
 class TrialStatus(str, Enum):
@@ -17,9 +17,12 @@ class TrialStatus(str, Enum):
     CANCELLED = "cancelled"    # キャンセル
 
 
-class TrialRequest(BaseModel):
-    """トライアルリクエストモデル"""
-    __tablename__ = "trial_requests"
+# 終了済み（以降変更されない）ステータス。一定期間後にアーカイブへ移動する
+TERMINAL_STATUSES = (TrialStatus.COMPLETED, TrialStatus.REJECTED, TrialStatus.CANCELLED)
+
+
+class TrialRequestFields(TenantMixin):
+    """トライアルリクエストの列（稼働中のテーブルとアーカイブで共通）"""
     
     # 基本情報
     customer_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
@@ -45,6 +48,7 @@ class TrialRequest(BaseModel):
     preferred_start_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     actual_start_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     completion_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    due_date: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))  # 期限（承認・開始時に設定）
     
     # 承認・処理情報
     approved_by: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"))
@@ -60,15 +64,6 @@ class TrialRequest(BaseModel):
     # 追加データ（JSON）
     additional_data: Mapped[Optional[dict]] = mapped_column(JSON)
     
-    # リレーション
-    # customer: Mapped["User"] = relationship("User", foreign_keys=[customer_id], back_populates="trial_requests")
-    # product: Mapped["Product"] = relationship("Product", back_populates="trial_requests")
-    # approved_by_user: Mapped[Optional["User"]] = relationship("User", foreign_keys=[approved_by])
-    # processed_by_user: Mapped[Optional["User"]] = relationship("User", foreign_keys=[processed_by])
-    
-    def __repr__(self):
-        return f"<TrialRequest(id={self.id}, customer_id={self.customer_id}, product_id={self.product_id}, status={self.status})>"
-        
     @property
     def is_active(self) -> bool:
         """アクティブなトライアルかチェック"""
@@ -82,4 +77,53 @@ class TrialRequest(BaseModel):
     @property 
     def can_be_rated(self) -> bool:
         """評価可能かチェック"""
-        return self.status == TrialStatus.COMPLETED and self.customer_rating is None
\ No newline at end of file
+        return self.status == TrialStatus.COMPLETED and self.customer_rating is None
+
+
+class TrialRequest(TrialRequestFields, BaseModel):
+    """
+    トライアルリクエストモデル
+    
+    PostgreSQLでは salon_id のハッシュでパーティション分割する（マイグレーションで作成）
+    """
+    __tablename__ = "trial_requests"
+    __table_args__ = (
+        # 期限切れトライアルの検索用（サロン・ステータス毎に期限順で走査）
+        Index("ix_trial_requests_salon_id_status_due_date", "salon_id", "status", "due_date"),
+        # サロン毎のステータス・顧客・商品別一覧用（新しい順）
+        Index("ix_trial_requests_salon_id_status_created_at", "salon_id", "status", "created_at"),
+        Index("ix_trial_requests_salon_id_customer_id_created_at", "salon_id", "customer_id", "created_at"),
+        Index("ix_trial_requests_salon_id_product_id_created_at", "salon_id", "product_id", "created_at"),
+    )
+    
+    # リレーション
+    # customer: Mapped["User"] = relationship("User", foreign_keys=[customer_id], back_populates="trial_requests")
+    # product: Mapped["Product"] = relationship("Product", back_populates="trial_requests")
+    # approved_by_user: Mapped[Optional["User"]] = relationship("User", foreign_keys=[approved_by])
+    # processed_by_user: Mapped[Optional["User"]] = relationship("User", foreign_keys=[processed_by])
+    
+    def __repr__(self):
+        return f"<TrialRequest(id={self.id}, customer_id={self.customer_id}, product_id={self.product_id}, status={self.status})>"
+
+
+class TrialRequestArchive(TrialRequestFields, BaseModel):
+    """
+    アーカイブ済みのトライアルリクエスト
+    
+    終了済みで TRIAL_ARCHIVE_AFTER_DAYS 日以上更新の無いリクエストを元のIDのまま移動する。
+    PostgreSQLでは created_at の月毎にレンジパーティション分割する（パーティションは
+    アーカイブ時に作成）。読み取り専用で、履歴の取得時に稼働中のテーブルと合わせて参照する
+    """
+    __tablename__ = "trial_requests_archive"
+    __table_args__ = (
+        Index("ix_trial_requests_archive_salon_id_status_created_at", "salon_id", "status", "created_at"),
+        Index("ix_trial_requests_archive_salon_id_customer_id_created_at", "salon_id", "customer_id", "created_at"),
+        Index("ix_trial_requests_archive_salon_id_product_id_created_at", "salon_id", "product_id", "created_at"),
+    )
+    
+    # 稼働中のテーブルのIDをそのまま使う（採番しない）
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=False)
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    
+    def __repr__(self):
+        return f"<TrialRequestArchive(id={self.id}, customer_id={self.customer_id}, product_id={self.product_id}, status={self.status})>"
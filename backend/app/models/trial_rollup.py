@@ -0,0 +1,66 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, Enum as SQLEnum, Integer, UniqueConstraint
+from sqlalchemy.orm import mapped_column, Mapped
+from .base import BaseModel, TenantMixin
+from .product import ProductCategory
+
+# 担当スタイリストが決まっていない活動（リクエスト作成等）のスタイリストID
+UNASSIGNED_STYLIST_ID = 0
+
+
+class TrialActivityFields(TenantMixin):
+    """
+    トライアル活動の時系列集計（時間・日単位の表で共通の列）
+
+    バケット（UTCの開始日時）・商品カテゴリ・スタイリスト毎に、その期間に発生した
+    リクエスト作成・承認・担当（開始）・完了・購入意向（完了日時のバケット）の件数を持つ。
+    スタイリスト別の成績もこの集計から求める
+    """
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    category: Mapped[ProductCategory] = mapped_column(SQLEnum(ProductCategory), nullable=False)
+    stylist_id: Mapped[int] = mapped_column(Integer, default=UNASSIGNED_STYLIST_ID, nullable=False)
+
+    requests: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    approvals: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    approval_seconds: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)  # 作成から承認までの秒数の合計
+    handled: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # 担当したトライアル
+    completions: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    conversions: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class TrialActivityHourly(TrialActivityFields, BaseModel):
+    """
+    トライアル活動の時間単位の集計モデル
+
+    トライアルリクエストの書き込みと同じトランザクションで差分を加算する。
+    保存期間を過ぎた行は圧縮ジョブで削除する（日単位の集計は残る）
+    """
+    __tablename__ = "trial_activity_hourly"
+    __table_args__ = (
+        # 差分加算の競合キー・期間指定の範囲検索用
+        UniqueConstraint(
+            "salon_id", "bucket_start", "category", "stylist_id",
+            name="uq_trial_activity_hourly_bucket"
+        ),
+    )
+
+    def __repr__(self):
+        return f"<TrialActivityHourly(bucket_start={self.bucket_start}, category={self.category})>"
+
+
+class TrialActivityDaily(TrialActivityFields, BaseModel):
+    """
+    トライアル活動の日単位の集計モデル
+
+    時間単位と同じく差分を加算する。週単位の系列は日単位の行から作成する
+    """
+    __tablename__ = "trial_activity_daily"
+    __table_args__ = (
+        UniqueConstraint(
+            "salon_id", "bucket_start", "category", "stylist_id",
+            name="uq_trial_activity_daily_bucket"
+        ),
+    )
+
+    def __repr__(self):
+        return f"<TrialActivityDaily(bucket_start={self.bucket_start}, category={self.category})>"
@@ -0,0 +1,40 @@
+from typing import Optional
+from sqlalchemy import Float, ForeignKey, Index, Integer
+from sqlalchemy.orm import mapped_column, Mapped
+from .base import BaseModel, TenantMixin
+
+
+class ProductTrialStats(TenantMixin, BaseModel):
+    """
+    商品毎のトライアル集計モデル
+
+    トライアルリクエストの作成・ステータス遷移・フィードバック追加と同じトランザクションで
+    差分を加算する。率・平均は並べ替えに使うため加算時に計算して保存する。
+    定期的な照合ジョブで稼働中のテーブルとアーカイブから集計し直す
+    """
+    __tablename__ = "product_trial_stats"
+    __table_args__ = (
+        # 商品一覧の「評価が高い順」「購入意向が高い順」の並べ替え用
+        Index("ix_product_trial_stats_salon_id_avg_rating", "salon_id", "avg_rating"),
+        Index("ix_product_trial_stats_salon_id_conversion_rate", "salon_id", "conversion_rate"),
+    )
+
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), unique=True, nullable=False)
+
+    # 件数・合計（差分で加算）
+    trial_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    completed_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rating_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # フィードバック件数
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    effectiveness_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    effectiveness_sum: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    purchase_intent_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    # 率・平均（件数が0なら NULL）
+    completion_rate: Mapped[Optional[float]] = mapped_column(Float)  # 完了 / 全リクエスト
+    avg_rating: Mapped[Optional[float]] = mapped_column(Float)
+    avg_effectiveness: Mapped[Optional[float]] = mapped_column(Float)
+    conversion_rate: Mapped[Optional[float]] = mapped_column(Float)  # 購入意向あり / フィードバック
+
+    def __repr__(self):
+        return f"<ProductTrialStats(product_id={self.product_id}, trial_count={self.trial_count})>"
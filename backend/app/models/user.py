@@ -1,9 +1,9 @@
 from enum import Enum
 from typing import Optional, List
 from fastapi_users_db_sqlalchemy import SQLAlchemyBaseUserTable
-from sqlalchemy import String, Boolean, Text, Enum as SQLEnum, Integer
+from sqlalchemy import String, Boolean, Text, Index, Enum as SQLEnum, Integer
 from sqlalchemy.orm import mapped_column, Mapped, relationship
-from .base import BaseModel
+from .base import BaseModel, TenantMixin
 
 
 class UserRole(str, Enum):
@@ -14,9 +14,13 @@ class UserRole(str, Enum):
     CUSTOMER = "customer"    # 顧客
 
 
-class User(SQLAlchemyBaseUserTable[int], BaseModel):
-    """ユーザーモデル"""
+class User(SQLAlchemyBaseUserTable[int], TenantMixin, BaseModel):
+    """ユーザーモデル（メールアドレスでログインするため email は全サロンで一意）"""
     __tablename__ = "users"
+    __table_args__ = (
+        # サロン毎のロール別一覧用
+        Index("ix_users_salon_id_role", "salon_id", "role"),
+    )
     
     # 基本情報（emailとhashed_passwordはSQLAlchemyBaseUserTableで提供）
     username: Mapped[Optional[str]] = mapped_column(String(100), unique=True, index=True)
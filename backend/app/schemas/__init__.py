@@ -6,14 +6,17 @@ from .user import (
 from .product import (
     ProductBase, ProductCreate, ProductUpdate, ProductResponse,
     ProductListItem, ProductStockUpdate, ProductStatusUpdate,
-    ProductFilter, ProductSearchQuery
+    ProductFilter, ProductSearchQuery, ProductImportRow, ProductImportError,
+    ProductImportResult
 )
 from .trial_request import (
     TrialRequestBase, TrialRequestCreate, TrialRequestUpdate,
     TrialRequestStaffUpdate, TrialRequestStatusUpdate, TrialRequestFeedback,
     TrialRequestResponse, TrialRequestListItem, TrialRequestWithDetails,
-    TrialRequestFilter, TrialRequestSearchQuery
+    TrialRequestFilter, TrialRequestSearchQuery, TrialRequestBulkAction,
+    BulkActionOutcome, TrialRequestBulkItemResult, TrialRequestBulkResult
 )
+from .event import OutboxEventCreate, OutboxEventResponse, EventFeedResponse
 
 # 共通レスポンススキーマ
 from .common import PaginatedResponse, SuccessResponse, ErrorResponse
@@ -26,13 +29,18 @@ __all__ = [
     # Product schemas  
     "ProductBase", "ProductCreate", "ProductUpdate", "ProductResponse",
     "ProductListItem", "ProductStockUpdate", "ProductStatusUpdate",
-    "ProductFilter", "ProductSearchQuery",
+    "ProductFilter", "ProductSearchQuery", "ProductImportRow", "ProductImportError",
+    "ProductImportResult",
     
     # Trial request schemas
     "TrialRequestBase", "TrialRequestCreate", "TrialRequestUpdate",
     "TrialRequestStaffUpdate", "TrialRequestStatusUpdate", "TrialRequestFeedback", 
     "TrialRequestResponse", "TrialRequestListItem", "TrialRequestWithDetails",
-    "TrialRequestFilter", "TrialRequestSearchQuery",
+    "TrialRequestFilter", "TrialRequestSearchQuery", "TrialRequestBulkAction",
+    "BulkActionOutcome", "TrialRequestBulkItemResult", "TrialRequestBulkResult",
+    
+    # Event schemas
+    "OutboxEventCreate", "OutboxEventResponse", "EventFeedResponse",
     
     # Common schemas
     "PaginatedResponse", "SuccessResponse", "ErrorResponse"
@@ -0,0 +1,35 @@
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+
+class OutboxEventCreate(BaseModel):
+    """変更イベント作成スキーマ"""
+    event_type: str = Field(..., max_length=100, description="イベント種別")
+    aggregate_type: str = Field(..., max_length=50, description="集約種別")
+    aggregate_id: Optional[int] = Field(None, description="集約ID")
+    payload: Optional[dict] = Field(None, description="イベント内容")
+
+
+class OutboxEventResponse(BaseModel):
+    """変更イベントレスポンススキーマ"""
+    id: int
+    salon_id: int
+    event_type: str
+    aggregate_type: str
+    aggregate_id: Optional[int]
+    payload: Optional[dict]
+    created_at: datetime
+    seq: Optional[int] = Field(
+        None, validation_alias="dispatched_seq", description="配信順の連番（フィード・SSEのカーソル）"
+    )
+    
+    class Config:
+        from_attributes = True
+
+
+class EventFeedResponse(BaseModel):
+    """変更イベントフィードレスポンス"""
+    items: List[OutboxEventResponse]
+    next_cursor: int = Field(..., description="次回取得時に after に指定するカーソル（配信順の連番）")
+    has_more: bool = Field(..., description="続きのイベントがあるか")
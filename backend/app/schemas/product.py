@@ -1,7 +1,10 @@
-from typing import Optional, List
+from enum import Enum
+from typing import Dict, Optional, List
+from datetime import date, datetime
 from decimal import Decimal
 from pydantic import BaseModel, Field, validator
 from ..models.product import ProductCategory, ProductStatus
+from ..models.stock import StockMovementKind
 
 
 class ProductBase(BaseModel):
@@ -38,6 +41,13 @@ class ProductCreate(ProductBase):
         return v
 
 
+class ProductImportRow(ProductCreate):
+    """商品一括インポート行スキーマ"""
+    slug: Optional[str] = Field(None, max_length=200, description="スラッグ（未指定時は自動生成）")
+    image_urls: Optional[List[str]] = None
+    thumbnail_url: Optional[str] = Field(None, max_length=500)
+
+
 class ProductUpdate(BaseModel):
     """商品更新スキーマ"""
     name: Optional[str] = Field(None, min_length=1, max_length=200)
@@ -67,6 +77,7 @@ class ProductUpdate(BaseModel):
 class ProductResponse(ProductBase):
     """商品レスポンススキーマ"""
     id: int
+    salon_id: int
     slug: Optional[str]
     stock_quantity: int
     min_stock_level: int
@@ -100,6 +111,92 @@ class ProductListItem(BaseModel):
         from_attributes = True
 
 
+class ProductSort(str, Enum):
+    """商品一覧の並び順（トライアル集計の値が大きい順）"""
+    BEST_RATED = "best_rated"                  # 平均評価
+    HIGHEST_CONVERSION = "highest_conversion"  # 購入意向率
+    HIGHEST_COMPLETION = "highest_completion"  # 完了率
+    MOST_TRIALED = "most_trialed"              # トライアル件数
+
+
+class ProductTrialStatsResponse(BaseModel):
+    """商品のトライアル集計レスポンススキーマ"""
+    product_id: int
+    trial_count: int = 0
+    completed_count: int = 0
+    rating_count: int = Field(0, description="フィードバック件数")
+    effectiveness_count: int = 0
+    purchase_intent_count: int = 0
+    completion_rate: Optional[float] = Field(None, description="完了 / 全リクエスト")
+    avg_rating: Optional[float] = None
+    avg_effectiveness: Optional[float] = None
+    conversion_rate: Optional[float] = Field(None, description="購入意向あり / フィードバック")
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class ReorderSuggestion(BaseModel):
+    """発注提案（需要予測ジョブの結果）"""
+    product_id: int
+    name: str
+    stock_quantity: int = Field(..., description="現在の在庫数")
+    min_stock_level: int = Field(..., description="設定されている最低在庫レベル")
+    suggested_min_stock_level: int = Field(..., description="推奨最低在庫数（リードタイムの需要 + 安全在庫）")
+    needs_reorder: bool = Field(..., description="現在の在庫数が推奨最低在庫数以下")
+    daily_demand: float = Field(..., description="予測日需要（予測期間の平均）")
+    demand_stddev: float
+    projected_stockout_date: Optional[date] = Field(None, description="在庫切れ予測日（予測期間内に切れなければ None）")
+    model: str
+    generated_at: datetime
+
+
+class ProductAvailabilityResponse(BaseModel):
+    """商品の引当可能数"""
+    product_id: int
+    stock_quantity: int = Field(..., description="在庫数")
+    reserved_quantity: int = Field(..., description="承認済み・実施中のトライアルの引当数")
+    available_quantity: int = Field(..., description="在庫数 - 引当数（引当が在庫を超えていれば負）")
+
+
+class StockMovementResponse(BaseModel):
+    """在庫移動台帳の行"""
+    id: int
+    trial_request_id: Optional[int] = Field(None, description="圧縮された行は None")
+    kind: StockMovementKind
+    quantity: int = Field(..., description="引当数の増減（引当は正、解除は負）")
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class ProductImageUploadResponse(BaseModel):
+    """商品画像のアップロード結果"""
+    digest: str = Field(..., description="画像のSHA-256（同じ画像は同じURL）")
+    variants: Dict[str, Dict[str, str]] = Field(
+        ..., description="サイズ（thumb / card / full）毎・形式（webp / jpeg）毎のURL"
+    )
+    created: bool = Field(..., description="変換したか（同じ画像が保存済みなら False）")
+    product: ProductResponse
+
+
+class ProductImportError(BaseModel):
+    """インポート行エラー"""
+    row: int = Field(..., description="行番号（CSVはヘッダーを1行目とする）")
+    errors: List[str]
+
+
+class ProductImportResult(BaseModel):
+    """一括インポート結果"""
+    total_rows: int = Field(..., description="処理した行数")
+    created: int = Field(..., description="新規作成件数")
+    updated: int = Field(..., description="更新件数")
+    failed: int = Field(..., description="エラー件数")
+    errors: List[ProductImportError] = []
+
+
 class ProductStockUpdate(BaseModel):
     """在庫更新スキーマ"""
     stock_quantity: int = Field(..., ge=0)
@@ -1,7 +1,9 @@
-from typing import Optional
+from enum import Enum
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 from pydantic import BaseModel, Field, validator
+from ..models.product import ProductCategory
 from ..models.trial_request import TrialStatus
 
 
@@ -55,6 +57,33 @@ class TrialRequestStatusUpdate(BaseModel):
         return v
 
 
+class TrialRequestBulkAction(BaseModel):
+    """一括ステータス更新スキーマ（スタッフ用）"""
+    ids: List[int] = Field(..., min_length=1, max_length=1000, description="トライアルリクエストID一覧")
+    staff_notes: Optional[str] = Field(None, max_length=1000, description="スタッフメモ（全件に設定）")
+
+
+class BulkActionOutcome(str, Enum):
+    """一括更新の結果"""
+    APPLIED = "applied"      # 更新済み
+    CONFLICT = "conflict"    # 想定外のステータスのため未更新
+    NOT_FOUND = "not_found"  # 存在しない
+
+
+class TrialRequestBulkItemResult(BaseModel):
+    """一括更新の個別結果"""
+    id: int
+    outcome: BulkActionOutcome
+
+
+class TrialRequestBulkResult(BaseModel):
+    """一括更新結果"""
+    applied: int = Field(..., description="更新件数")
+    conflict: int = Field(..., description="ステータス不一致件数")
+    not_found: int = Field(..., description="存在しなかった件数")
+    results: List[TrialRequestBulkItemResult]
+
+
 class TrialRequestFeedback(BaseModel):
     """フィードバック・評価スキーマ"""
     customer_rating: int = Field(..., ge=1, le=5, description="総合評価（1-5）")
@@ -66,6 +95,7 @@ class TrialRequestFeedback(BaseModel):
 class TrialRequestResponse(TrialRequestBase):
     """トライアルリクエストレスポンススキーマ"""
     id: int
+    salon_id: int
     customer_id: int
     status: TrialStatus
     unit_price: Decimal
@@ -75,6 +105,7 @@ class TrialRequestResponse(TrialRequestBase):
     # 日程情報
     actual_start_date: Optional[datetime]
     completion_date: Optional[datetime]
+    due_date: Optional[datetime] = None
     
     # 承認情報
     approved_by: Optional[int]
@@ -150,4 +181,73 @@ class TrialRequestSearchQuery(BaseModel):
     customer_email: Optional[str] = Field(None, description="顧客メールアドレス")
     product_name: Optional[str] = Field(None, description="商品名（部分一致）")
     page: int = Field(1, ge=1)
-    size: int = Field(20, ge=1, le=100)
\ No newline at end of file
+    size: int = Field(20, ge=1, le=100)
+
+# 時系列集計用スキーマ
+class TimeseriesInterval(str, Enum):
+    """時系列のバケットの間隔"""
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"  # 月曜始まり
+
+
+class TimeseriesDimension(str, Enum):
+    """時系列を分ける軸"""
+    CATEGORY = "category"
+    STYLIST = "stylist"
+
+
+class TrialTimeseriesPoint(BaseModel):
+    """時系列の1バケット"""
+    bucket_start: datetime = Field(..., description="バケットの開始日時（UTC）")
+    requests: int = Field(..., description="リクエスト作成件数")
+    approvals: int = Field(..., description="承認件数")
+    handled: int = Field(..., description="担当件数（開始、開始せずに完了したものは完了日時）")
+    completions: int = Field(..., description="完了件数")
+    conversions: int = Field(..., description="購入意向あり件数（完了日時で集計）")
+
+
+class TrialTimeseriesSeries(BaseModel):
+    """軸の値毎の系列（軸で分けない場合は None）"""
+    category: Optional[ProductCategory] = None
+    stylist_id: Optional[int] = Field(None, description="スタイリストID（0は未割当）")
+    points: List[TrialTimeseriesPoint]
+
+
+class TrialTimeseriesResponse(BaseModel):
+    """トライアル活動の時系列"""
+    interval: TimeseriesInterval
+    start: datetime
+    end: datetime
+    group_by: List[TimeseriesDimension]
+    series: List[TrialTimeseriesSeries]
+
+
+class LeaderboardSort(str, Enum):
+    """スタイリスト別成績の並べ替え"""
+    HANDLED = "handled"                  # 担当件数が多い順
+    APPROVAL_TIME = "approval_time"      # 承認までの平均時間が短い順
+    COMPLETION_RATE = "completion_rate"  # 完了率が高い順
+    CONVERSION_RATE = "conversion_rate"  # 購入意向率が高い順
+
+
+class StylistLeaderboardEntry(BaseModel):
+    """スタイリスト別成績の1行"""
+    rank: int
+    stylist_id: int
+    name: Optional[str] = Field(None, description="氏名（未登録ならユーザー名）")
+    handled: int = Field(..., description="担当件数")
+    approvals: int = Field(..., description="承認件数")
+    avg_approval_seconds: Optional[float] = Field(None, description="作成から承認までの平均秒数")
+    completions: int = Field(..., description="完了件数")
+    completion_rate: Optional[float] = Field(None, description="完了 / 担当")
+    conversions: int = Field(..., description="購入意向あり件数")
+    conversion_rate: Optional[float] = Field(None, description="購入意向あり / 完了")
+
+
+class StylistLeaderboardResponse(BaseModel):
+    """スタイリスト別成績のランキング"""
+    start: datetime
+    end: datetime
+    sort: LeaderboardSort
+    entries: List[StylistLeaderboardEntry]
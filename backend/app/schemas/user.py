@@ -62,6 +62,7 @@ class UserUpdate(schemas.BaseUserUpdate):
 class UserResponse(UserBase):
     """ユーザーレスポンススキーマ"""
     id: int
+    salon_id: int
     role: UserRole
     is_active: bool
     is_verified: bool
@@ -1,18 +1,46 @@
+# 起動時間の計測（他のモジュールより先にインポート）
+from app.core.startup import FirstRequestMiddleware, startup_profile
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
-from app.api.v1 import api_router
+from app.api.v1 import include_api_routers
 from app.auth.config import fastapi_users, auth_backend
+from app.core.events import broker, dispatcher
+from app.core.health import loop_lag_monitor
+from app.core.images import image_processor
+from app.core.database import replicas
+from app.core.replicas import ReadYourWritesMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.response_cache import ResponseCacheMiddleware, cache_invalidator
+from app.core.scheduler import scheduler
 from app.db.database import create_db_and_tables
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 起動時
-    await create_db_and_tables()
+    # 本番環境のスキーマはAlembicで管理するため、テーブル作成（全テーブルの確認）は行わない
+    if not settings.is_production:
+        await create_db_and_tables()
+    loop_lag_monitor.start()
+    replicas.start()
+    await broker.start()
+    dispatcher.start()
+    await cache_invalidator.start()
+    if settings.SCHEDULER_ENABLED:
+        scheduler.start()
+    startup_profile.mark("lifespan")
     yield
     # 終了時
+    await scheduler.stop()
+    await cache_invalidator.stop()
+    await dispatcher.stop()
+    await broker.stop()
+    await replicas.stop()
+    await loop_lag_monitor.stop()
+    await image_processor.stop()
 
 
 app = FastAPI(
@@ -25,6 +53,14 @@ app = FastAPI(
     redoc_url="/api/v1/redoc"
 )
 
+# レスポンス圧縮（キャッシュには圧縮済みのボディを保存するためキャッシュより内側）
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# レスポンスキャッシュ（CORSヘッダーを保存しないようCORSより内側）
+if settings.RESPONSE_CACHE_ENABLED:
+    app.add_middleware(ResponseCacheMiddleware)
+
 # CORS設定
 app.add_middleware(
     CORSMiddleware,
@@ -34,6 +70,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 書き込んだクライアントの読み取りを一定時間プライマリに固定（レプリカ利用時のみ）
+if settings.DATABASE_REPLICA_URLS:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# 最初のリクエストまでの時間を記録（最も外側）
+app.add_middleware(FirstRequestMiddleware)
+
 # 認証ルーター
 app.include_router(
     fastapi_users.get_auth_router(auth_backend), 
@@ -57,7 +100,11 @@ app.include_router(
 )
 
 # APIルーターを登録
-app.include_router(api_router, prefix=settings.API_V1_STR)
+include_api_routers(app, settings.API_V1_STR)
+
+# アップロードした画像の配信（本番では本体を nginx が配信する）
+from app.api.media import router as media_router
+app.include_router(media_router, prefix=settings.MEDIA_URL.rstrip("/"), tags=["media"])
 
 @app.get("/")
 async def root():
@@ -70,19 +117,15 @@ async def root():
 
 @app.get("/api/v1/health")
 async def health_check():
-    """詳細ヘルスチェック"""
+    """詳細ヘルスチェック（監視には /api/v1/health/live・/api/v1/health/ready を使用）"""
     return {
         "status": "healthy",
         "service": "aura-select-api",
         "version": "1.0.0"
     }
 
+startup_profile.mark("imports")
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        reload_dirs=["app"]
-    )
\ No newline at end of file
+    from app.core.server import run
+    run()
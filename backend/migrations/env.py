@@ -19,7 +19,7 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from app.models.base import Base
-from app.models import user, product, trial_request
+from app.models import user, product, trial_request, outbox, scheduler, idempotency
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -0,0 +1,45 @@
+"""Add outbox_events table
+
+Revision ID: 3b9f2c7d41a0
+Revises: 726935b53fdf
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9f2c7d41a0'
+down_revision: Union[str, None] = '726935b53fdf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('outbox_events',
+    sa.Column('event_type', sa.String(length=100), nullable=False),
+    sa.Column('aggregate_type', sa.String(length=50), nullable=False),
+    sa.Column('aggregate_id', sa.Integer(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('dispatched_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_outbox_events_id'), 'outbox_events', ['id'], unique=False)
+    # 未配信イベントのみを対象とする部分インデックス
+    op.create_index(
+        'ix_outbox_events_undispatched', 'outbox_events', ['id'], unique=False,
+        postgresql_where=sa.text('dispatched_at IS NULL'),
+        sqlite_where=sa.text('dispatched_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_events_undispatched', table_name='outbox_events')
+    op.drop_index(op.f('ix_outbox_events_id'), table_name='outbox_events')
+    op.drop_table('outbox_events')
@@ -0,0 +1,62 @@
+"""Add trial due_date and scheduler_leases table
+
+Revision ID: 8c1e5a9f3d27
+Revises: 3b9f2c7d41a0
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1e5a9f3d27'
+down_revision: Union[str, None] = '3b9f2c7d41a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _due_date_sql(dialect: str, start: str) -> str:
+    if dialect == 'postgresql':
+        return f"{start} + make_interval(days => trial_duration_days)"
+    return f"strftime('%Y-%m-%d %H:%M:%f000', {start}, '+' || trial_duration_days || ' days')"
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('trial_requests') as batch_op:
+        batch_op.add_column(sa.Column('due_date', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index('ix_trial_requests_status_due_date', ['status', 'due_date'], unique=False)
+    
+    # 既存の承認済み・実施中のリクエストに期限を設定
+    dialect = op.get_bind().dialect.name
+    op.execute(
+        f"UPDATE trial_requests SET due_date = {_due_date_sql(dialect, 'actual_start_date')} "
+        "WHERE status = 'IN_PROGRESS' AND actual_start_date IS NOT NULL"
+    )
+    op.execute(
+        f"UPDATE trial_requests SET due_date = "
+        f"{_due_date_sql(dialect, 'COALESCE(preferred_start_date, approved_at, created_at)')} "
+        "WHERE status = 'APPROVED'"
+    )
+    
+    op.create_table('scheduler_leases',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('holder', sa.String(length=200), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_scheduler_leases_id'), 'scheduler_leases', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_scheduler_leases_id'), table_name='scheduler_leases')
+    op.drop_table('scheduler_leases')
+    with op.batch_alter_table('trial_requests') as batch_op:
+        batch_op.drop_index('ix_trial_requests_status_due_date')
+        batch_op.drop_column('due_date')
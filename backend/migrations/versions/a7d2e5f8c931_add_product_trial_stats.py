@@ -0,0 +1,54 @@
+"""Add product_trial_stats table
+
+Revision ID: a7d2e5f8c931
+Revises: f3a9c4d7e218
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d2e5f8c931'
+down_revision: Union[str, None] = 'f3a9c4d7e218'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 既存データの集計は照合ジョブ（スケジューラのリーダーが起動直後に実行）で作成する
+    op.create_table('product_trial_stats',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('trial_count', sa.Integer(), nullable=False),
+    sa.Column('completed_count', sa.Integer(), nullable=False),
+    sa.Column('rating_count', sa.Integer(), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    sa.Column('effectiveness_count', sa.Integer(), nullable=False),
+    sa.Column('effectiveness_sum', sa.Integer(), nullable=False),
+    sa.Column('purchase_intent_count', sa.Integer(), nullable=False),
+    sa.Column('completion_rate', sa.Float(), nullable=True),
+    sa.Column('avg_rating', sa.Float(), nullable=True),
+    sa.Column('avg_effectiveness', sa.Float(), nullable=True),
+    sa.Column('conversion_rate', sa.Float(), nullable=True),
+    sa.Column('salon_id', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(['salon_id'], ['salons.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('product_id')
+    )
+    op.create_index(op.f('ix_product_trial_stats_id'), 'product_trial_stats', ['id'], unique=False)
+    op.create_index('ix_product_trial_stats_salon_id_avg_rating', 'product_trial_stats', ['salon_id', 'avg_rating'], unique=False)
+    op.create_index('ix_product_trial_stats_salon_id_conversion_rate', 'product_trial_stats', ['salon_id', 'conversion_rate'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_trial_stats_salon_id_conversion_rate', table_name='product_trial_stats')
+    op.drop_index('ix_product_trial_stats_salon_id_avg_rating', table_name='product_trial_stats')
+    op.drop_index(op.f('ix_product_trial_stats_id'), table_name='product_trial_stats')
+    op.drop_table('product_trial_stats')
@@ -0,0 +1,32 @@
+"""Add dispatched_seq to outbox_events
+
+Revision ID: a7d3e9c1f402
+Revises: e2c8a4f7b153
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e9c1f402'
+down_revision: Union[str, None] = 'e2c8a4f7b153'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('outbox_events') as batch_op:
+        batch_op.add_column(sa.Column('dispatched_seq', sa.BigInteger(), nullable=True))
+    # 配信済みのイベントは id を連番にする（クライアントが保持している id のカーソルをそのまま使える）
+    op.execute("UPDATE outbox_events SET dispatched_seq = id WHERE dispatched_at IS NOT NULL")
+    op.create_index('ix_outbox_events_dispatched_seq', 'outbox_events', ['dispatched_seq'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_events_dispatched_seq', table_name='outbox_events')
+    with op.batch_alter_table('outbox_events') as batch_op:
+        batch_op.drop_column('dispatched_seq')
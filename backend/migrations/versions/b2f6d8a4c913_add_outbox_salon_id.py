@@ -0,0 +1,55 @@
+"""Add salon_id to outbox_events
+
+Revision ID: b2f6d8a4c913
+Revises: a7d3e9c1f402
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2f6d8a4c913'
+down_revision: Union[str, None] = 'a7d3e9c1f402'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 既存データの所属先（app.models.base.DEFAULT_SALON_ID）
+DEFAULT_SALON_ID = 1
+
+# 集約種別毎の発生元のテーブル
+AGGREGATE_TABLES = (
+    ('trial_request', 'trial_requests'),
+    ('trial_request', 'trial_requests_archive'),
+    ('product', 'products'),
+)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('outbox_events') as batch_op:
+        batch_op.add_column(
+            sa.Column('salon_id', sa.Integer(), nullable=False, server_default=str(DEFAULT_SALON_ID))
+        )
+        batch_op.create_foreign_key('fk_outbox_events_salon_id_salons', 'salons', ['salon_id'], ['id'])
+        batch_op.create_index(
+            'ix_outbox_events_salon_id_dispatched_seq', ['salon_id', 'dispatched_seq'], unique=False
+        )
+
+    # 既存のイベントは発生元の集約のサロンに所属させる（一括取込のイベントは既定のサロン）
+    for aggregate_type, table in AGGREGATE_TABLES:
+        op.execute(
+            f"UPDATE outbox_events SET salon_id = ("
+            f"SELECT {table}.salon_id FROM {table} WHERE {table}.id = outbox_events.aggregate_id"
+            f") WHERE aggregate_type = '{aggregate_type}' AND EXISTS ("
+            f"SELECT 1 FROM {table} WHERE {table}.id = outbox_events.aggregate_id)"
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('outbox_events') as batch_op:
+        batch_op.drop_index('ix_outbox_events_salon_id_dispatched_seq')
+        batch_op.drop_constraint('fk_outbox_events_salon_id_salons', type_='foreignkey')
+        batch_op.drop_column('salon_id')
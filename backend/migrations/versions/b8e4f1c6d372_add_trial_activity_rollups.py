@@ -0,0 +1,54 @@
+"""Add trial_activity_hourly and trial_activity_daily tables
+
+Revision ID: b8e4f1c6d372
+Revises: a7d2e5f8c931
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4f1c6d372'
+down_revision: Union[str, None] = 'a7d2e5f8c931'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('trial_activity_hourly', 'trial_activity_daily')
+
+
+def upgrade() -> None:
+    # 既存データの集計は圧縮ジョブの初回実行（日単位の集計が空なら全期間）で作成する
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+    for table_name in TABLES:
+        category_type = (
+            postgresql.ENUM(name='productcategory', create_type=False) if is_postgresql
+            else sa.Enum('SHAMPOO', 'CONDITIONER', 'TREATMENT', 'STYLING', 'COLOR', 'SKINCARE', 'TOOLS', 'ACCESSORIES', 'OTHER', name='productcategory')
+        )
+        op.create_table(table_name,
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('category', category_type, nullable=False),
+        sa.Column('stylist_id', sa.Integer(), nullable=False),
+        sa.Column('requests', sa.Integer(), nullable=False),
+        sa.Column('approvals', sa.Integer(), nullable=False),
+        sa.Column('completions', sa.Integer(), nullable=False),
+        sa.Column('conversions', sa.Integer(), nullable=False),
+        sa.Column('salon_id', sa.Integer(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['salon_id'], ['salons.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('salon_id', 'bucket_start', 'category', 'stylist_id', name=f'uq_{table_name}_bucket')
+        )
+        op.create_index(op.f(f'ix_{table_name}_id'), table_name, ['id'], unique=False)
+
+
+def downgrade() -> None:
+    for table_name in reversed(TABLES):
+        op.drop_index(op.f(f'ix_{table_name}_id'), table_name=table_name)
+        op.drop_table(table_name)
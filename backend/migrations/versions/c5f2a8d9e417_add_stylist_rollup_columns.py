@@ -0,0 +1,38 @@
+"""Add handled and approval_seconds to trial activity rollups
+
+Revision ID: c5f2a8d9e417
+Revises: b8e4f1c6d372
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f2a8d9e417'
+down_revision: Union[str, None] = 'b8e4f1c6d372'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('trial_activity_hourly', 'trial_activity_daily')
+
+
+def upgrade() -> None:
+    # 既存の行は新しい列の値を持たないため空にし、圧縮ジョブの初回実行（日単位の集計が
+    # 空なら全期間）で作り直す
+    for table_name in TABLES:
+        op.execute(sa.text(f'DELETE FROM {table_name}'))
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('approval_seconds', sa.BigInteger(), nullable=False))
+            batch_op.add_column(sa.Column('handled', sa.Integer(), nullable=False))
+
+
+def downgrade() -> None:
+    for table_name in reversed(TABLES):
+        op.execute(sa.text(f'DELETE FROM {table_name}'))
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_column('handled')
+            batch_op.drop_column('approval_seconds')
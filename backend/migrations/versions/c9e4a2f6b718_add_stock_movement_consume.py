@@ -0,0 +1,30 @@
+"""Add CONSUME to stockmovementkind
+
+Revision ID: c9e4a2f6b718
+Revises: b2f6d8a4c913
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e4a2f6b718'
+down_revision: Union[str, None] = 'b2f6d8a4c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite の Enum は VARCHAR のため変更は不要
+    if op.get_bind().dialect.name == 'postgresql':
+        # ALTER TYPE ... ADD VALUE はトランザクション外で実行する
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE stockmovementkind ADD VALUE IF NOT EXISTS 'CONSUME'")
+
+
+def downgrade() -> None:
+    # PostgreSQL は Enum の値を削除できないため、消費の移動を解除に戻すのみ（減らした在庫数は戻さない）
+    op.execute("UPDATE stock_movements SET kind = 'RELEASE' WHERE kind = 'CONSUME'")
@@ -0,0 +1,49 @@
+"""Add product_demand_forecasts table
+
+Revision ID: d1b7e3a5f926
+Revises: c5f2a8d9e417
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1b7e3a5f926'
+down_revision: Union[str, None] = 'c5f2a8d9e417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 予測は需要予測ジョブ（スケジューラのリーダーが起動直後に実行）で作成する
+    op.create_table('product_demand_forecasts',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('daily_demand', sa.Float(), nullable=False),
+    sa.Column('demand_stddev', sa.Float(), nullable=False),
+    sa.Column('suggested_min_stock_level', sa.Integer(), nullable=False),
+    sa.Column('projected_stockout_date', sa.Date(), nullable=True),
+    sa.Column('stock_quantity', sa.Integer(), nullable=False),
+    sa.Column('model', sa.String(length=20), nullable=False),
+    sa.Column('alpha', sa.Float(), nullable=False),
+    sa.Column('generated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('salon_id', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['salon_id'], ['salons.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('product_id')
+    )
+    op.create_index(op.f('ix_product_demand_forecasts_id'), 'product_demand_forecasts', ['id'], unique=False)
+    op.create_index('ix_product_demand_forecasts_salon_id_stockout', 'product_demand_forecasts', ['salon_id', 'projected_stockout_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_demand_forecasts_salon_id_stockout', table_name='product_demand_forecasts')
+    op.drop_index(op.f('ix_product_demand_forecasts_id'), table_name='product_demand_forecasts')
+    op.drop_table('product_demand_forecasts')
@@ -0,0 +1,74 @@
+"""Add stock_movements and product_stock_counters tables
+
+Revision ID: e2c8a4f7b153
+Revises: d1b7e3a5f926
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2c8a4f7b153'
+down_revision: Union[str, None] = 'd1b7e3a5f926'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# app.crud.stock.COUNTER_SHARDS
+COUNTER_SHARDS = 8
+
+
+def upgrade() -> None:
+    op.create_table('stock_movements',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('trial_request_id', sa.Integer(), nullable=True),
+    sa.Column('kind', sa.Enum('RESERVE', 'RELEASE', 'COMPACTED', name='stockmovementkind'), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('salon_id', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['salon_id'], ['salons.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stock_movements_id'), 'stock_movements', ['id'], unique=False)
+    op.create_index('ix_stock_movements_product_id_created_at', 'stock_movements', ['product_id', 'created_at'], unique=False)
+    op.create_table('product_stock_counters',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('reserved', sa.Integer(), nullable=False),
+    sa.Column('salon_id', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['salon_id'], ['salons.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('product_id', 'shard', name='uq_product_stock_counters_shard')
+    )
+    op.create_index(op.f('ix_product_stock_counters_id'), 'product_stock_counters', ['id'], unique=False)
+
+    # 承認済み・実施中のトライアルを引当として記録する
+    op.execute(
+        "INSERT INTO stock_movements (salon_id, product_id, trial_request_id, kind, quantity) "
+        "SELECT salon_id, product_id, id, 'RESERVE', quantity FROM trial_requests "
+        "WHERE status IN ('APPROVED', 'IN_PROGRESS')"
+    )
+    op.execute(
+        "INSERT INTO product_stock_counters (salon_id, product_id, shard, reserved) "
+        f"SELECT salon_id, product_id, trial_request_id % {COUNTER_SHARDS}, SUM(quantity) "
+        "FROM stock_movements "
+        f"GROUP BY salon_id, product_id, trial_request_id % {COUNTER_SHARDS}"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_product_stock_counters_id'), table_name='product_stock_counters')
+    op.drop_table('product_stock_counters')
+    op.drop_index('ix_stock_movements_product_id_created_at', table_name='stock_movements')
+    op.drop_index(op.f('ix_stock_movements_id'), table_name='stock_movements')
+    op.drop_table('stock_movements')
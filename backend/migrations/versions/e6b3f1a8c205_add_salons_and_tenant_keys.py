@@ -0,0 +1,166 @@
+"""Add salons and tenant keys (salon_id)
+
+Revision ID: e6b3f1a8c205
+Revises: d4a7b2e9c510
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b3f1a8c205'
+down_revision: Union[str, None] = 'd4a7b2e9c510'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 既存データの所属先（app.models.base.DEFAULT_SALON_ID）
+DEFAULT_SALON_ID = 1
+
+# PostgreSQLの trial_requests のハッシュパーティション数
+TRIAL_REQUEST_PARTITIONS = 8
+
+TRIAL_REQUEST_INDEXES = (
+    ('ix_trial_requests_salon_id_status_due_date', ['salon_id', 'status', 'due_date']),
+    ('ix_trial_requests_salon_id_status_created_at', ['salon_id', 'status', 'created_at']),
+    ('ix_trial_requests_salon_id_customer_id_created_at', ['salon_id', 'customer_id', 'created_at']),
+    ('ix_trial_requests_salon_id_product_id_created_at', ['salon_id', 'product_id', 'created_at']),
+)
+
+TRIAL_REQUEST_FOREIGN_KEYS = (
+    ('customer_id', 'users'),
+    ('product_id', 'products'),
+    ('approved_by', 'users'),
+    ('processed_by', 'users'),
+)
+
+
+def _salon_column() -> sa.Column:
+    return sa.Column('salon_id', sa.Integer(), nullable=False, server_default=str(DEFAULT_SALON_ID))
+
+
+def _partition_trial_requests() -> None:
+    """trial_requests を salon_id のハッシュで分割したテーブルに作り直す（PostgreSQL）"""
+    op.execute("ALTER TABLE trial_requests RENAME TO trial_requests_unpartitioned")
+    op.execute(
+        "CREATE TABLE trial_requests (LIKE trial_requests_unpartitioned INCLUDING DEFAULTS) "
+        "PARTITION BY HASH (salon_id)"
+    )
+    for remainder in range(TRIAL_REQUEST_PARTITIONS):
+        op.execute(
+            f"CREATE TABLE trial_requests_p{remainder} PARTITION OF trial_requests "
+            f"FOR VALUES WITH (MODULUS {TRIAL_REQUEST_PARTITIONS}, REMAINDER {remainder})"
+        )
+    op.execute("INSERT INTO trial_requests SELECT * FROM trial_requests_unpartitioned")
+    # 旧テーブルの削除で採番シーケンスが削除されないよう所有者を移す
+    op.execute("ALTER SEQUENCE trial_requests_id_seq OWNED BY trial_requests.id")
+    op.execute("DROP TABLE trial_requests_unpartitioned")
+
+    # パーティションテーブルの主キーには分割キーを含める必要がある
+    op.create_primary_key('trial_requests_pkey', 'trial_requests', ['id', 'salon_id'])
+    for column, target in TRIAL_REQUEST_FOREIGN_KEYS:
+        op.create_foreign_key(None, 'trial_requests', target, [column], ['id'])
+
+
+def _unpartition_trial_requests() -> None:
+    op.execute("ALTER TABLE trial_requests RENAME TO trial_requests_partitioned")
+    op.execute("CREATE TABLE trial_requests (LIKE trial_requests_partitioned INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO trial_requests SELECT * FROM trial_requests_partitioned")
+    op.execute("ALTER SEQUENCE trial_requests_id_seq OWNED BY trial_requests.id")
+    op.execute("DROP TABLE trial_requests_partitioned")
+    op.create_primary_key('trial_requests_pkey', 'trial_requests', ['id'])
+    for column, target in TRIAL_REQUEST_FOREIGN_KEYS:
+        op.create_foreign_key(None, 'trial_requests', target, [column], ['id'])
+
+
+def upgrade() -> None:
+    op.create_table('salons',
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('code', sa.String(length=50), nullable=False),
+    sa.Column('is_active', sa.Boolean(), server_default=sa.true(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code')
+    )
+    op.create_index(op.f('ix_salons_id'), 'salons', ['id'], unique=False)
+    op.execute(
+        f"INSERT INTO salons (id, name, code) VALUES ({DEFAULT_SALON_ID}, 'default', 'default')"
+    )
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("SELECT setval(pg_get_serial_sequence('salons', 'id'), (SELECT MAX(id) FROM salons))")
+
+    # 既存データは既定のサロンに所属させる
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(_salon_column())
+        batch_op.create_foreign_key('fk_users_salon_id_salons', 'salons', ['salon_id'], ['id'])
+        batch_op.create_index('ix_users_salon_id_role', ['salon_id', 'role'], unique=False)
+
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.add_column(_salon_column())
+        batch_op.create_foreign_key('fk_products_salon_id_salons', 'salons', ['salon_id'], ['id'])
+        # スラッグはサロン内で一意、単一列のインデックスは salon_id を先頭にした複合インデックスに置き換え
+        batch_op.drop_index('ix_products_slug')
+        batch_op.drop_index('ix_products_name')
+        batch_op.create_index('uq_products_salon_id_slug', ['salon_id', 'slug'], unique=True)
+        batch_op.create_index('ix_products_salon_id_name', ['salon_id', 'name'], unique=False)
+        batch_op.create_index('ix_products_salon_id_status_category', ['salon_id', 'status', 'category'], unique=False)
+        batch_op.create_index('ix_products_salon_id_status_is_featured', ['salon_id', 'status', 'is_featured'], unique=False)
+
+    with op.batch_alter_table('trial_requests') as batch_op:
+        batch_op.add_column(_salon_column())
+        batch_op.drop_index('ix_trial_requests_status_due_date')
+
+    if dialect == 'postgresql':
+        _partition_trial_requests()
+        op.create_index(op.f('ix_trial_requests_id'), 'trial_requests', ['id'], unique=False)
+
+    with op.batch_alter_table('trial_requests') as batch_op:
+        batch_op.create_foreign_key('fk_trial_requests_salon_id_salons', 'salons', ['salon_id'], ['id'])
+        for name, columns in TRIAL_REQUEST_INDEXES:
+            batch_op.create_index(name, columns, unique=False)
+
+    # 既定値は既存データの移行用（以降はアプリケーションが設定する）
+    for table in ('users', 'products', 'trial_requests'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('salon_id', server_default=None)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    with op.batch_alter_table('trial_requests') as batch_op:
+        for name, _ in TRIAL_REQUEST_INDEXES:
+            batch_op.drop_index(name)
+        batch_op.drop_constraint('fk_trial_requests_salon_id_salons', type_='foreignkey')
+
+    if dialect == 'postgresql':
+        _unpartition_trial_requests()
+        op.create_index(op.f('ix_trial_requests_id'), 'trial_requests', ['id'], unique=False)
+
+    with op.batch_alter_table('trial_requests') as batch_op:
+        batch_op.create_index('ix_trial_requests_status_due_date', ['status', 'due_date'], unique=False)
+        batch_op.drop_column('salon_id')
+
+    with op.batch_alter_table('products') as batch_op:
+        batch_op.drop_index('ix_products_salon_id_status_is_featured')
+        batch_op.drop_index('ix_products_salon_id_status_category')
+        batch_op.drop_index('ix_products_salon_id_name')
+        batch_op.drop_index('uq_products_salon_id_slug')
+        batch_op.create_index('ix_products_name', ['name'], unique=False)
+        batch_op.create_index('ix_products_slug', ['slug'], unique=True)
+        batch_op.drop_constraint('fk_products_salon_id_salons', type_='foreignkey')
+        batch_op.drop_column('salon_id')
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_index('ix_users_salon_id_role')
+        batch_op.drop_constraint('fk_users_salon_id_salons', type_='foreignkey')
+        batch_op.drop_column('salon_id')
+
+    op.drop_index(op.f('ix_salons_id'), table_name='salons')
+    op.drop_table('salons')
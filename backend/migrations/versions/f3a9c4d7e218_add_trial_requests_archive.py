@@ -0,0 +1,78 @@
+"""Add trial_requests_archive table
+
+Revision ID: f3a9c4d7e218
+Revises: e6b3f1a8c205
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9c4d7e218'
+down_revision: Union[str, None] = 'e6b3f1a8c205'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    is_postgresql = op.get_bind().dialect.name == 'postgresql'
+    # PostgreSQLでは created_at の月毎にレンジパーティション分割する（月のパーティションは
+    # アーカイブ時に作成）。パーティションテーブルの主キーには分割キーを含める必要がある
+    primary_key = ('id', 'created_at') if is_postgresql else ('id',)
+    status_type = (
+        postgresql.ENUM(name='trialstatus', create_type=False) if is_postgresql
+        else sa.Enum('PENDING', 'APPROVED', 'REJECTED', 'IN_PROGRESS', 'COMPLETED', 'CANCELLED', name='trialstatus')
+    )
+    op.create_table('trial_requests_archive',
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('status', status_type, nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('trial_duration_days', sa.Integer(), nullable=False),
+    sa.Column('unit_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('total_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('reason', sa.Text(), nullable=True),
+    sa.Column('customer_notes', sa.Text(), nullable=True),
+    sa.Column('staff_notes', sa.Text(), nullable=True),
+    sa.Column('preferred_start_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('actual_start_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('completion_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('due_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('approved_by', sa.Integer(), nullable=True),
+    sa.Column('approved_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('processed_by', sa.Integer(), nullable=True),
+    sa.Column('customer_rating', sa.Integer(), nullable=True),
+    sa.Column('customer_review', sa.Text(), nullable=True),
+    sa.Column('effectiveness_rating', sa.Integer(), nullable=True),
+    sa.Column('purchase_intent', sa.Boolean(), nullable=True),
+    sa.Column('additional_data', sa.JSON(), nullable=True),
+    sa.Column('salon_id', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['approved_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['customer_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['processed_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(['salon_id'], ['salons.id'], ),
+    sa.PrimaryKeyConstraint(*primary_key),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.create_index(op.f('ix_trial_requests_archive_id'), 'trial_requests_archive', ['id'], unique=False)
+    op.create_index('ix_trial_requests_archive_salon_id_status_created_at', 'trial_requests_archive', ['salon_id', 'status', 'created_at'], unique=False)
+    op.create_index('ix_trial_requests_archive_salon_id_customer_id_created_at', 'trial_requests_archive', ['salon_id', 'customer_id', 'created_at'], unique=False)
+    op.create_index('ix_trial_requests_archive_salon_id_product_id_created_at', 'trial_requests_archive', ['salon_id', 'product_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_trial_requests_archive_salon_id_product_id_created_at', table_name='trial_requests_archive')
+    op.drop_index('ix_trial_requests_archive_salon_id_customer_id_created_at', table_name='trial_requests_archive')
+    op.drop_index('ix_trial_requests_archive_salon_id_status_created_at', table_name='trial_requests_archive')
+    op.drop_index(op.f('ix_trial_requests_archive_id'), table_name='trial_requests_archive')
+    op.drop_table('trial_requests_archive')
@@ -0,0 +1,126 @@
+"""
+サーバーモード別のスループット計測
+
+開発モード（uvicorn 1プロセス + 自動リロード）と本番モード（gunicorn + uvicornワーカー）を
+順に起動し、同じ負荷をかけて秒間リクエスト数とレイテンシを比較する
+
+    python scripts/bench_server.py --duration 10 --concurrency 64 --path /api/v1/products/featured
+"""
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(mode: str, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "ENVIRONMENT": mode,
+        "SERVER_PORT": str(port),
+        "DEBUG": "false",
+        "SCHEDULER_ENABLED": "false",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.core.server"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/api/v1/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("サーバーが起動しませんでした")
+
+
+async def load(base_url: str, path: str, *, duration: float, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker() -> None:
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+    latencies.sort()
+    return {
+        "requests_per_second": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+async def bench(mode: str, args: argparse.Namespace) -> dict:
+    process = start_server(mode, args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        await wait_ready(base_url)
+        # ウォームアップ
+        await load(base_url, args.path, duration=1, concurrency=args.concurrency)
+        return await load(base_url, args.path, duration=args.duration, concurrency=args.concurrency)
+    finally:
+        stop_server(process)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/api/v1/health")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", nargs="+", default=["development", "production"])
+    args = parser.parse_args()
+
+    results = {mode: asyncio.run(bench(mode, args)) for mode in args.modes}
+    for mode, result in results.items():
+        print(
+            f"{mode:>12}: {result['requests_per_second']:8.1f} req/s  "
+            f"p50 {result['p50_ms']:6.1f} ms  p99 {result['p99_ms']:6.1f} ms  errors {result['errors']}"
+        )
+    if len(results) == 2:
+        development, production = (results[mode]["requests_per_second"] for mode in args.modes)
+        if development:
+            print(f"{'gain':>12}: x{production / development:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+メディア配信用の nginx の location を nginx/nginx.conf に生成
+
+公開パス（MEDIA_URL）はバックエンドに存在確認させ、バックエンドが返す X-Accel-Redirect の
+内部ロケーションから nginx が sendfile で配信する。nginx.conf の目印の行の間を置き換える。
+バックエンドには MEDIA_ACCEL_REDIRECT_PREFIX に同じ内部ロケーションを設定する
+
+    python scripts/generate_nginx_media.py --media-root /var/lib/auraselect/media
+"""
+import argparse
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.core.config import settings
+from app.core.media import render_nginx_locations, replace_nginx_locations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--conf", default=os.path.join(BACKEND_DIR, os.pardir, "nginx", "nginx.conf"),
+        help="書き換える nginx.conf"
+    )
+    parser.add_argument("--media-url", default=settings.MEDIA_URL, help="公開パス")
+    parser.add_argument(
+        "--accel-prefix", default=settings.MEDIA_ACCEL_REDIRECT_PREFIX or "/_media/",
+        help="X-Accel-Redirect の内部ロケーション"
+    )
+    parser.add_argument(
+        "--media-root", default="/var/lib/auraselect/media", help="nginx コンテナ内のメディアの保存先"
+    )
+    parser.add_argument("--stdout", action="store_true", help="書き換えずに生成した location を表示")
+    args = parser.parse_args()
+
+    block = render_nginx_locations(
+        media_url=args.media_url, accel_prefix=args.accel_prefix, media_root=args.media_root
+    )
+    if args.stdout:
+        sys.stdout.write(block)
+        return
+    with open(args.conf, encoding="utf-8") as file:
+        conf = file.read()
+    with open(args.conf, "w", encoding="utf-8") as file:
+        file.write(replace_nginx_locations(conf, block))
+    print(f"{args.conf} を更新しました")
+
+
+if __name__ == "__main__":
+    main()
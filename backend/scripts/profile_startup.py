@@ -0,0 +1,115 @@
+"""
+起動時間のプロファイル
+
+1. python -X importtime で main のインポートを計測し、モジュール・パッケージ毎の
+   インポート時間（自身の時間）が大きいものを表示する
+2. サーバーを起動し、最初のリクエストが成功するまでの時間と
+   /api/v1/metrics/ の起動フェーズ（インポート・lifespan・最初のリクエスト）を表示する
+
+    python scripts/profile_startup.py --top 20 --mode production
+"""
+import argparse
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import List, Tuple
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times() -> List[Tuple[str, int, int]]:
+    """(モジュール名, 自身の時間[us], 累積時間[us]) の一覧"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "DEBUG": "false"},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            times.append((name, int(self_us), int(cumulative_us)))
+    return times
+
+
+def report_imports(top: int) -> None:
+    times = import_times()
+    total = next((cumulative for name, _, cumulative in times if name == "main"), 0)
+    print(f"main のインポート: {total / 1000:.0f} ms\n")
+
+    print(f"自身の時間が大きいモジュール（上位{top}）")
+    for name, self_us, cumulative_us in sorted(times, key=lambda t: t[1], reverse=True)[:top]:
+        print(f"  {self_us / 1000:8.1f} ms  (累積 {cumulative_us / 1000:8.1f} ms)  {name}")
+
+    packages: Counter = Counter()
+    for name, self_us, _ in times:
+        packages[name.split(".")[0]] += self_us
+    print(f"\nパッケージ毎の合計（上位{top}）")
+    for package, self_us in packages.most_common(top):
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+
+def report_first_request(mode: str, port: int, timeout: float = 60.0) -> None:
+    env = {
+        **os.environ,
+        "ENVIRONMENT": mode,
+        "SERVER_PORT": str(port),
+        "DEBUG": "false",
+        "SCHEDULER_ENABLED": "false",
+    }
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.core.server"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while True:
+                if time.perf_counter() - started > timeout:
+                    raise RuntimeError("サーバーが起動しませんでした")
+                try:
+                    if client.get("/api/v1/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.05)
+            ready = time.perf_counter() - started
+            phases = client.get("/api/v1/metrics/").json()["startup"]
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+
+    print(f"\n起動から最初のリクエスト成功まで（{mode}）: {ready * 1000:.0f} ms")
+    for phase, seconds in phases.items():
+        print(f"  {phase}: {seconds * 1000:.0f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--mode", default="production")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--imports-only", action="store_true")
+    args = parser.parse_args()
+
+    report_imports(args.top)
+    if not args.imports_only:
+        report_first_request(args.mode, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import asyncio
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+import sys
+import os
+
+# パスの調整
+sys.path.append(os.path.dirname(os.path.abspath(__file__)).replace('tests', ''))
+
+from app.core.database import get_db
+from app.core.response_cache import response_cache
+from app.models import Base
+
+
+def create_test_engine() -> AsyncEngine:
+    """テスト用のインメモリSQLiteデータベース"""
+    return create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+        echo=False
+    )
+
+
+@contextmanager
+def override_get_db(session_factory: Callable) -> Iterator[None]:
+    """アプリの get_db を session_factory のセッションに差し替え、終了時に元に戻す"""
+    from main import app
+
+    async def get_test_db():
+        async with session_factory() as session:
+            yield session
+
+    previous = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = get_test_db
+    try:
+        yield
+    finally:
+        if previous is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = previous
+
+
+@dataclass
+class InMemoryDatabase:
+    """テストモジュール毎のデータベース（engine とセッションファクトリ）"""
+    engine: AsyncEngine = field(default_factory=create_test_engine)
+    statements: List[str] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.session = async_sessionmaker(self.engine, expire_on_commit=False)
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self._record_statement)
+
+    def _record_statement(self, conn, cursor, statement, parameters, context, executemany):
+        """発行されたSQLを記録"""
+        self.statements.append(statement)
+
+    async def create_tables(self) -> None:
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def dispatch_outbox(self) -> None:
+        """未配信のイベントを全て配信する（フィード・再送は配信済みのイベントのみを返す）"""
+        from app.core.events import EventBroker, OutboxDispatcher
+
+        dispatcher = OutboxDispatcher(EventBroker(), session_factory=self.session)
+        while await dispatcher.dispatch_once():
+            pass
+
+
+@pytest.fixture(scope="module")
+def database() -> Iterator[InMemoryDatabase]:
+    """テーブルを作成したインメモリデータベースを用意し、アプリの get_db をそのセッションにする"""
+    db = InMemoryDatabase()
+    asyncio.run(db.create_tables())
+    with override_get_db(db.session):
+        yield db
+    asyncio.run(db.engine.dispose())
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    """テストモジュール毎にDBが異なるため、保存済みのレスポンスを持ち越さない"""
+    response_cache.clear()
+    yield
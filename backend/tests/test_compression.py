@@ -0,0 +1,101 @@
+import gzip
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from main import app
+from app.core import compression
+from app.core.compression import CompressionMiddleware, compression_stats, negotiate
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database(database):
+    """テストデータベースのセットアップ"""
+    for index in range(20):
+        response = client.post("/api/v1/products/", json={
+            "name": f"圧縮テスト商品{index}", "category": "treatment", "price": 3000,
+            "description": "しっとりまとまる集中補修トリートメント" * 3,
+            "stock_quantity": 10, "status": "active"
+        })
+        assert response.status_code == 201
+
+
+def _raw_get(url: str, encoding: str):
+    """デコードせずにレスポンスを取得"""
+    with client.stream("GET", url, headers={"Accept-Encoding": encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_negotiate(monkeypatch):
+    """q値とサーバー側の優先順で圧縮方式を選択する"""
+    monkeypatch.setattr(compression, "COMPRESSORS", {"br": None, "zstd": None, "gzip": None})
+    assert negotiate("gzip, deflate, br") == "br"
+    assert negotiate("gzip, br;q=0.5") == "gzip"
+    assert negotiate("zstd, gzip") == "zstd"
+    assert negotiate("*") == "br"
+    assert negotiate("br;q=0, *;q=0.1") == "zstd"
+    assert negotiate("identity") is None
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("") is None
+
+
+def test_cached_body_is_compressed_once():
+    """キャッシュ対象のレスポンスは1回だけ圧縮し、以降は保存済みの圧縮ボディを返す"""
+    url = "/api/v1/products/?size=20"
+    compression_stats.reset()
+    first, first_body = _raw_get(url, "gzip")
+    assert first.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in first.headers["vary"]
+    assert int(first.headers["content-length"]) == len(first_body)
+
+    second, second_body = _raw_get(url, "gzip")
+    assert second.headers["x-cache"] == "HIT"
+    assert second_body == first_body
+    assert compression_stats.snapshot()["gzip"]["responses"] == 1
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert json.loads(gzip.decompress(first_body)) == plain.json()
+    assert len(first_body) < len(plain.content)
+
+
+def test_small_response_is_not_compressed():
+    """閾値未満のレスポンスは圧縮しない"""
+    response, body = _raw_get("/api/v1/health", "gzip")
+    assert "content-encoding" not in response.headers
+    assert json.loads(body)["status"] == "healthy"
+
+
+def test_export_is_stream_compressed():
+    """エクスポートはチャンク毎に圧縮してストリーミングする"""
+    response, body = _raw_get("/api/v1/products/export?format=ndjson", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    lines = gzip.decompress(body).decode().splitlines()
+    assert len(lines) == 20
+
+
+def test_event_stream_and_encoded_responses_pass_through():
+    """SSEや圧縮済みのレスポンスはそのまま返す"""
+    async def events():
+        yield "data: 1\n\n" * 200
+
+    inner = FastAPI()
+
+    @inner.get("/sse")
+    async def sse():
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @inner.get("/encoded")
+    async def encoded():
+        return PlainTextResponse("x" * 2000, headers={"Content-Encoding": "identity"})
+
+    inner.add_middleware(CompressionMiddleware, minimum_size=100)
+    test_client = TestClient(inner)
+    for url in ("/sse", "/encoded"):
+        response = test_client.get(url, headers={"Accept-Encoding": "gzip"})
+        assert response.headers.get("content-encoding") != "gzip"
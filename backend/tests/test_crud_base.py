@@ -0,0 +1,130 @@
+import asyncio
+from decimal import Decimal
+import pytest
+from sqlalchemy import event
+
+from app.crud import product as crud_product
+from app.models.product import ProductStatus
+from app.schemas.product import ProductCreate, ProductUpdate
+
+
+def _kinds(statements):
+    """発行されたSQLの種類（SELECT / UPDATE など）"""
+    return [statement.split()[0].upper() for statement in statements]
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _create_product(db):
+    return await crud_product.create(db, obj_in=ProductCreate(
+        name="差分更新テスト", category="shampoo", price=Decimal("1000"),
+        attributes={"hair_type": ["dry"]}
+    ))
+
+
+def test_update_without_changes_issues_no_query(database):
+    """変更が無い更新ではSQLを発行しない"""
+    async def scenario():
+        async with database.session() as db:
+            product = await _create_product(db)
+            database.statements.clear()
+            updated = await crud_product.update(db, db_obj=product, obj_in=ProductUpdate(
+                name="差分更新テスト", price=Decimal("1000.00"),
+                attributes={"hair_type": ["dry"]}
+            ))
+            return product, updated
+    
+    product, updated = _run(scenario())
+    assert updated is product
+    assert _kinds(database.statements) == []
+
+
+def test_update_changed_fields_with_single_statement(database):
+    """変更された項目のみ UPDATE ... RETURNING 1回で更新する"""
+    async def scenario():
+        async with database.session() as db:
+            product = await _create_product(db)
+            updated_at = product.updated_at
+            database.statements.clear()
+            updated = await crud_product.update(db, db_obj=product, obj_in={
+                "name": "差分更新テスト",
+                "status": ProductStatus.ACTIVE,
+                "unknown_field": "ignored"
+            })
+            return updated, updated_at
+    
+    updated, updated_at = _run(scenario())
+    assert _kinds(database.statements) == ["UPDATE"]
+    assert updated.status == ProductStatus.ACTIVE
+    assert updated.updated_at is not None
+    assert updated.updated_at >= updated_at
+
+
+def test_create_fetches_server_defaults_without_refresh(database):
+    """作成時はINSERTのRETURNINGでサーバー側の値を取得しrefreshしない"""
+    async def scenario():
+        async with database.session() as db:
+            database.statements.clear()
+            product = await _create_product(db)
+            return product, _kinds(database.statements)
+    
+    product, issued = _run(scenario())
+    assert issued == ["INSERT"]
+    assert product.id is not None
+    assert product.created_at is not None
+    assert product.updated_at is not None
+
+
+def test_remove_issues_single_delete(database):
+    """削除は DELETE ... RETURNING id の1文"""
+    async def scenario():
+        async with database.session() as db:
+            product = await _create_product(db)
+            database.statements.clear()
+            deleted_id = await crud_product.remove(db, id=product.id)
+            missing_id = await crud_product.remove(db, id=product.id)
+            return product.id, deleted_id, missing_id
+    
+    product_id, deleted_id, missing_id = _run(scenario())
+    assert _kinds(database.statements) == ["DELETE", "DELETE"]
+    assert deleted_id == product_id
+    assert missing_id is None
+
+
+def test_unit_of_work_commits_once(database):
+    """unit of work 内の書き込みはまとめて1回だけcommitされる"""
+    from app.core.database import unit_of_work
+    
+    async def scenario():
+        async with database.session() as db:
+            commits = []
+            event.listen(db.sync_session, "after_commit", lambda session: commits.append(1))
+            async with unit_of_work(db):
+                product = await _create_product(db)
+                await crud_product.set_featured(db, product_id=product.id, featured=True)
+                await crud_product.update_stock(db, product_id=product.id, quantity_change=-3)
+                assert commits == []
+            return product, commits
+    
+    product, commits = _run(scenario())
+    assert commits == [1]
+    assert product.is_featured is True
+    assert product.stock_quantity == 0
+
+
+def test_unit_of_work_rolls_back_on_error(database):
+    """unit of work 内で例外が起きた場合は全ての書き込みを取り消す"""
+    from app.core.database import unit_of_work
+    
+    async def scenario():
+        async with database.session() as db:
+            with pytest.raises(RuntimeError):
+                async with unit_of_work(db):
+                    product = await _create_product(db)
+                    product_id = product.id
+                    raise RuntimeError("abort")
+            return await crud_product.get(db, id=product_id)
+    
+    assert _run(scenario()) is None
@@ -0,0 +1,124 @@
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from main import app
+from app.core.forecasting import MODEL_SEASONAL_SES, forecast_demand
+from app.crud.demand_forecast import demand_forecast
+from app.models import TrialRequest
+
+
+TODAY = date(2026, 10, 19)  # 月曜日
+FORECAST_OPTIONS = dict(history_days=56, horizon_days=30, lead_time_days=7, service_level_z=1.65)
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def _daily(product_id: int, quantities) -> pd.DataFrame:
+    """TODAY の前日までの日毎の需要"""
+    start = TODAY - timedelta(days=len(quantities))
+    return pd.DataFrame([
+        (product_id, start + timedelta(days=offset), quantity)
+        for offset, quantity in enumerate(quantities) if quantity
+    ], columns=["product_id", "day", "quantity"])
+
+
+def test_forecast_constant_and_seasonal_demand():
+    """一定の需要・曜日で偏る需要・需要なしを1回で予測する"""
+    saturdays = [7 if (TODAY - timedelta(days=56 - offset)).weekday() == 5 else 0 for offset in range(56)]
+    demand = pd.concat([_daily(1, [2] * 56), _daily(2, saturdays)])
+    products = pd.DataFrame({"product_id": [1, 2, 3], "stock_quantity": [20, 100, 5]})
+
+    result = forecast_demand(demand, products, today=TODAY, **FORECAST_OPTIONS)
+
+    constant = result.loc[1]
+    assert constant["daily_demand"] == pytest.approx(2.0)
+    assert constant["suggested_min_stock_level"] == 14
+    assert constant["projected_stockout_date"].date() == TODAY + timedelta(days=9)
+
+    seasonal = result.loc[2]
+    assert seasonal["model"] == MODEL_SEASONAL_SES
+    assert seasonal["daily_demand"] == pytest.approx(1.0, abs=0.1)
+    # 月曜起点の7日間には土曜が1回含まれる
+    assert seasonal["suggested_min_stock_level"] >= 7
+
+    idle = result.loc[3]
+    assert idle["daily_demand"] == 0
+    assert idle["suggested_min_stock_level"] == 0
+    assert pd.isna(idle["projected_stockout_date"])
+
+
+def test_forecast_100k_products_within_a_minute():
+    rng = np.random.default_rng(0)
+    count, days = 100_000, 112
+    demand = pd.DataFrame({
+        "product_id": rng.integers(1, count + 1, count * 10),
+        "offset": rng.integers(0, days, count * 10),
+        "quantity": rng.integers(1, 4, count * 10),
+    }).groupby(["product_id", "offset"], as_index=False)["quantity"].sum()
+    demand["day"] = pd.Timestamp(TODAY - timedelta(days=days)) + pd.to_timedelta(demand["offset"], unit="D")
+    products = pd.DataFrame({"product_id": np.arange(1, count + 1), "stock_quantity": rng.integers(0, 50, count)})
+
+    started = time.perf_counter()
+    result = forecast_demand(
+        demand[["product_id", "day", "quantity"]], products, today=TODAY,
+        history_days=days, horizon_days=90, lead_time_days=7, service_level_z=1.65
+    )
+    assert time.perf_counter() - started < 60
+    assert len(result) == count
+
+
+def test_reorder_suggestions_from_trial_history(database):
+    """トライアル履歴から予測し、在庫切れが近い順に発注提案を返す"""
+    def create_product(name: str, stock: int) -> int:
+        return client.post("/api/v1/products/", json={
+            "name": name, "category": "treatment", "price": 2000, "stock_quantity": stock
+        }).json()["id"]
+
+    busy, quiet = create_product("需要が多い商品", 4), create_product("需要の無い商品", 10)
+    ids = [
+        client.post("/api/v1/trial-requests/", json={"product_id": busy, "quantity": 2}).json()["id"]
+        for _ in range(14)
+    ]
+    rejected = client.post("/api/v1/trial-requests/", json={"product_id": quiet, "quantity": 5}).json()["id"]
+    client.patch(f"/api/v1/trial-requests/{rejected}/reject", json={})
+
+    async def scenario():
+        async with database.session() as db:
+            # 過去14日間に1日1件ずつ申し込まれたことにする
+            for offset, request_id in enumerate(ids, start=1):
+                await db.execute(
+                    update(TrialRequest).where(TrialRequest.id == request_id)
+                    .values(created_at=datetime.utcnow() - timedelta(days=offset))
+                )
+            await db.execute(
+                update(TrialRequest).where(TrialRequest.id == rejected)
+                .values(created_at=datetime.utcnow() - timedelta(days=1))
+            )
+            await db.commit()
+            return await demand_forecast.refresh(db, **FORECAST_OPTIONS)
+
+    assert asyncio.run(scenario()) == 2
+
+    response = client.get("/api/v1/products/reorder-suggestions")
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["product_id"] for item in items] == [busy, quiet]
+    assert items[0]["daily_demand"] > 1
+    assert items[0]["projected_stockout_date"] is not None
+    assert items[0]["needs_reorder"] is True
+    # 却下されたリクエストは需要に数えない
+    assert items[1]["daily_demand"] == 0
+    assert items[1]["projected_stockout_date"] is None
+
+    urgent = client.get("/api/v1/products/reorder-suggestions?within_days=7").json()
+    assert [item["product_id"] for item in urgent["items"]] == [busy]
+    assert urgent["total"] == 1
+    assert client.get("/api/v1/products/reorder-suggestions?needs_reorder=false").json()["total"] == 1
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from starlette.requests import Request
+
+from main import app
+from app.api.v1.events import stream_events
+from app.core.database import unit_of_work
+from app.core.events import EventBroker, OutboxDispatcher
+from app.crud import outbox as crud_outbox, trial_request as crud_trial_request
+from app.models import DEFAULT_SALON_ID, OutboxEvent
+from app.models.trial_request import TrialStatus
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+@pytest.fixture(scope="module")
+def product_id():
+    response = client.post("/api/v1/products/", json={
+        "name": "イベントテスト商品", "category": "shampoo", "price": 3000,
+        "stock_quantity": 10, "min_stock_level": 5
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _latest_cursor(database) -> int:
+    """それまでのイベントを配信した後の最新の連番"""
+    return asyncio.run(_latest_seq(database))
+
+
+async def _latest_seq(database) -> int:
+    await database.dispatch_outbox()
+    async with database.session() as db:
+        return await crud_outbox.get_latest_seq(db)
+
+
+def _events_after(database, cursor: int, **params):
+    asyncio.run(database.dispatch_outbox())
+    response = client.get("/api/v1/events/", params={"after": cursor, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_trial_lifecycle_appends_events(product_id, database):
+    """トライアルの作成・承認・開始・完了でイベントが順に追加される"""
+    cursor = _latest_cursor(database)
+    request_id = client.post(
+        "/api/v1/trial-requests/", json={"product_id": product_id}
+    ).json()["id"]
+    client.patch(f"/api/v1/trial-requests/{request_id}/approve?staff_id=3", json={})
+    client.patch(f"/api/v1/trial-requests/{request_id}/status?staff_id=4", json={"status": "in_progress"})
+    client.patch(f"/api/v1/trial-requests/{request_id}/complete", json={})
+    
+    data = _events_after(database, cursor, aggregate_type="trial_request")
+    assert [event["event_type"] for event in data["items"]] == [
+        "trial_request.created",
+        "trial_request.approved",
+        "trial_request.started",
+        "trial_request.completed",
+    ]
+    assert all(event["aggregate_id"] == request_id for event in data["items"])
+    approved = data["items"][1]["payload"]
+    assert approved["status"] == "approved"
+    assert approved["approved_by"] == 3
+    assert approved["product_id"] == product_id
+    assert data["has_more"] is False
+    assert data["next_cursor"] == data["items"][-1]["seq"]
+
+
+def test_feed_pages_with_cursor(product_id, database):
+    """カーソルで続きのイベントを取得できる"""
+    cursor = _latest_cursor(database)
+    for _ in range(3):
+        client.post("/api/v1/trial-requests/", json={"product_id": product_id})
+    
+    first = _events_after(database, cursor, limit=2)
+    assert len(first["items"]) == 2
+    assert first["has_more"] is True
+    
+    second = _events_after(database, first["next_cursor"], limit=2)
+    assert len(second["items"]) == 1
+    assert second["has_more"] is False
+    assert second["items"][0]["seq"] > first["items"][-1]["seq"]
+    
+    # 新しいイベントが無ければカーソルはそのまま
+    empty = _events_after(database, second["next_cursor"])
+    assert empty["items"] == []
+    assert empty["next_cursor"] == second["next_cursor"]
+
+
+def test_stock_update_appends_event(product_id, database):
+    """在庫更新で在庫変更イベントが追加される（在庫以外の更新では追加されない）"""
+    cursor = _latest_cursor(database)
+    client.put(f"/api/v1/products/{product_id}", json={"description": "説明のみ変更"})
+    response = client.patch(f"/api/v1/products/{product_id}/stock", json={"stock_quantity": 3})
+    assert response.status_code == 200
+    
+    data = _events_after(database, cursor, aggregate_type="product")
+    assert len(data["items"]) == 1
+    event = data["items"][0]
+    assert event["event_type"] == "product.stock_changed"
+    assert event["aggregate_id"] == product_id
+    assert event["payload"] == {"stock_quantity": 3, "min_stock_level": 5, "is_low_stock": True}
+
+
+def test_bulk_action_appends_event_per_applied_id(product_id, database):
+    """一括承認では更新された件数分だけイベントが追加される"""
+    ids = [
+        client.post("/api/v1/trial-requests/", json={"product_id": product_id}).json()["id"]
+        for _ in range(3)
+    ]
+    client.patch(f"/api/v1/trial-requests/{ids[0]}/reject", json={})
+    cursor = _latest_cursor(database)
+    
+    client.post("/api/v1/trial-requests/bulk/approve?staff_id=9", json={"ids": ids})
+    
+    data = _events_after(database, cursor)
+    assert [event["aggregate_id"] for event in data["items"]] == ids[1:]
+    assert {event["event_type"] for event in data["items"]} == {"trial_request.approved"}
+    assert all(event["payload"]["approved_by"] == 9 for event in data["items"])
+
+
+def test_rolled_back_write_discards_event(product_id, database):
+    """書き込みがロールバックされるとイベントも残らない"""
+    request_id = client.post(
+        "/api/v1/trial-requests/", json={"product_id": product_id}
+    ).json()["id"]
+    cursor = _latest_cursor(database)
+    
+    async def scenario():
+        async with database.session() as db:
+            with pytest.raises(RuntimeError):
+                async with unit_of_work(db):
+                    await crud_trial_request.approve_request(db, request_id=request_id, approved_by=1)
+                    raise RuntimeError("中断")
+        async with database.session() as db:
+            request = await crud_trial_request.get(db, id=request_id)
+            return request.status
+    
+    assert asyncio.run(scenario()) == TrialStatus.PENDING
+    assert _events_after(database, cursor)["items"] == []
+
+
+def test_dispatcher_publishes_batches_and_marks_dispatched(product_id, database):
+    """ディスパッチャが未配信イベントをバッチで配信し、配信済みにする"""
+    for _ in range(3):
+        client.post("/api/v1/trial-requests/", json={"product_id": product_id})
+    
+    async def scenario():
+        broker = EventBroker()
+        dispatcher = OutboxDispatcher(broker, session_factory=database.session, batch_size=2)
+        subscription = broker.subscribe()
+        
+        counts = []
+        while True:
+            count = await dispatcher.dispatch_once()
+            counts.append(count)
+            if count == 0:
+                break
+        
+        received = []
+        while True:
+            try:
+                received.append(await subscription.get(timeout=0))
+            except asyncio.TimeoutError:
+                break
+        
+        async with database.session() as db:
+            result = await db.execute(select(OutboxEvent).where(OutboxEvent.dispatched_at.is_(None)))
+            remaining = result.scalars().all()
+        return counts, received, remaining
+    
+    counts, received, remaining = asyncio.run(scenario())
+    assert counts[-1] == 0
+    assert all(count <= 2 for count in counts)
+    assert len(received) == sum(counts)
+    seqs = [message["seq"] for message in received]
+    assert seqs == list(range(seqs[0], seqs[0] + len(seqs)))
+    assert remaining == []
+
+
+def test_slow_subscriber_is_closed():
+    """受信が追いつかない購読は閉じられ、終了が通知される"""
+    async def scenario():
+        broker = EventBroker(queue_size=2)
+        subscription = broker.subscribe()
+        for event_id in range(1, 4):
+            await broker.publish({"id": event_id})
+        return broker.subscriber_count, await subscription.get(timeout=0)
+    
+    assert asyncio.run(scenario()) == (0, None)
+
+
+def _request_disconnecting_after(polls: int) -> Request:
+    """polls 回目以降の確認で切断を返すリクエスト"""
+    state = {"calls": 0}
+    
+    async def receive():
+        state["calls"] += 1
+        if state["calls"] > polls:
+            return {"type": "http.disconnect"}
+        await asyncio.sleep(1)
+        return {"type": "http.request", "body": b""}
+    
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": []}, receive)
+
+
+def test_stream_replays_from_last_event_id_then_goes_live(product_id, database):
+    """SSEは Last-Event-ID 以降を再送した後、リアルタイムのイベントを配信する"""
+    cursor = _latest_cursor(database)
+    for _ in range(2):
+        client.post("/api/v1/trial-requests/", json={"product_id": product_id})
+    
+    async def scenario():
+        from app.core.events import broker
+        
+        await database.dispatch_outbox()
+        async with database.session() as db:
+            replay = await crud_outbox.get_after(db, after=cursor)
+            response = await stream_events(
+                request=_request_disconnecting_after(3),
+                after=None,
+                aggregate_type=None,
+                last_event_id=str(cursor),
+                db=db
+            )
+            # 再送済みのイベントは重複して配信しない
+            await broker.publish({
+                "id": replay[-1].id, "seq": replay[-1].dispatched_seq, "salon_id": DEFAULT_SALON_ID,
+                "event_type": "trial_request.created", "aggregate_type": "trial_request"
+            })
+            # 他のサロンのイベントは配信しない
+            await broker.publish({
+                "id": replay[-1].id + 500, "seq": replay[-1].dispatched_seq + 500, "salon_id": DEFAULT_SALON_ID + 1,
+                "event_type": "product.stock_changed", "aggregate_type": "product"
+            })
+            await broker.publish({
+                "id": replay[-1].id + 1000, "seq": replay[-1].dispatched_seq + 1000, "salon_id": DEFAULT_SALON_ID,
+                "event_type": "product.stock_changed", "aggregate_type": "product"
+            })
+            chunks = [chunk async for chunk in response.body_iterator]
+        return [event.dispatched_seq for event in replay], chunks, broker.subscriber_count
+    
+    replay_seqs, chunks, subscriber_count = asyncio.run(scenario())
+    messages = [chunk for chunk in chunks if chunk.startswith("id: ")]
+    sent_seqs = [int(message.split("\n")[0][4:]) for message in messages]
+    assert sent_seqs == replay_seqs + [replay_seqs[-1] + 1000]
+    
+    first = messages[0].split("\n")
+    assert first[1] == "event: trial_request.created"
+    assert json.loads(first[2][6:])["seq"] == replay_seqs[0]
+    assert subscriber_count == 0
+
+
+def test_feed_does_not_skip_events_committed_out_of_id_order(database):
+    """先に採番された id のイベントが後からコミットされても、カーソル以降のフィードに現れる"""
+    async def append(event_id: int) -> None:
+        async with database.session() as db:
+            db.add(OutboxEvent(
+                id=event_id, event_type="product.stock_changed", aggregate_type="product",
+                aggregate_id=1, payload={}
+            ))
+            await db.commit()
+    
+    async def scenario():
+        await database.dispatch_outbox()
+        async with database.session() as db:
+            latest_id = (await db.execute(select(func.max(OutboxEvent.id)))).scalar() or 0
+        # id の大きいイベントが先にコミット・配信される
+        await append(latest_id + 100)
+        await database.dispatch_outbox()
+        async with database.session() as db:
+            cursor = await crud_outbox.get_latest_seq(db)
+        await append(latest_id + 50)
+        return latest_id, cursor
+    
+    latest_id, cursor = asyncio.run(scenario())
+    data = _events_after(database, cursor)
+    assert [event["id"] for event in data["items"]] == [latest_id + 50]
+    assert data["next_cursor"] == cursor + 1
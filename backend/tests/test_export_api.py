@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from app.core.config import settings
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database(database):
+    """テストデータベースのセットアップ"""
+    # チャンク境界をまたぐよう小さいチャンクサイズにする
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    settings.EXPORT_CHUNK_SIZE = 2
+    
+    for i in range(5):
+        response = client.post("/api/v1/products/", json={
+            "name": f"エクスポート商品{i}",
+            "category": "shampoo" if i % 2 == 0 else "conditioner",
+            "price": 1000 + i,
+            "tags": ["test", f"tag{i}"]
+        })
+        assert response.status_code == 201
+    
+    yield
+    
+    settings.EXPORT_CHUNK_SIZE = chunk_size
+
+
+def test_export_products_ndjson():
+    """商品のNDJSONエクスポート"""
+    response = client.get("/api/v1/products/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert "products.ndjson" in response.headers["content-disposition"]
+    
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 5
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+    assert rows[0]["tags"] == ["test", "tag0"]
+
+
+def test_export_products_csv_with_filter():
+    """フィルタ付き商品のCSVエクスポート"""
+    response = client.get("/api/v1/products/export?format=csv&category=shampoo")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 3
+    assert all(row["category"] == "shampoo" for row in rows)
+    assert json.loads(rows[0]["tags"]) == ["test", "tag0"]
+
+
+def test_export_csv_empty_has_header():
+    """0件でもCSVヘッダーは出力される"""
+    response = client.get("/api/v1/trial-requests/export?format=csv")
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert len(lines) == 1
+    assert "status" in lines[0].split(",")
+
+
+def test_export_invalid_format():
+    """未対応の出力形式はバリデーションエラー"""
+    response = client.get("/api/v1/users/export?format=xml")
+    assert response.status_code == 422
@@ -0,0 +1,98 @@
+import asyncio
+import time
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from main import app
+from app.api.v1 import health as health_api
+from app.core.health import LoopLagMonitor, ReadinessProbe, check_database, pool_stats
+from tests.conftest import create_test_engine
+
+engine = create_test_engine()
+
+client = TestClient(app)
+
+
+def _probe(**kwargs) -> ReadinessProbe:
+    kwargs.setdefault("checks", {"database": lambda: check_database(engine)})
+    return ReadinessProbe(engine=engine, monitor=LoopLagMonitor(), **kwargs)
+
+
+def test_liveness():
+    """liveは依存先を確認せずに応答する"""
+    response = client.get("/api/v1/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+
+
+def test_readiness_ok(monkeypatch):
+    """依存先が正常なら 200 で各確認結果とプールの状況を返す"""
+    monkeypatch.setattr(health_api, "readiness", _probe())
+    response = client.get("/api/v1/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["checks"]["database"]["status"] == "ok"
+    assert body["pool"]["class"] == "StaticPool"
+
+
+def test_readiness_timeout_budget(monkeypatch):
+    """応答しない依存先は timeout 秒で打ち切って 503"""
+    async def hang():
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(health_api, "readiness", _probe(checks={"redis": hang}, timeout=0.05))
+    started = time.perf_counter()
+    response = client.get("/api/v1/health/ready")
+    assert time.perf_counter() - started < 1
+    assert response.status_code == 503
+    assert response.json()["checks"]["redis"]["detail"] == "タイムアウト"
+
+
+def test_readiness_fails_on_loop_lag():
+    """イベントループの遅延が閾値以上なら受け付けない"""
+    probe = _probe(max_loop_lag=0.1)
+    probe.monitor._samples.append(0.3)
+    report = asyncio.run(probe.report())
+    assert report["status"] == "not_ready"
+    assert report["loop_lag_ms"] == 300.0
+
+
+def test_dependency_checks_are_cached():
+    """確認結果は cache_ttl 秒再利用し、同時の確認は1回にまとめる"""
+    calls = []
+
+    async def check():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+
+    probe = _probe(checks={"database": check}, cache_ttl=60)
+
+    async def scenario():
+        await asyncio.gather(*[probe.report() for _ in range(5)])
+        await probe.report()
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+
+
+def test_pool_saturation():
+    """QueuePoolでは貸し出し中の接続数から使用率を求め、飽和したら受け付けない"""
+    queue_engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:", poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=1
+    )
+    probe = ReadinessProbe(engine=queue_engine, monitor=LoopLagMonitor(), checks={}, max_pool_saturation=0.9)
+
+    async def scenario():
+        async with queue_engine.connect(), queue_engine.connect():
+            saturated = pool_stats(queue_engine)
+            report = await probe.report()
+        await queue_engine.dispose()
+        return saturated, report
+
+    saturated, report = asyncio.run(scenario())
+    assert saturated["capacity"] == 2
+    assert saturated["checked_out"] == 2
+    assert saturated["saturation"] == 1.0
+    assert report["status"] == "not_ready"
@@ -0,0 +1,164 @@
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, update
+
+from main import app
+from app.core.idempotency import REPLAYED_HEADER
+from app.crud import idempotency_key as crud_idempotency_key
+from app.models import IdempotencyKey, TrialRequest
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+@pytest.fixture(scope="module")
+def product_id():
+    response = client.post("/api/v1/products/", json={
+        "name": "冪等性テスト商品", "category": "shampoo", "price": 2200, "stock_quantity": 10
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _count_requests(database, product_id: int) -> int:
+    async def scenario():
+        async with database.session() as db:
+            result = await db.execute(
+                select(func.count(TrialRequest.id)).where(TrialRequest.product_id == product_id)
+            )
+            return result.scalar()
+    return asyncio.run(scenario())
+
+
+def test_retry_with_same_key_replays_response(product_id, database):
+    """同じキーの再送では作成せず、初回のレスポンスを返す"""
+    before = _count_requests(database, product_id)
+    headers = {"Idempotency-Key": "create-1"}
+    body = {"product_id": product_id, "reason": "乾燥が気になる"}
+    
+    first = client.post("/api/v1/trial-requests/", json=body, headers=headers)
+    second = client.post("/api/v1/trial-requests/", json=body, headers=headers)
+    
+    assert first.status_code == second.status_code == 201
+    assert second.json() == first.json()
+    assert REPLAYED_HEADER not in first.headers
+    assert second.headers[REPLAYED_HEADER] == "true"
+    assert _count_requests(database, product_id) == before + 1
+
+
+def test_requests_without_key_are_not_deduplicated(product_id, database):
+    """キー無しのリクエストは従来通り毎回実行する"""
+    before = _count_requests(database, product_id)
+    for _ in range(2):
+        assert client.post("/api/v1/trial-requests/", json={"product_id": product_id}).status_code == 201
+    assert _count_requests(database, product_id) == before + 2
+
+
+def test_key_reused_with_different_payload_is_rejected(product_id):
+    """同じキーを異なる内容で使うと 422"""
+    headers = {"Idempotency-Key": "create-2"}
+    assert client.post(
+        "/api/v1/trial-requests/", json={"product_id": product_id, "quantity": 1}, headers=headers
+    ).status_code == 201
+    response = client.post(
+        "/api/v1/trial-requests/", json={"product_id": product_id, "quantity": 2}, headers=headers
+    )
+    assert response.status_code == 422
+
+
+def test_failed_request_can_be_retried_with_same_key(product_id, database):
+    """ハンドラが失敗した場合は予約を解除し、同じキーで再実行できる"""
+    headers = {"Idempotency-Key": "stock-missing"}
+    response = client.patch("/api/v1/products/999999/stock", json={"stock_quantity": 1}, headers=headers)
+    assert response.status_code == 404
+    
+    async def scenario():
+        async with database.session() as db:
+            return await crud_idempotency_key.get(
+                db, scope="PATCH /api/v1/products/999999/stock", key="stock-missing"
+            )
+    assert asyncio.run(scenario()) is None
+
+
+def test_stock_update_replay_does_not_reapply(product_id):
+    """在庫更新の再送は初回の結果を返し、その後の変更を上書きしない"""
+    headers = {"Idempotency-Key": "stock-1"}
+    first = client.patch(f"/api/v1/products/{product_id}/stock", json={"stock_quantity": 7}, headers=headers)
+    assert first.status_code == 200
+    
+    client.patch(f"/api/v1/products/{product_id}/stock", json={"stock_quantity": 3})
+    replay = client.patch(f"/api/v1/products/{product_id}/stock", json={"stock_quantity": 7}, headers=headers)
+    
+    assert replay.headers[REPLAYED_HEADER] == "true"
+    assert replay.json()["stock_quantity"] == 7
+    assert client.get(f"/api/v1/products/{product_id}").json()["stock_quantity"] == 3
+
+
+def test_concurrent_duplicates_execute_once(product_id, database):
+    """同時に届いた同じキーのリクエストは1回だけ実行される"""
+    before = _count_requests(database, product_id)
+    
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            return await asyncio.gather(*[
+                async_client.post(
+                    "/api/v1/trial-requests/",
+                    json={"product_id": product_id},
+                    headers={"Idempotency-Key": "create-concurrent"}
+                )
+                for _ in range(5)
+            ])
+    
+    responses = asyncio.run(scenario())
+    assert {response.status_code for response in responses} == {201}
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert sum(REPLAYED_HEADER in response.headers for response in responses) == 4
+    assert _count_requests(database, product_id) == before + 1
+
+
+def test_abandoned_reservation_is_taken_over(product_id, database):
+    """実行中のまま応答が無くなった予約はロック期限後に引き継いで実行する"""
+    key = "create-abandoned"
+    
+    async def reserve_and_expire():
+        async with database.session() as db:
+            reserved_id = await crud_idempotency_key.reserve(
+                db, scope="POST /api/v1/trial-requests/", key=key, request_hash="x",
+                now=datetime.utcnow(), lock_timeout=timedelta(seconds=30), ttl=timedelta(hours=1)
+            )
+            await db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.id == reserved_id)
+                .values(locked_until=datetime.utcnow() - timedelta(seconds=1))
+            )
+            await db.commit()
+    
+    asyncio.run(reserve_and_expire())
+    response = client.post(
+        "/api/v1/trial-requests/", json={"product_id": product_id}, headers={"Idempotency-Key": key}
+    )
+    assert response.status_code == 201
+    assert REPLAYED_HEADER not in response.headers
+
+
+def test_purge_removes_expired_keys(database):
+    """保存期間を過ぎたキーは削除される"""
+    async def scenario():
+        async with database.session() as db:
+            now = datetime.utcnow()
+            await crud_idempotency_key.reserve(
+                db, scope="TEST", key="old", request_hash="x",
+                now=now - timedelta(days=2), lock_timeout=timedelta(seconds=30), ttl=timedelta(days=1)
+            )
+            deleted = await crud_idempotency_key.purge_expired(db, now=now)
+            remaining = await crud_idempotency_key.get(db, scope="TEST", key="old")
+            return deleted, remaining
+    
+    deleted, remaining = asyncio.run(scenario())
+    assert deleted >= 1
+    assert remaining is None
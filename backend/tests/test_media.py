@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import os
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from app.core.config import settings
+from app.core.media import content_path, parse_range, render_nginx_locations, replace_nginx_locations
+
+client = TestClient(app)
+
+CONTENT = bytes(range(256)) * 4
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+PATH = f"{content_path('images', DIGEST)}/full.webp"
+ETAG = f'"{DIGEST}-full.webp"'
+NGINX_CONF = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, "nginx", "nginx.conf")
+
+
+@pytest.fixture(autouse=True)
+def media_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_ROOT", str(tmp_path))
+    target = tmp_path / PATH
+    target.parent.mkdir(parents=True)
+    target.write_bytes(CONTENT)
+    return tmp_path
+
+
+def test_serves_file_with_cache_headers():
+    response = client.get(f"/media/{PATH}")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-type"] == "image/webp"
+    assert response.headers["etag"] == ETAG
+    assert response.headers["cache-control"] == f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable"
+    assert response.headers["accept-ranges"] == "bytes"
+
+    head = client.head(f"/media/{PATH}")
+    assert head.status_code == 200
+    assert head.headers["content-length"] == str(len(CONTENT))
+    assert head.content == b""
+
+    cached = client.get(f"/media/{PATH}", headers={"If-None-Match": f'"other", {ETAG}'})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+
+def test_range_requests():
+    partial = client.get(f"/media/{PATH}", headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.content == CONTENT[10:20]
+    assert partial.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+
+    suffix = client.get(f"/media/{PATH}", headers={"Range": "bytes=-5"})
+    assert suffix.content == CONTENT[-5:]
+
+    unsatisfiable = client.get(f"/media/{PATH}", headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+    # If-Range が一致しなければ全体を返す
+    stale = client.get(f"/media/{PATH}", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert stale.status_code == 200
+    assert stale.content == CONTENT
+    fresh = client.get(f"/media/{PATH}", headers={"Range": "bytes=0-9", "If-Range": ETAG})
+    assert fresh.status_code == 206
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("bytes=0-0", (0, 0)),
+    ("bytes=5-", (5, 99)),
+    ("bytes=90-200", (90, 99)),
+    ("bytes=-200", (0, 99)),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(value, expected):
+    assert parse_range(value, 100) == expected
+
+
+@pytest.mark.parametrize("path", [
+    f"../{PATH}",
+    f"images/00/00/{DIGEST}/full.webp",
+    "images/ab/cd/short/full.webp",
+    f"{content_path('images', DIGEST)}/missing.webp",
+])
+def test_unknown_paths_are_not_found(path):
+    assert client.get(f"/media/{path}").status_code == 404
+
+
+def test_zerocopy_through_middleware_stack():
+    """zerocopy 対応サーバーでは圧縮などのミドルウェアを通しても開始の後に sendfile を送る"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": f"/media/{PATH}", "raw_path": f"/media/{PATH}".encode(),
+        "root_path": "", "query_string": b"", "server": ("testserver", 80), "client": ("test", 1),
+        "headers": [(b"host", b"testserver"), (b"accept-encoding", b"gzip"), (b"range", b"bytes=10-19")],
+        "extensions": {"http.response.zerocopy": {}},
+    }
+    asyncio.run(app(scope, receive, send))
+
+    assert [message["type"] for message in messages] == ["http.response.start", "http.response.zerocopy"]
+    start, zerocopy = messages
+    assert start["status"] == 206
+    assert dict(start["headers"])[b"content-length"] == b"10"
+    assert b"content-encoding" not in dict(start["headers"])
+    assert (zerocopy["offset"], zerocopy["count"]) == (10, 10)
+
+
+def test_accel_redirect(monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_ACCEL_REDIRECT_PREFIX", "/_media/")
+    response = client.get(f"/media/{PATH}")
+    assert response.status_code == 200
+    assert response.headers["x-accel-redirect"] == f"/_media/{PATH}"
+    assert response.headers["etag"] == ETAG
+    assert response.content == b""
+
+
+def test_nginx_conf_is_up_to_date():
+    """nginx.conf のメディアの location は scripts/generate_nginx_media.py の既定値で生成したもの"""
+    with open(NGINX_CONF, encoding="utf-8") as file:
+        conf = file.read()
+    block = render_nginx_locations(
+        media_url=settings.MEDIA_URL, accel_prefix="/_media/", media_root="/var/lib/auraselect/media"
+    )
+    assert block in conf
+    assert replace_nginx_locations(conf, block) == conf
@@ -0,0 +1,98 @@
+import asyncio
+import io
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from main import app
+from app.core.config import settings
+from app.core.images import image_processor
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database(database):
+    """テストデータベースのセットアップ"""
+    yield
+    asyncio.run(image_processor.stop())
+
+
+@pytest.fixture(autouse=True)
+def media_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_ROOT", str(tmp_path))
+    return tmp_path
+
+
+def _png(size=(1200, 800), color=(200, 30, 90, 128)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGBA", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _create_product() -> int:
+    return client.post("/api/v1/products/", json={
+        "name": "画像商品", "category": "styling", "price": 3000
+    }).json()["id"]
+
+
+def _upload(product_id: int, content: bytes, content_type: str = "image/png", **params):
+    return client.post(
+        f"/api/v1/products/{product_id}/images",
+        params=params,
+        files={"file": ("photo.png", content, content_type)}
+    )
+
+
+def test_upload_creates_variants_and_fills_thumbnail(media_root):
+    product_id = _create_product()
+    response = _upload(product_id, _png())
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] is True
+
+    digest = body["digest"]
+    directory = media_root / "images" / digest[:2] / digest[2:4] / digest
+    for variant, edge in (("thumb", 200), ("card", 600), ("full", 1200)):
+        url = body["variants"][variant]["webp"]
+        assert url == f"/media/images/{digest[:2]}/{digest[2:4]}/{digest}/{variant}.webp"
+        with Image.open(directory / f"{variant}.webp") as image:
+            assert max(image.size) == edge
+        with Image.open(directory / f"{variant}.jpg") as image:
+            assert image.format == "JPEG" and image.mode == "RGB"
+    assert not list((media_root / "tmp").iterdir())
+    served = client.get(body["variants"]["thumb"]["jpeg"])
+    assert served.status_code == 200
+    assert served.headers["content-type"] == "image/jpeg"
+
+    product = body["product"]
+    assert product["thumbnail_url"] == body["variants"]["thumb"]["webp"]
+    assert product["image_urls"] == [body["variants"]["full"]["webp"]]
+
+
+def test_same_image_is_not_processed_twice(media_root):
+    product_id = _create_product()
+    first = _upload(product_id, _png(color=(1, 2, 3, 255))).json()
+    second = _upload(product_id, _png(color=(1, 2, 3, 255))).json()
+    assert second["created"] is False
+    assert second["digest"] == first["digest"]
+    assert second["product"]["image_urls"] == first["product"]["image_urls"]
+
+    # 2枚目はサムネイルを変えない（primary 指定時のみ）
+    other = _upload(product_id, _png(color=(9, 9, 9, 255))).json()
+    assert other["product"]["thumbnail_url"] == first["variants"]["thumb"]["webp"]
+    assert len(other["product"]["image_urls"]) == 2
+    primary = _upload(product_id, _png(color=(9, 9, 9, 255)), primary="true").json()
+    assert primary["product"]["thumbnail_url"] == other["variants"]["thumb"]["webp"]
+
+
+def test_rejects_invalid_uploads(media_root, monkeypatch):
+    product_id = _create_product()
+    assert _upload(product_id, b"GIF89a", "image/gif").status_code == 415
+    assert _upload(product_id, b"not an image").status_code == 422
+    assert _upload(999999, _png()).status_code == 404
+
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+    assert _upload(product_id, _png(color=(5, 5, 5, 255)) + b"\0" * 2048).status_code == 413
+    assert not list((media_root / "tmp").iterdir())
+    assert client.get(f"/api/v1/products/{product_id}").json()["thumbnail_url"] is None
@@ -0,0 +1,83 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def _upload(name: str, content: str):
+    return client.post(
+        "/api/v1/products/import",
+        files={"file": (name, content.encode("utf-8"), "application/octet-stream")}
+    )
+
+
+def test_import_csv_creates_products_with_slugs():
+    """CSVインポートで商品が作成されスラッグが自動生成される"""
+    content = (
+        "name,category,price,brand,model_number,tags\n"
+        "Moist Shampoo,shampoo,1200,Aura,MS-1,\"[\"\"moist\"\"]\"\n"
+        "Moist Shampoo,shampoo,1300,Aura,,\n"
+        "壊れた行,unknown,abc,,,\n"
+    )
+    response = _upload("catalog.csv", content)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_rows"] == 3
+    assert data["created"] == 2
+    assert data["updated"] == 0
+    assert data["failed"] == 1
+    assert data["errors"][0]["row"] == 4
+    
+    export = client.get("/api/v1/products/export").text.splitlines()
+    products = [json.loads(line) for line in export]
+    slugs = [product["slug"] for product in products]
+    assert len(set(slugs)) == 2
+    assert "aura-moist-shampoo-ms-1" in slugs
+    assert "aura-moist-shampoo" in slugs
+    
+    by_slug = {product["slug"]: product for product in products}
+    assert by_slug["aura-moist-shampoo-ms-1"]["tags"] == ["moist"]
+
+
+def test_import_ndjson_upserts_by_slug_and_model_number():
+    """NDJSONインポートでslug・型番が一致する商品は入力列のみ更新される"""
+    content = "\n".join([
+        json.dumps({"slug": "aura-moist-shampoo-ms-1", "name": "Moist Shampoo", "category": "shampoo", "price": 1500}),
+        json.dumps({"model_number": "MS-1", "name": "Moist Shampoo", "category": "shampoo", "price": 1800, "stock_quantity": 7}),
+        "not json",
+        json.dumps({"slug": "new-item", "name": "New", "category": "tools", "price": 500}),
+    ])
+    response = _upload("catalog.ndjson", content)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 1
+    assert data["updated"] == 1
+    # 1行目は同じ商品を指す2行目に置き換えられる
+    assert [error["row"] for error in data["errors"]] == [1, 3]
+    
+    products = {
+        product["slug"]: product
+        for product in map(json.loads, client.get("/api/v1/products/export").text.splitlines())
+    }
+    updated = products["aura-moist-shampoo-ms-1"]
+    assert float(updated["price"]) == 1800
+    assert updated["stock_quantity"] == 7
+    assert updated["tags"] == ["moist"]  # 入力に無い列は保持される
+    assert "new-item" in products
+
+
+def test_import_rejects_oversized_file():
+    """MAX_FILE_SIZEを超えるファイルは413"""
+    from app.core.config import settings
+    max_file_size = settings.MAX_FILE_SIZE
+    settings.MAX_FILE_SIZE = 10
+    try:
+        response = _upload("catalog.csv", "name,category,price\nA,shampoo,100\n")
+    finally:
+        settings.MAX_FILE_SIZE = max_file_size
+    assert response.status_code == 413
@@ -0,0 +1,141 @@
+import asyncio
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from main import app
+from app.core import database
+from app.core.config import settings
+from app.core.replicas import READ_REPLICA_KEY, ReadYourWritesMiddleware, ReplicaSet, RoutingSession
+from app.core.response_cache import response_cache
+from app.models import Base
+from app.models.product import Product
+from tests.conftest import create_test_engine, override_get_db
+
+# プライマリとレプリカは別のインメモリSQLite（レプリカには書き込みが反映されない）
+primary = create_test_engine()
+replica = create_test_engine()
+replica_set = ReplicaSet([replica])
+
+TestingSessionLocal = async_sessionmaker(
+    primary, expire_on_commit=False, sync_session_class=RoutingSession, replicas=replica_set
+)
+
+
+async def _create_tables():
+    for engine in (primary, replica):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+client = TestClient(app)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database():
+    """テストデータベースのセットアップ（読み取りはレプリカに振り分けるセッション）"""
+    asyncio.run(_create_tables())
+    with override_get_db(TestingSessionLocal):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def use_replicas(monkeypatch):
+    monkeypatch.setattr(database, "replicas", replica_set)
+    for member in replica_set.replicas:
+        member.healthy = True
+
+
+@pytest.fixture(scope="module")
+def product_id():
+    """プライマリにのみ存在する商品"""
+    response = client.post("/api/v1/products/", json={
+        "name": "レプリカテスト商品", "category": "shampoo", "price": 2000,
+        "stock_quantity": 5, "status": "active"
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_reads_go_to_replica_unless_client_wrote_recently(product_id):
+    """読み取りはレプリカ、書き込み直後のクライアントはプライマリから読む"""
+    assert client.get(f"/api/v1/products/{product_id}").status_code == 404
+    response = client.get(
+        f"/api/v1/products/{product_id}", headers={"Cookie": f"{settings.REPLICA_STICKY_COOKIE}=1"}
+    )
+    assert response.status_code == 200
+
+
+def test_unhealthy_replica_falls_back_to_primary(product_id):
+    """正常なレプリカが無ければプライマリから読む"""
+    fallbacks = replica_set.fallbacks
+    for member in replica_set.replicas:
+        member.healthy = False
+    assert client.get(f"/api/v1/products/{product_id}").status_code == 200
+    assert replica_set.fallbacks > fallbacks
+
+
+def test_writes_pin_session_to_primary(product_id):
+    """書き込み後は同じセッションの読み取りもプライマリで行う"""
+    async def scenario():
+        async with TestingSessionLocal() as session:
+            session.info[READ_REPLICA_KEY] = True
+            before = await session.scalar(select(Product).where(Product.id == product_id))
+            session.add(Product(name="固定テスト", category="shampoo", price=1000))
+            await session.flush()
+            after = await session.scalar(select(Product).where(Product.id == product_id))
+            await session.rollback()
+            return before, after
+
+    before, after = asyncio.run(scenario())
+    assert before is None
+    assert after is not None
+
+
+def test_lagging_replica_is_removed_and_restored():
+    """遅延が許容値以上のレプリカは外し、追いついたら戻す"""
+    lagging = ReplicaSet([replica], max_lag=1.0)
+    lag = {"value": 5.0}
+
+    async def measure_lag(engine):
+        return lag["value"]
+
+    lagging._measure_lag = measure_lag
+    asyncio.run(lagging.check_all())
+    assert lagging.choose() is None
+    lag["value"] = 0.1
+    asyncio.run(lagging.check_all())
+    assert lagging.choose() is replica
+
+
+def test_replica_reads_are_not_cached_right_after_purge(product_id):
+    """破棄直後にレプリカから読んだレスポンスは、許容遅延が過ぎるまで保存しない"""
+    assert client.get("/api/v1/products/").headers["x-cache"] == "MISS"
+    assert client.get("/api/v1/products/").headers["x-cache"] == "MISS"
+    response_cache.purged_at -= settings.REPLICA_MAX_LAG
+    assert client.get("/api/v1/products/").headers["x-cache"] == "MISS"
+    assert client.get("/api/v1/products/").headers["x-cache"] == "HIT"
+
+
+def test_successful_writes_set_sticky_cookie():
+    """書き込みに成功したレスポンスのみCookieを付ける"""
+    inner = FastAPI()
+
+    @inner.post("/ok")
+    async def ok():
+        return {}
+
+    @inner.post("/fail")
+    async def fail():
+        raise HTTPException(status_code=400)
+
+    @inner.get("/read")
+    async def read():
+        return {}
+
+    inner.add_middleware(ReadYourWritesMiddleware, sticky_seconds=5)
+    inner_client = TestClient(inner)
+    assert "Max-Age=5" in inner_client.post("/ok").headers["set-cookie"]
+    assert "set-cookie" not in inner_client.post("/fail").headers
+    assert "set-cookie" not in inner_client.get("/read").headers
@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from app.core.database import unit_of_work
+from app.core.events import EventBroker
+from app.core.response_cache import (
+    CacheInvalidator, ResponseCache, mark_stale, product_write_tags, response_cache
+)
+from app.crud import product as crud_product
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+@pytest.fixture(scope="module")
+def products():
+    """カテゴリの異なるおすすめ商品"""
+    ids = {}
+    for category in ("shampoo", "color"):
+        response = client.post("/api/v1/products/", json={
+            "name": f"キャッシュテスト{category}", "category": category, "price": 2500,
+            "stock_quantity": 10, "is_featured": True, "status": "active"
+        })
+        assert response.status_code == 201
+        ids[category] = response.json()["id"]
+    return ids
+
+
+def test_hit_skips_handler(products, monkeypatch):
+    """2回目以降はハンドラ（DB・シリアライズ）を実行せず保存済みのボディを返す"""
+    first = client.get("/api/v1/products/featured")
+    assert first.headers["x-cache"] == "MISS"
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("キャッシュヒット時にDBを参照した")
+
+    monkeypatch.setattr(crud_product, "get_featured_products", fail)
+    second = client.get("/api/v1/products/featured")
+    assert second.headers["x-cache"] == "HIT"
+    assert second.content == first.content
+    assert second.headers["content-type"] == first.headers["content-type"]
+
+
+def test_key_normalizes_query_and_varies_on_encoding(products):
+    """クエリの順序は正規化し、Accept-Encoding 毎に別のエントリとする"""
+    url = "/api/v1/products/"
+    assert client.get(url + "?page=1&size=5").headers["x-cache"] == "MISS"
+    assert client.get(url + "?size=5&page=1").headers["x-cache"] == "HIT"
+    response = client.get(url + "?page=1&size=5", headers={"Accept-Encoding": "identity"})
+    assert response.headers["x-cache"] == "MISS"
+
+
+def test_write_purges_only_affected_responses(products):
+    """在庫更新では該当商品・カテゴリを含むレスポンスのみ破棄する"""
+    shampoo = "/api/v1/products/?category=shampoo"
+    color = "/api/v1/products/?category=color"
+    featured = "/api/v1/products/featured"
+    for url in (shampoo, color, featured):
+        client.get(url)
+        assert client.get(url).headers["x-cache"] == "HIT"
+
+    response = client.patch(
+        f"/api/v1/products/{products['shampoo']}/stock", json={"stock_quantity": 4}
+    )
+    assert response.status_code == 200
+
+    assert client.get(color).headers["x-cache"] == "HIT"
+    refreshed = client.get(shampoo)
+    assert refreshed.headers["x-cache"] == "MISS"
+    assert refreshed.json()["items"][0]["stock_quantity"] == 4
+    assert client.get(featured).headers["x-cache"] == "MISS"
+
+
+def test_rolled_back_write_keeps_entries(products, database):
+    """ロールバックされた書き込みではキャッシュを破棄しない"""
+    url = "/api/v1/products/?category=color"
+    client.get(url)
+
+    async def scenario():
+        async with database.session() as db:
+            with pytest.raises(RuntimeError):
+                async with unit_of_work(db):
+                    await crud_product.update_stock(db, product_id=products["color"], quantity_change=1)
+                    raise RuntimeError("rollback")
+
+    asyncio.run(scenario())
+    assert client.get(url).headers["x-cache"] == "HIT"
+
+
+def test_authenticated_requests_bypass_cache(products):
+    """認証ヘッダー付きのリクエストは保存・返却の対象外"""
+    url = "/api/v1/products/featured"
+    client.get(url)
+    response = client.get(url, headers={"Authorization": "Bearer token"})
+    assert "x-cache" not in response.headers
+
+
+def test_cache_evicts_and_purges_by_tag():
+    """最大件数を超えると最も古く参照されたエントリから破棄し、タグで破棄できる"""
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.set("a", status=200, headers=[], body=b"a", tags={"product:1"})
+    cache.set("b", status=200, headers=[], body=b"b", tags={"product:2"})
+    assert cache.get("a") is not None
+    cache.set("c", status=200, headers=[], body=b"c", tags={"product:2"})
+    assert cache.get("b") is None
+    assert cache.purge({"product:2"}) == 1
+    assert cache.get("a").body == b"a"
+    assert len(cache) == 1
+
+
+def test_invalidation_reaches_other_workers():
+    """コミット時の無効化はブローカー経由で他ワーカーのキャッシュも破棄する"""
+    async def scenario():
+        broker = EventBroker()
+        caches = [ResponseCache(), ResponseCache()]
+        workers = [CacheInvalidator(cache, broker) for cache in caches]
+        for cache in caches:
+            cache.set("featured", status=200, headers=[], body=b"[]", tags=product_write_tags(1, "shampoo"))
+        for worker in workers:
+            await worker.start()
+        await asyncio.sleep(0)
+
+        workers[0].invalidate(product_write_tags(1, "shampoo"))
+        for _ in range(3):
+            await asyncio.sleep(0)
+        result = [len(cache) for cache in caches]
+        for worker in workers:
+            await worker.stop()
+        return result
+
+    assert asyncio.run(scenario()) == [0, 0]
+
+
+def test_mark_stale_is_applied_on_commit(products, database):
+    """書き込みのタグはコミット時に破棄される"""
+    url = "/api/v1/products/?category=shampoo"
+    client.get(url)
+
+    async def scenario():
+        async with database.session() as db:
+            mark_stale(db, {"category:shampoo"})
+            assert client.get(url).headers["x-cache"] == "HIT"
+            await db.commit()
+
+    asyncio.run(scenario())
+    assert client.get(url).headers["x-cache"] == "MISS"
+    assert response_cache.stats()["purged"] >= 1
@@ -0,0 +1,41 @@
+import pytest
+
+from app.core import server
+from app.core.config import settings
+
+
+def test_production_options(monkeypatch):
+    """本番モードはCPUコア数分のワーカー・preload・ワーカー再起動を設定する"""
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 0)
+    monkeypatch.setattr(server.multiprocessing, "cpu_count", lambda: 8)
+    options = server.gunicorn_options()
+    assert options["workers"] == 8
+    assert options["preload_app"] is True
+    assert options["max_requests"] == settings.SERVER_MAX_REQUESTS
+    assert options["graceful_timeout"] == settings.SERVER_GRACEFUL_TIMEOUT
+
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 3)
+    assert server.gunicorn_options()["workers"] == 3
+
+
+def test_worker_uses_uvloop_and_httptools():
+    """ワーカークラスは uvloop・httptools を使う"""
+    pytest.importorskip("gunicorn")
+    from app.core.gunicorn_worker import UvloopWorker
+
+    assert server.gunicorn_options()["worker_class"] == "app.core.gunicorn_worker.UvloopWorker"
+    assert UvloopWorker.CONFIG_KWARGS["loop"] == "uvloop"
+    assert UvloopWorker.CONFIG_KWARGS["http"] == "httptools"
+
+
+def test_mode_follows_environment(monkeypatch):
+    """ENVIRONMENT に応じて起動モードを切り替える"""
+    calls = []
+    monkeypatch.setattr(server, "run_production", lambda: calls.append("production"))
+    monkeypatch.setattr(server, "run_development", lambda: calls.append("development"))
+
+    monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+    server.run()
+    monkeypatch.setattr(settings, "ENVIRONMENT", "development")
+    server.run()
+    assert calls == ["production", "development"]
@@ -0,0 +1,127 @@
+import asyncio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from app.api.v1.products import product_reads
+from app.core.singleflight import SingleFlight, make_key
+from app.crud import product as crud_product
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def test_concurrent_calls_share_one_execution():
+    """実行中のキーへの呼び出しは同じ結果を共有し、完了後は改めて実行される"""
+    flight = SingleFlight("test")
+    calls = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def load():
+            calls.append(1)
+            await release.wait()
+            return {"value": len(calls)}
+
+        tasks = [asyncio.create_task(flight.do(make_key("k", a=1), load)) for _ in range(5)]
+        other = asyncio.create_task(flight.do(make_key("k", a=2), load))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+        await other
+        again = await flight.do(make_key("k", a=1), load)
+        return results, again
+
+    results, again = asyncio.run(scenario())
+    assert all(result is results[0] for result in results)
+    assert again["value"] == 3
+    assert len(calls) == 3
+
+    stats = flight.snapshot()
+    assert stats["calls"] == 7
+    assert stats["executions"] == 3
+    assert stats["coalesced"] == 4
+    assert stats["coalescing_rate"] == pytest.approx(4 / 7)
+    assert stats["in_flight"] == 0
+
+
+def test_leader_error_and_cancellation():
+    """リーダーの例外は待機者にも伝わり、リーダーの中断時は待機者が実行し直す"""
+    flight = SingleFlight("test")
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def failing():
+            started.set()
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        leader = asyncio.create_task(flight.do("error", failing))
+        await started.wait()
+        follower = asyncio.create_task(flight.do("error", failing))
+        errors = await asyncio.gather(leader, follower, return_exceptions=True)
+
+        started.clear()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def fast():
+            return "ok"
+
+        leader = asyncio.create_task(flight.do("cancel", slow))
+        await started.wait()
+        follower = asyncio.create_task(flight.do("cancel", fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return errors, await follower
+
+    errors, result = asyncio.run(scenario())
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert result == "ok"
+
+
+def test_concurrent_featured_requests_coalesce(monkeypatch):
+    """同時に届いた同一条件のおすすめ商品リクエストはクエリを1回だけ実行する"""
+    for index in range(3):
+        response = client.post("/api/v1/products/", json={
+            "name": f"合流テスト商品{index}", "category": "shampoo", "price": 1800,
+            "stock_quantity": 5, "is_featured": True, "status": "active"
+        })
+        assert response.status_code == 201
+
+    original = crud_product.get_featured_products
+    queries = []
+
+    async def slow_featured(db, *, limit=10):
+        queries.append(limit)
+        await asyncio.sleep(0.05)
+        return await original(db, limit=limit)
+
+    monkeypatch.setattr(crud_product, "get_featured_products", slow_featured)
+    product_reads.reset()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(
+                *[ac.get("/api/v1/products/featured", params={"limit": 5}) for _ in range(10)],
+                ac.get("/api/v1/products/featured", params={"limit": 3})
+            )
+
+    responses = asyncio.run(scenario())
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.text for response in responses[:10]}) == 1
+    assert len(responses[0].json()) == 3
+    assert sorted(queries) == [3, 5]
+
+    metrics = client.get("/api/v1/metrics/").json()["singleflight"]["products"]
+    assert metrics["calls"] == 11
+    assert metrics["executions"] == 2
+    assert metrics["coalesced"] == 9
+    assert metrics["wait_seconds_max"] > 0
@@ -0,0 +1,58 @@
+import asyncio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from app.core.config import settings
+from app.core.startup import FirstRequestMiddleware, StartupProfile
+
+
+def _run_lifespan():
+    async def scenario():
+        async with main.lifespan(main.app):
+            pass
+    asyncio.run(scenario())
+
+
+def test_production_skips_create_all(monkeypatch):
+    """本番環境ではテーブル作成を行わない（スキーマはAlembicで管理）"""
+    calls = []
+
+    async def create_db_and_tables():
+        calls.append(settings.ENVIRONMENT)
+
+    monkeypatch.setattr(main, "create_db_and_tables", create_db_and_tables)
+    monkeypatch.setattr(main.dispatcher, "start", lambda: None)
+    monkeypatch.setattr(settings, "SCHEDULER_ENABLED", False)
+
+    monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+    _run_lifespan()
+    monkeypatch.setattr(settings, "ENVIRONMENT", "development")
+    _run_lifespan()
+    assert calls == ["development"]
+
+
+def test_first_request_is_recorded_once():
+    """最初のリクエストの完了時刻を1回だけ記録する"""
+    profile = StartupProfile()
+    profile.mark("imports")
+    inner = FastAPI()
+
+    @inner.get("/")
+    async def root():
+        return {}
+
+    inner.add_middleware(FirstRequestMiddleware, profile=profile)
+    client = TestClient(inner)
+    client.get("/")
+    first = profile.phases["first_request"]
+    client.get("/")
+    assert profile.phases["first_request"] == first
+    assert first >= profile.phases["imports"]
+    assert set(profile.snapshot()) >= {"imports_seconds", "first_request_seconds"}
+
+
+def test_metrics_include_startup_profile():
+    """起動プロファイルを /metrics で確認できる"""
+    startup = TestClient(main.app).get("/api/v1/metrics/").json()["startup"]
+    assert startup["imports_seconds"] > 0
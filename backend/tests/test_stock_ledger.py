@@ -0,0 +1,164 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+
+from main import app
+from app.crud.stock import COUNTER_SHARDS, stock_ledger
+from app.models import ProductStockCounter, StockMovement
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def _create_product(stock: int) -> int:
+    return client.post("/api/v1/products/", json={
+        "name": "引当商品", "category": "treatment", "price": 2000, "stock_quantity": stock
+    }).json()["id"]
+
+
+def _create_requests(product_id: int, count: int, quantity: int = 1) -> list:
+    return [
+        client.post("/api/v1/trial-requests/", json={"product_id": product_id, "quantity": quantity}).json()["id"]
+        for _ in range(count)
+    ]
+
+
+def _availability(product_id: int) -> dict:
+    response = client.get(f"/api/v1/products/{product_id}/availability")
+    assert response.status_code == 200
+    return response.json()
+
+
+def _counters(database, product_id: int) -> dict:
+    async def load():
+        async with database.session() as db:
+            result = await db.execute(
+                select(ProductStockCounter.shard, ProductStockCounter.reserved)
+                .where(ProductStockCounter.product_id == product_id)
+            )
+            return dict(result.tuples().all())
+    return asyncio.run(load())
+
+
+def test_reserve_on_approve_and_release_on_reject_or_cancel():
+    product_id = _create_product(10)
+    approved, cancelled, rejected = _create_requests(product_id, 3, quantity=2)
+    assert _availability(product_id)["reserved_quantity"] == 0
+
+    client.patch(f"/api/v1/trial-requests/{approved}/approve?staff_id=1", json={})
+    client.patch(f"/api/v1/trial-requests/{cancelled}/approve?staff_id=1", json={})
+    client.patch(f"/api/v1/trial-requests/{rejected}/reject", json={})
+    assert _availability(product_id) == {
+        "product_id": product_id, "stock_quantity": 10, "reserved_quantity": 4, "available_quantity": 6
+    }
+
+    response = client.patch(
+        f"/api/v1/trial-requests/{cancelled}/status?staff_id=1", json={"status": "cancelled"}
+    )
+    assert response.status_code == 200
+    assert _availability(product_id)["available_quantity"] == 8
+
+    # 在庫数の変更は引当に影響しない
+    client.patch(f"/api/v1/products/{product_id}/stock", json={"stock_quantity": 1})
+    assert _availability(product_id) == {
+        "product_id": product_id, "stock_quantity": 1, "reserved_quantity": 2, "available_quantity": -1
+    }
+
+    movements = client.get(f"/api/v1/products/{product_id}/stock-movements").json()
+    assert movements["total"] == 3
+    assert [(item["trial_request_id"], item["kind"], item["quantity"]) for item in movements["items"]] == [
+        (cancelled, "release", -2), (cancelled, "reserve", 2), (approved, "reserve", 2)
+    ]
+    assert client.get("/api/v1/products/999999/availability").status_code == 404
+
+
+def test_complete_consumes_reserved_stock():
+    """完了は引当を消費して在庫数を減らし、渡した分は再び引当可能にならない"""
+    product_id = _create_product(5)
+    request_id, = _create_requests(product_id, 1, quantity=2)
+    client.patch(f"/api/v1/trial-requests/{request_id}/approve?staff_id=1", json={})
+    assert _availability(product_id)["available_quantity"] == 3
+
+    response = client.patch(f"/api/v1/trial-requests/{request_id}/complete?staff_id=1", json={})
+    assert response.status_code == 200
+    assert _availability(product_id) == {
+        "product_id": product_id, "stock_quantity": 3, "reserved_quantity": 0, "available_quantity": 3
+    }
+    assert client.get(f"/api/v1/products/{product_id}").json()["stock_quantity"] == 3
+    items = client.get(f"/api/v1/products/{product_id}/stock-movements").json()["items"]
+    assert [(item["kind"], item["quantity"]) for item in items] == [("consume", -2), ("reserve", 2)]
+
+
+def test_bulk_transitions_spread_over_counter_shards(database):
+    """同じ商品の承認は複数の行に分けて加算し、完了で消費・期限切れで解除する"""
+    product_id = _create_product(100)
+    ids = _create_requests(product_id, 20)
+
+    response = client.post("/api/v1/trial-requests/bulk/approve?staff_id=1", json={"ids": ids})
+    assert response.json()["applied"] == 20
+    counters = _counters(database, product_id)
+    assert len(counters) == COUNTER_SHARDS
+    assert sum(counters.values()) == 20
+
+    # 開始では引当は変わらない
+    client.post("/api/v1/trial-requests/bulk/start?staff_id=1", json={"ids": ids[:5]})
+    client.post("/api/v1/trial-requests/bulk/complete", json={"ids": ids[:10]})
+    assert _availability(product_id) == {
+        "product_id": product_id, "stock_quantity": 90, "reserved_quantity": 10, "available_quantity": 80
+    }
+
+    async def expire():
+        from app.crud.trial_request import trial_request
+        async with database.session() as db:
+            return await trial_request.expire_due(db, now=datetime.utcnow() + timedelta(days=365))
+    asyncio.run(expire())
+    assert _availability(product_id)["reserved_quantity"] == 0
+    assert _availability(product_id)["stock_quantity"] == 90
+
+
+def test_compact_folds_old_movements_and_repairs_counters(database):
+    product_id = _create_product(5)
+    ids = _create_requests(product_id, 3)
+    for request_id in ids:
+        client.patch(f"/api/v1/trial-requests/{request_id}/approve?staff_id=1", json={})
+    client.patch(f"/api/v1/trial-requests/{ids[0]}/reject", json={})
+    client.patch(f"/api/v1/trial-requests/{ids[0]}/status?staff_id=1", json={"status": "cancelled"})
+
+    async def scenario():
+        async with database.session() as db:
+            # 移動を40日前のものにし、カウンタをずらす
+            await db.execute(
+                update(StockMovement).where(StockMovement.product_id == product_id)
+                .values(created_at=datetime.utcnow() - timedelta(days=40))
+            )
+            await db.execute(
+                update(ProductStockCounter).where(ProductStockCounter.product_id == product_id)
+                .values(reserved=ProductStockCounter.reserved + 5)
+            )
+            await db.commit()
+            folded = await stock_ledger.compact(db, older_than=timedelta(days=30))
+            rows = await db.execute(
+                select(StockMovement.kind, StockMovement.quantity, StockMovement.trial_request_id)
+                .where(StockMovement.product_id == product_id)
+            )
+            return folded, rows.tuples().all()
+
+    folded, rows = asyncio.run(scenario())
+    assert folded == 4
+    assert [(kind.value, quantity, request_id) for kind, quantity, request_id in rows] == [
+        ("compacted", 2, None)
+    ]
+    assert _availability(product_id)["reserved_quantity"] == 2
+    assert sum(_counters(database, product_id).values()) == 2
+
+    # 新しい移動は圧縮されない
+    client.patch(f"/api/v1/trial-requests/{ids[1]}/status?staff_id=1", json={"status": "cancelled"})
+    async def compact():
+        async with database.session() as db:
+            return await stock_ledger.compact(db, older_than=timedelta(days=30))
+    assert asyncio.run(compact()) == 0
+    assert _availability(product_id)["reserved_quantity"] == 1
+    assert client.get(f"/api/v1/products/{product_id}/stock-movements").json()["total"] == 2
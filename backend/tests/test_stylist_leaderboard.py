@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from main import app
+from app.core.config import settings
+from app.crud.trial_rollup import leaderboard_range
+from app.models import TrialRequest, User, UserRole
+
+SATO, SUZUKI = 3, 4
+
+client = TestClient(app)
+
+
+async def _seed(session_factory):
+    async with session_factory() as session:
+        session.add(User(
+            id=SATO, email="sato@example.com", hashed_password="x",
+            full_name="佐藤", role=UserRole.STYLIST
+        ))
+        await session.commit()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database(database):
+    """テストデータベースのセットアップ（スタイリストを追加）"""
+    asyncio.run(_seed(database.session))
+
+
+def _create_requests(product_id: int, count: int) -> list:
+    return [
+        client.post("/api/v1/trial-requests/", json={"product_id": product_id}).json()["id"]
+        for _ in range(count)
+    ]
+
+
+def _bulk(action: str, ids: list, staff_id: int = 1):
+    response = client.post(f"/api/v1/trial-requests/bulk/{action}?staff_id={staff_id}", json={"ids": ids})
+    assert response.json()["applied"] == len(ids)
+
+
+def _leaderboard(**params) -> list:
+    now = datetime.utcnow()
+    params.setdefault("start", (now - timedelta(hours=1)).isoformat())
+    params.setdefault("end", (now + timedelta(hours=1)).isoformat())
+    response = client.get("/api/v1/trial-requests/leaderboard", params=params)
+    assert response.status_code == 200
+    return response.json()["entries"]
+
+
+@pytest.fixture(scope="module")
+def activity(database):
+    """佐藤: 2件を担当・完了（1件で購入意向あり）、鈴木: 1件を開始、1件を開始せずに完了"""
+    product_id = client.post("/api/v1/products/", json={
+        "name": "ランキング商品", "category": "treatment", "price": 2000
+    }).json()["id"]
+    sato = _create_requests(product_id, 2)
+    suzuki = _create_requests(product_id, 2)
+
+    # 佐藤の担当分は作成から承認まで2時間かかったことにする
+    async def age():
+        async with database.session() as db:
+            await db.execute(
+                update(TrialRequest).where(TrialRequest.id.in_(sato))
+                .values(created_at=datetime.utcnow() - timedelta(hours=2))
+            )
+            await db.commit()
+    asyncio.run(age())
+
+    _bulk("approve", sato, SATO)
+    _bulk("start", sato, SATO)
+    _bulk("complete", sato)
+    client.post(f"/api/v1/trial-requests/{sato[0]}/feedback", json={
+        "customer_rating": 5, "effectiveness_rating": 5, "purchase_intent": True
+    })
+    _bulk("approve", suzuki, SUZUKI)
+    _bulk("start", suzuki[:1], SUZUKI)
+    _bulk("complete", suzuki[1:], SUZUKI)
+
+
+def test_leaderboard_aggregates_per_stylist(activity):
+    entries = {entry["stylist_id"]: entry for entry in _leaderboard()}
+    assert set(entries) == {SATO, SUZUKI}
+
+    sato = entries[SATO]
+    assert sato["name"] == "佐藤"
+    assert (sato["handled"], sato["completions"], sato["conversions"]) == (2, 2, 1)
+    assert sato["completion_rate"] == pytest.approx(1.0)
+    assert sato["conversion_rate"] == pytest.approx(0.5)
+    assert sato["avg_approval_seconds"] == pytest.approx(7200, abs=60)
+
+    suzuki = entries[SUZUKI]
+    assert suzuki["name"] is None
+    assert (suzuki["handled"], suzuki["completions"], suzuki["conversions"]) == (2, 1, 0)
+    assert suzuki["completion_rate"] == pytest.approx(0.5)
+    assert suzuki["avg_approval_seconds"] < 60
+
+
+@pytest.mark.parametrize("sort, expected", [
+    ("handled", [SATO, SUZUKI]),
+    ("completion_rate", [SATO, SUZUKI]),
+    ("conversion_rate", [SATO, SUZUKI]),
+    ("approval_time", [SUZUKI, SATO]),
+])
+def test_leaderboard_sort(activity, sort, expected):
+    entries = _leaderboard(sort=sort)
+    assert [entry["stylist_id"] for entry in entries] == expected
+    assert [entry["rank"] for entry in entries] == [1, 2]
+
+
+def test_leaderboard_windows(activity):
+    """日の境界の期間は日単位の集計から読み、期間外・最低担当件数未満は含めない"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    daily = _leaderboard(start=today.isoformat(), end=(today + timedelta(days=1)).isoformat())
+    assert daily == _leaderboard()
+
+    assert _leaderboard(start=(today - timedelta(days=7)).isoformat(), end=today.isoformat()) == []
+    assert _leaderboard(min_handled=3) == []
+    assert len(_leaderboard(limit=1)) == 1
+
+
+def test_leaderboard_snaps_ranges_older_than_hourly_retention(activity):
+    """時間単位の集計が削除済みの期間から始まる場合は日の境界に広げて日単位の集計から読む"""
+    now = datetime.utcnow()
+    start = now - timedelta(days=settings.TRIAL_ROLLUP_HOURLY_RETENTION_DAYS + 30, hours=-3)
+    response = client.get("/api/v1/trial-requests/leaderboard", params={
+        "start": start.isoformat(), "end": (now + timedelta(hours=1)).isoformat()
+    })
+    assert response.status_code == 200
+    body = response.json()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    assert datetime.fromisoformat(body["start"]) == start.replace(hour=0, minute=0, second=0, microsecond=0)
+    assert datetime.fromisoformat(body["end"]) > now
+    assert datetime.fromisoformat(body["end"]) - today in (timedelta(days=1), timedelta(days=2))
+    assert body["entries"] == _leaderboard()
+
+    now = datetime(2026, 10, 19, 8)
+    recent = (datetime(2026, 10, 1, 5), datetime(2026, 10, 19, 7))
+    assert leaderboard_range(*recent, now=now) == recent
+    assert leaderboard_range(datetime(2026, 1, 1, 5), datetime(2026, 10, 19, 7), now=now) == (
+        datetime(2026, 1, 1), datetime(2026, 10, 20)
+    )
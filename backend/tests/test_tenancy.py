@@ -0,0 +1,177 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+
+from main import app
+from app.core.config import settings
+from app.core.tenancy import parse_salon_id
+from app.crud import trial_request as crud_trial_request
+from app.models import DEFAULT_SALON_ID, Product, Salon, TrialRequest
+from app.models.trial_request import TrialStatus
+
+OTHER_SALON_ID = 2
+
+client = TestClient(app)
+
+
+async def _seed(session_factory):
+    async with session_factory() as session:
+        session.add(Salon(id=OTHER_SALON_ID, name="二号店", code="second"))
+        await session.commit()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database(database):
+    """テストデータベースのセットアップ（2店舗目を追加）"""
+    asyncio.run(_seed(database.session))
+
+
+def _salon(salon_id: int):
+    return {settings.TENANT_HEADER: str(salon_id)}
+
+
+def _create_product(salon_id: int, name: str) -> int:
+    response = client.post("/api/v1/products/", headers=_salon(salon_id), json={
+        "name": name, "category": "shampoo", "price": 1500, "stock_quantity": 3
+    })
+    assert response.status_code == 201
+    assert response.json()["salon_id"] == salon_id
+    return response.json()["id"]
+
+
+def test_parse_salon_id():
+    """未指定は既定のサロン、不正な値は None"""
+    assert parse_salon_id(None) == DEFAULT_SALON_ID
+    assert parse_salon_id(" ") == DEFAULT_SALON_ID
+    assert parse_salon_id("2") == 2
+    assert parse_salon_id("0") is None
+    assert parse_salon_id("abc") is None
+
+
+def test_products_are_isolated_per_salon():
+    """他のサロンの商品は一覧・取得・更新・削除の対象にならない"""
+    own_id = _create_product(OTHER_SALON_ID, "二号店の商品")
+    default_id = _create_product(DEFAULT_SALON_ID, "本店の商品")
+
+    names = [p["name"] for p in client.get("/api/v1/products/", headers=_salon(OTHER_SALON_ID)).json()["items"]]
+    assert "二号店の商品" in names
+    assert "本店の商品" not in names
+
+    assert client.get(f"/api/v1/products/{own_id}").status_code == 404
+    assert client.get(f"/api/v1/products/{default_id}", headers=_salon(OTHER_SALON_ID)).status_code == 404
+    response = client.put(
+        f"/api/v1/products/{default_id}", headers=_salon(OTHER_SALON_ID), json={"price": 1}
+    )
+    assert response.status_code == 404
+    assert client.delete(f"/api/v1/products/{default_id}", headers=_salon(OTHER_SALON_ID)).status_code == 404
+    assert client.get(f"/api/v1/products/{default_id}").json()["price"] != 1
+
+
+def test_invalid_salon_header_is_rejected():
+    """不正なテナントヘッダーは 400"""
+    response = client.get("/api/v1/products/", headers={settings.TENANT_HEADER: "abc"})
+    assert response.status_code == 400
+
+
+def test_response_cache_is_keyed_per_salon():
+    """レスポンスキャッシュはサロン毎に分ける"""
+    _create_product(OTHER_SALON_ID, "キャッシュ確認用")
+    assert client.get("/api/v1/products/featured", headers=_salon(OTHER_SALON_ID)).status_code == 200
+    first = client.get("/api/v1/products/featured", headers=_salon(OTHER_SALON_ID))
+    assert first.headers["x-cache"] == "HIT"
+    assert client.get("/api/v1/products/featured").headers["x-cache"] == "MISS"
+
+
+def test_import_slugs_are_unique_per_salon(database):
+    """同じ名前の商品を別のサロンにインポートしても衝突しない"""
+    content = "name,category,price\nSalon Oil,treatment,2400\n".encode("utf-8")
+    for salon_id in (DEFAULT_SALON_ID, OTHER_SALON_ID):
+        response = client.post(
+            "/api/v1/products/import",
+            headers=_salon(salon_id),
+            files={"file": ("catalog.csv", content, "text/csv")}
+        )
+        assert response.status_code == 200
+        assert response.json()["created"] == 1
+
+    async def slugs():
+        async with database.session() as session:
+            rows = await session.execute(
+                select(Product.salon_id, Product.slug).where(Product.name == "Salon Oil")
+            )
+            return sorted(rows.all())
+
+    assert asyncio.run(slugs()) == [(DEFAULT_SALON_ID, "salon-oil"), (OTHER_SALON_ID, "salon-oil")]
+
+
+def test_expire_due_runs_for_every_salon(database):
+    """期限切れの遷移は全サロンが対象"""
+    product_ids = {salon_id: _create_product(salon_id, f"期限テスト{salon_id}")
+                   for salon_id in (DEFAULT_SALON_ID, OTHER_SALON_ID)}
+
+    ids = []
+    for salon_id, product_id in product_ids.items():
+        response = client.post(
+            "/api/v1/trial-requests/", headers=_salon(salon_id), json={"product_id": product_id}
+        )
+        assert response.status_code == 201
+        ids.append(response.json()["id"])
+
+    async def scenario():
+        now = datetime.utcnow()
+        async with database.session() as session:
+            await session.execute(
+                update(TrialRequest).where(TrialRequest.id.in_(ids))
+                .values(status=TrialStatus.IN_PROGRESS, due_date=now - timedelta(hours=1))
+            )
+            await session.commit()
+            counts = await crud_trial_request.expire_due(session, now=now)
+            rows = await session.execute(
+                select(TrialRequest.salon_id, TrialRequest.status).where(TrialRequest.id.in_(ids))
+            )
+            return counts, sorted(rows.all())
+
+    counts, rows = asyncio.run(scenario())
+    assert counts[TrialStatus.COMPLETED] == 2
+    assert rows == [
+        (DEFAULT_SALON_ID, TrialStatus.COMPLETED),
+        (OTHER_SALON_ID, TrialStatus.COMPLETED)
+    ]
+
+
+def test_event_feed_is_isolated_per_salon(database):
+    """変更イベントのフィードはリクエストのサロンのイベントのみを返す"""
+    events = {}
+    for salon_id in (DEFAULT_SALON_ID, OTHER_SALON_ID):
+        product_id = _create_product(salon_id, f"イベントテスト{salon_id}")
+        client.patch(
+            f"/api/v1/products/{product_id}/stock", headers=_salon(salon_id), json={"stock_quantity": 1}
+        )
+        request_id = client.post(
+            "/api/v1/trial-requests/", headers=_salon(salon_id), json={"product_id": product_id}
+        ).json()["id"]
+        # 一括承認のイベント（executemany で追加）も発生元のサロンに所属する
+        client.post(
+            "/api/v1/trial-requests/bulk/approve", headers=_salon(salon_id), json={"ids": [request_id]}
+        )
+        events[salon_id] = {
+            (product_id, "product.stock_changed"),
+            (request_id, "trial_request.created"),
+            (request_id, "trial_request.approved"),
+        }
+    asyncio.run(database.dispatch_outbox())
+
+    feeds = {}
+    for salon_id in events:
+        response = client.get("/api/v1/events/", headers=_salon(salon_id), params={"limit": 1000})
+        assert response.status_code == 200
+        items = response.json()["items"]
+        assert {item["salon_id"] for item in items} == {salon_id}
+        feeds[salon_id] = {(item["aggregate_id"], item["event_type"]) for item in items}
+
+    assert events[DEFAULT_SALON_ID] <= feeds[DEFAULT_SALON_ID]
+    assert events[OTHER_SALON_ID] <= feeds[OTHER_SALON_ID]
+    assert not feeds[OTHER_SALON_ID] & events[DEFAULT_SALON_ID]
+    assert not feeds[DEFAULT_SALON_ID] & events[OTHER_SALON_ID]
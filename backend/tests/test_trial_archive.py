@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, update
+
+from main import app
+from app.core.config import settings
+from app.crud import trial_request as crud_trial_request
+from app.models import Salon, TrialRequest, TrialRequestArchive
+
+OTHER_SALON_ID = 2
+
+client = TestClient(app)
+
+
+async def _seed(session_factory):
+    async with session_factory() as session:
+        session.add(Salon(id=OTHER_SALON_ID, name="二号店", code="second"))
+        await session.commit()
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_database(database):
+    """テストデータベースのセットアップ（2店舗目を追加）"""
+    asyncio.run(_seed(database.session))
+
+
+@pytest.fixture(scope="module")
+def product_id():
+    response = client.post("/api/v1/products/", json={
+        "name": "アーカイブテスト商品", "category": "treatment", "price": 2200
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _create_request(product_id: int) -> int:
+    response = client.post("/api/v1/trial-requests/", json={"product_id": product_id})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _age(database, request_ids, days: int):
+    """最終更新日時を過去にずらす"""
+    async def scenario():
+        async with database.session() as db:
+            await db.execute(
+                update(TrialRequest).where(TrialRequest.id.in_(request_ids))
+                .values(updated_at=datetime.utcnow() - timedelta(days=days))
+            )
+            await db.commit()
+    asyncio.run(scenario())
+
+
+def _archive(database, batch_size: int = 1000) -> int:
+    async def scenario():
+        async with database.session() as db:
+            return await crud_trial_request.archive_terminal(
+                db, older_than=timedelta(days=settings.TRIAL_ARCHIVE_AFTER_DAYS), batch_size=batch_size
+            )
+    return asyncio.run(scenario())
+
+
+def _counts(database):
+    async def scenario():
+        async with database.session() as db:
+            hot = await db.scalar(select(func.count(TrialRequest.id)))
+            archived = await db.scalar(select(func.count(TrialRequestArchive.id)))
+            return hot, archived
+    return asyncio.run(scenario())
+
+
+def test_archive_moves_only_old_terminal_requests(product_id, database):
+    """終了済みで一定期間更新の無いリクエストのみバッチ単位で移動する"""
+    rejected = [_create_request(product_id) for _ in range(3)]
+    client.post("/api/v1/trial-requests/bulk/reject", json={"ids": rejected})
+    recent = _create_request(product_id)
+    client.patch(f"/api/v1/trial-requests/{recent}/reject", json={})
+    pending = _create_request(product_id)
+    old = settings.TRIAL_ARCHIVE_AFTER_DAYS + 1
+    _age(database, rejected + [pending], old)
+
+    hot, archived = _counts(database)
+    assert _archive(database, batch_size=2) == 3
+    assert _counts(database) == (hot - 3, archived + 3)
+    assert _archive(database) == 0
+
+    # アーカイブ済みも元のIDで取得できる
+    data = client.get(f"/api/v1/trial-requests/{rejected[0]}").json()
+    assert data["id"] == rejected[0]
+    assert data["status"] == "rejected"
+    assert client.get(f"/api/v1/trial-requests/{pending}").json()["status"] == "pending"
+
+
+def test_history_endpoints_include_archived_requests(product_id, database):
+    """履歴の一覧は稼働中のテーブルとアーカイブを合わせて新しい順に返す"""
+    product = client.post("/api/v1/products/", json={
+        "name": "履歴テスト商品", "category": "treatment", "price": 2200
+    }).json()["id"]
+    ids = [_create_request(product) for _ in range(4)]
+    client.post("/api/v1/trial-requests/bulk/reject", json={"ids": ids[:2]})
+    _age(database, ids[:2], settings.TRIAL_ARCHIVE_AFTER_DAYS + 1)
+    assert _archive(database) == 2
+
+    listed = client.get(f"/api/v1/trial-requests/product/{product}?size=3").json()["items"]
+    assert [item["id"] for item in listed] == sorted(ids, reverse=True)[:3]
+    page2 = client.get(f"/api/v1/trial-requests/product/{product}?size=3&page=2").json()["items"]
+    assert [item["id"] for item in page2] == [min(ids)]
+
+    rejected = client.get(f"/api/v1/trial-requests/?product_id={product}&status=rejected").json()
+    assert sorted(item["id"] for item in rejected["items"]) == ids[:2]
+    pending = client.get(f"/api/v1/trial-requests/?product_id={product}&status=pending").json()
+    assert sorted(item["id"] for item in pending["items"]) == ids[2:]
+
+    exported = client.get(f"/api/v1/trial-requests/export?product_id={product}").text.splitlines()
+    assert len(exported) == 4
+
+
+def test_stats_include_archived_requests(product_id, database):
+    """統計の件数はアーカイブ後も変わらない"""
+    request_ids = [_create_request(product_id) for _ in range(2)]
+    client.post("/api/v1/trial-requests/bulk/reject", json={"ids": request_ids})
+    # SQLiteは最大のIDを再利用するため、アーカイブしないより新しいリクエストを残す
+    _create_request(product_id)
+    before = client.get("/api/v1/trial-requests/stats").json()
+
+    _age(database, request_ids, settings.TRIAL_ARCHIVE_AFTER_DAYS + 1)
+    assert _archive(database) == 2
+
+    after = client.get("/api/v1/trial-requests/stats").json()
+    assert after["total_requests"] == before["total_requests"] == sum(_counts(database))
+    assert after["status_breakdown"] == before["status_breakdown"]
+    assert after["status_breakdown"]["rejected"] >= 2
+    assert after["recent_requests"] == before["recent_requests"]
+
+
+def test_archived_requests_stay_in_their_salon(product_id, database):
+    """アーカイブ済みのリクエストも他のサロンからは参照できない"""
+    request_id = _create_request(product_id)
+    client.patch(f"/api/v1/trial-requests/{request_id}/reject", json={})
+    _age(database, [request_id], settings.TRIAL_ARCHIVE_AFTER_DAYS + 1)
+    assert _archive(database) == 1
+
+    headers = {settings.TENANT_HEADER: str(OTHER_SALON_ID)}
+    assert client.get(f"/api/v1/trial-requests/{request_id}", headers=headers).status_code == 404
+    items = client.get("/api/v1/trial-requests/customer/1", headers=headers).json()["items"]
+    assert items == []
+    assert client.get(f"/api/v1/trial-requests/{request_id}").status_code == 200
+
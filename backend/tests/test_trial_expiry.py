@@ -0,0 +1,221 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from main import app
+from app.core.scheduler import Scheduler
+from app.crud import outbox as crud_outbox, trial_request as crud_trial_request
+from app.models import SchedulerLease, TrialRequest
+from app.models.trial_request import TrialStatus
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+@pytest.fixture(scope="module")
+def product_id():
+    response = client.post("/api/v1/products/", json={
+        "name": "期限テスト商品", "category": "styling", "price": 1800
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _create_request(product_id: int, **fields) -> int:
+    response = client.post("/api/v1/trial-requests/", json={"product_id": product_id, **fields})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _parse(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+
+def _assert_close(actual: datetime, expected: datetime):
+    # SQLiteの日付計算はミリ秒精度
+    assert abs(actual - expected) < timedelta(milliseconds=1)
+
+
+def _set_due_date(database, request_ids, due_date: datetime):
+    async def scenario():
+        async with database.session() as db:
+            await db.execute(
+                update(TrialRequest).where(TrialRequest.id.in_(request_ids)).values(due_date=due_date)
+            )
+            await db.commit()
+    asyncio.run(scenario())
+
+
+def test_approve_and_start_set_due_date(product_id):
+    """承認時は希望開始日、開始時は開始日時にトライアル期間を加えた期限を設定する"""
+    preferred = datetime(2030, 1, 10, 9, 30)
+    request_id = _create_request(
+        product_id, trial_duration_days=5, preferred_start_date=preferred.isoformat()
+    )
+    
+    approved = client.patch(f"/api/v1/trial-requests/{request_id}/approve", json={}).json()
+    assert _parse(approved["due_date"]) == preferred + timedelta(days=5)
+    
+    started = client.patch(
+        f"/api/v1/trial-requests/{request_id}/status?staff_id=2", json={"status": "in_progress"}
+    ).json()
+    _assert_close(_parse(started["due_date"]), _parse(started["actual_start_date"]) + timedelta(days=5))
+
+
+def test_bulk_start_uses_each_trial_duration(product_id):
+    """一括開始でも行毎のトライアル期間で期限を設定する"""
+    ids = [_create_request(product_id, trial_duration_days=days) for days in (3, 14)]
+    client.post("/api/v1/trial-requests/bulk/approve", json={"ids": ids})
+    client.post("/api/v1/trial-requests/bulk/start", json={"ids": ids})
+    
+    for request_id, days in zip(ids, (3, 14)):
+        data = client.get(f"/api/v1/trial-requests/{request_id}").json()
+        _assert_close(_parse(data["due_date"]), _parse(data["actual_start_date"]) + timedelta(days=days))
+
+
+def test_expire_due_transitions_in_batches_and_emits_events(product_id, database):
+    """期限切れの実施中は完了、承認済みはキャンセルに遷移し、イベントを追加する"""
+    in_progress = [_create_request(product_id) for _ in range(3)]
+    client.post("/api/v1/trial-requests/bulk/approve", json={"ids": in_progress})
+    client.post("/api/v1/trial-requests/bulk/start", json={"ids": in_progress})
+    approved = [_create_request(product_id) for _ in range(2)]
+    client.post("/api/v1/trial-requests/bulk/approve", json={"ids": approved})
+    not_due = _create_request(product_id)
+    client.patch(f"/api/v1/trial-requests/{not_due}/approve", json={})
+    
+    now = datetime.utcnow()
+    _set_due_date(database, in_progress + approved, now - timedelta(days=1))
+    _set_due_date(database, [not_due], now + timedelta(days=1))
+    
+    async def scenario():
+        await database.dispatch_outbox()
+        async with database.session() as db:
+            cursor = await crud_outbox.get_latest_seq(db)
+            counts = await crud_trial_request.expire_due(db, now=now, batch_size=2)
+            again = await crud_trial_request.expire_due(db, now=now, batch_size=2)
+        await database.dispatch_outbox()
+        async with database.session() as db:
+            events = await crud_outbox.get_after(db, after=cursor)
+        return counts, again, events
+    
+    counts, again, events = asyncio.run(scenario())
+    assert counts[TrialStatus.COMPLETED] >= 3
+    assert counts[TrialStatus.CANCELLED] >= 2
+    assert set(again.values()) == {0}
+    
+    for request_id in in_progress:
+        data = client.get(f"/api/v1/trial-requests/{request_id}").json()
+        assert data["status"] == "completed"
+        assert data["completion_date"] is not None
+    for request_id in approved:
+        assert client.get(f"/api/v1/trial-requests/{request_id}").json()["status"] == "cancelled"
+    assert client.get(f"/api/v1/trial-requests/{not_due}").json()["status"] == "approved"
+    
+    by_type = {}
+    for event in events:
+        by_type.setdefault(event.event_type, set()).add(event.aggregate_id)
+    assert set(in_progress) <= by_type["trial_request.completed"]
+    assert set(in_progress) <= by_type["trial_request.feedback_requested"]
+    assert set(approved) <= by_type["trial_request.cancelled"]
+    assert not_due not in by_type.get("trial_request.cancelled", set())
+
+
+def test_only_one_scheduler_runs_jobs(database):
+    """リースを保持している1つのスケジューラのみがジョブを実行し、停止後は他が引き継ぐ"""
+    runs = []
+    
+    def make_scheduler(name: str) -> Scheduler:
+        scheduler = Scheduler(
+            session_factory=database.session, lease_name="test", lease_ttl=30, holder=name
+        )
+        
+        async def job(session_factory):
+            runs.append(name)
+        
+        scheduler.add_job("record", job, interval=3600)
+        return scheduler
+    
+    async def scenario():
+        first, second = make_scheduler("worker-1"), make_scheduler("worker-2")
+        results = [await first.tick(), await second.tick(), await first.tick()]
+        await first.stop()
+        results.append(await second.tick())
+        await second.stop()
+        return results
+    
+    assert asyncio.run(scenario()) == [True, False, True, True]
+    assert runs == ["worker-1", "worker-2"]
+
+
+def test_expired_lease_is_taken_over(database):
+    """リーダーが停止せずに落ちても、リースの期限が切れれば他のワーカーが引き継ぐ"""
+    async def scenario():
+        crashed = Scheduler(session_factory=database.session, lease_name="crash", lease_ttl=0.05, holder="a")
+        other = Scheduler(session_factory=database.session, lease_name="crash", lease_ttl=30, holder="b")
+        acquired = await crashed.acquire_leadership()
+        blocked = await other.acquire_leadership()
+        await asyncio.sleep(0.1)
+        return acquired, blocked, await other.acquire_leadership(), await crashed.acquire_leadership()
+    
+    assert asyncio.run(scenario()) == (True, False, True, False)
+
+
+def test_lease_is_renewed_while_a_job_outlives_the_ttl(database):
+    """有効期間より長いジョブの実行中もリースを延長し、他のワーカーは引き継がない"""
+    runs = []
+
+    async def scenario():
+        leader = Scheduler(session_factory=database.session, lease_name="slow", lease_ttl=0.3, holder="a")
+        other = Scheduler(session_factory=database.session, lease_name="slow", lease_ttl=0.3, holder="b")
+
+        async def slow(session_factory):
+            runs.append("start")
+            await asyncio.sleep(1.0)
+            runs.append("end")
+
+        leader.add_job("slow", slow, interval=3600)
+        running = asyncio.create_task(leader.tick())
+        taken = []
+        while not running.done():
+            await asyncio.sleep(0.1)
+            taken.append(await other.acquire_leadership())
+        return await running, taken
+
+    finished, taken = asyncio.run(scenario())
+    assert finished is True
+    assert runs == ["start", "end"]
+    assert not any(taken)
+
+
+def test_job_is_cancelled_when_the_lease_is_lost(database):
+    """実行中にリースを延長できなければジョブを中止し、以降のジョブも実行しない"""
+    runs = []
+
+    async def scenario():
+        leader = Scheduler(session_factory=database.session, lease_name="lost", lease_ttl=0.3, holder="a")
+
+        async def slow(session_factory):
+            runs.append("slow")
+            await asyncio.sleep(5)
+            runs.append("finished")
+
+        async def after(session_factory):
+            runs.append("after")
+
+        leader.add_job("slow", slow, interval=3600)
+        leader.add_job("after", after, interval=3600)
+        assert await leader.acquire_leadership()
+        # 他のワーカーに奪われた状態を再現
+        async with database.session() as db:
+            await db.execute(
+                update(SchedulerLease).where(SchedulerLease.name == "lost").values(holder="b")
+            )
+            await db.commit()
+        await leader.run_pending()
+        return leader.is_leader
+
+    assert asyncio.run(scenario()) is False
+    assert runs == ["slow"]
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from main import app
+from app.api.v1.trial_requests import stream_pending_queue
+from app.core.events import RedisEventBroker, broker
+from app.crud import outbox as crud_outbox
+from app.models import DEFAULT_SALON_ID
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+@pytest.fixture(scope="module")
+def product_id():
+    response = client.post("/api/v1/products/", json={
+        "name": "キュー配信テスト商品", "category": "treatment", "price": 2500
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _request_disconnecting_after(polls: int) -> Request:
+    """polls 回目以降の確認で切断を返すリクエスト"""
+    state = {"calls": 0}
+    
+    async def receive():
+        state["calls"] += 1
+        if state["calls"] > polls:
+            return {"type": "http.disconnect"}
+        await asyncio.sleep(1)
+        return {"type": "http.request", "body": b""}
+    
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": []}, receive)
+
+
+def _parse(chunks):
+    """SSEのチャンクを (連番, event, data) に変換"""
+    messages = []
+    for chunk in chunks:
+        if chunk.startswith(":"):
+            continue
+        fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+        messages.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return messages
+
+
+async def _collect(database, live_messages, *, last_event_id=None):
+    """キューのSSEを開き、ライブ配信のメッセージを送ってから切断するまでのチャンクを返す"""
+    async with database.session() as db:
+        response = await stream_pending_queue(
+            request=_request_disconnecting_after(len(live_messages)),
+            snapshot_size=100,
+            last_event_id=last_event_id,
+            db=db
+        )
+        chunks = []
+        iterator = response.body_iterator
+        # スナップショット・再送分を受信してからライブ配信を開始
+        chunks.append(await iterator.__anext__())
+        database.statements.clear()
+        for message in live_messages:
+            await broker.publish(message)
+        chunks.extend([chunk async for chunk in iterator])
+    return chunks, list(database.statements)
+
+
+def test_pending_stream_sends_snapshot_then_queue_events(product_id, database):
+    """接続時に承認待ち一覧を送り、以降はキューに関係するイベントのみを送る（DBアクセス無し）"""
+    ids = [
+        client.post("/api/v1/trial-requests/", json={"product_id": product_id}).json()["id"]
+        for _ in range(2)
+    ]
+    client.patch(f"/api/v1/trial-requests/{ids[0]}/approve", json={})
+    
+    live = [
+        {"id": 10001, "seq": 10001, "event_type": "trial_request.created", "aggregate_type": "trial_request"},
+        {"id": 10002, "seq": 10002, "event_type": "trial_request.feedback_added", "aggregate_type": "trial_request"},
+        {"id": 10003, "seq": 10003, "event_type": "product.stock_changed", "aggregate_type": "product"},
+        {"id": 10004, "seq": 10004, "event_type": "trial_request.rejected", "aggregate_type": "trial_request"},
+    ]
+    live = [{**message, "salon_id": DEFAULT_SALON_ID} for message in live]
+    # 他のサロンのキューのイベントは配信しない
+    live.append({
+        "id": 10005, "seq": 10005, "salon_id": DEFAULT_SALON_ID + 1,
+        "event_type": "trial_request.created", "aggregate_type": "trial_request"
+    })
+    asyncio.run(database.dispatch_outbox())
+    chunks, live_statements = asyncio.run(_collect(database, live))
+    messages = _parse(chunks)
+    
+    snapshot_id, snapshot_event, snapshot = messages[0]
+    assert snapshot_event == "pending_snapshot"
+    pending_ids = [item["id"] for item in snapshot["items"]]
+    assert ids[1] in pending_ids
+    assert ids[0] not in pending_ids
+    assert snapshot_id == asyncio.run(_latest_seq(database))
+    
+    assert [(seq, name) for seq, name, _ in messages[1:]] == [
+        (10001, "trial_request.created"),
+        (10004, "trial_request.rejected"),
+    ]
+    assert live_statements == []
+
+
+async def _latest_seq(database):
+    await database.dispatch_outbox()
+    async with database.session() as db:
+        return await crud_outbox.get_latest_seq(db)
+
+
+def test_pending_stream_replays_after_last_event_id(product_id, database):
+    """再接続時はスナップショットではなく Last-Event-ID 以降のイベントを再送する"""
+    cursor = asyncio.run(_latest_seq(database))
+    request_id = client.post(
+        "/api/v1/trial-requests/", json={"product_id": product_id}
+    ).json()["id"]
+    client.patch(f"/api/v1/products/{product_id}/stock", json={"stock_quantity": 4})
+    client.patch(f"/api/v1/trial-requests/{request_id}/approve", json={})
+    
+    async def scenario():
+        await database.dispatch_outbox()
+        async with database.session() as db:
+            response = await stream_pending_queue(
+                request=_request_disconnecting_after(0),
+                snapshot_size=100,
+                last_event_id=str(cursor),
+                db=db
+            )
+            return [chunk async for chunk in response.body_iterator]
+    
+    messages = _parse(asyncio.run(scenario()))
+    assert [(name, data["aggregate_id"]) for _, name, data in messages] == [
+        ("trial_request.created", request_id),
+        ("trial_request.approved", request_id),
+    ]
+    assert all(seq > cursor for seq, _, _ in messages)
+
+
+class FakeRedisHub:
+    """Redis pub/sub のテスト用代替（チャンネル毎に購読者へ配信）"""
+    
+    def __init__(self):
+        self.channels = {}
+    
+    def client(self):
+        return FakeRedisClient(self)
+
+
+class FakeRedisClient:
+    def __init__(self, hub):
+        self.hub = hub
+    
+    async def publish(self, channel, data):
+        for queue in self.hub.channels.get(channel, []):
+            queue.put_nowait({"type": "message", "channel": channel, "data": data})
+        return len(self.hub.channels.get(channel, []))
+    
+    def pubsub(self):
+        return FakePubSub(self.hub)
+
+
+class FakePubSub:
+    def __init__(self, hub):
+        self.hub = hub
+        self.queue = asyncio.Queue()
+        self.channel = None
+    
+    async def subscribe(self, channel):
+        self.channel = channel
+        self.hub.channels.setdefault(channel, []).append(self.queue)
+        self.queue.put_nowait({"type": "subscribe", "channel": channel, "data": 1})
+    
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+    
+    async def close(self):
+        if self.channel:
+            self.hub.channels[self.channel].remove(self.queue)
+
+
+def test_redis_broker_fans_out_across_workers():
+    """Redis経由の配信は publish したワーカー以外の購読にも届く"""
+    async def scenario():
+        hub = FakeRedisHub()
+        workers = [
+            RedisEventBroker(channel="test:events", client=hub.client())
+            for _ in range(2)
+        ]
+        subscriptions = [worker.subscribe() for worker in workers]
+        for worker in workers:
+            await worker.start()
+        await asyncio.sleep(0)
+        
+        await workers[0].publish({"id": 1, "event_type": "trial_request.created"})
+        received = [await subscription.get(timeout=1) for subscription in subscriptions]
+        
+        for worker in workers:
+            await worker.stop()
+        return received, hub.channels["test:events"]
+    
+    received, remaining = asyncio.run(scenario())
+    assert received == [{"id": 1, "event_type": "trial_request.created"}] * 2
+    assert remaining == []
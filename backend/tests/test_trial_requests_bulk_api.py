@@ -0,0 +1,109 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+@pytest.fixture(scope="module")
+def product_id():
+    response = client.post("/api/v1/products/", json={
+        "name": "一括処理テスト商品", "category": "treatment", "price": 2000
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _create_requests(product_id: int, count: int):
+    ids = []
+    for _ in range(count):
+        response = client.post("/api/v1/trial-requests/", json={"product_id": product_id})
+        assert response.status_code == 201
+        ids.append(response.json()["id"])
+    return ids
+
+
+def test_bulk_approve_reports_per_id_outcomes(product_id):
+    """一括承認でID毎の結果が返る"""
+    ids = _create_requests(product_id, 3)
+    client.patch(f"/api/v1/trial-requests/{ids[0]}/reject", json={})
+    
+    response = client.post(
+        "/api/v1/trial-requests/bulk/approve?staff_id=7",
+        json={"ids": ids + [999999], "staff_notes": "週末分"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["applied"], data["conflict"], data["not_found"]) == (2, 1, 1)
+    outcomes = {item["id"]: item["outcome"] for item in data["results"]}
+    assert outcomes[ids[0]] == "conflict"
+    assert outcomes[ids[1]] == "applied"
+    assert outcomes[999999] == "not_found"
+    
+    detail = client.get(f"/api/v1/trial-requests/{ids[1]}").json()
+    assert detail["status"] == "approved"
+    assert detail["approved_by"] == 7
+    assert detail["staff_notes"] == "週末分"
+
+
+def test_bulk_start_and_complete(product_id):
+    """一括開始・一括完了は遷移元ステータスで制御される"""
+    ids = _create_requests(product_id, 2)
+    client.post("/api/v1/trial-requests/bulk/approve", json={"ids": ids})
+    
+    data = client.post("/api/v1/trial-requests/bulk/start", json={"ids": ids[:1]}).json()
+    assert data["applied"] == 1
+    
+    data = client.post("/api/v1/trial-requests/bulk/complete", json={"ids": ids}).json()
+    assert data["applied"] == 2
+    
+    data = client.post("/api/v1/trial-requests/bulk/reject", json={"ids": ids}).json()
+    assert data["conflict"] == 2
+
+
+def test_bulk_reject_and_complete_record_actor(product_id):
+    """一括却下・一括完了は操作したスタッフを処理者に記録する（開始済みなら開始したスタッフのまま）"""
+    rejected, completed, started = _create_requests(product_id, 3)
+    client.post("/api/v1/trial-requests/bulk/reject?staff_id=5", json={"ids": [rejected]})
+    client.post("/api/v1/trial-requests/bulk/approve?staff_id=7", json={"ids": [completed, started]})
+    client.post("/api/v1/trial-requests/bulk/start?staff_id=8", json={"ids": [started]})
+    
+    data = client.post(
+        "/api/v1/trial-requests/bulk/complete?staff_id=9", json={"ids": [completed, started]}
+    ).json()
+    assert data["applied"] == 2
+    
+    def detail(request_id):
+        data = client.get(f"/api/v1/trial-requests/{request_id}").json()
+        return data["status"], data["approved_by"], data["processed_by"]
+    
+    assert detail(rejected) == ("rejected", None, 5)
+    assert detail(completed) == ("completed", 7, 9)
+    assert detail(started) == ("completed", 7, 8)
+
+
+def test_bulk_approve_thousand_ids(product_id):
+    """1000件の一括承認"""
+    ids = _create_requests(product_id, 50) + list(range(10**6, 10**6 + 950))
+    
+    started = time.perf_counter()
+    response = client.post("/api/v1/trial-requests/bulk/approve", json={"ids": ids})
+    elapsed = time.perf_counter() - started
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["applied"] == 50
+    assert data["not_found"] == 950
+    assert elapsed < 1.0
+
+
+def test_bulk_rejects_too_many_ids():
+    """1001件以上はバリデーションエラー"""
+    response = client.post(
+        "/api/v1/trial-requests/bulk/approve", json={"ids": list(range(1001))}
+    )
+    assert response.status_code == 422
@@ -0,0 +1,118 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from main import app
+from app.crud.trial_stats import product_trial_stats
+from app.models import ProductTrialStats
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def _create_product(name: str) -> int:
+    response = client.post("/api/v1/products/", json={
+        "name": name, "category": "treatment", "price": 3000, "status": "active"
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _completed_trial(product_id: int) -> int:
+    request_id = client.post("/api/v1/trial-requests/", json={"product_id": product_id}).json()["id"]
+    client.post("/api/v1/trial-requests/bulk/approve", json={"ids": [request_id]})
+    client.post("/api/v1/trial-requests/bulk/start", json={"ids": [request_id]})
+    client.post("/api/v1/trial-requests/bulk/complete", json={"ids": [request_id]})
+    return request_id
+
+
+def _feedback(request_id: int, rating: int, effectiveness: int, purchase_intent: bool):
+    response = client.post(f"/api/v1/trial-requests/{request_id}/feedback", json={
+        "customer_rating": rating, "effectiveness_rating": effectiveness,
+        "purchase_intent": purchase_intent
+    })
+    assert response.status_code == 200
+
+
+def _stats(product_id: int) -> dict:
+    response = client.get(f"/api/v1/products/{product_id}/trial-stats")
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_stats_follow_transitions_and_feedback():
+    """作成・完了・フィードバックで集計が更新される"""
+    product_id = _create_product("集計テスト商品")
+    assert _stats(product_id)["trial_count"] == 0
+
+    first = _completed_trial(product_id)
+    second = _completed_trial(product_id)
+    client.post("/api/v1/trial-requests/", json={"product_id": product_id})
+    _feedback(first, 5, 4, True)
+    _feedback(second, 3, 2, False)
+
+    stats = _stats(product_id)
+    assert stats["trial_count"] == 3
+    assert stats["completed_count"] == 2
+    assert stats["rating_count"] == 2
+    assert stats["avg_rating"] == pytest.approx(4.0)
+    assert stats["avg_effectiveness"] == pytest.approx(3.0)
+    assert stats["conversion_rate"] == pytest.approx(0.5)
+    assert stats["completion_rate"] == pytest.approx(2 / 3)
+
+    # フィードバックの上書き・完了からの変更は差分で反映する
+    _feedback(second, 5, 4, True)
+    client.patch(f"/api/v1/trial-requests/{first}/status?staff_id=2", json={"status": "cancelled"})
+    stats = _stats(product_id)
+    assert stats["avg_rating"] == pytest.approx(5.0)
+    assert stats["conversion_rate"] == pytest.approx(1.0)
+    assert stats["completed_count"] == 1
+
+
+def test_unknown_product_returns_404():
+    assert client.get("/api/v1/products/999999/trial-stats").status_code == 404
+
+
+def test_product_list_sorted_by_trial_stats():
+    """商品一覧をトライアル集計の値で並べ替える（集計の無い商品は最後）"""
+    low = _create_product("評価低")
+    high = _create_product("評価高")
+    untried = _create_product("未トライアル")
+    _feedback(_completed_trial(low), 2, 2, False)
+    _feedback(_completed_trial(high), 5, 5, True)
+
+    items = client.get("/api/v1/products/?sort=best_rated&size=100").json()["items"]
+    ids = [item["id"] for item in items]
+    assert ids.index(high) < ids.index(low) < ids.index(untried)
+
+    # 集計の更新で並べ替え済みのキャッシュを破棄する
+    assert client.get("/api/v1/products/?sort=best_rated&size=100").headers["x-cache"] == "HIT"
+    _feedback(_completed_trial(untried), 5, 5, True)
+    response = client.get("/api/v1/products/?sort=best_rated&size=100")
+    assert response.headers["x-cache"] == "MISS"
+    ids = [item["id"] for item in response.json()["items"]]
+    assert ids.index(untried) < ids.index(low)
+
+
+def test_reconcile_repairs_drift(database):
+    """照合で稼働中のテーブルから集計し直す"""
+    product_id = _create_product("照合テスト商品")
+    _feedback(_completed_trial(product_id), 4, 3, True)
+    expected = _stats(product_id)
+
+    async def scenario():
+        async with database.session() as db:
+            await db.execute(
+                update(ProductTrialStats)
+                .where(ProductTrialStats.product_id == product_id)
+                .values(trial_count=100, avg_rating=1.0)
+            )
+            await db.commit()
+            await product_trial_stats.reconcile(db)
+
+    asyncio.run(scenario())
+    repaired = _stats(product_id)
+    assert {k: v for k, v in repaired.items() if k != "updated_at"} == \
+        {k: v for k, v in expected.items() if k != "updated_at"}
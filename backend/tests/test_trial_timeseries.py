@@ -0,0 +1,132 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from main import app
+from app.crud.trial_rollup import trial_rollup
+from app.models import TrialActivityDaily, TrialActivityHourly
+
+
+METRICS = ("requests", "approvals", "completions", "conversions")
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def _create_product(name: str, category: str) -> int:
+    response = client.post("/api/v1/products/", json={
+        "name": name, "category": category, "price": 3000, "status": "active"
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _create_request(product_id: int) -> int:
+    response = client.post("/api/v1/trial-requests/", json={"product_id": product_id})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _timeseries(**params) -> dict:
+    now = datetime.utcnow()
+    params.setdefault("start", (now - timedelta(hours=2)).isoformat())
+    params.setdefault("end", (now + timedelta(hours=1)).isoformat())
+    params.setdefault("interval", "hour")
+    response = client.get("/api/v1/trial-requests/timeseries", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def _totals(series: dict) -> dict:
+    return {metric: sum(point[metric] for point in series["points"]) for metric in METRICS}
+
+
+def _by_key(data: dict, key: str) -> dict:
+    return {series[key]: _totals(series) for series in data["series"]}
+
+
+def test_timeseries_follows_activity_by_category_and_stylist():
+    """作成・承認・完了・購入意向をカテゴリ・スタイリスト毎に集計する"""
+    before = _totals(_timeseries()["series"][0])
+    treatment = _create_product("時系列トリートメント", "treatment")
+    shampoo = _create_product("時系列シャンプー", "shampoo")
+    first, second = _create_request(treatment), _create_request(treatment)
+    third = _create_request(shampoo)
+
+    client.post("/api/v1/trial-requests/bulk/approve?staff_id=3", json={"ids": [first]})
+    client.post("/api/v1/trial-requests/bulk/approve?staff_id=4", json={"ids": [second]})
+    client.patch(f"/api/v1/trial-requests/{third}/status?staff_id=4", json={"status": "approved"})
+    client.post("/api/v1/trial-requests/bulk/start?staff_id=3", json={"ids": [first]})
+    client.post("/api/v1/trial-requests/bulk/complete", json={"ids": [first]})
+    client.post(f"/api/v1/trial-requests/{first}/feedback", json={
+        "customer_rating": 5, "effectiveness_rating": 4, "purchase_intent": True
+    })
+
+    data = _timeseries()
+    assert len(data["series"]) == 1
+    after = _totals(data["series"][0])
+    assert {metric: after[metric] - before[metric] for metric in METRICS} == \
+        {"requests": 3, "approvals": 3, "completions": 1, "conversions": 1}
+
+    by_category = _by_key(_timeseries(group_by="category"), "category")
+    assert by_category["shampoo"] == {"requests": 1, "approvals": 1, "completions": 0, "conversions": 0}
+    assert by_category["treatment"] == {"requests": 2, "approvals": 2, "completions": 1, "conversions": 1}
+
+    by_stylist = _by_key(_timeseries(group_by="stylist", category="treatment"), "stylist_id")
+    assert by_stylist[0]["requests"] == 2
+    assert by_stylist[3] == {"requests": 0, "approvals": 1, "completions": 1, "conversions": 1}
+    assert by_stylist[4] == {"requests": 0, "approvals": 1, "completions": 0, "conversions": 0}
+
+    # 完了からの変更は完了・購入意向を取り消す
+    client.patch(f"/api/v1/trial-requests/{first}/status?staff_id=2", json={"status": "cancelled"})
+    by_category = _by_key(_timeseries(group_by="category"), "category")
+    assert by_category["treatment"]["completions"] == 0
+    assert by_category["treatment"]["conversions"] == 0
+
+
+def test_buckets_are_zero_filled():
+    """日・週単位は件数の無いバケットも0で返す"""
+    now = datetime.utcnow()
+    start = (now - timedelta(days=3)).isoformat()
+    daily = _timeseries(interval="day", start=start, end=now.isoformat())
+    points = daily["series"][0]["points"]
+    assert len(points) == 4
+    assert points[0]["requests"] == 0
+
+    weekly = _timeseries(interval="week", start=(now - timedelta(weeks=3)).isoformat(), end=now.isoformat())
+    buckets = [datetime.fromisoformat(point["bucket_start"]) for point in weekly["series"][0]["points"]]
+    assert all(bucket.weekday() == 0 for bucket in buckets)
+    assert _totals(weekly["series"][0]) == _totals(_timeseries(interval="day", start=buckets[0].isoformat(), end=now.isoformat())["series"][0])
+
+
+def test_invalid_ranges_are_rejected():
+    now = datetime.utcnow()
+    url = "/api/v1/trial-requests/timeseries"
+    assert client.get(url, params={"start": now.isoformat(), "end": (now - timedelta(hours=1)).isoformat()}).status_code == 400
+    assert client.get(url, params={"start": (now - timedelta(days=3650)).isoformat(), "interval": "day"}).status_code == 400
+    assert client.get(url, params={"start": (now - timedelta(days=365)).isoformat(), "interval": "hour"}).status_code == 400
+
+
+def test_compact_rebuilds_rollups_and_stats_period(database):
+    """圧縮ジョブで直近の集計を作り直す・統計の期間指定は日単位の集計から数える"""
+    _create_request(_create_product("照合テスト", "styling"))
+    expected = _totals(_timeseries(interval="day")["series"][0])
+
+    async def scenario():
+        async with database.session() as db:
+            for model in (TrialActivityHourly, TrialActivityDaily):
+                await db.execute(update(model).values(requests=100))
+            await db.commit()
+            return await trial_rollup.compact(db)
+
+    assert asyncio.run(scenario()) > 0
+    assert _totals(_timeseries(interval="day")["series"][0]) == expected
+    assert _totals(_timeseries()["series"][0])["requests"] == expected["requests"]
+
+    today = datetime.utcnow().date().isoformat()
+    period = client.get(f"/api/v1/trial-requests/stats?start_date={today}&end_date={today}").json()["period"]
+    assert {metric: period[metric] for metric in METRICS} == expected
+    assert client.get("/api/v1/trial-requests/stats?start_date=bad").status_code == 400